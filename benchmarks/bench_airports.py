@@ -0,0 +1,216 @@
+# benchmarks/bench_airports.py
+"""Airport reference store: memory per worker and lookup latency, memory-mapped vs per-process dicts.
+
+Run with: python -m benchmarks.bench_airports --airports 80000 --workers 4
+
+Pads the bundled sample with synthetic OurAirports-style rows up to
+--airports, about the size of the full dataset. Roughly one in eight rows
+has an IATA code and half have an ICAO code. The CSV is compiled into the
+binary store. Then --workers processes are started twice. In the first
+run each worker parses the CSV into dicts keyed by code, as a plain
+implementation would. In the second run each worker maps the compiled file
+and touches every page of it. Each worker reports the growth of its
+resident set (RSS), proportional set (PSS, shared pages split between the
+processes mapping them) and private memory while all workers are alive.
+Last, the latency of code lookups and of prefix and fuzzy searches is
+measured in one process.
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import string
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.airports.store import (
+    AIRPORTS_CSV_ENV,
+    AIRPORTS_PATH_ENV,
+    DEFAULT_CSV_PATH,
+    AirportStore,
+    build_airports,
+    get_airport_info,
+    normalize,
+)
+
+SYLLABLES = ["ka", "to", "ri", "lo", "man", "sa", "ber", "vi", "na", "do", "lin", "gra", "po", "tes",
+             "mar", "quo", "ven", "hal", "ost", "burg", "fel", "dun", "ash", "cor", "el", "mi", "ra", "sun"]
+SUFFIXES = ["International Airport", "Regional Airport", "Airport", "Airfield", "Heliport", "Municipal Airport"]
+TYPES = ["small_airport"] * 12 + ["heliport"] * 4 + ["medium_airport"] * 2 + ["closed", "seaplane_base"]
+
+
+def synthetic_rows(count, columns, seed=13):
+    rng = random.Random(seed)
+    letters = string.ascii_uppercase
+    iata = [a + b + c for a in letters for b in letters for c in letters]
+    icao = ["Y" + a + b + c for a in letters for b in letters for c in letters]  # Y... is unused by real ICAO regions
+    rng.shuffle(iata)
+    rng.shuffle(icao)
+    rows = []
+    for i in range(count):
+        city = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        kind = rng.choice(TYPES)
+        row = dict.fromkeys(columns, "")
+        row.update({
+            "id": 100_000 + i, "ident": f"SY{i:05d}", "type": kind,
+            "name": f"{city} {rng.choice(SUFFIXES)}", "municipality": city,
+            "latitude_deg": round(rng.uniform(-60, 70), 4), "longitude_deg": round(rng.uniform(-180, 180), 4),
+            "elevation_ft": rng.randrange(0, 9000), "continent": rng.choice(["NA", "EU", "AS", "SA", "AF", "OC"]),
+            "iso_country": rng.choice(["US", "CA", "BR", "AU", "RU", "CN", "IN", "FR"]),
+            "scheduled_service": "yes" if kind == "medium_airport" and rng.random() < 0.5 else "no",
+        })
+        row["iso_region"] = f"{row['iso_country']}-{rng.randrange(1, 60):02d}"
+        if rng.random() < 0.5 and icao:
+            row["icao_code"] = row["gps_code"] = icao.pop()
+        if rng.random() < 0.12 and iata:
+            row["iata_code"] = iata.pop()
+        rows.append(row)
+    return rows
+
+
+def write_dataset(path, airports):
+    with open(DEFAULT_CSV_PATH, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        columns, rows = reader.fieldnames, list(reader)
+    taken = {row["iata_code"] for row in rows}
+    extra = [row for row in synthetic_rows(max(0, airports - len(rows)), columns) if row["iata_code"] not in taken]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, columns)
+        writer.writeheader()
+        writer.writerows(rows + extra)
+    return rows + extra
+
+
+def memory():
+    """RSS, PSS and private memory of this process in bytes."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return fields.get("Rss", 0), fields.get("Pss", 0), fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+
+
+def load_dicts(csv_path):
+    """Baseline: every worker parses the CSV into its own dicts and a sorted city list."""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = [row for row in csv.DictReader(f) if row["type"] != "closed"]
+    by_iata = {row["iata_code"]: row for row in rows if row["iata_code"]}
+    by_icao = {row["icao_code"]: row for row in rows if row["icao_code"]}
+    cities = sorted((normalize(row["municipality"]), i) for i, row in enumerate(rows))
+    return by_iata, by_icao, cities
+
+
+def worker(mode, csv_path, bin_path, codes, barrier, results):
+    before = memory()
+    if mode == "dicts":
+        data = load_dicts(csv_path)
+        found = sum(code in data[0] or code in data[1] for code in codes)
+    else:
+        data = AirportStore(bin_path)
+        found = sum(data.find(code) is not None for code in codes)
+        # Fault in every page of the mapping, as a long-running worker eventually would
+        np.frombuffer(data._map, dtype=np.uint8)[::4096].sum()
+    barrier.wait()
+    after = memory()
+    results.put((mode, found, *(a - b for a, b in zip(after, before))))
+    barrier.wait()
+
+
+def run_workers(mode, count, csv_path, bin_path, codes):
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(count), context.Queue()
+    processes = [context.Process(target=worker, args=(mode, csv_path, bin_path, codes, barrier, results))
+                 for _ in range(count)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return reports
+
+
+def latency(function, queries):
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        function(query)
+        samples.append(time.perf_counter() - started)
+    return latency_summary(samples)
+
+
+def typo(word, rng):
+    if len(word) < 5:
+        return word
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--airports", type=int, default=80_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--lookups", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, bin_path = os.path.join(tmp, "airports.csv"), os.path.join(tmp, "airports.bin")
+        rows = write_dataset(csv_path, args.airports)
+        os.environ[AIRPORTS_CSV_ENV], os.environ[AIRPORTS_PATH_ENV] = csv_path, bin_path
+        started = time.perf_counter()
+        count = build_airports(csv_path, bin_path)
+        build_s = time.perf_counter() - started
+        store = AirportStore(bin_path)
+        stats = store.stats()
+        print_report(f"Compiling {len(rows):,} OurAirports-style rows", {
+            "airports kept (not closed)": count,
+            "IATA / ICAO codes": f"{stats['iata_codes']:,} / {stats['icao_codes']:,}",
+            "build (s)": build_s,
+            "CSV size (MB)": os.path.getsize(csv_path) / 2**20,
+            "compiled file (MB)": stats["file_bytes"] / 2**20,
+        })
+
+        iata_codes = [row["iata_code"] for row in rows if row["iata_code"] and row["type"] != "closed"]
+        icao_codes = [row["icao_code"] for row in rows if row["icao_code"] and row["type"] != "closed"]
+        codes = iata_codes + icao_codes
+        report = {}
+        for mode in ("dicts", "mmap"):
+            reports = run_workers(mode, args.workers, csv_path, bin_path, codes)
+            rss, pss, private = (np.mean([r[i] for r in reports]) / 2**20 for i in (2, 3, 4))
+            report[f"{mode}: RSS / PSS / private per worker (MB)"] = f"{rss:.1f} / {pss:.1f} / {private:.1f}"
+            report[f"{mode}: PSS total for {args.workers} workers (MB)"] = pss * args.workers
+        print_report(f"Memory added per worker, {args.workers} workers alive at once", report)
+
+        rng = random.Random(2)
+        iata = [rng.choice(iata_codes) for _ in range(args.lookups)]
+        icao = [rng.choice(icao_codes) for _ in range(args.lookups)]
+        missing = ["".join(rng.choice(string.ascii_uppercase) for _ in range(4)) for _ in range(args.lookups)]
+        by_iata, by_icao, _ = load_dicts(csv_path)
+        cities = [row["municipality"] for row in rows if row["municipality"]]
+        prefixes = [rng.choice(cities)[:rng.randint(2, 6)] for _ in range(5000)]
+        typos = [typo(rng.choice(cities).lower(), rng) for _ in range(2000)]
+        results = {
+            "IATA find": latency(store.find, iata),
+            "ICAO find": latency(store.find, icao),
+            "absent code": latency(store.find, missing),
+            "dict lookup (baseline)": latency(by_iata.get, iata),
+            "prefix search": latency(lambda q: store.prefix_search(q, 8), prefixes),
+            "fuzzy search (one transposition)": latency(lambda q: store.fuzzy_search(q, 8), typos),
+            "get_airport_info tool": latency(get_airport_info, iata[:5000]),
+        }
+        hits = sum(bool(store.search(q, 8)) for q in typos)
+        print_report(f"Lookup latency over {count:,} airports", {
+            **{f"{name} p50 / p99 (us)": f"{r['p50_ms'] * 1000:.1f} / {r['p99_ms'] * 1000:.1f}"
+               for name, r in results.items()},
+            "misspelled cities with a result": f"{hits:,} / {len(typos):,}",
+        })
+        del os.environ[AIRPORTS_CSV_ENV], os.environ[AIRPORTS_PATH_ENV]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# benchmarks/bench_alerts.py
+"""Flight alert fan-out: one delay pushed to 50k following sessions.
+
+Run with: python -m benchmarks.bench_alerts --followers 50000 --sessions 500000
+
+Fills a FlightAlertIndex with `sessions` sessions spread over a day's
+flights, `followers` of them on the delayed flight. Finding those sessions
+with the index is compared against scanning every session's followed
+flights. The delay is then published through an AlertDispatcher. Followers
+are split across the in-app "session" channel (some with a live stream
+open) and two simulated gateways, push and SMS. Each gateway call costs a
+fixed round trip plus a little per message. The report covers time to
+queue, time to last delivery, gateway calls per channel, how long publish()
+waited on full queues, and live-stream latency.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.alerts import AlertDispatcher, FlightAlertIndex, SessionInbox, flight_key
+
+DATE = "2026-03-05"
+DELAYED = "AA100"
+# channel -> (share of followers, batch size, seconds per call, seconds per message)
+GATEWAYS = {
+    "session": (0.7, 500, 0.0, 0.0),
+    "push": (0.2, 500, 0.020, 0.00001),
+    "sms": (0.1, 100, 0.050, 0.0001),
+}
+
+
+class Gateway:
+    """A batch send API: one round trip per call, plus a cost per message."""
+
+    def __init__(self, call_s, message_s):
+        self.call_s = call_s
+        self.message_s = message_s
+        self.calls = 0
+
+    async def __call__(self, alert, recipients):
+        self.calls += 1
+        await asyncio.sleep(self.call_s + self.message_s * len(recipients))
+
+
+def build_index(sessions, followers, flights, seed=7):
+    rng = random.Random(seed)
+    channels = list(GATEWAYS)
+    weights = [share for share, *_ in GATEWAYS.values()]
+    index = FlightAlertIndex()
+    for i in range(sessions):
+        flight = DELAYED if i < followers else f"{rng.choice(['AA', 'UA', 'DL'])}{rng.randrange(101, 101 + flights)}"
+        index.track(f"s{i:07d}", flight, DATE, user_id=f"u{i}", channel=rng.choices(channels, weights)[0])
+    return index
+
+
+def scan_sessions(index):
+    """Baseline: check every session's followed flights for the delayed one."""
+    key = flight_key(DELAYED, DATE)
+    return [session_id for session_id, keys in index.flights.items() if key in keys]
+
+
+def timed(function, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return latency_summary(samples)
+
+
+async def fan_out(index, listeners, max_pending):
+    dispatcher = AlertDispatcher(index)
+    inbox = SessionInbox()
+    gateways = {}
+    for name, (_, batch_size, call_s, message_s) in GATEWAYS.items():
+        send = inbox if name == "session" else gateways.setdefault(name, Gateway(call_s, message_s))
+        dispatcher.add_channel(name, send, batch_size=batch_size, max_pending=max_pending)
+    await dispatcher.start()
+
+    followers = [r.session_id for r in index.recipients(DELAYED, DATE) if r.channel == "session"]
+    streams = [inbox.listen(session_id) for session_id in followers[:listeners]]
+    received = []
+
+    async def read(stream):
+        await anext(stream)
+        received.append(time.perf_counter() - started)
+
+    readers = [asyncio.create_task(read(stream)) for stream in streams]
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    _, queued = await dispatcher.publish({"flight_number": DELAYED, "date": DATE, "type": "DELAY",
+                                          "delay_minutes": 95, "new_departure": "16:05"})
+    queued_s = time.perf_counter() - started
+    await dispatcher.drain()
+    delivered_s = time.perf_counter() - started
+    await asyncio.gather(*readers)
+    for stream in streams:
+        stream.close()
+    await dispatcher.close()
+    return dispatcher.stats(), queued, queued_s, delivered_s, received, {n: g.calls for n, g in gateways.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--followers", type=int, default=50_000, help="sessions following the delayed flight")
+    parser.add_argument("--sessions", type=int, default=500_000, help="sessions in the index")
+    parser.add_argument("--flights", type=int, default=2000, help="other flights per carrier")
+    parser.add_argument("--listeners", type=int, default=1000, help="followers with a live stream open")
+    parser.add_argument("--max-pending", type=int, default=32, help="queued batches per channel")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = build_index(max(args.sessions, args.followers), args.followers, args.flights)
+    build_s = time.perf_counter() - started
+    by_index = timed(lambda: index.recipients(DELAYED, DATE))
+    by_scan = timed(lambda: scan_sessions(index), repeat=5)
+    print_report(f"Finding the {args.followers:,} followers among {len(index):,} sessions", {
+        "index build (s)": build_s,
+        "inverted index p50 (ms)": by_index["p50_ms"],
+        "scan every session p50 (ms)": by_scan["p50_ms"],
+        "speedup": by_scan["p50_ms"] / by_index["p50_ms"],
+    })
+
+    stats, queued, queued_s, delivered_s, received, calls = asyncio.run(
+        fan_out(index, args.listeners, args.max_pending)
+    )
+    live = latency_summary(received)
+    rows = {
+        "sessions queued": queued,
+        "publish returned (ms)": queued_s * 1000,
+        "last delivery (ms)": delivered_s * 1000,
+        "deliveries/sec": queued / delivered_s,
+        "live stream p50 / p99 (ms)": f"{live['p50_ms']:.2f} / {live['p99_ms']:.2f}",
+    }
+    for name, channel in stats["channels"].items():
+        rows[f"{name}: sent / calls"] = f"{channel['sent']:,} / {calls.get(name, channel['batches']):,}"
+        rows[f"{name}: backpressure wait (ms)"] = channel["backpressure_wait_ms"]
+    print_report(f"Fan-out of one delay to {queued:,} sessions", rows)
+
+
+if __name__ == "__main__":
+    main()
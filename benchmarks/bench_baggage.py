@@ -0,0 +1,145 @@
+# benchmarks/bench_baggage.py
+"""Baggage scan store: 1M-scan replay, O(1) lookups, pushed deltas over a live feed.
+
+Run with: python -m benchmarks.bench_baggage --scans 1000000 --watchers 1000
+
+Writes a synthetic hub scan log, replays most of it from the file, then
+streams the rest through the TCP feed while asyncio watchers follow some of
+the bags still moving. Reports ingest rate, lookup latency at a tenth of the
+load and at full load (flat if lookups are O(1)), and how long a pushed
+delta takes to reach its watcher.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import resource
+import tempfile
+import time
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.baggage import (
+    INGEST_BATCH,
+    ScanStore,
+    TagWatch,
+    send_scans,
+    serve_feed,
+    synthetic_scans,
+    track_baggage,
+)
+
+SCANS_PER_BAG = 7  # average journey length in synthetic_scans, rounded up
+
+
+class TimedWatch(TagWatch):
+    """A TagWatch that stamps each delta when the store pushes it."""
+
+    def _push(self, delta):
+        super()._push(dict(delta, pushed=time.perf_counter()))
+
+
+def lookup_latency(store, tags, count=50_000):
+    rng = random.Random(1)
+    samples = []
+    for tag in rng.choices(tags, k=count):
+        started = time.perf_counter()
+        store.latest(tag)
+        samples.append(time.perf_counter() - started)
+    return latency_summary(samples)
+
+
+async def follow(store, tags, feed_path, port):
+    watches = [TimedWatch(store, tag) for tag in tags]
+    received = []
+
+    async def consume(watch):
+        async for delta in watch:
+            received.append(time.perf_counter() - delta["pushed"])
+            if delta["final"]:
+                return
+
+    server = await serve_feed(store, port=port)
+    consumers = [asyncio.create_task(consume(watch)) for watch in watches]
+    base, started = store.scans, time.perf_counter()
+    sent = await send_scans(feed_path, "127.0.0.1", server.sockets[0].getsockname()[1])
+    while store.scans < base + sent:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(0.1)
+    for task in consumers:
+        task.cancel()
+    for watch in watches:
+        watch.close()
+    server.close()
+    await server.wait_closed()
+    return sent, elapsed, received, sum(watch.dropped for watch in watches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scans", type=int, default=1_000_000)
+    parser.add_argument("--live", type=float, default=0.1, help="fraction of the log sent through the feed")
+    parser.add_argument("--watchers", type=int, default=1000, help="tags followed during the live part")
+    parser.add_argument("--port", type=int, default=0, help="feed port (0 picks a free one)")
+    args = parser.parse_args()
+
+    lines = synthetic_scans(max(1, args.scans // SCANS_PER_BAG))
+    split = int(len(lines) * (1 - args.live))
+    with tempfile.TemporaryDirectory() as tmp:
+        bulk_path, live_path = os.path.join(tmp, "bulk.log"), os.path.join(tmp, "live.log")
+        for path, part in ((bulk_path, lines[:split]), (live_path, lines[split:])):
+            with open(path, "w", encoding="utf-8") as out:
+                out.writelines(line + "\n" for line in part)
+        live_tags = sorted({line.split("|", 2)[1] for line in lines[split:]})
+        del lines
+
+        store = ScanStore()
+        replay_s = 0.0
+        with open(bulk_path, encoding="utf-8") as log:
+            for stage, count in (("early", split // 10), ("rest", split)):
+                started = time.perf_counter()
+                while chunk := list(itertools.islice(log, min(INGEST_BATCH, count))):
+                    count -= store.ingest(chunk)
+                replay_s += time.perf_counter() - started
+                if stage == "early":
+                    early_lookup = lookup_latency(store, list(store.history))
+        replayed = store.scans
+        full_lookup = lookup_latency(store, list(store.history))
+
+        sample = store.latest(random.Random(2).choice(list(store.history)))
+        samples = []
+        for tag in random.Random(3).choices(list(store.history), k=20_000):
+            scan = store.latest(tag)
+            begun = time.perf_counter()
+            track_baggage(scan.pnr, scan.last_name, store=store)
+            samples.append(time.perf_counter() - begun)
+        by_booking = latency_summary(samples)
+
+        watched = random.Random(4).sample(live_tags, min(args.watchers, len(live_tags)))
+        sent, live_s, received, dropped = asyncio.run(follow(store, watched, live_path, args.port))
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print_report(f"Replay: {replayed:,} of {replayed + sent:,} scans from a file", {
+        "replay rate (scans/sec)": replayed / replay_s,
+        "bags": len(store),
+        "late scans slotted in": store.late,
+        "latest status p50 / p99 at 10% (us)":
+            f"{early_lookup['p50_ms'] * 1000:.2f} / {early_lookup['p99_ms'] * 1000:.2f}",
+        "latest status p50 / p99 at 100% (us)":
+            f"{full_lookup['p50_ms'] * 1000:.2f} / {full_lookup['p99_ms'] * 1000:.2f}",
+        "track_baggage by booking p50 (us)": by_booking["p50_ms"] * 1000,
+        "peak RSS (MB)": peak_mb,
+        "sample status": f"{sample.tag} {sample.event} at {sample.station}",
+    })
+    delivery = latency_summary(received)
+    print_report(f"Live feed: {sent:,} scans over TCP, {len(watched):,} watched bags", {
+        "feed ingest rate (scans/sec)": sent / live_s,
+        "deltas pushed": len(received),
+        "delivery p50 / p99 (ms)": f"{delivery['p50_ms']:.3f} / {delivery['p99_ms']:.3f}",
+        "deltas dropped (slow watcher)": dropped,
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_fanout.py
+"""Multi-lookup turns run sequentially vs fanned out by parallel_lookup.
+
+Run with: python -m benchmarks.bench_fanout --turns 50
+
+Each tool gets a synthetic backend latency (a blocking sleep, as a real
+HTTP client would incur) in front of its normal response. Every scenario
+runs through FanoutRunner in sequential and in parallel mode; the report
+shows turn latency and the wall-clock time the fan-out saved.
+"""
+import argparse
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.fanout import FANOUT_TOOLS, FanoutRunner, FanoutStats
+
+# Typical backend latency per tool, in milliseconds
+BACKEND_MS = {
+    "check_flight_status": 120, "search_flights": 250, "check_weather": 150,
+    "get_airport_info": 80, "track_baggage": 160, "check_baggage_policy": 60,
+    "check_travel_advisory": 140, "check_miles_balance": 180, "check_status_benefits": 90,
+    "check_visa_requirements": 200, "provide_cultural_guidance": 100, "calculate_time_zones": 40,
+    "check_connection_risk": 60, "search_airports": 30, "check_weather_disruptions": 70,
+}
+
+SCENARIOS = {
+    # README example: delayed flight to Paris with a connection to catch
+    "delayed connection": [
+        {"tool": "check_flight_status", "args": {"flight_number": "AF1680", "date": "2026-03-05"}},
+        {"tool": "check_flight_status", "args": {"flight_number": "AF0022", "date": "2026-03-05"}},
+        {"tool": "check_miles_balance", "args": {"member_number": "FF123456789"}},
+        {"tool": "check_status_benefits", "args": {"member_number": "FF123456789"}},
+        {"tool": "check_weather", "args": {"airport_code": "CDG"}},
+    ],
+    "trip planning": [
+        {"tool": "check_visa_requirements",
+         "args": {"nationality": "US", "destination": "Japan", "purpose": "tourism"}},
+        {"tool": "provide_cultural_guidance", "args": {"destination": "Japan"}},
+        {"tool": "calculate_time_zones",
+         "args": {"origin_timezone": "America/New_York", "destination_timezone": "Asia/Tokyo"}},
+        {"tool": "check_travel_advisory", "args": {"destination": "Japan"}},
+    ],
+    "missing bag": [
+        {"tool": "track_baggage", "args": {"reference_number": "AA123456", "last_name": "Smith"}},
+        {"tool": "check_baggage_policy", "args": {"route_type": "domestic", "fare_class": "economy"}},
+        {"tool": "get_airport_info", "args": {"airport_code": "LAX"}},
+    ],
+}
+
+
+def with_latency(tool, milliseconds):
+    """A stand-in tool whose function blocks for ~milliseconds before answering."""
+    function = getattr(tool.function, "uncached", tool.function)
+
+    def slow(**kwargs):
+        time.sleep(milliseconds * random.uniform(0.7, 1.3) / 1000)
+        return function(**kwargs)
+
+    return SimpleNamespace(name=tool.name, function=slow)
+
+
+async def run(calls, mode, turns, tools, concurrency, timeout):
+    stats = FanoutStats()
+    runner = FanoutRunner(tools, max_concurrency=concurrency, timeout=timeout, mode=mode, stats=stats)
+    samples = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        await runner.run(calls)
+        samples.append(time.perf_counter() - started)
+    return latency_summary(samples), stats.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4, help="per-turn concurrency limit")
+    parser.add_argument("--timeout", type=float, default=10.0, help="per-turn deadline in seconds")
+    args = parser.parse_args()
+
+    tools = {name: with_latency(tool, BACKEND_MS[name]) for name, tool in FANOUT_TOOLS.items()}
+    for name, calls in SCENARIOS.items():
+        random.seed(3)
+        sequential, _ = asyncio.run(run(calls, "sequential", args.turns, tools, args.concurrency, args.timeout))
+        random.seed(3)
+        parallel, stats = asyncio.run(run(calls, "parallel", args.turns, tools, args.concurrency, args.timeout))
+        print_report(f"{name}: {len(calls)} lookups x {args.turns} turns", {
+            "sequential p50 / p99 (ms)": f"{sequential['p50_ms']:.0f} / {sequential['p99_ms']:.0f}",
+            "parallel p50 / p99 (ms)": f"{parallel['p50_ms']:.0f} / {parallel['p99_ms']:.0f}",
+            "traced saved per turn (ms)": stats["saved_ms"] / stats["turns"],
+            "speedup": sequential["mean_ms"] / parallel["mean_ms"],
+            "timeouts": stats["timeouts"],
+        })
+
+
+if __name__ == "__main__":
+    main()
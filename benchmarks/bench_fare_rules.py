@@ -0,0 +1,97 @@
+# benchmarks/bench_fare_rules.py
+"""Fare-rule engine latency: single quotes and batch disruption waivers.
+
+Run with: python -m benchmarks.bench_fare_rules --tickets 100000
+
+Times rule resolution (first and memoized), single refund quotes, and one
+batch pass quoting every ticket on a disrupted schedule with and without a
+waiver, then spot-checks batch results against single quotes.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.fares.engine import DEFAULT_RULES_PATH, FareRuleEngine, get_engine
+from customer_service_agent.schedule.generate import HUB_AIRPORTS
+
+FARE_PREFIXES = ["JFLX", "JSAV", "F", "Y", "BFLEX", "MH7N", "ML14", "QNA0", "QXR", "NLOW", "KSPC", "HWEB"]
+CARRIERS = ["AA", "UA", "DL", "BA", "LH", "AF"]
+
+
+def synthetic_tickets(count, seed=9):
+    rng = random.Random(seed)
+    airports = sorted(code for code, *_ in HUB_AIRPORTS)
+    tickets = []
+    for _ in range(count):
+        origin, destination = rng.sample(airports, 2)
+        fare_basis = rng.choice(FARE_PREFIXES) + rng.choice(["", "US", "BE", "7", "21"])
+        tickets.append((rng.choice(CARRIERS), fare_basis, origin, destination))
+    return tickets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickets", type=int, default=100_000)
+    parser.add_argument("--single", type=int, default=20_000, help="single quotes to time")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    tickets = synthetic_tickets(args.tickets)
+    rng = np.random.default_rng(4)
+    fares = rng.uniform(80, 2500, size=args.tickets).round(2)
+    taxes = (fares * 0.12).round(2)
+    hours = rng.uniform(-12, 24 * 30, size=args.tickets)
+
+    # A fresh engine so the first pass measures resolution without the memo
+    cold = FareRuleEngine.from_csv(DEFAULT_RULES_PATH)
+    samples = []
+    for ticket in tickets[: args.single]:
+        started = time.perf_counter()
+        cold.resolve(*ticket)
+        samples.append(time.perf_counter() - started)
+    first = latency_summary(samples)
+
+    samples = []
+    for i, ticket in enumerate(tickets[: args.single]):
+        started = time.perf_counter()
+        rule = cold.resolve(*ticket)
+        cold.quote(rule, fares[i], taxes[i], hours_to_departure=hours[i])
+        samples.append(time.perf_counter() - started)
+    single = latency_summary(samples)
+
+    started = time.perf_counter()
+    rules = engine.resolve_many(*zip(*tickets))
+    resolve_s = time.perf_counter() - started
+    started = time.perf_counter()
+    plain = engine.quote_batch(rules, fares, taxes, hours_to_departure=hours)
+    plain_s = time.perf_counter() - started
+    started = time.perf_counter()
+    waived = engine.quote_batch(rules, fares, taxes, hours_to_departure=hours, waived=True)
+    waived_s = time.perf_counter() - started
+
+    mismatches = 0
+    for i in random.Random(2).sample(range(args.tickets), min(500, args.tickets)):
+        quote = engine.quote(rules[i], fares[i], taxes[i], hours_to_departure=hours[i], waived=True)
+        mismatches += not np.isclose(quote["refund_amount"], waived["refund_amount"][i])
+
+    print_report(f"Fare rules: {len(engine)} sequences", {
+        "resolve, first time p50 / p99 (us)": f"{first['p50_ms'] * 1000:.1f} / {first['p99_ms'] * 1000:.1f}",
+        "resolve + quote p50 / p99 (us)": f"{single['p50_ms'] * 1000:.1f} / {single['p99_ms'] * 1000:.1f}",
+        "unmatched tickets": int((rules < 0).sum()),
+    })
+    print_report(f"Batch of {args.tickets:,} tickets", {
+        "resolve_many (ms)": resolve_s * 1000,
+        "quote_batch (ms)": plain_s * 1000,
+        "quote_batch with waiver (ms)": waived_s * 1000,
+        "tickets/sec (resolve + quote)": args.tickets / (resolve_s + plain_s),
+        "refunds without waiver ($M)": float(np.nansum(plain["refund_amount"])) / 1e6,
+        "refunds with waiver ($M)": float(np.nansum(waived["refund_amount"])) / 1e6,
+        "batch/single mismatches": mismatches,
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_flight_search.py
+"""Schedule load time, memory and search_flights latency on a large schedule.
+
+Run with: python -m benchmarks.bench_flight_search --legs 500000
+
+Generates a synthetic schedule (or uses --schedule), loads it from CSV and
+from the .npz snapshot, then times searches over random origin/destination
+pairs, split by hub-to-hub, hub-to-spoke and spoke-to-spoke routes.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.schedule.generate import generate, write_schedule
+from customer_service_agent.schedule.search import FlightSearch
+from customer_service_agent.schedule.store import ScheduleStore, format_day
+
+
+def kind(code):
+    return "spoke" if code.startswith("Q") else "hub"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--legs", type=int, default=500_000)
+    parser.add_argument("--schedule", default=None, help="existing schedule CSV to use")
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.schedule
+        if path is None:
+            path = os.path.join(tmp, "schedule.csv")
+            started = time.perf_counter()
+            write_schedule(path, generate(args.legs))
+            print(f"Generated {args.legs:,}-leg schedule in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        store = ScheduleStore.from_csv(path)
+        csv_s = time.perf_counter() - started
+        snapshot = os.path.join(tmp, "schedule.npz")
+        store.save(snapshot)
+        started = time.perf_counter()
+        store = ScheduleStore.from_npz(snapshot)
+        npz_s = time.perf_counter() - started
+
+    engine = FlightSearch(store)
+    rng = random.Random(args.seed)
+    first_day = int(store.dep_local.min()) // (24 * 60)
+    last_day = int(store.dep_local.max()) // (24 * 60)
+    timings, results, empty = defaultdict(list), defaultdict(list), 0
+    for _ in range(args.queries):
+        origin, destination = rng.sample(store.airports, 2)
+        day = format_day(rng.randint(first_day + 1, last_day - 1))
+        started = time.perf_counter()
+        found = engine.search(origin, destination, day)
+        elapsed = time.perf_counter() - started
+        label = f"{kind(origin)}-{kind(destination)}"
+        for key in ("all", label):
+            timings[key].append(elapsed)
+            results[key].append(len(found))
+        empty += not found
+
+    rows = {
+        "legs": len(store),
+        "airports": len(store.airports),
+        "routes": len(store.pair_slices),
+        "store size (MB)": store.nbytes() / 1e6,
+        "load from CSV (s)": csv_s,
+        "load from .npz (s)": npz_s,
+        "queries with no itinerary": empty,
+    }
+    for key in ("all", "hub-hub", "hub-spoke", "spoke-hub", "spoke-spoke"):
+        if not timings[key]:
+            continue
+        summary = latency_summary(timings[key])
+        rows[f"{key} p50 / p99 (ms)"] = f"{summary['p50_ms']:.2f} / {summary['p99_ms']:.2f}"
+        rows[f"{key} mean itineraries"] = sum(results[key]) / len(results[key])
+    print_report(f"search_flights over {len(store):,} legs, {args.queries:,} queries", rows)
+
+
+if __name__ == "__main__":
+    main()
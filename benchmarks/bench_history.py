@@ -0,0 +1,95 @@
+# benchmarks/bench_history.py
+"""Orchestrator prompt size per turn: unbounded vs bounded interaction history.
+
+Run with: python -m benchmarks.bench_history --turns 200
+
+Simulates a long conversation. The unbounded baseline substitutes the full
+history list into the instruction, as the agent did before; the bounded run
+appends through HistoryManager and renders with render_instruction.
+"""
+import argparse
+import time
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.agent import ORCHESTRATOR_INSTRUCTION
+from customer_service_agent.history import (
+    SUMMARY_KEY,
+    TEMPLATE_VARIABLE,
+    HistoryManager,
+    estimate_tokens,
+    render_instruction,
+)
+from utils import new_session_state
+
+QUERIES = [
+    "My flight AA1234 to Chicago was cancelled, can you find me another one tonight?",
+    "Where is my bag? The tag number is AA123456 and it never showed up at the carousel.",
+    "How many miles do I have and can I use them to upgrade to business class?",
+    "I need a visa for my layover in Frankfurt, do I need a transit visa as a US citizen?",
+    "Can I get a refund for the seat upgrade I paid for but never received?",
+]
+RESPONSE = (
+    "I've looked into that for you. {detail} Is there anything else I can help "
+    "you with regarding your trip today?"
+)
+
+
+def unbounded_instruction(state):
+    return TEMPLATE_VARIABLE.sub(lambda m: str(state.get(m.group(1), "")), ORCHESTRATOR_INSTRUCTION)
+
+
+def simulate(turns, budget, max_turns):
+    manager = HistoryManager(max_turns=max_turns)
+    unbounded = new_session_state()
+    bounded = new_session_state()
+    unbounded_tokens, bounded_tokens, render_times = [], [], []
+
+    for turn in range(turns):
+        query = {"action": "user_query", "query": QUERIES[turn % len(QUERIES)],
+                 "timestamp": f"2026-01-01 10:{turn % 60:02d}:00"}
+        reply = {"action": "agent_response", "agent": "flight_operations_agent",
+                 "response": RESPONSE.format(detail=f"Option {turn} departs at {turn % 24:02d}:15."),
+                 "timestamp": f"2026-01-01 10:{turn % 60:02d}:30"}
+        for entry in (query, reply):
+            unbounded["interaction_history"] = unbounded["interaction_history"] + [entry]
+            bounded["interaction_history"], bounded[SUMMARY_KEY] = manager.append(
+                bounded["interaction_history"], bounded[SUMMARY_KEY], entry
+            )
+
+        unbounded_tokens.append(estimate_tokens(unbounded_instruction(unbounded)))
+        started = time.perf_counter()
+        rendered = render_instruction(ORCHESTRATOR_INSTRUCTION, bounded, token_budget=budget)
+        render_times.append(time.perf_counter() - started)
+        bounded_tokens.append(estimate_tokens(rendered))
+
+    return unbounded_tokens, bounded_tokens, render_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--budget", type=int, default=2500, help="prompt token budget")
+    parser.add_argument("--max-turns", type=int, default=12, help="history entries kept verbatim")
+    args = parser.parse_args()
+
+    unbounded, bounded, render_times = simulate(args.turns, args.budget, args.max_turns)
+    render = latency_summary(render_times)
+    print_report(
+        f"Orchestrator instruction size over {args.turns} turns",
+        {
+            "unbounded tokens at turn 1": unbounded[0],
+            "unbounded tokens at last turn": unbounded[-1],
+            "unbounded total tokens sent": sum(unbounded),
+            "bounded tokens at turn 1": bounded[0],
+            "bounded tokens at last turn": bounded[-1],
+            "bounded max tokens per turn": max(bounded),
+            "bounded total tokens sent": sum(bounded),
+            "tokens saved": 1 - sum(bounded) / sum(unbounded),
+            "render p50 (us)": render["p50_ms"] * 1000,
+            "render p99 (us)": render["p99_ms"] * 1000,
+        },
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/bench_inventory.py
+"""Concurrent bookers competing for seats on one flight.
+
+Run with: python -m benchmarks.bench_inventory --bookers 1000
+
+Each booker holds 1-3 seats with a random preference, awaits a fare quote,
+then either confirms after a simulated payment or abandons the hold, which
+the timer wheel later expires. The same workload runs against optimistic
+holds (InventoryService.hold) and against a per-flight asyncio.Lock held
+across the quote, and every run is checked for double-sold seats.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.inventory import InventoryService, SoldOut, TimerWheel
+
+FLIGHT = ("AA100", "2026-03-05")
+PREFERENCES = ([], ["window"], ["aisle"], ["back"], ["together"])
+
+
+async def booker(service, args, results, lock=None):
+    count = random.choice((1, 1, 2, 3))
+    preferences = random.choice(PREFERENCES)
+
+    async def quote(inventory, mask, bucket):
+        await asyncio.sleep(random.uniform(0, args.quote_ms) / 1000)
+
+    started = time.perf_counter()
+    try:
+        if lock is None:
+            inventory, hold = await service.hold(*FLIGHT, count, preferences, quote=quote, ttl=args.hold_ttl)
+        else:
+            async with lock:
+                inventory, hold = await service.hold(*FLIGHT, count, preferences, quote=quote, ttl=args.hold_ttl)
+    except SoldOut:
+        results["sold_out"] += 1
+        return
+    results["hold_latency"].append(time.perf_counter() - started)
+
+    await asyncio.sleep(random.uniform(0, args.payment_ms) / 1000)
+    if random.random() < args.abandon:
+        results["abandoned"] += 1
+        return
+    service.confirm(inventory, hold)
+    results["confirmed"].append(hold.seats)
+
+
+async def run(args, pessimistic):
+    service = InventoryService(
+        flight_lookup=lambda number, date: ("A359", args.seats, 500.0),
+        wheel=TimerWheel(tick=0.01),
+    )
+    expiry = asyncio.create_task(service.run_expiry())
+    results = {"hold_latency": [], "confirmed": [], "sold_out": 0, "abandoned": 0}
+    lock = asyncio.Lock() if pessimistic else None
+    started = time.perf_counter()
+    await asyncio.gather(*(booker(service, args, results, lock) for _ in range(args.bookers)))
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(args.hold_ttl + 0.05)
+    expiry.cancel()
+
+    inventory = service.flight(*FLIGHT)
+    union, double_sold = 0, 0
+    for seats in results["confirmed"]:
+        double_sold += bin(union & seats).count("1")
+        union |= seats
+    return {
+        "elapsed": elapsed,
+        "latency": latency_summary(results["hold_latency"]),
+        "holds": len(results["hold_latency"]),
+        "confirmed": len(results["confirmed"]),
+        "seats sold": bin(inventory.sold).count("1"),
+        "sold out": results["sold_out"],
+        "abandoned": results["abandoned"],
+        "expired holds": service.expired_holds,
+        "seats re-picked at commit": inventory.repicks,
+        "conflicts retried": inventory.conflicts,
+        "double-sold seats": double_sold + bin(union ^ inventory.sold).count("1"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bookers", type=int, default=1000)
+    parser.add_argument("--seats", type=int, default=300)
+    parser.add_argument("--quote-ms", type=float, default=5.0)
+    parser.add_argument("--payment-ms", type=float, default=20.0)
+    parser.add_argument("--abandon", type=float, default=0.2, help="share of holds never confirmed")
+    parser.add_argument("--hold-ttl", type=float, default=0.2, help="seconds")
+    args = parser.parse_args()
+
+    for name, pessimistic in (("optimistic holds", False), ("per-flight asyncio.Lock", True)):
+        random.seed(1)
+        result = asyncio.run(run(args, pessimistic))
+        latency = result.pop("latency")
+        elapsed = result.pop("elapsed")
+        rows = {
+            "wall time (s)": elapsed,
+            "holds/sec": result["holds"] / elapsed,
+            "hold p50 / p99 (ms)": f"{latency['p50_ms']:.2f} / {latency['p99_ms']:.2f}",
+        }
+        rows.update(result)
+        print_report(f"{args.bookers} bookers on one {args.seats}-seat flight: {name}", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/bench_ledger.py
+"""Miles ledger at scale: bulk load, snapshot vs replayed balances, transfers.
+
+Run with: python -m benchmarks.bench_ledger --members 1000000 --transactions 10000000
+
+Loads a synthetic history into a fresh ledger, then compares balance
+lookups from the snapshot table with recomputing them from the history,
+times expiring-soon queries and concurrent transfers, and checks that
+transfers conserve the total and snapshots agree with the replay.
+"""
+import argparse
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.ledger import InsufficientMiles, MilesLedger, synthetic_history, synthetic_member
+
+
+def timed(function, arguments):
+    samples = []
+    for args in arguments:
+        started = time.perf_counter()
+        function(*args)
+        samples.append(time.perf_counter() - started)
+    return latency_summary(samples)
+
+
+def total_balance(ledger):
+    with ledger.pool.connection() as conn:
+        return conn.execute("SELECT SUM(balance) FROM balances").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--members", type=int, default=1_000_000)
+    parser.add_argument("--transactions", type=int, default=10_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--transfers", type=int, default=5_000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--db", help="ledger file to create (default: a temporary file)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "ledger.db")
+    ledger = MilesLedger(path, pool_size=args.threads + 1)
+    started = time.perf_counter()
+    postings = ledger.bulk_load(synthetic_history(args.members, args.transactions))
+    load_s = time.perf_counter() - started
+    print_report("Bulk load", {
+        "postings": postings,
+        "members": args.members,
+        "load time (s)": load_s,
+        "postings/sec": postings / load_s,
+        "database size (MB)": os.path.getsize(path) / 1e6,
+        "peak RSS (MB)": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+    random.seed(5)
+    # Low member indexes are the most active, so sample both ends
+    heavy = [(synthetic_member(i),) for i in range(20)]
+    members = [(synthetic_member(random.randrange(args.members)),) for _ in range(args.lookups)]
+    replay_sample = members[: max(1, args.lookups // 100)]
+    print_report("Balance lookups", {
+        "snapshot p50 / p99 (ms)": "{p50_ms:.3f} / {p99_ms:.3f}".format(**timed(ledger.account, members)),
+        "snapshot, most active p50 (ms)": timed(ledger.account, heavy)["p50_ms"],
+        "replay p50 / p99 (ms)": "{p50_ms:.3f} / {p99_ms:.3f}".format(**timed(ledger.replay_balance, replay_sample)),
+        "replay, most active p50 (ms)": timed(ledger.replay_balance, heavy)["p50_ms"],
+        "expiring soon p50 / p99 (ms)": "{p50_ms:.3f} / {p99_ms:.3f}".format(**timed(ledger.expiring, members)),
+        "recent activity p50 (ms)": timed(ledger.activity, members[:2000])["p50_ms"],
+    })
+
+    before = total_balance(ledger)
+    results = {"done": 0, "insufficient": 0}
+    lock = threading.Lock()
+
+    def transfer_worker(count, seed):
+        rng = random.Random(seed)
+        for _ in range(count):
+            source, target = rng.sample(range(args.members), 2)
+            try:
+                ledger.transfer(synthetic_member(source), synthetic_member(target), rng.choice((500, 1000, 5000)))
+                outcome = "done"
+            except InsufficientMiles:
+                outcome = "insufficient"
+            with lock:
+                results[outcome] += 1
+
+    per_thread = args.transfers // args.threads
+    workers = [threading.Thread(target=transfer_worker, args=(per_thread, i)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    transfer_s = time.perf_counter() - started
+
+    sample = heavy + members[:200]
+    mismatches = sum(ledger.account(m)[0] != ledger.replay_balance(m) for (m,) in sample if ledger.account(m))
+    print_report(f"Transfers ({args.threads} threads)", {
+        "committed": results["done"],
+        "rejected (insufficient miles)": results["insufficient"],
+        "transfers/sec": (results["done"] + results["insufficient"]) / transfer_s,
+        "total miles conserved": "yes" if total_balance(ledger) == before else "NO",
+        "snapshot/replay mismatches": mismatches,
+    })
+
+    started = time.perf_counter()
+    expired = ledger.expire()
+    print_report("Expiry job", {"miles expired": expired, "run time (s)": time.perf_counter() - started})
+    ledger.close()
+    if not args.db:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
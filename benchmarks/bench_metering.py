@@ -0,0 +1,152 @@
+# benchmarks/bench_metering.py
+"""Token metering: per-call overhead, and what a session budget does to long conversations.
+
+Run with: python -m benchmarks.bench_metering --sessions 200 --turns 30 --budget 60000
+
+Model calls go to a StubLlm with no latency, so the first report is the
+pure cost of MeteredLlm: budget lookup, tool result sizing and counting.
+The second drives --sessions conversations of --turns turns each. Every
+turn makes three calls, as a transfer to flight operations with one tool
+call does: the orchestrator, the specialist asking for the tool, then the
+specialist answering with the tool result. History grows with every turn.
+The run is done without a budget and then with --budget, and the report
+compares tokens per session, prompt size of the last turn and how many
+calls ran degraded or on the cheaper model. The last report times one
+StatsD push of the resulting counters to a local UDP socket.
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import time
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from benchmarks.common import print_report
+from customer_service_agent import metering
+from customer_service_agent.agent import ORCHESTRATOR_INSTRUCTION
+from customer_service_agent.metering import LEVELS, MeteredLlm, StatsdPusher, TokenMeter
+from customer_service_agent.models.stub import StubLlm
+
+AGENTS = ("airline_assist_orchestrator", "flight_operations")
+# About the size of a search_flights result with a handful of options
+TOOL_RESULT = {"flights": [
+    {"flight_number": f"AA{100 + i}", "departure": "08:15", "arrival": "11:40", "duration": "3h25m",
+     "stops": 0, "price": "$412", "available_seats": 23, "connections": [], "layovers": []}
+    for i in range(8)
+]}
+
+
+def instruction(agent):
+    return f'{ORCHESTRATOR_INSTRUCTION}\n\nYou are an agent. Your internal name is "{agent}".'
+
+
+def request(agent, contents):
+    return LlmRequest(contents=list(contents),
+                      config=types.GenerateContentConfig(system_instruction=instruction(agent)))
+
+
+def turn_contents(turn):
+    call = types.FunctionCall(name="search_flights", args={"origin": "BOS", "destination": "CDG"})
+    return [
+        types.Content(role="user", parts=[types.Part(text=f"Question {turn}: any flights to Paris on day {turn}?")]),
+        types.Content(role="model", parts=[types.Part(function_call=call)]),
+        types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+            name="search_flights", response=TOOL_RESULT))]),
+        types.Content(role="model", parts=[types.Part(text="Here are the options I found. " * 8)]),
+    ]
+
+
+async def call(model, llm_request):
+    async for _ in model.generate_content_async(llm_request):
+        pass
+
+
+async def time_calls(model, count):
+    history = [content for turn in range(4) for content in turn_contents(turn)]
+    llm_request = request("flight_operations", history[:-1])
+    started = time.perf_counter()
+    for _ in range(count):
+        await call(model, llm_request)
+    return (time.perf_counter() - started) / count
+
+
+async def run_session(model, session_id, turns, budget, meter):
+    metering._session.set(session_id)
+    meter.open_session(session_id, budget)
+    history, last_prompt = [], 0
+    for turn in range(turns):
+        user, function_call, function_response, answer = turn_contents(turn)
+        history.append(user)
+        await call(model, request(AGENTS[0], history))
+        await call(model, request(AGENTS[1], history))
+        history += [function_call, function_response]
+        before = meter.session(session_id)["prompt"]
+        await call(model, request(AGENTS[1], history))
+        last_prompt = meter.session(session_id)["prompt"] - before
+        history.append(answer)
+    return last_prompt
+
+
+async def run_sessions(sessions, turns, budget):
+    meter = TokenMeter(budget)
+    model = MeteredLlm(model="stub-llm", inner=StubLlm(latency=0.0, token_latency=0.0), meter=meter,
+                       cheap=StubLlm(model="stub-llm-lite", latency=0.0, token_latency=0.0))
+    started = time.perf_counter()
+    last_prompts = await asyncio.gather(*(run_session(model, f"s{i}", turns, budget, meter)
+                                          for i in range(sessions)))
+    elapsed = time.perf_counter() - started
+    totals = [meter.session(f"s{i}")["tokens"] for i in range(sessions)]
+    return meter, {"elapsed": elapsed, "totals": totals, "last_prompts": last_prompts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--budget", type=int, default=60_000)
+    args = parser.parse_args()
+
+    stub = StubLlm(latency=0.0, token_latency=0.0)
+    plain_s = asyncio.run(time_calls(stub, args.calls))
+    metered_s = asyncio.run(time_calls(MeteredLlm(model="stub-llm", inner=stub, meter=TokenMeter()), args.calls))
+    print_report("Per-call cost (stub model, no latency)", {
+        "plain StubLlm call (us)": plain_s * 1e6,
+        "through MeteredLlm (us)": metered_s * 1e6,
+        "metering overhead per call (us)": (metered_s - plain_s) * 1e6,
+    })
+
+    rows = {}
+    for label, budget in (("no budget", 0), (f"budget {args.budget:,}", args.budget)):
+        meter, result = asyncio.run(run_sessions(args.sessions, args.turns, budget))
+        stats = meter.stats()
+        rows[f"{label}: tokens per session, mean / max"] = (
+            f"{statistics.fmean(result['totals']):,.0f} / {max(result['totals']):,}")
+        rows[f"{label}: last turn's answer prompt tokens, mean"] = statistics.fmean(result["last_prompts"])
+        rows[f"{label}: calls per level ({' / '.join(LEVELS[1:])})"] = " / ".join(
+            f"{stats['degraded_calls'].get(level, 0):,}" for level in LEVELS[1:])
+        rows[f"{label}: calls on the cheaper model"] = stats["models"].get("stub-llm-lite", 0)
+        rows[f"{label}: turns/sec"] = args.sessions * args.turns / result["elapsed"]
+    print_report(f"{args.sessions} sessions x {args.turns} turns, 3 model calls per turn", rows)
+
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(1.0)
+    pusher = StatsdPusher(meter, f"127.0.0.1:{receiver.getsockname()[1]}")
+    started = time.perf_counter()
+    pusher.push()
+    push_s = time.perf_counter() - started
+    received = 0
+    for _ in range(pusher.datagrams):
+        received += len(receiver.recv(65536).splitlines())
+    receiver.close()
+    print_report("StatsD push of the budgeted run's counters", {
+        "push (ms)": push_s * 1000,
+        "datagrams / lines received": f"{pusher.datagrams} / {received}",
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/bench_prompt_cache.py
+"""Provider prefix-cache hits for the orchestrator prompt, by instruction layout.
+
+Run with: python -m benchmarks.bench_prompt_cache --sessions 20 --turns 10
+
+Replays interleaved multi-turn conversations against StubLlm with a
+simulated PrefixCache. The "inline" layout puts the customer, booking and
+history sections in the middle of the instruction, as the orchestrator did
+before; "prefix-first" is the current ORCHESTRATOR_INSTRUCTION with the
+static text first. Cached-token ratio and per-turn latency are reported
+for each layout.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from benchmarks.bench_history import QUERIES, RESPONSE
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.agent import ORCHESTRATOR_INSTRUCTION
+from customer_service_agent.history import SUMMARY_KEY, HistoryManager, estimate_tokens, render_instruction, static_prefix
+from customer_service_agent.models.stub import PrefixCache, StubLlm
+from utils import new_session_state
+
+LOYALTY_TIERS = ["None", "Silver", "Gold", "Platinum"]
+
+
+def inline_layout(template):
+    """The orchestrator instruction with its session sections moved back before the agent list."""
+    start = template.index("    **Customer Information:**")
+    context = template[start:].rstrip(" ")
+    marker = "    **Available Specialized Agents:**"
+    return template[:start].rstrip(" ").replace(marker, context + "    \n" + marker)
+
+
+def new_customer(rng, i):
+    state = new_session_state()
+    state.update({
+        "customer_name": f"Customer {i:04d}",
+        "ff_number": f"FF{rng.randrange(10**8, 10**9)}",
+        "loyalty_status": rng.choice(LOYALTY_TIERS),
+        "active_bookings": [f"PNR{rng.randrange(10**5, 10**6)}"],
+    })
+    return state
+
+
+async def simulate(template, sessions, turns, model, seed=5):
+    rng = random.Random(seed)
+    manager = HistoryManager()
+    states = [new_customer(rng, i) for i in range(sessions)]
+    contents = [[] for _ in range(sessions)]
+    latencies, first_turn, prompt_tokens, cached_tokens = [], [], 0, 0
+    # Round-robin across sessions, the way concurrent customers interleave
+    for turn in range(turns):
+        for i, state in enumerate(states):
+            query = QUERIES[(i + turn) % len(QUERIES)]
+            contents[i].append(types.Content(role="user", parts=[types.Part(text=query)]))
+            request = LlmRequest(
+                contents=list(contents[i]),
+                config=types.GenerateContentConfig(system_instruction=render_instruction(template, state)),
+            )
+            started = time.perf_counter()
+            async for response in model.generate_content_async(request):
+                pass
+            elapsed = time.perf_counter() - started
+            latencies.append(elapsed)
+            if turn == 0:
+                first_turn.append(elapsed)
+            prompt_tokens += response.usage_metadata.prompt_token_count
+            cached_tokens += response.usage_metadata.cached_content_token_count
+
+            reply = RESPONSE.format(detail=f"Option {turn} departs at {turn % 24:02d}:15.")
+            contents[i].append(types.Content(role="model", parts=[types.Part(text=reply)]))
+            for entry in ({"action": "user_query", "query": query},
+                          {"action": "agent_response", "agent": "airline_assist_orchestrator", "response": reply}):
+                state["interaction_history"], state[SUMMARY_KEY] = manager.append(
+                    state["interaction_history"], state[SUMMARY_KEY], entry
+                )
+    return latency_summary(latencies), latency_summary(first_turn), prompt_tokens, cached_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--prefill-us", type=float, default=20.0, help="latency per uncached prompt token")
+    parser.add_argument("--cached-prefill-us", type=float, default=2.0, help="latency per cached prompt token")
+    args = parser.parse_args()
+
+    for name, template in (("inline", inline_layout(ORCHESTRATOR_INSTRUCTION)),
+                           ("prefix-first", ORCHESTRATOR_INSTRUCTION)):
+        model = StubLlm(latency=0.005, token_latency=0.0, prefill_latency=args.prefill_us / 1e6,
+                        cached_prefill_latency=args.cached_prefill_us / 1e6, prefix_cache=PrefixCache())
+        turns, first, prompt_tokens, cached_tokens = asyncio.run(
+            simulate(template, args.sessions, args.turns, model)
+        )
+        print_report(f"{name}: {args.sessions} sessions x {args.turns} turns", {
+            "static prefix (tokens)": estimate_tokens(static_prefix(template)[0]),
+            "prompt tokens per turn": prompt_tokens // (args.sessions * args.turns),
+            "cached-token ratio": cached_tokens / prompt_tokens,
+            "turn latency p50 / p95 (ms)": f"{turns['p50_ms']:.1f} / {turns['p95_ms']:.1f}",
+            "first turn p50 (ms)": first["p50_ms"],
+        })
+
+
+if __name__ == "__main__":
+    main()
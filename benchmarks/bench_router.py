@@ -0,0 +1,92 @@
+# benchmarks/bench_router.py
+"""Routing accuracy and latency of the local intent pre-router.
+
+Run with: python -m benchmarks.bench_router
+
+Rows labelled "orchestrator" in the query set are ambiguous on purpose; the
+router should fall back to the LLM for them. Latency saved is estimated as
+one orchestrator model hop per routed query minus the local classify time.
+"""
+import argparse
+import csv
+import time
+from collections import Counter
+from pathlib import Path
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.router import IntentRouter
+
+DEFAULT_QUERIES = Path(__file__).parent / "data" / "routing_queries.csv"
+
+
+def load_queries(path):
+    with open(path, newline="") as f:
+        return [(row["query"], row["expected_agent"]) for row in csv.DictReader(f)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", default=str(DEFAULT_QUERIES))
+    parser.add_argument(
+        "--orchestrator-ms",
+        type=float,
+        default=650.0,
+        help="latency of one orchestrator LLM hop, for the savings estimate",
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    router = IntentRouter()
+    queries = load_queries(args.queries)
+
+    timings = []
+    for _ in range(args.repeat):
+        for query, _ in queries:
+            started = time.perf_counter()
+            router.classify(query)
+            timings.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    decisions = router.classify_many([query for query, _ in queries])
+    batch_per_query = (time.perf_counter() - started) / len(queries)
+
+    routed = correct = fallback_expected = fallback_ok = 0
+    misroutes = Counter()
+    for (query, expected), decision in zip(queries, decisions):
+        if expected == "orchestrator":
+            fallback_expected += 1
+            fallback_ok += not decision.routed
+        if not decision.routed:
+            continue
+        routed += 1
+        if decision.agent_name == expected:
+            correct += 1
+        else:
+            misroutes[(query, expected, decision.agent_name)] += 1
+
+    labelled = len(queries) - fallback_expected
+    classify = latency_summary(timings)
+    saved_ms = routed * args.orchestrator_ms - sum(timings) / args.repeat * 1000
+    print_report(
+        f"Intent pre-router on {len(queries)} labelled queries",
+        {
+            "routed locally": routed,
+            "coverage (routed / total)": routed / len(queries),
+            "routing accuracy (correct / routed)": correct / routed if routed else 0.0,
+            "recall on routable queries": correct / labelled if labelled else 0.0,
+            "ambiguous queries left to LLM": f"{fallback_ok}/{fallback_expected}",
+            "classify p50 (us)": classify["p50_ms"] * 1000,
+            "classify p99 (us)": classify["p99_ms"] * 1000,
+            "batched classify per query (us)": batch_per_query * 1e6,
+            "orchestrator hops skipped": routed,
+            "estimated latency saved per turn (ms)": saved_ms / len(queries),
+        },
+    )
+    if misroutes:
+        print("\nMisroutes:")
+        for (query, expected, got), _ in misroutes.most_common():
+            print(f"  {query!r}: expected {expected}, routed to {got}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+# benchmarks/bench_scenarios.py
+"""Scripted multi-turn scenarios end to end on replayed model responses, usable as a regression gate.
+
+Run with: python -m benchmarks.bench_scenarios --sessions 50
+Save a baseline with --save-baseline scenarios.json, then gate a change with
+--baseline scenarios.json (exits 1 on a regression).
+
+Three journeys from the README run through the real Runner, session service,
+history, tools and stores: a delayed flight with a tight connection, a lost
+bag that turns into a claim, and a hub closure with mass rebooking. The
+model is a ReplayLlm over benchmarks/data/fixtures, so every run makes the
+same calls without the network, arriving at their recorded offsets times
+--latency-scale (or after a fixed --latency). Schedule, bag scans and
+weather are generated with fixed seeds so tool results line up with the
+fixtures.
+
+Each scenario runs --sessions concurrent sessions after one warm-up session
+(which pays for lazy sub-agent loading). The report shows turns/sec, turn
+latency, time to first token with --stream, and model calls and prompt and
+completion tokens per turn. A turn that ends at another agent or misses an
+expected tool call is a script failure. With --baseline, throughput below
+or p95 latency above --tolerance, or tokens per turn above
+--token-tolerance, fail the run along with errors, fixture misses and
+script failures.
+
+--record runs each scenario once against gemini-2.0-flash (GOOGLE_API_KEY
+must be set) and rewrites its fixture file with the real responses.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import date
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.agent import airline_assist_agent
+from customer_service_agent.baggage import get_scan_store, synthetic_scans
+from customer_service_agent.models.replay import RecordingLlm, ReplayLlm
+from customer_service_agent.models.stub import use_model
+from customer_service_agent.schedule import search
+from customer_service_agent.schedule.generate import generate
+from customer_service_agent.schedule.search import FlightSearch
+from customer_service_agent.schedule.store import ScheduleStore
+from google.adk.sessions import InMemorySessionService
+from server import build_runner
+from utils import add_user_query_to_history, new_session_state, stream_agent_turn
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "data", "fixtures")
+# Bag scans up to this time: AA001584 is still held at JFK
+SCANS_BEFORE = "2026-03-05T08:00"
+
+# scenario -> turns of (customer message, agent expected to answer, tools it must call)
+SCENARIOS = {
+    "delay_connection": (
+        ("My flight AF145 from Boston on 2026-03-05 is running about two hours late and I connect to AF151 to "
+         "Paris at JFK. Will I make my connection?", "flight_operations", ("check_connection_risk",)),
+        ("If I miss it, what other ways are there from Boston to Paris that day?", "flight_operations",
+         ("search_flights",)),
+    ),
+    "lost_bag": (
+        ("My bag didn't arrive in Amsterdam. The tag number is AA001584 and my last name is Hall.",
+         "baggage_services", ("track_baggage",)),
+        ("Yes please, file a claim. It's a large black Samsonite suitcase with a red ribbon on the handle, "
+         "booking TSYLPB.", "baggage_services", ("file_baggage_claim",)),
+    ),
+    "mass_disruption": (
+        ("A snowstorm has closed ORD from 06:00 on 2026-03-05 for about 6 hours. Please rebook the 5000 "
+         "affected passengers.", "emergency_response", ("mass_rebook",)),
+        ("What other weather disruptions should we expect at ORD and JFK?", "emergency_response",
+         ("check_weather_disruptions",)),
+    ),
+}
+
+
+def pin_data():
+    """Load the fixed-seed schedule and bag scans the fixtures were recorded against."""
+    search._engine = FlightSearch(ScheduleStore.from_rows(generate(20_000, days=14, start=date(2026, 3, 1))))
+    get_scan_store().ingest([scan for scan in synthetic_scans(2000) if scan < SCANS_BEFORE])
+
+
+async def run_session(runner, turns, stream, result):
+    user_id = f"bench-{uuid.uuid4().hex[:8]}"
+    session = runner.session_service.create_session(
+        app_name=runner.app_name, user_id=user_id, state=new_session_state())
+    for message, expected_agent, expected_tools in turns:
+        add_user_query_to_history(runner.session_service, runner.app_name, user_id, session.id, message)
+        called = set()
+        started = time.perf_counter()
+        try:
+            async for update in stream_agent_turn(runner, user_id, session.id, message, stream=stream):
+                if update["type"] == "tool_call":
+                    called.add(update["name"])
+                elif update["type"] == "done":
+                    done = update
+        except Exception as exc:
+            result["errors"].append(repr(exc))
+            return
+        result["latencies"].append(time.perf_counter() - started)
+        if done["ttft_ms"] is not None:
+            result["ttfts"].append(done["ttft_ms"] / 1000)
+        if done["agent"] != expected_agent or not called.issuperset(expected_tools):
+            result["failures"].append((message, done["agent"], sorted(called)))
+
+
+async def run_scenario(runner, turns, sessions, stream):
+    result = {"latencies": [], "ttfts": [], "errors": [], "failures": []}
+    started = time.perf_counter()
+    await asyncio.gather(*(run_session(runner, turns, stream, result) for _ in range(sessions)))
+    result["elapsed"] = time.perf_counter() - started
+    return result
+
+
+async def record(names, stream):
+    for name in names:
+        path = os.path.join(FIXTURE_DIR, f"{name}.jsonl")
+        if os.path.exists(path):
+            os.remove(path)
+        use_model(airline_assist_agent, RecordingLlm.wrap("gemini-2.0-flash", path))
+        result = await run_scenario(build_runner(InMemorySessionService()), SCENARIOS[name], 1, stream)
+        print(f"Recorded {name} to {path}: {len(result['latencies'])} turns, "
+              f"{len(result['errors'])} errors, {len(result['failures'])} script failures")
+
+
+async def replay(names, sessions, stream, model):
+    use_model(airline_assist_agent, model)
+    runner = build_runner(InMemorySessionService())
+    metrics = {}
+    for name in names:
+        turns = SCENARIOS[name]
+        await run_scenario(runner, turns, 1, stream)
+        model.reset()
+        result = await run_scenario(runner, turns, sessions, stream)
+        summary = latency_summary(result["latencies"])
+        completed = summary["count"] or 1
+        tokens = model.tokens.values()
+        metrics[name] = {
+            "turns": summary["count"],
+            "turns_per_sec": summary["count"] / result["elapsed"],
+            "p50_ms": summary["p50_ms"],
+            "p95_ms": summary["p95_ms"],
+            "ttft_p50_ms": latency_summary(result["ttfts"])["p50_ms"],
+            "model_calls_per_turn": sum(counts["calls"] for counts in tokens) / completed,
+            "prompt_tokens_per_turn": sum(counts["prompt"] for counts in tokens) / completed,
+            "completion_tokens_per_turn": sum(counts["completion"] for counts in tokens) / completed,
+            "errors": len(result["errors"]),
+            "misses": model.stats["misses"],
+            "drift": model.stats["drift"],
+            "failures": len(result["failures"]),
+        }
+        for message, agent, called in result["failures"][:3]:
+            print(f"  {name}: {message[:60]!r} answered by {agent} after {', '.join(called) or 'no tools'}")
+        for error in sorted(set(result["errors"]))[:3]:
+            print(f"  {name}: {error}")
+    return metrics
+
+
+def report(metrics, sessions, stream, timing):
+    for name, m in metrics.items():
+        rows = {
+            "turns completed": m["turns"],
+            "turns/sec": m["turns_per_sec"],
+            "p50 / p95 turn latency (ms)": f"{m['p50_ms']:.1f} / {m['p95_ms']:.1f}",
+            "model calls per turn": m["model_calls_per_turn"],
+            "prompt / completion tokens per turn": (f"{m['prompt_tokens_per_turn']:,.0f} / "
+                                                    f"{m['completion_tokens_per_turn']:,.0f}"),
+            "errors / fixture misses / script failures": f"{m['errors']} / {m['misses']} / {m['failures']}",
+            "tool results differing from the recording": m["drift"],
+        }
+        if stream:
+            rows["p50 time to first token (ms)"] = m["ttft_p50_ms"]
+        print_report(f"{name}: {sessions} sessions x {len(SCENARIOS[name])} turns ({timing})", rows)
+
+
+def regressions(metrics, baseline, tolerance, token_tolerance):
+    """Lines describing every gated metric that is worse than baseline, plus errors and misses."""
+    found = []
+    for name, m in metrics.items():
+        for key in ("errors", "misses", "failures"):
+            if m[key]:
+                found.append(f"{name}: {m[key]} {key}")
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if m["turns_per_sec"] < base["turns_per_sec"] * (1 - tolerance):
+            found.append(f"{name}: {m['turns_per_sec']:.1f} turns/sec vs {base['turns_per_sec']:.1f}")
+        if m["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            found.append(f"{name}: p95 {m['p95_ms']:.1f} ms vs {base['p95_ms']:.1f} ms")
+        for key in ("prompt_tokens_per_turn", "completion_tokens_per_turn"):
+            if m[key] > base[key] * (1 + token_tolerance):
+                found.append(f"{name}: {key.replace('_', ' ')} {m[key]:,.0f} vs {base[key]:,.0f}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR)
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier on recorded timing")
+    parser.add_argument("--latency", type=float, help="fixed seconds to first response instead")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds between chunks with --latency")
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument("--baseline")
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--token-tolerance", type=float, default=0.02)
+    args = parser.parse_args()
+    names = args.scenarios.split(",")
+
+    pin_data()
+    if args.record:
+        asyncio.run(record(names, args.stream))
+        return
+
+    model = ReplayLlm.from_paths([args.fixtures], strict=False, latency_scale=args.latency_scale,
+                                 latency=args.latency, token_latency=args.token_latency)
+    metrics = asyncio.run(replay(names, args.sessions, args.stream, model))
+    timing = (f"fixed {args.latency * 1000:.0f} ms latency" if args.latency is not None
+              else f"recorded timing x {args.latency_scale:g}")
+    report(metrics, args.sessions, args.stream, timing)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(metrics, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    found = regressions(metrics, baseline, args.tolerance, args.token_tolerance)
+    if found:
+        print("\nRegressions:")
+        for line in found:
+            print(f"  {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
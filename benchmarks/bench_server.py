@@ -0,0 +1,167 @@
+# benchmarks/bench_server.py
+"""Load test for server.py against a local stub model.
+
+Run with: python -m benchmarks.bench_server --sessions 300 --turns 5
+Add --stream to drive /chat/stream and report time to first token.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.agent import airline_assist_agent
+from customer_service_agent.models.stub import StubLlm, use_model
+from google.adk.sessions import InMemorySessionService
+from server import ChatServer, build_runner
+
+QUERIES = [
+    "What is the status of flight AA123 today?",
+    "Where is my bag? The tag number is AA123456.",
+    "I want to change my booking ABC123 to next Friday.",
+    "How many miles do I have?",
+    "What is the refund policy for basic economy?",
+]
+
+
+def encode_multipart(fields):
+    boundary = f"----bench{uuid.uuid4().hex}"
+    chunks = []
+    for name, value in fields.items():
+        chunks.append(
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n"
+        )
+    chunks.append(f"--{boundary}--\r\n")
+    return f"multipart/form-data; boundary={boundary}", "".join(chunks).encode("utf-8")
+
+
+async def send_post(writer, path, fields):
+    content_type, body = encode_multipart(fields)
+    writer.write(
+        (
+            f"POST {path} HTTP/1.1\r\n"
+            "Host: localhost\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        ).encode("latin-1")
+        + body
+    )
+    await writer.drain()
+
+
+async def read_head(reader):
+    status_line = await reader.readline()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return int(status_line.split()[1]), headers
+
+
+async def post_chat(reader, writer, fields):
+    await send_post(writer, "/chat", fields)
+    status, headers = await read_head(reader)
+    payload = await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, json.loads(payload) if payload else None
+
+
+async def post_chat_stream(reader, writer, fields, started):
+    """POST to /chat/stream; returns (status, session_id, seconds to first token)."""
+    await send_post(writer, "/chat/stream", fields)
+    status, headers = await read_head(reader)
+    if status != 200:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+        return status, None, None
+
+    session_id, first_token = None, None
+    while True:
+        size = int((await reader.readline()).strip(), 16)
+        chunk = await reader.readexactly(size + 2)
+        if size == 0:
+            return status, session_id, first_token
+        event, _, data = chunk.decode("utf-8").partition("\ndata: ")
+        event = event.removeprefix("event: ")
+        if event == "token" and first_token is None:
+            first_token = time.perf_counter() - started
+        elif event == "session":
+            session_id = json.loads(data)["session_id"]
+
+
+async def run_client(port, turns, stream, latencies, ttfts, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    session_id = ""
+    try:
+        for turn in range(turns):
+            fields = {"message": QUERIES[turn % len(QUERIES)], "session_id": session_id}
+            started = time.perf_counter()
+            if stream:
+                status, session_id, first_token = await post_chat_stream(
+                    reader, writer, fields, started
+                )
+                if first_token is not None:
+                    ttfts.append(first_token)
+            else:
+                status, payload = await post_chat(reader, writer, fields)
+                session_id = payload and payload.get("session_id")
+            if status != 200:
+                errors.append(status)
+                return
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+async def run_benchmark(sessions, turns, model_latency, stream):
+    use_model(airline_assist_agent, StubLlm(latency=model_latency))
+    server = await ChatServer(build_runner(InMemorySessionService())).start("127.0.0.1", 0)
+
+    latencies, ttfts, errors = [], [], []
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_client(server.port, turns, stream, latencies, ttfts, errors)
+            for _ in range(sessions)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    await server.close()
+
+    summary = latency_summary(latencies)
+    rows = {
+        "turns completed": summary["count"],
+        "errors": len(errors),
+        "elapsed (s)": elapsed,
+        "turns/sec": summary["count"] / elapsed,
+        "p50 turn latency (ms)": summary["p50_ms"],
+        "p99 turn latency (ms)": summary["p99_ms"],
+        "max turn latency (ms)": summary["max_ms"],
+    }
+    if stream:
+        ttft = latency_summary(ttfts)
+        rows["p50 time to first token (ms)"] = ttft["p50_ms"]
+        rows["p99 time to first token (ms)"] = ttft["p99_ms"]
+    print_report(
+        f"Chat server{' (streaming)' if stream else ''}: {sessions} concurrent sessions "
+        f"x {turns} turns (stub model latency {model_latency * 1000:.0f} ms)",
+        rows,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--model-latency", type=float, default=0.05)
+    parser.add_argument("--stream", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.sessions, args.turns, args.model_latency, args.stream))
+
+
+if __name__ == "__main__":
+    main()
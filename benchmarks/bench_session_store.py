@@ -0,0 +1,97 @@
+# benchmarks/bench_session_store.py
+"""Create/get/append throughput: SqliteSessionService vs InMemorySessionService.
+
+Run with: python -m benchmarks.bench_session_store --sizes 10000,100000,1000000
+
+For each size N the store is filled with N sessions, then a fixed sample of
+random sessions is read and appended to. SQLite timings include the final
+write-behind flush so they reflect data actually on disk.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from benchmarks.common import print_report
+from customer_service_agent.session_store import SqliteSessionService
+from google.adk.events import Event, EventActions
+from google.adk.sessions import InMemorySessionService
+from utils import APP_NAME, new_session_state
+
+USER_ID = "bench_user"
+
+
+def history_event(turn):
+    return Event(
+        invocation_id=f"bench-{uuid.uuid4().hex}",
+        author="user",
+        actions=EventActions(
+            state_delta={
+                "interaction_history": [
+                    {"action": "user_query", "query": f"Where is my bag? ({i})"}
+                    for i in range(turn)
+                ],
+                "last_route": {"agent": "baggage_services", "confidence": 0.9},
+            }
+        ),
+        timestamp=time.time(),
+    )
+
+
+def run_store(name, service, size, sample, flush):
+    started = time.perf_counter()
+    ids = [
+        service.create_session(app_name=APP_NAME, user_id=USER_ID, state=new_session_state()).id
+        for _ in range(size)
+    ]
+    flush()
+    create_s = time.perf_counter() - started
+
+    picks = random.sample(ids, min(sample, size))
+    started = time.perf_counter()
+    sessions = [
+        service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+        for session_id in picks
+    ]
+    get_s = time.perf_counter() - started
+
+    events = [history_event(turn % 10) for turn in range(len(sessions))]
+    started = time.perf_counter()
+    for session, event in zip(sessions, events):
+        service.append_event(session, event)
+    flush()
+    append_s = time.perf_counter() - started
+
+    return {
+        f"{name} create/sec": size / create_s,
+        f"{name} get/sec": len(picks) / get_s,
+        f"{name} append/sec": len(sessions) / append_s,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--sample", type=int, default=10_000)
+    parser.add_argument("--db-dir", default=None, help="directory for the SQLite files")
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        rows = run_store("in-memory", InMemorySessionService(), size, args.sample, lambda: None)
+
+        with tempfile.TemporaryDirectory(dir=args.db_dir) as tmp:
+            db_path = os.path.join(tmp, "sessions.db")
+            service = SqliteSessionService(db_path)
+            rows.update(run_store("sqlite", service, size, args.sample, service.flush))
+            service.close()
+            rows["sqlite db size (MB)"] = sum(
+                os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)
+            ) / 1e6
+
+        print_report(f"Session store throughput at {size:,} sessions", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/bench_startup.py
+"""Cold-start cost of importing the orchestrator, lazy vs eager sub-agents.
+
+Run with: python -m benchmarks.bench_startup --runs 10
+
+Each run is a fresh interpreter started with `python -X importtime` that
+imports customer_service_agent.agent, once with SUBAGENT_LOADING=lazy (the
+default) and once with SUBAGENT_LOADING=eager (every specialist imported up
+front, as before the registry). The report shows wall-clock import time, the
+cumulative -X importtime figure, how many modules were loaded, and the
+slowest project modules. The lazy run then routes to each specialist to
+show what the first transfer to it costs.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+from benchmarks.common import latency_summary, print_report
+
+# Imports the orchestrator, then materializes each specialist still behind a placeholder
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import customer_service_agent.agent as orchestrator
+import_s = time.perf_counter() - started
+from customer_service_agent.registry import loading_stats
+modules = len(sys.modules)
+print("-- routing --", file=sys.stderr, flush=True)
+for agent in list(orchestrator.airline_assist_agent.sub_agents):
+    if hasattr(agent, "load"):
+        agent.load()
+print(json.dumps({"import_s": import_s, "modules": modules, "first_route_ms": loading_stats()}))
+"""
+IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|\s+(\S+)$")
+
+
+def run_child(mode):
+    env = dict(os.environ, SUBAGENT_LOADING=mode)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    own = {}
+    for line in completed.stderr.splitlines():
+        if line == "-- routing --":
+            break
+        match = IMPORTTIME.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, module = match.groups()
+        if module == "customer_service_agent":
+            result["importtime_ms"] = int(cumulative_us) / 1000
+        if module.startswith("customer_service_agent"):
+            own[module] = int(self_us) / 1000
+    result["own_modules"] = own
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters per mode")
+    parser.add_argument("--top", type=int, default=5, help="slowest project modules to list")
+    args = parser.parse_args()
+
+    results = {mode: [run_child(mode) for _ in range(args.runs)] for mode in ("eager", "lazy")}
+    for mode, runs in results.items():
+        wall = latency_summary([run["import_s"] for run in runs])
+        importtime = latency_summary([run["importtime_ms"] / 1000 for run in runs])
+        last = runs[-1]
+        slowest = sorted(last["own_modules"].items(), key=lambda item: -item[1])[: args.top]
+        rows = {
+            "import p50 / p95 (ms)": f"{wall['p50_ms']:.1f} / {wall['p95_ms']:.1f}",
+            "-X importtime cumulative p50 (ms)": importtime["p50_ms"],
+            "modules loaded": last["modules"],
+            "project modules imported": len(last["own_modules"]),
+        }
+        rows.update({f"  {module} (self ms)": ms for module, ms in slowest})
+        print_report(f"SUBAGENT_LOADING={mode}, {args.runs} cold starts", rows)
+
+    eager = latency_summary([run["import_s"] for run in results["eager"]])
+    lazy = latency_summary([run["import_s"] for run in results["lazy"]])
+    first_route = results["lazy"][-1]["first_route_ms"]
+    rows = {f"first transfer to {name} (ms)": ms for name, ms in first_route.items()}
+    rows["startup saved p50 (ms)"] = eager["p50_ms"] - lazy["p50_ms"]
+    rows["startup speedup"] = eager["p50_ms"] / lazy["p50_ms"]
+    print_report("Lazy loading: deferred cost", rows)
+
+
+if __name__ == "__main__":
+    main()
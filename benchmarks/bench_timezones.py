@@ -0,0 +1,172 @@
+# benchmarks/bench_timezones.py
+"""Time zone table: preload cost and vectorized UTC/local conversion vs per-leg zoneinfo.
+
+Run with: python -m benchmarks.bench_timezones --itineraries 200000
+
+Preloads the airport time zone table from cold (zone transitions read from
+zoneinfo) and from the transition cache. Then builds random itineraries of one
+to three legs between the table's airports, spread over several years so they
+cross DST changes, and converts every departure and arrival to local time.
+The table does this in one vectorized pass. The baseline makes one
+datetime.fromtimestamp(..., ZoneInfo) call per time, and the two must agree,
+as must the local -> UTC direction. Last, layovers are rated against MCTs
+with connection_times vs a Python loop, and the calculate_time_zones and
+check_connection_risk tools are timed.
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.schedule import search
+from customer_service_agent.schedule.generate import generate
+from customer_service_agent.schedule.search import FlightSearch, check_connection_risk
+from customer_service_agent.schedule.store import ScheduleStore
+from customer_service_agent.schedule.timezones import (
+    DEFAULT_AIRPORT_TIMEZONES_PATH,
+    RISK_LEVELS,
+    TIGHT_BUFFER,
+    TimeZoneTable,
+    calculate_time_zones,
+    connection_times,
+    minutes_at,
+    zone_transitions,
+)
+
+
+def itineraries(table, count, seed=11):
+    """Airports (count, 4) in travel order, dep/arr UTC (count, 3), and a mask of legs past each trip's end."""
+    rng = np.random.default_rng(seed)
+    airports = np.array(sorted(table.airport_ids.values()))
+    zones = rng.choice(airports, (count, 4))
+    legs = rng.integers(1, 4, count)
+    block = rng.integers(60, 14 * 60, (count, 3))
+    layover = rng.integers(20, 6 * 60, (count, 3))
+    dep = np.empty((count, 3), dtype=np.int64)
+    dep[:, 0] = rng.integers(minutes_at(2024), minutes_at(2030), count)
+    for leg in (1, 2):
+        dep[:, leg] = dep[:, leg - 1] + block[:, leg - 1] + layover[:, leg]
+    arr = dep + block
+    padded = np.arange(3)[None, :] >= legs[:, None]
+    return zones, dep, arr, padded
+
+
+def zoneinfo_local(zone_names, zones, minutes):
+    out = np.empty(minutes.shape, dtype=np.int64)
+    for index in np.ndindex(minutes.shape):
+        tz = ZoneInfo(zone_names[zones[index]])
+        moment = datetime.fromtimestamp(int(minutes[index]) * 60, tz)
+        out[index] = minutes[index] + int(moment.utcoffset().total_seconds()) // 60
+    return out
+
+
+def zoneinfo_utc(zone_names, zones, local):
+    out = np.empty(local.shape, dtype=np.int64)
+    for index in np.ndindex(local.shape):
+        moment = datetime(1970, 1, 1) + timedelta(minutes=int(local[index]))
+        out[index] = int(moment.replace(tzinfo=ZoneInfo(zone_names[zones[index]])).timestamp()) // 60
+    return out
+
+
+def risk_loop(arrivals, departures, mct):
+    out = []
+    for a, d, m in zip(arrivals.tolist(), departures.tolist(), mct.tolist()):
+        layover = d - a
+        out.append(3 if layover < 0 else 2 if layover < m else 1 if layover < m + TIGHT_BUFFER else 0)
+    return np.array(out)
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--itineraries", type=int, default=200_000)
+    parser.add_argument("--connections", type=int, default=1_000_000)
+    parser.add_argument("--tool-calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    zone_transitions.cache_clear()
+    table, cold_s = timed(lambda: TimeZoneTable.from_csv(DEFAULT_AIRPORT_TIMEZONES_PATH))
+    _, warm_s = timed(lambda: TimeZoneTable.from_csv(DEFAULT_AIRPORT_TIMEZONES_PATH))
+    stats = table.stats()
+    print_report(f"Preloading {stats['airports']} airports, {stats['zones']} zones, {stats['years']}", {
+        "cold build (ms)": cold_s * 1000,
+        "rebuild from cached transitions (ms)": warm_s * 1000,
+        "transitions": stats["transitions"],
+        "table size (KB)": stats["bytes"] / 1024,
+    })
+
+    zones, dep, arr, padded = itineraries(table, args.itineraries)
+    origin, destination = zones[:, :3], zones[:, 1:]
+    times = (~padded).sum()
+    vector_local, vector_s = timed(lambda: (table.to_local(origin, dep), table.to_local(destination, arr)))
+    loop_local, loop_s = timed(lambda: (zoneinfo_local(table.zones, origin, dep),
+                                        zoneinfo_local(table.zones, destination, arr)))
+    local_mismatches = sum(int(np.count_nonzero((v != l) & ~padded)) for v, l in zip(vector_local, loop_local))
+    back, back_s = timed(lambda: table.to_utc(origin, vector_local[0]))
+    expected, back_loop_s = timed(lambda: zoneinfo_utc(table.zones, origin, vector_local[0]))
+    utc_mismatches = int(np.count_nonzero((back != expected) & ~padded))
+    dst_legs = int(np.count_nonzero((table.offsets(origin, dep) != table.offsets(origin, dep - 180 * 1440))
+                                    & ~padded))
+    print_report(f"UTC -> local for {args.itineraries:,} itineraries ({times:,} legs, both ends)", {
+        "vectorized (ms)": vector_s * 1000,
+        "zoneinfo per time (ms)": loop_s * 1000,
+        "speedup": loop_s / vector_s,
+        "mismatches": local_mismatches,
+        "legs whose origin offset differs from 6 months earlier": dst_legs,
+        "local -> UTC vectorized (ms)": back_s * 1000,
+        "local -> UTC zoneinfo (ms)": back_loop_s * 1000,
+        "local -> UTC mismatches": utc_mismatches,
+    })
+
+    rng = np.random.default_rng(3)
+    arrivals = rng.integers(minutes_at(2026), minutes_at(2027), args.connections)
+    departures = arrivals + rng.integers(-30, 6 * 60, args.connections)
+    mct = rng.choice([45, 60, 90], args.connections)
+    (_, risk), vector_s = timed(lambda: connection_times(arrivals, departures, mct))
+    expected, loop_s = timed(lambda: risk_loop(arrivals, departures, mct))
+    counts = np.bincount(risk, minlength=len(RISK_LEVELS))
+    print_report(f"Rating {args.connections:,} connections against MCT", {
+        "connection_times (ms)": vector_s * 1000,
+        "Python loop (ms)": loop_s * 1000,
+        "speedup": loop_s / vector_s,
+        "mismatches": int(np.count_nonzero(risk != expected)),
+        **{f"{level}": int(count) for level, count in zip(RISK_LEVELS, counts)},
+    })
+
+    store = ScheduleStore.from_rows(generate(50_000, days=14, start=date(2026, 3, 1)))
+    search._engine = FlightSearch(store)
+    connecting = []
+    for origin_code in [code for code in store.airports if code.startswith("Q")][:200]:
+        for option in search.search_flights(origin_code, "LHR", "2026-03-09")["flights"]:
+            if "legs" in option:
+                connecting.append([{"flight_number": leg["flight_number"], "date": leg["date"]}
+                                   for leg in option["legs"]])
+    sample = random.Random(5)
+    codes = list(table.airport_ids) + ["EST", "Tokyo", "America/Chicago", "CET"]
+    zone_calls, risk_calls = [], []
+    for _ in range(args.tool_calls):
+        a, b = sample.choice(codes), sample.choice(codes)
+        zone_calls.append(timed(lambda: calculate_time_zones(a, b, "09:30"))[1])
+        flights = sample.choice(connecting)
+        risk_calls.append(timed(lambda: check_connection_risk(flights))[1])
+    zone_latency, risk_latency = latency_summary(zone_calls), latency_summary(risk_calls)
+    print_report("Tools", {
+        "calculate_time_zones p50 / p99 (us)":
+            f"{zone_latency['p50_ms'] * 1000:.0f} / {zone_latency['p99_ms'] * 1000:.0f}",
+        "check_connection_risk p50 / p99 (us)":
+            f"{risk_latency['p50_ms'] * 1000:.0f} / {risk_latency['p99_ms'] * 1000:.0f}",
+        "itineraries sampled for check_connection_risk": len(connecting),
+    })
+
+
+if __name__ == "__main__":
+    main()
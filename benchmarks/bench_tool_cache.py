@@ -0,0 +1,113 @@
+# benchmarks/bench_tool_cache.py
+"""Read-only tool cache under an IRROPS-style burst of repeated lookups.
+
+Run with: python -m benchmarks.bench_tool_cache --calls 20000 --workers 64
+
+Calls are spread over a skewed set of flights and airports, with the
+casing/format variations a model produces ("aa 0123" vs "AA123",
+"03/15/2026" vs "2026-03-15"). Each backend call sleeps --backend-ms to stand
+in for the real status/weather service.
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.tool_cache import FLIGHT_STATUS_TTL, WEATHER_TTL, ToolCache
+
+AIRPORTS = ["JFK", "ORD", "DFW", "LAX", "ATL", "MIA", "BOS", "SEA", "DEN", "CLT"]
+
+
+def flight_variants(number, day):
+    return random.choice([
+        {"flight_number": f"AA{number}", "date": f"2026-03-{day:02d}"},
+        {"flight_number": f"aa {number}", "date": f"03/{day:02d}/2026"},
+        {"flight_number": f"AA0{number}", "date": f"2026/03/{day:02d}"},
+    ])
+
+
+def make_workload(calls, flights):
+    # Zipf-like: a few cancelled flights get most of the traffic
+    weights = [1 / (rank + 1) for rank in range(flights)]
+    numbers = random.choices(range(100, 100 + flights), weights=weights, k=calls)
+    workload = []
+    for number in numbers:
+        if random.random() < 0.8:
+            workload.append(("check_flight_status", flight_variants(number, 15)))
+        else:
+            code = random.choice(AIRPORTS)
+            workload.append(("check_weather", {"airport_code": random.choice([code, code.lower(), f" {code}"])}))
+    return workload
+
+
+def run(workload, tools, workers):
+    latencies = []
+
+    def one(item):
+        name, kwargs = item
+        started = time.perf_counter()
+        tools[name](**kwargs)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(one, workload))
+    return time.perf_counter() - started, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--flights", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--backend-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    backend_calls = {"count": 0}
+    lock = threading.Lock()
+
+    def backend(**kwargs):
+        with lock:
+            backend_calls["count"] += 1
+        time.sleep(args.backend_ms / 1000)
+        return {"status": "Delayed", "gate": "B12", "query": kwargs}
+
+    workload = make_workload(args.calls, args.flights)
+
+    raw = {"check_flight_status": backend, "check_weather": backend}
+    uncached_s, uncached_lat = run(workload, raw, args.workers)
+    uncached_backend = backend_calls["count"]
+
+    backend_calls["count"] = 0
+    cache = ToolCache()
+    cached = {
+        "check_flight_status": cache.wrap("check_flight_status", backend, FLIGHT_STATUS_TTL),
+        "check_weather": cache.wrap("check_weather", backend, WEATHER_TTL),
+    }
+    cached_s, cached_lat = run(workload, cached, args.workers)
+    stats = cache.stats()
+
+    before, after = latency_summary(uncached_lat), latency_summary(cached_lat)
+    print_report(
+        f"Tool cache: {args.calls:,} calls, {args.workers} workers, {args.backend_ms:.0f} ms backend",
+        {
+            "uncached wall time (s)": uncached_s,
+            "uncached backend calls": uncached_backend,
+            "uncached p50 / p99 (ms)": f"{before['p50_ms']:.2f} / {before['p99_ms']:.2f}",
+            "cached wall time (s)": cached_s,
+            "cached backend calls": backend_calls["count"],
+            "cached p50 / p99 (ms)": f"{after['p50_ms']:.3f} / {after['p99_ms']:.2f}",
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+            "in-flight joins": stats["inflight_joins"],
+            "evictions": stats["evictions"],
+            "hit ratio": stats["hit_ratio"],
+            "speedup": uncached_s / cached_s,
+        },
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# benchmarks/bench_tracing.py
+"""Tracing overhead: tool calls and turns with TRACE_DIR unset vs set, and span file aggregation.
+
+Run with: python -m benchmarks.bench_tracing --turns 20000 --calls 100000
+
+With TRACE_DIR unset, instrument_runner(), trace_tool() and the session
+service wrapper must hand back what they were given, so the disabled cost
+is checked by identity as well as timed. Then tracing is switched on with
+a temporary TRACE_DIR and the same work is timed again: get_airport_info
+called through its Tool, and synthetic turns whose event stream looks like
+a transfer to flight operations, one tool call and a streamed answer (no
+model latency, so the figures are pure tracing cost). Last, the span files
+are read back and aggregated the way the CLI does.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from google.adk.events import Event
+from google.adk.tools import Tool
+from google.genai import types
+
+from benchmarks.common import print_report
+from customer_service_agent import tracing
+from customer_service_agent.airports.store import get_airport_info
+from customer_service_agent.session_store import SqliteSessionService
+
+USAGE = types.GenerateContentResponseUsageMetadata(prompt_token_count=1200, candidates_token_count=40)
+
+
+def call(name, **args):
+    return types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))])
+
+
+def response(name):
+    part = types.Part(function_response=types.FunctionResponse(name=name, response={}))
+    return types.Content(role="user", parts=[part])
+
+
+def text(value):
+    return types.Content(role="model", parts=[types.Part(text=value)])
+
+
+class ScriptedRunner:
+    """Stands in for Runner: replays one turn's events and calls the tool between them."""
+
+    app_name = "bench"
+
+    def __init__(self, session_service, tool):
+        self.session_service = session_service
+        self.agent = None
+        self.tool = tool
+
+    async def run_async(self, *, user_id, session_id, new_message=None, run_config=None):
+        self.session_service.get_session(app_name=self.app_name, user_id=user_id, session_id=session_id)
+        yield Event(author="orchestrator", content=call("transfer_to_agent", agent_name="flight_operations"),
+                    usage_metadata=USAGE)
+        yield Event(author="orchestrator", content=response("transfer_to_agent"))
+        yield Event(author="flight_operations", content=call("get_airport_info", airport_code="JFK"),
+                    usage_metadata=USAGE)
+        self.tool.function(airport_code="JFK")
+        yield Event(author="flight_operations", content=response("get_airport_info"))
+        for word in ("JFK ", "is ", "John ", "F. ", "Kennedy"):
+            yield Event(author="flight_operations", content=text(word), partial=True)
+        yield Event(author="flight_operations", content=text("JFK is John F. Kennedy"), usage_metadata=USAGE)
+
+
+def time_calls(function, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        function(airport_code="JFK")
+    return (time.perf_counter() - started) / count
+
+
+def time_turns(runner, session_id, count):
+    async def turns():
+        started = time.perf_counter()
+        for _ in range(count):
+            async for _ in runner.run_async(user_id="bench", session_id=session_id):
+                pass
+        return (time.perf_counter() - started) / count
+    return asyncio.run(turns())
+
+
+def measure(session_service, turns, calls):
+    tool = Tool(name="get_airport_info", description="Airport lookup", function=get_airport_info)
+    unwrapped = tool.function
+    runner = ScriptedRunner(session_service, tool)
+    instrumented = tracing.instrument_runner(runner)
+    tracing.trace_tool(tool)
+    session = session_service.create_session(app_name=runner.app_name, user_id="bench")
+    return {
+        "wrapped": tool.function is not unwrapped,
+        "runner": "run_async" in vars(runner),  # instrument_runner replaces it on the instance
+        "call_s": time_calls(tool.function, calls),
+        "turn_s": time_turns(instrumented, session.id, turns),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=20_000)
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.pop(tracing.TRACE_DIR_ENV, None)
+        tracing._tracer_checked = False
+        baseline_tool = Tool(name="get_airport_info", description="Airport lookup", function=get_airport_info)
+        raw_call_s = time_calls(baseline_tool.function, args.calls)
+        off = measure(SqliteSessionService(os.path.join(tmp, "off.db")), args.turns, args.calls)
+
+        os.environ[tracing.TRACE_DIR_ENV] = os.path.join(tmp, "traces")
+        tracing._tracer_checked = False
+        on = measure(SqliteSessionService(os.path.join(tmp, "on.db")), args.turns, args.calls)
+        started = time.perf_counter()
+        tracing.flush()
+        flush_s = time.perf_counter() - started
+
+        print_report("Per-call and per-turn cost", {
+            "TRACE_DIR unset: tool wrapped": "yes" if off["wrapped"] else "no",
+            "TRACE_DIR unset: runner wrapped": "yes" if off["runner"] else "no",
+            "get_airport_info, plain function (us)": raw_call_s * 1e6,
+            "get_airport_info, tracing off (us)": off["call_s"] * 1e6,
+            "get_airport_info, tracing on (us)": on["call_s"] * 1e6,
+            "scripted turn, tracing off (us)": off["turn_s"] * 1e6,
+            "scripted turn, tracing on (us)": on["turn_s"] * 1e6,
+            "added per traced turn (us)": (on["turn_s"] - off["turn_s"]) * 1e6,
+            "final flush (ms)": flush_s * 1000,
+        })
+
+        paths = [os.path.join(tmp, "traces")]
+        started = time.perf_counter()
+        spans = list(tracing.read_spans(paths))
+        read_s = time.perf_counter() - started
+        started = time.perf_counter()
+        report = tracing.summarize(spans)
+        summarize_s = time.perf_counter() - started
+        turns = report["turns"]["flight_operations"]
+        print_report(f"Aggregating {len(spans):,} spans", {
+            "span file size (MB)": sum(os.path.getsize(path) for path in tracing.span_files(paths)) / 2**20,
+            "read (s)": read_s,
+            "summarize (s)": summarize_s,
+            "turns / tool spans": f"{turns['count']:,} / {report['tools']['get_airport_info']['count']:,}",
+            "traced turn p50 / p99 (ms)": f"{turns['p50_ms']:.3f} / {turns['p99_ms']:.3f}",
+        })
+        del os.environ[tracing.TRACE_DIR_ENV]
+
+
+if __name__ == "__main__":
+    main()
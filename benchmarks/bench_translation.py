@@ -0,0 +1,124 @@
+# benchmarks/bench_translation.py
+"""translate_content: translation memory and batched misses vs one provider call per message.
+
+Run with: python -m benchmarks.bench_translation --messages 5000 --rate 500
+
+Generates a stream of airline messages (boarding notices, delay apologies,
+gate changes, visa checklists, baggage updates) with varying flights, gates,
+times and small wording changes. Each message is sent to one of six target
+languages, with arrivals at `rate` messages/sec. The stream is translated
+twice against LocalTranslator. The first run makes one provider call per
+message. The second goes through TranslationPipeline, which tries the
+memory first and batches misses per language. The pipeline run covers a
+cold memory and then a second, warm stream. Reported: provider calls,
+memory hit ratio and per-message latency.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.translation import LocalTranslator, TranslationMemory, TranslationPipeline
+
+TARGETS = ["es", "fr", "de", "it", "pt", "ja"]
+AIRPORTS = ["JFK", "LAX", "ORD", "ATL", "DFW", "LHR", "CDG", "FRA", "NRT", "SFO"]
+TEMPLATES = [
+    "Boarding for {flight} to {airport} begins at {time} from gate {gate}. {please} have your boarding pass ready.",
+    "{sorry}, flight {flight} is delayed. The new departure time is {time}. {please} check the screens for updates.",
+    "{flight} to {airport} now departs from gate {gate}. {please} proceed to the new gate.",
+    "Your flight {flight} has been cancelled. We have rebooked you on {flight2} departing at {time}.",
+    "Passengers travelling to {airport} need a passport valid for six months. A visa may be required for your stay.",
+    "Your bag has arrived at {airport} and is on belt {belt}. {thanks}.",
+    "Final call for {flight} to {airport}. The gate closes at {time}.",
+    "Due to weather at {airport}, flight {flight} is delayed by {minutes} minutes. We apologize for the inconvenience.",
+]
+# Small wording changes that the memory should match fuzzily
+PLEASE = ["Please", "Please", "Kindly"]
+SORRY = ["We are sorry", "We are sorry", "We are very sorry", "We're sorry"]
+THANKS = ["Thank you for flying with us", "Thank you for flying with us today", "Thanks for flying with us"]
+
+
+def messages(count, seed):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(count):
+        carrier = rng.choice(["AA", "UA", "DL"])
+        text = rng.choice(TEMPLATES).format(
+            flight=f"{carrier}{rng.randrange(1, 3000)}", flight2=f"{carrier}{rng.randrange(1, 3000)}",
+            airport=rng.choice(AIRPORTS), time=f"{rng.randrange(24):02d}:{rng.choice(['00', '15', '30', '45'])}",
+            gate=f"{rng.choice('ABCDE')}{rng.randrange(1, 40)}", belt=rng.randrange(1, 12),
+            minutes=rng.randrange(15, 240, 5), please=rng.choice(PLEASE),
+            sorry=rng.choice(SORRY), thanks=rng.choice(THANKS),
+        )
+        out.append((text, rng.choice(TARGETS)))
+    return out
+
+
+async def per_message(stream, rate, translator):
+    async def one(text, target):
+        started = time.perf_counter()
+        await translator.translate_batch([text], "en", target)
+        return time.perf_counter() - started
+
+    return await arrive(stream, rate, one)
+
+
+async def through_pipeline(stream, rate, pipeline):
+    async def one(text, target):
+        started = time.perf_counter()
+        await pipeline.translate(text, target, "en")
+        return time.perf_counter() - started
+
+    return await arrive(stream, rate, one)
+
+
+async def arrive(stream, rate, handle):
+    rng = random.Random(0)
+    tasks = []
+    for text, target in stream:
+        tasks.append(asyncio.create_task(handle(text, target)))
+        await asyncio.sleep(rng.expovariate(rate))
+    return await asyncio.gather(*tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--rate", type=float, default=500.0, help="arrivals per second")
+    parser.add_argument("--call-ms", type=float, default=300.0, help="provider round trip per call")
+    parser.add_argument("--window-ms", type=float, default=10.0, help="miss batching window")
+    args = parser.parse_args()
+
+    cold, warm = messages(args.messages, seed=1), messages(args.messages, seed=2)
+    translator = LocalTranslator(call_latency=args.call_ms / 1000)
+    samples = asyncio.run(per_message(cold, args.rate, translator))
+    latency = latency_summary(samples)
+    print_report(f"One provider call per message: {args.messages:,} messages", {
+        "provider calls": translator.calls,
+        "latency p50 / p95 / p99 (ms)": f"{latency['p50_ms']:.1f} / {latency['p95_ms']:.1f} / {latency['p99_ms']:.1f}",
+    })
+
+    pipeline = TranslationPipeline(TranslationMemory(), LocalTranslator(call_latency=args.call_ms / 1000),
+                                   window=args.window_ms / 1000)
+    for name, stream in (("cold memory", cold), ("warm memory", warm)):
+        before = pipeline.stats()
+        samples = asyncio.run(through_pipeline(stream, args.rate, pipeline))
+        after = pipeline.stats()
+        latency = latency_summary(samples)
+        lookups = after["lookups"] - before["lookups"]
+        exact, fuzzy = after["exact_hits"] - before["exact_hits"], after["fuzzy_hits"] - before["fuzzy_hits"]
+        print_report(f"Translation memory + batching, {name}: {args.messages:,} messages", {
+            "sentences looked up": lookups,
+            "exact hits / fuzzy suggestions": f"{exact:,} / {fuzzy:,}",
+            "hit ratio": exact / lookups,
+            "provider calls": after["provider_calls"] - before["provider_calls"],
+            "sentences machine-translated": after["segments_translated"] - before["segments_translated"],
+            "memory entries": after["entries"],
+            "latency p50 / p95 / p99 (ms)":
+                f"{latency['p50_ms']:.2f} / {latency['p95_ms']:.1f} / {latency['p99_ms']:.1f}",
+        })
+
+
+if __name__ == "__main__":
+    main()
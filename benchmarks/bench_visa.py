@@ -0,0 +1,218 @@
+# benchmarks/bench_visa.py
+"""Visa requirements: integer-coded matrix vs a dict-of-dicts, lookups and itinerary checks.
+
+Run with: python -m benchmarks.bench_visa --countries 200 --itineraries 200000
+
+Builds the bundled rules into a VisaMatrix and into the obvious
+nationality -> destination -> purpose dict of per-cell dicts. The country
+table is padded with synthetic countries (each copying a real one's groups)
+up to --countries, so the sizes look like a full world table. Compares
+build time and memory, single lookups, and checking whole itineraries with
+up to three connections each. The itinerary check is one vectorized pass for
+the matrix and a Python loop for the dicts, and the two must agree. Last,
+the rule file is touched and get_visa_matrix() is timed while it hot-reloads.
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.visa import matrix as visa
+from customer_service_agent.visa.matrix import (
+    DEFAULT_COUNTRIES_PATH,
+    DEFAULT_RULES_PATH,
+    PURPOSES,
+    REQUIREMENTS,
+    VISA,
+    VisaMatrix,
+    load_rows,
+)
+
+
+def padded_countries(count, seed=3):
+    rows = load_rows(DEFAULT_COUNTRIES_PATH)
+    rng = random.Random(seed)
+    real = list(rows)
+    for i in range(max(0, count - len(real))):
+        like = rng.choice(real)
+        rows.append({"code": f"X{i:03d}", "name": f"Country {i:03d}", "aliases": "",
+                     "groups": like["groups"], "airports": f"Q{i:02d}" if i < 100 else ""})
+    return rows
+
+
+class NaiveVisaRules:
+    """nationality -> destination -> purpose -> dict, built by applying each rule cell by cell."""
+
+    def __init__(self, countries, rules):
+        codes = [row["code"] for row in countries]
+        groups = {}
+        for row in countries:
+            for group in row["groups"].split():
+                groups.setdefault(group, []).append(row["code"])
+
+        def expand(spec):
+            out = []
+            for token in spec.split(";"):
+                token = token.strip()
+                if token == "*":
+                    return codes
+                out += groups.get(token[1:], []) if token.startswith("@") else [token]
+            return out
+
+        self.rules = {n: {d: {} for d in codes} for n in codes}
+        for rule in rules:
+            purposes = PURPOSES if rule["purpose"] == "*" else rule["purpose"].split(";")
+            for n in expand(rule["nationality"]):
+                for d in expand(rule["destination"]):
+                    for p in purposes:
+                        self.rules[n][d][p] = {
+                            "requirement": rule["requirement"],
+                            "max_stay_days": int(rule["max_stay_days"]),
+                            "fee": int(rule["fee_usd"]),
+                            "processing_days": int(rule["processing_days"]),
+                            "documents": [x.strip() for x in rule["documents"].split(";")],
+                            "notes": rule["notes"],
+                        }
+        for code in codes:
+            for p in PURPOSES:
+                self.rules[code][code][p] = {"requirement": "NONE", "max_stay_days": 0, "fee": 0,
+                                             "processing_days": 0, "documents": [], "notes": "Citizen"}
+
+    def check_itinerary(self, nationality, destination, purpose, connections, duration):
+        cell = self.rules[nationality][destination][purpose]
+        worst = REQUIREMENTS.index(cell["requirement"])
+        if cell["max_stay_days"] and duration > cell["max_stay_days"] and worst < VISA:
+            worst = VISA
+        for stop in connections:
+            if stop not in (nationality, destination):
+                worst = max(worst, REQUIREMENTS.index(self.rules[nationality][stop]["transit"]["requirement"]))
+        return worst
+
+
+def measure(build):
+    tracemalloc.start()
+    started = time.perf_counter()
+    built = build()
+    elapsed = time.perf_counter() - started
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return built, elapsed, size
+
+
+def itineraries(count, countries, seed=5):
+    rng = np.random.default_rng(seed)
+    nationalities = rng.integers(0, countries, count)
+    destinations = rng.integers(0, countries, count)
+    purposes = rng.choice([0, 0, 0, 1, 1, 3], count)
+    durations = rng.integers(1, 200, count)
+    stops = rng.integers(0, countries, (count, 3))
+    # Between zero and three connections, the rest padded
+    stops[np.arange(3)[None, :] >= rng.integers(0, 4, count)[:, None]] = -1
+    return nationalities, destinations, purposes, durations, stops
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--countries", type=int, default=200)
+    parser.add_argument("--itineraries", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    args = parser.parse_args()
+
+    countries, rules = padded_countries(args.countries), load_rows(DEFAULT_RULES_PATH)
+    matrix, matrix_build_s, matrix_bytes = measure(lambda: VisaMatrix(countries, rules))
+    naive, naive_build_s, naive_bytes = measure(lambda: NaiveVisaRules(countries, rules))
+    codes = matrix.codes
+    n = len(codes)
+
+    rng = random.Random(1)
+    cells = [(rng.randrange(n), rng.randrange(n), rng.randrange(len(PURPOSES))) for _ in range(args.lookups)]
+    started = time.perf_counter()
+    for cell in cells:
+        matrix.check(*cell)
+    matrix_lookup_s = time.perf_counter() - started
+    named = [(codes[a], codes[b], PURPOSES[p]) for a, b, p in cells]
+    started = time.perf_counter()
+    for a, b, p in named:
+        naive.rules[a][b][p]["requirement"]
+    naive_lookup_s = time.perf_counter() - started
+    # The tool reads the bundled table, so time it on real countries only
+    real = load_rows(DEFAULT_COUNTRIES_PATH)
+    samples = []
+    for _ in range(20_000):
+        a, b, p = rng.choice(real)["name"], rng.choice(real)["code"], rng.choice(PURPOSES)
+        begun = time.perf_counter()
+        visa.check_visa_requirements(a, b, p)
+        samples.append(time.perf_counter() - begun)
+    tool = latency_summary(samples)
+
+    print_report(f"Visa rules: {n} countries x {n} x {len(PURPOSES)} purposes, {len(rules)} rule rows", {
+        "matrix build (ms)": matrix_build_s * 1000,
+        "dict-of-dicts build (ms)": naive_build_s * 1000,
+        "matrix memory (MB)": matrix_bytes / 2**20,
+        "dict-of-dicts memory (MB)": naive_bytes / 2**20,
+        "matrix lookup (ns)": matrix_lookup_s / len(cells) * 1e9,
+        "dict-of-dicts lookup (ns)": naive_lookup_s / len(cells) * 1e9,
+        "check_visa_requirements tool p50 / p99 (us)":
+            f"{tool['p50_ms'] * 1000:.1f} / {tool['p99_ms'] * 1000:.1f}",
+    })
+
+    nationalities, destinations, purposes, durations, stops = itineraries(args.itineraries, n)
+    started = time.perf_counter()
+    worst, leg = matrix.check_itineraries(nationalities, destinations, purposes, stops, durations)
+    vector_s = time.perf_counter() - started
+    started = time.perf_counter()
+    expected = [
+        naive.check_itinerary(codes[a], codes[b], PURPOSES[p], [codes[s] for s in row if s >= 0], int(d))
+        for a, b, p, d, row in zip(nationalities, destinations, purposes, durations, stops)
+    ]
+    loop_s = time.perf_counter() - started
+    mismatches = int(np.count_nonzero(worst != np.array(expected)))
+    print_report(f"Itinerary checks: {args.itineraries:,} itineraries, 0-3 connections", {
+        "vectorized (ms)": vector_s * 1000,
+        "dict-of-dicts loop (ms)": loop_s * 1000,
+        "speedup": loop_s / vector_s,
+        "itineraries needing a visa": int(np.count_nonzero(worst >= VISA)),
+        "of which a connection is strictest": int(np.count_nonzero((worst >= VISA) & (leg < stops.shape[1]))),
+        "mismatches": mismatches,
+    })
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rules_path = os.path.join(tmp, "visa_rules.csv")
+        shutil.copy(DEFAULT_RULES_PATH, rules_path)
+        os.environ[visa.VISA_RULES_ENV] = rules_path
+        os.environ[visa.VISA_RELOAD_ENV] = "0"
+        before = visa.get_visa_matrix()
+        with open(rules_path, "a", encoding="utf-8") as f:
+            f.write("US,IN,tourism,VISA_FREE,30,0,0,Valid passport,Example rule update\n")
+        os.utime(rules_path, (time.time() + 5, time.time() + 5))
+        started = time.perf_counter()
+        after = visa.get_visa_matrix()
+        reload_s = time.perf_counter() - started
+        checking = latency_summary([timed(visa.get_visa_matrix) for _ in range(10_000)])
+        updated = visa.check_visa_requirements("US", "India", "tourism")["requirement"]
+        del os.environ[visa.VISA_RELOAD_ENV]
+        between = latency_summary([timed(visa.get_visa_matrix) for _ in range(10_000)])
+        del os.environ[visa.VISA_RULES_ENV]
+    print_report("Hot reload", {
+        "reload and swap (ms)": reload_s * 1000,
+        "matrix replaced": "yes" if after is not before else "no",
+        "US -> India tourism after the update": updated,
+        "get_visa_matrix, checking files p50 (us)": checking["p50_ms"] * 1000,
+        "get_visa_matrix, between checks p50 (us)": between["p50_ms"] * 1000,
+    })
+
+
+def timed(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# benchmarks/bench_weather.py
+"""Weather table: METAR parse throughput and delay-risk lookups over a day of global reports.
+
+Run with: python -m benchmarks.bench_weather --stations 9000 --hours 24
+
+Writes a day of synthetic METARs and six-hourly TAFs. --stations is about
+the number of reporting stations worldwide: the bundled airports, plus
+US-style (Kxxx, statute miles and inches of mercury) and metric stations,
+each with hourly reports and occasional specials. The whole METAR file is
+parsed in one vectorized pass, first with an empty token vocabulary, then
+again with the vocabulary a running process already has. The baseline
+classifies every token of every report as it comes, one report at a time,
+over the first --baseline-reports reports, and the two must agree.
+Then both files are ingested through get_weather_table(), and lookups are
+timed: one airport's delay outlook, the check_weather and
+check_flight_status tools, and a sweep of every station for the emergency
+agent's check_weather_disruptions.
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent import weather
+from customer_service_agent.schedule import search
+from customer_service_agent.weather import (
+    BECMG,
+    CLOUD,
+    COVERS,
+    END,
+    FIELDS,
+    FLAGS,
+    HEADERS,
+    METERS_PER_MILE,
+    PRESSURE,
+    TEMPERATURE,
+    TEMPO,
+    TIME,
+    VISIBILITY,
+    WEATHER,
+    WHOLE_MILES,
+    WIND,
+    Vocabulary,
+    airport_stations,
+    classify,
+    parse_metars,
+    resolve_minute,
+    synthetic_metars,
+    synthetic_tafs,
+)
+
+
+def global_stations(count, seed=7):
+    """The bundled airports' stations padded with synthetic ones, a quarter of them US-style."""
+    rng = random.Random(seed)
+    stations = set(airport_stations())
+    while len(stations) < count:
+        prefix = "K" if rng.random() < 0.25 else rng.choice("YZ")  # Y and Z codes stand in for metric regions
+        stations.add(prefix + "".join(rng.choice(string.ascii_uppercase) for _ in range(3)))
+    return sorted(stations)
+
+
+def parse_loop(lines, now):
+    """Baseline: walk each report's tokens in order, classifying every token as it comes."""
+    out = {name: [] for name in FIELDS}
+    for line in lines:
+        tokens = line.split(",", 1)[0].replace("=", " ").split()
+        while tokens and tokens[0] in HEADERS:
+            tokens = tokens[1:]
+        stamp = classify(tokens[1]) if len(tokens) >= 3 else None
+        if stamp is None or stamp[0] != TIME:
+            continue
+        row = {name: default for name, (_, default) in FIELDS.items()}
+        row["time"] = resolve_minute(stamp[1], stamp[2], stamp[3], now)
+        seen, previous = set(), None
+        for token in tokens[2:]:
+            kind, a, b, c = classify(token)
+            if kind in (END, TEMPO, BECMG):
+                break
+            if kind == WIND and WIND not in seen:
+                row["wind_dir"], row["wind_kt"], row["gust_kt"] = a, b, c
+            elif kind == VISIBILITY and VISIBILITY not in seen:
+                whole = previous is not None and previous[0] == WHOLE_MILES and b == 1
+                row["visibility_m"] = a + (round(previous[1] * METERS_PER_MILE) if whole else 0)
+            elif kind == CLOUD:
+                row["cover"] = max(row["cover"], a)
+                if a >= COVERS["BKN"]:
+                    row["ceiling_ft"] = min(row["ceiling_ft"], b)
+                if c:
+                    row["weather"] |= FLAGS["CB"]
+            elif kind == WEATHER:
+                row["weather"] |= a
+                row["vicinity"] |= b
+            elif kind == TEMPERATURE and TEMPERATURE not in seen:
+                row["temp_c"], row["dewpoint_c"] = a, b
+            elif kind == PRESSURE and PRESSURE not in seen:
+                row["pressure"] = a
+            seen.add(kind)
+            previous = (kind, a, b, c)
+        for name in FIELDS:
+            out[name].append(row[name])
+    return {name: np.array(values) for name, values in out.items()}
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def latency(function, queries):
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        function(query)
+        samples.append(time.perf_counter() - started)
+    return latency_summary(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stations", type=int, default=9000)
+    parser.add_argument("--hours", type=int, default=24)
+    parser.add_argument("--baseline-reports", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    args = parser.parse_args()
+
+    now = int(time.time() // 60)
+    stations = global_stations(args.stations)
+    with tempfile.TemporaryDirectory() as tmp:
+        metar_path, taf_path = os.path.join(tmp, "metars.txt"), os.path.join(tmp, "tafs.txt")
+        (metars, tafs), generate_s = timed(lambda: (synthetic_metars(stations, args.hours, now),
+                                                    synthetic_tafs(stations, args.hours, now)))
+        for path, lines in ((metar_path, metars), (taf_path, tafs)):
+            with open(path, "w", encoding="utf-8") as f:
+                f.writelines(line + "\n" for line in lines)
+        size = os.path.getsize(metar_path)
+
+        vocabulary = Vocabulary()
+        parsed, cold_s = timed(lambda: parse_metars(metars, now, vocabulary))
+        _, warm_s = timed(lambda: parse_metars(metars, now, vocabulary))
+        sample = metars[:args.baseline_reports]
+        expected, loop_s = timed(lambda: parse_loop(sample, now))
+        vector = parse_metars(sample, now, vocabulary)
+        mismatches = sum(int(np.count_nonzero(vector[name] != expected[name])) for name in FIELDS)
+        reports = len(parsed["station"])
+        print_report(f"Parsing {reports:,} METARs from {len(stations):,} stations ({size / 2**20:.1f} MB)", {
+            "synthetic feed generation (s)": generate_s,
+            "vectorized, empty vocabulary (ms)": cold_s * 1000,
+            "vectorized, warm vocabulary (ms)": warm_s * 1000,
+            "distinct tokens": len(vocabulary),
+            "vectorized throughput (reports/s)": f"{reports / warm_s:,.0f}",
+            f"per-report loop over {len(sample):,} (ms)": loop_s * 1000,
+            "per-report loop throughput (reports/s)": f"{len(sample) / loop_s:,.0f}",
+            "speedup": (loop_s / len(sample)) / (warm_s / reports),
+            "mismatches": mismatches,
+        })
+
+        os.environ[weather.WEATHER_METARS_ENV], os.environ[weather.WEATHER_TAFS_ENV] = metar_path, taf_path
+        table, ingest_s = timed(weather.get_weather_table)
+        stats = table.stats()
+        print_report("Ingesting both files into the shared table", {
+            "get_weather_table, first call (ms)": ingest_s * 1000,
+            "stations": stats["stations"],
+            "TAFs kept (latest per station)": stats["with_taf"],
+            "forecast periods": stats["forecast_periods"],
+            "stations at high risk or worse now": stats["high_risk"],
+        })
+
+        rng = random.Random(4)
+        codes = [rng.choice(stations) for _ in range(args.lookups)]
+        airports = [code for code in (weather.iata_code(s) for s in airport_stations()) if code]
+        iata = [rng.choice(airports) for _ in range(args.lookups)]
+        store = search.get_engine().store
+        legs = [store.leg(int(row)) for row in rng.sample(range(len(store)), 2000)]
+        results = {
+            "delay outlook, ICAO station": latency(table.delay_outlook, codes),
+            "delay outlook, IATA airport": latency(table.delay_outlook, iata),
+            "check_weather tool": latency(weather.check_weather, iata[:5000]),
+            "check_flight_status tool": latency(
+                lambda leg: search.check_flight_status(leg["flight_number"], leg["date"]), legs),
+        }
+        sweep = latency(lambda _: weather.check_weather_disruptions(), range(200))
+        print_report(f"Lookups against {len(table):,} stations", {
+            **{f"{name} p50 / p99 (us)": f"{r['p50_ms'] * 1000:.1f} / {r['p99_ms'] * 1000:.1f}"
+               for name, r in results.items()},
+            "check_weather_disruptions, every station p50 / p99 (ms)":
+                f"{sweep['p50_ms']:.2f} / {sweep['p99_ms']:.2f}",
+            "stations flagged high or severe": weather.check_weather_disruptions()["airports_flagged"],
+        })
+        del os.environ[weather.WEATHER_METARS_ENV], os.environ[weather.WEATHER_TAFS_ENV]
+
+
+if __name__ == "__main__":
+    main()
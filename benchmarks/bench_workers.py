@@ -0,0 +1,142 @@
+# benchmarks/bench_workers.py
+"""Pre-fork worker mode: chat throughput from 1 to N worker processes under CPU-bound turns.
+
+Run with: python -m benchmarks.bench_workers --workers 1,2,4 --sessions 200 --turns 5
+
+Each worker serves a stub model that burns --cpu-ms of CPU per model call
+(encoding and decoding a session-sized JSON document, the kind of work a
+real turn does around the model) before its usual synthetic latency. The
+burn is measured in thread CPU time, so workers sharing a core do not get
+through it any faster. For every worker count, --sessions clients each send
+--turns /chat requests through the supervisor, reusing the session_id they
+are given, and the report shows turns/sec and its speedup over one worker.
+Scaling stops at the number of cores (os.cpu_count() is printed).
+
+With --crash, worker 0 is killed with SIGKILL halfway through the largest
+run; the report shows how long the supervisor took to bring it back and
+how many turns failed while it was down.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+
+from benchmarks.bench_server import run_client
+from benchmarks.common import latency_summary, print_report
+from customer_service_agent.models.stub import StubLlm, use_model
+from workers import PreforkServer
+
+# Roughly the size of a session's state after a few turns
+SESSION_DOCUMENT = {
+    "user_name": "Avery Quinn",
+    "interaction_history": [
+        {"action": "user_query", "query": "What is the status of flight AA123 today?",
+         "timestamp": "2026-03-05 08:15:00"},
+        {"action": "agent_response", "agent": "flight_operations", "response": "AA123 is on time. " * 20},
+    ] * 8,
+    "booking_history": [{"pnr": f"ABC{i:03d}", "segments": [{"flight": "AA123", "date": "2026-03-05"}] * 3}
+                        for i in range(10)],
+}
+
+
+class BusyLlm(StubLlm):
+    """StubLlm that spends cpu_ms of CPU time before answering, as turn processing would."""
+
+    cpu_ms: float = 5.0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        deadline = time.thread_time() + self.cpu_ms / 1000
+        while time.thread_time() < deadline:
+            json.loads(json.dumps(SESSION_DOCUMENT))
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
+
+
+def stub_runner(cpu_ms, latency):
+    """Runner factory for the workers: the real agent on a BusyLlm and in-memory sessions."""
+    from customer_service_agent.agent import airline_assist_agent
+    from google.adk.sessions import InMemorySessionService
+    from server import build_runner
+
+    use_model(airline_assist_agent, BusyLlm(cpu_ms=cpu_ms, latency=latency, token_latency=0.0))
+    return build_runner(InMemorySessionService())
+
+
+async def crash_worker(server, after):
+    await asyncio.sleep(after)
+    worker = server.workers[0]
+    killed = time.perf_counter()
+    os.kill(worker.process.pid, signal.SIGKILL)
+    while not worker.ready.is_set() or worker.restarts == 0:
+        await asyncio.sleep(0.01)
+    return time.perf_counter() - killed
+
+
+async def run_load(workers, sessions, turns, cpu_ms, latency, crash_after=None):
+    server = await PreforkServer(workers, "benchmarks.bench_workers:stub_runner", (cpu_ms, latency)).start(
+        "127.0.0.1", 0)
+    try:
+        latencies, errors = [], []
+        crash = asyncio.ensure_future(crash_worker(server, crash_after)) if crash_after else None
+        started = time.perf_counter()
+        await asyncio.gather(*(run_client(server.port, turns, False, latencies, [], errors)
+                               for _ in range(sessions)))
+        elapsed = time.perf_counter() - started
+        recovery = await crash if crash else None
+        stats = server.stats()
+    finally:
+        await server.close()
+    return {
+        "elapsed": elapsed,
+        "latency": latency_summary(latencies),
+        "errors": len(errors),
+        "recovery": recovery,
+        "requests": [worker["requests"] for worker in stats["workers"]],
+    }
+
+
+async def run_benchmark(counts, sessions, turns, cpu_ms, latency, crash):
+    rows, baseline = {}, None
+    for count in counts:
+        result = await run_load(count, sessions, turns, cpu_ms, latency)
+        throughput = result["latency"]["count"] / result["elapsed"]
+        baseline = baseline or throughput
+        rows[f"{count} worker{'s' if count > 1 else ''}: turns/sec"] = throughput
+        rows[f"{count} worker{'s' if count > 1 else ''}: speedup / p50 / p99 (ms)"] = (
+            f"{throughput / baseline:.2f}x / {result['latency']['p50_ms']:.0f} / {result['latency']['p99_ms']:.0f}")
+        rows[f"{count} worker{'s' if count > 1 else ''}: requests per worker"] = " / ".join(
+            str(requests) for requests in result["requests"])
+        rows[f"{count} worker{'s' if count > 1 else ''}: errors"] = result["errors"]
+    print_report(f"{sessions} sessions x {turns} turns, {cpu_ms:.0f} ms CPU + {latency * 1000:.0f} ms wait "
+                 f"per model call ({os.cpu_count()} cores)", rows)
+
+    if crash:
+        count = max(counts)
+        # Aim the kill at the middle of the run, going by the measured throughput
+        result = await run_load(count, sessions, turns, cpu_ms, latency,
+                                crash_after=sessions * turns / throughput / 2)
+        print_report(f"Worker 0 killed mid-run ({count} workers)", {
+            "restarted and ready after (ms)": result["recovery"] * 1000,
+            "turns completed": result["latency"]["count"],
+            "sessions that saw an error": result["errors"],
+            "turns/sec": result["latency"]["count"] / result["elapsed"],
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, 4, os.cpu_count() or 1})))
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--cpu-ms", type=float, default=5.0)
+    parser.add_argument("--model-latency", type=float, default=0.02)
+    parser.add_argument("--crash", action="store_true")
+    args = parser.parse_args()
+    counts = [int(count) for count in args.workers.split(",")]
+    asyncio.run(run_benchmark(counts, args.sessions, args.turns, args.cpu_ms, args.model_latency, args.crash))
+
+
+if __name__ == "__main__":
+    main()
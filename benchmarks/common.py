@@ -0,0 +1,29 @@
+# benchmarks/common.py
+import statistics
+
+from utils import percentile
+
+
+def latency_summary(samples):
+    """Summarize latency samples given in seconds as milliseconds."""
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples) * 1000 if samples else 0.0,
+    }
+
+
+def print_report(title, rows):
+    """Print a name/value report in aligned columns."""
+    print(f"\n{title}")
+    print("-" * len(title))
+    width = max(len(name) for name in rows)
+    for name, value in rows.items():
+        if isinstance(value, float):
+            value = f"{value:,.3f}"
+        elif isinstance(value, int):
+            value = f"{value:,}"
+        print(f"{name:<{width}}  {value}")
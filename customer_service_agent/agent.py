@@ -1,19 +1,15 @@
 
 from google.adk.agents import Agent
-from .sub_agents.flight_operations_agent.agent import flight_operations_agent
-from .sub_agents.booking_management_agent.agent import booking_management_agent
-from .sub_agents.baggage_services_agent.agent import baggage_services_agent
-from .sub_agents.policy_billing_agent.agent import policy_billing_agent
-from .sub_agents.loyalty_program_agent.agent import loyalty_program_agent
-from .sub_agents.emergency_response_agent.agent import emergency_response_agent
-from .sub_agents.language_cultural_agent.agent import language_cultural_agent
+from google.adk.tools import Tool
+from .fanout import FANOUT_TOOLS, parallel_lookup
+from .history import bounded_instruction
+from .router import pre_route
+from .registry import lazy_sub_agents, preload
 
-# Create the main orchestrator agent for airline customer service
-airline_assist_agent = Agent(
-    name="airline_assist_orchestrator",
-    model="gemini-2.0-flash",
-    description="Master orchestrator for AirlineAssist Pro multi-agent customer service system",
-    instruction="""
+# Everything before the first {placeholder} is identical for every session and
+# is cached by the model provider as a prompt prefix, so per-session sections
+# belong at the end.
+ORCHESTRATOR_INSTRUCTION = """
     You are the master orchestrator for AirlineAssist Pro, an intelligent airline customer service system.
     Your role is to understand customer inquiries and route them to the appropriate specialized agent.
     
@@ -37,24 +33,6 @@ airline_assist_agent = Agent(
        - Prioritize emergency rebooking and crisis management
        - Fast-track to Emergency Response Agent when needed
     
-    **Customer Information:**
-    <customer_info>
-    Name: {customer_name}
-    Frequent Flyer Number: {ff_number}
-    Status: {loyalty_status}
-    </customer_info>
-    
-    **Booking Information:**
-    <booking_info>
-    Active Bookings: {active_bookings}
-    Past Bookings: {booking_history}
-    </booking_info>
-    
-    **Interaction History:**
-    <interaction_history>
-    {interaction_history}
-    </interaction_history>
-    
     **Available Specialized Agents:**
     
     1. Flight Operations Agent
@@ -116,6 +94,14 @@ airline_assist_agent = Agent(
     - For urgent situations or disruptions → Emergency Response Agent
     - For language support or international travel → Language & Cultural Agent
     
+    **Parallel Lookups:**
+    
+    When one message needs several independent lookups (flight status, miles balance,
+    status benefits, weather, visa rules...), call parallel_lookup once with all of them
+    instead of visiting each specialist in turn. An argument written as "$0" or "$0.gate"
+    takes the result (or one field of it) of call 0, so dependent lookups can go in the
+    same request. Transfer to a specialist for anything that changes a booking or account.
+    
     **Escalation Protocol:**
     
     When detecting complex issues that require human intervention:
@@ -134,15 +120,63 @@ airline_assist_agent = Agent(
     
     Always prioritize customer safety and satisfaction. When multiple agents might be relevant,
     choose based on the primary concern and coordinate between agents as needed.
-    """,
-    sub_agents=[
-        flight_operations_agent,
-        booking_management_agent,
-        baggage_services_agent,
-        policy_billing_agent,
-        loyalty_program_agent,
-        emergency_response_agent,
-        language_cultural_agent
-    ],
-    tools=[],
-)
\ No newline at end of file
+    
+    **Customer Information:**
+    <customer_info>
+    Name: {customer_name}
+    Frequent Flyer Number: {ff_number}
+    Status: {loyalty_status}
+    </customer_info>
+    
+    **Booking Information:**
+    <booking_info>
+    Active Bookings: {active_bookings}
+    Past Bookings: {booking_history}
+    </booking_info>
+    
+    **Interaction History:**
+    <interaction_history>
+    {interaction_history}
+    </interaction_history>
+    """
+
+# Runs independent read-only lookups from several specialists concurrently
+parallel_lookup_tool = Tool(
+    name="parallel_lookup",
+    description="Run several independent read-only lookups at once and return all results",
+    parameters={
+        "type": "object",
+        "properties": {
+            "calls": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "tool": {"type": "string", "enum": sorted(FANOUT_TOOLS)},
+                        "args": {"type": "object"}
+                    },
+                    "required": ["tool", "args"]
+                }
+            }
+        },
+        "required": ["calls"]
+    },
+    function=parallel_lookup
+)
+
+# Create the main orchestrator agent for airline customer service
+airline_assist_agent = Agent(
+    name="airline_assist_orchestrator",
+    model="gemini-2.0-flash",
+    description="Master orchestrator for AirlineAssist Pro multi-agent customer service system",
+    # Rendered per turn with history bounded to the session token budget
+    instruction=bounded_instruction(ORCHESTRATOR_INSTRUCTION, label="airline_assist_orchestrator"),
+    # Placeholders: each specialist is imported the first time it is routed to
+    sub_agents=lazy_sub_agents(),
+    tools=[parallel_lookup_tool],
+    # Route unambiguous queries locally and skip this agent's model call
+    before_model_callback=pre_route,
+)
+
+# SUBAGENT_LOADING=eager imports every specialist now instead
+preload(airline_assist_agent.sub_agents)
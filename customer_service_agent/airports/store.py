@@ -0,0 +1,454 @@
+# customer_service_agent/airports/store.py
+"""Memory-mapped airport reference store behind get_airport_info and search_airports.
+
+Run with: python -m customer_service_agent.airports.store --csv airports.csv --out data/airports.bin
+
+The source is an OurAirports-style airports.csv (AIRPORTS_CSV_PATH, default
+the bundled sample), plus terminals.csv for the airports we have terminal
+lists for. It is compiled once into a single binary file (AIRPORTS_PATH,
+default data/airports.bin, rebuilt when the CSV is newer) and every process
+maps that file read-only. The records, strings and indexes are NumPy views
+over the mapping, so worker processes share one copy of the pages through
+the OS page cache instead of each building its own dicts.
+
+The file holds:
+
+- records: one fixed-width row per airport (codes, type, coordinates, and
+  string ids for name, city and links) ordered by importance, so the
+  first airport with a code is the one people mean.
+- strings: an interned UTF-8 blob with offsets.
+- iata_* / icao_*: perfect hashes (hash-and-displace). One
+  CRC picks a bucket, the bucket's stored seed gives a second CRC that picks
+  the slot. A lookup is two crc32 calls and two array reads, then a code
+  comparison to reject absent keys.
+- key_*: normalized city names, airport names from each significant word,
+  keywords and IATA codes, sorted, for prefix search by binary search.
+- tri_*: a trigram index over city and airport names, for fuzzy matches
+  such as "frnakfurt" or "sao paolo".
+"""
+import argparse
+import csv
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import unicodedata
+import zlib
+from bisect import bisect_left
+from difflib import SequenceMatcher
+
+import numpy as np
+
+from ..schedule.timezones import get_timezone_table
+
+logger = logging.getLogger(__name__)
+
+AIRPORTS_CSV_ENV = "AIRPORTS_CSV_PATH"
+AIRPORTS_PATH_ENV = "AIRPORTS_PATH"
+DEFAULT_CSV_PATH = os.path.join(os.path.dirname(__file__), "airports.csv")
+DEFAULT_TERMINALS_PATH = os.path.join(os.path.dirname(__file__), "terminals.csv")
+# data/ at the repository root, whatever directory the process starts in
+DEFAULT_AIRPORTS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "airports.bin")
+MAGIC = b"AIRPORTS"
+VERSION = 1
+ALIGN = 64
+BUCKET_SIZE = 4  # average keys per perfect-hash bucket
+LOAD_FACTOR = 0.8  # keys per slot; a little headroom keeps the last buckets cheap to place
+FUZZY_CANDIDATES = 32
+FUZZY_THRESHOLD = 0.75
+FUZZY_MIN_LENGTH = 4  # shorter queries only get prefix matches
+TYPES = ("large_airport", "medium_airport", "small_airport", "heliport", "seaplane_base", "balloonport", "closed")
+# Name words that start too many airport names to be worth a prefix key of their own
+GENERIC_WORDS = {
+    "airport", "international", "regional", "municipal", "airfield", "field", "air", "base", "airstrip",
+    "heliport", "county", "the", "de", "del", "da", "do", "di", "of", "and", "la", "le", "el", "intl",
+}
+RECORD = np.dtype([
+    ("iata", "S3"), ("icao", "S4"), ("ident", "S8"), ("type", "u1"), ("importance", "u1"),
+    ("country", "S2"), ("region", "S8"), ("continent", "S2"),
+    ("latitude", "<f4"), ("longitude", "<f4"), ("elevation", "<i4"),
+    ("name", "<u4"), ("city", "<u4"), ("terminals", "<u4"), ("home_link", "<u4"), ("wikipedia", "<u4"),
+])
+
+
+def normalize(text):
+    """Lowercase ASCII words: accents stripped, punctuation to single spaces."""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode().lower()
+    return " ".join("".join(c if c.isalnum() else " " for c in text).split())
+
+
+def trigrams(text):
+    """Trigram ids of a normalized string padded with spaces (base-37 over space, a-z, 0-9)."""
+    codes = [0 if c == " " else ord(c) - 96 if c.isalpha() else ord(c) - 21 for c in f" {text} "]
+    return {codes[i] * 1369 + codes[i + 1] * 37 + codes[i + 2] for i in range(len(codes) - 2)}
+
+
+def importance(row):
+    """0-7: scheduled service first, then airport size."""
+    size = {"large_airport": 3, "medium_airport": 2, "small_airport": 1}.get(row["type"], 0)
+    return (4 if row.get("scheduled_service") == "yes" else 0) + size
+
+
+def build_perfect_hash(keys, bucket_size=BUCKET_SIZE, load_factor=LOAD_FACTOR):
+    """(seeds, slots) such that key i is at slots[crc32(key, seeds[crc32(key) % len(seeds)]) % len(slots)].
+
+    Buckets are placed largest first; each tries seeds until all of its
+    keys land on distinct free slots.
+    """
+    n_buckets = max(1, len(keys) // bucket_size)
+    size = max(1, int(len(keys) / load_factor))
+    buckets = [[] for _ in range(n_buckets)]
+    for i, key in enumerate(keys):
+        buckets[zlib.crc32(key) % n_buckets].append(i)
+    seeds = np.zeros(n_buckets, dtype=np.uint32)
+    slots = np.full(size, -1, dtype=np.int32)
+    for bucket in sorted(range(n_buckets), key=lambda b: -len(buckets[b])):
+        members = buckets[bucket]
+        if not members:
+            break
+        seed = 1
+        while True:
+            positions = {zlib.crc32(keys[i], seed) % size for i in members}
+            if len(positions) == len(members) and all(slots[p] < 0 for p in positions):
+                break
+            seed += 1
+        seeds[bucket] = seed
+        for i in members:
+            slots[zlib.crc32(keys[i], seed) % size] = i
+    return seeds, slots
+
+
+class StringTable:
+    """Interns strings into one UTF-8 blob; id 0 is the empty string."""
+
+    def __init__(self):
+        self.ids = {"": 0}
+        self.parts = [b""]
+
+    def add(self, text):
+        text = (text or "").strip()
+        if text not in self.ids:
+            self.ids[text] = len(self.parts)
+            self.parts.append(text.encode("utf-8"))
+        return self.ids[text]
+
+    def arrays(self):
+        offsets = np.zeros(len(self.parts) + 1, dtype=np.uint32)
+        np.cumsum([len(part) for part in self.parts], out=offsets[1:])
+        return np.frombuffer(b"".join(self.parts), dtype=np.uint8), offsets
+
+
+def load_terminals(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row["code"].strip().upper(): row["terminals"] for row in csv.DictReader(f)}
+
+
+def compile_airports(rows, terminals=None):
+    """Sections of the binary file, as {name: array}, from OurAirports-style rows."""
+    terminals = terminals or {}
+    rows = [row for row in rows if row.get("type") != "closed"]
+    rows.sort(key=lambda row: -importance(row))
+    strings = StringTable()
+    records = np.zeros(len(rows), dtype=RECORD)
+    codes = {"iata": {}, "icao": {}}  # code -> first (most important) record
+    prefix_keys, docs = [], []
+    for i, row in enumerate(rows):
+        iata = (row.get("iata_code") or "").strip().upper()
+        icao = (row.get("icao_code") or row.get("gps_code") or "").strip().upper()
+        iata = iata if len(iata) == 3 and iata.isalnum() else ""
+        icao = icao if len(icao) == 4 and icao.isalnum() else ""
+        name, city = row.get("name") or "", row.get("municipality") or ""
+        records[i] = (
+            iata, icao, (row.get("ident") or "")[:8], TYPES.index(row["type"]) if row["type"] in TYPES else 255,
+            importance(row), row.get("iso_country") or "", (row.get("iso_region") or "")[:8],
+            row.get("continent") or "", float(row.get("latitude_deg") or 0), float(row.get("longitude_deg") or 0),
+            int(float(row.get("elevation_ft") or 0)), strings.add(name), strings.add(city),
+            strings.add(terminals.get(iata, "")), strings.add(row.get("home_link")),
+            strings.add(row.get("wikipedia_link")),
+        )
+        # Rows are in importance order, so a duplicated code keeps the busier airport
+        if iata:
+            codes["iata"].setdefault(iata.encode(), i)
+        if icao:
+            codes["icao"].setdefault(icao.encode(), i)
+
+        words = normalize(name).split()
+        names = [" ".join(words[k:]) for k in range(len(words)) if words[k] not in GENERIC_WORDS]
+        keywords = [normalize(k) for k in (row.get("keywords") or "").split(",")]
+        # ICAO codes are matched exactly by search(); as prefixes ("K...") they would swamp short queries
+        for key in {normalize(city), *names, *keywords, iata.lower()} - {""}:
+            prefix_keys.append((key.encode(), i))
+        docs.append(normalize(city))
+        docs.append(normalize(name))
+
+    sections = {"records": records}
+    sections["strings"], sections["string_offsets"] = strings.arrays()
+    for prefix, owners in codes.items():
+        seeds, slots = build_perfect_hash(list(owners))
+        owners = np.fromiter(owners.values(), dtype=np.int32, count=len(owners))
+        sections[f"{prefix}_seeds"] = seeds
+        sections[f"{prefix}_slots"] = np.where(slots >= 0, owners[np.maximum(slots, 0)], -1).astype(np.int32)
+
+    prefix_keys.sort()
+    offsets = np.zeros(len(prefix_keys) + 1, dtype=np.uint32)
+    np.cumsum([len(key) for key, _ in prefix_keys], out=offsets[1:])
+    sections["key_blob"] = np.frombuffer(b"".join(key for key, _ in prefix_keys), dtype=np.uint8)
+    sections["key_offsets"] = offsets
+    sections["key_records"] = np.array([record for _, record in prefix_keys], dtype=np.int32)
+
+    # Trigram postings over documents (2 * record: city, 2 * record + 1: name)
+    grams, owners, counts = [], [], np.zeros(len(docs), dtype=np.uint16)
+    for doc, text in enumerate(docs):
+        if text:
+            ids = trigrams(text)
+            grams.extend(ids)
+            owners.extend([doc] * len(ids))
+            counts[doc] = min(len(ids), 65535)
+    grams, owners = np.asarray(grams, dtype=np.int32), np.asarray(owners, dtype=np.int32)
+    order = np.lexsort((owners, grams))
+    grams, owners = grams[order], owners[order]
+    sections["tri_ids"], starts = np.unique(grams, return_index=True)
+    sections["tri_ptr"] = np.append(starts, len(grams)).astype(np.uint32)
+    sections["tri_docs"] = owners
+    sections["doc_grams"] = counts
+    return sections
+
+
+def align(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_sections(path, sections, meta=None):
+    """Write arrays to one file: magic, JSON header, then each array 64-byte aligned.
+
+    The file is written beside `path` and renamed over it, so processes
+    that build it concurrently or map the old file never see a partial one.
+    """
+    layout, offset = {}, 0
+    for name, array in sections.items():
+        layout[name] = {"dtype": np.lib.format.dtype_to_descr(array.dtype), "shape": array.shape, "offset": offset}
+        offset = align(offset + array.nbytes)
+    header = json.dumps({"version": VERSION, "sections": layout, **(meta or {})}).encode()
+    base = align(len(MAGIC) + 4 + len(header))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for name, array in sections.items():
+            f.seek(base + layout[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(partial, path)
+
+
+def build_airports(csv_path, out_path, terminals_path=DEFAULT_TERMINALS_PATH):
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    sections = compile_airports(rows, load_terminals(terminals_path))
+    write_sections(out_path, sections, {"source": os.path.basename(csv_path), "built_at": time.time()})
+    return len(sections["records"])
+
+
+class PrefixKeys:
+    """The sorted prefix keys as a read-only sequence of bytes, for bisect."""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+
+class AirportStore:
+    """Read-only view over a compiled airports file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a compiled airports file")
+        (size,) = struct.unpack_from("<I", self._map, len(MAGIC))
+        self.header = json.loads(self._map[len(MAGIC) + 4:len(MAGIC) + 4 + size])
+        base = align(len(MAGIC) + 4 + size)
+        for name, spec in self.header["sections"].items():
+            dtype = np.lib.format.descr_to_dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            view = np.frombuffer(self._map, dtype=dtype, count=count, offset=base + spec["offset"])
+            setattr(self, name, view.reshape(spec["shape"]))
+        self.keys = PrefixKeys(self.key_blob, self.key_offsets)
+
+    def __len__(self):
+        return len(self.records)
+
+    def text(self, string_id):
+        return self.strings[self.string_offsets[string_id]:self.string_offsets[string_id + 1]].tobytes().decode()
+
+    # ----- lookups -----
+
+    def _lookup(self, kind, code):
+        seeds, slots = getattr(self, f"{kind}_seeds"), getattr(self, f"{kind}_slots")
+        seed = int(seeds[zlib.crc32(code) % len(seeds)])
+        record = int(slots[zlib.crc32(code, seed) % len(slots)])
+        if record >= 0 and self.records[kind][record] == code:
+            return record
+        return None
+
+    def find(self, code):
+        """Record index for an IATA (3-letter) or ICAO (4-letter) code, or None."""
+        code = str(code).strip().upper().encode("ascii", "ignore")
+        if len(code) == 3:
+            return self._lookup("iata", code)
+        if len(code) == 4:
+            return self._lookup("icao", code)
+        return None
+
+    def prefix_search(self, query, limit=10):
+        """Airports with a city, name word, keyword or code starting with the query, most important first."""
+        prefix = normalize(query).encode()
+        if not prefix:
+            return []
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + b"\xff", lo)
+        records = np.unique(self.key_records[lo:hi])
+        order = np.argsort(-self.records["importance"][records], kind="stable")
+        return [int(record) for record in records[order[:limit]]]
+
+    def fuzzy_search(self, query, limit=10, threshold=FUZZY_THRESHOLD):
+        """Airports whose city or name is close to the query (typos, transpositions)."""
+        text = normalize(query)
+        grams = np.fromiter(trigrams(text), dtype=np.int32) if text else np.empty(0, dtype=np.int32)
+        position = np.searchsorted(self.tri_ids, grams)
+        position = position[(position < len(self.tri_ids)) & (self.tri_ids[np.minimum(position, len(self.tri_ids) - 1)] == grams)]
+        if not len(position):
+            return []
+        docs = np.concatenate([self.tri_docs[self.tri_ptr[p]:self.tri_ptr[p + 1]] for p in position])
+        docs, shared = np.unique(docs, return_counts=True)
+        dice = 2 * shared / (len(grams) + self.doc_grams[docs])
+        candidates = docs[np.argsort(-dice, kind="stable")[:FUZZY_CANDIDATES]]
+        scored = {}
+        for doc in candidates:
+            record, field = divmod(int(doc), 2)
+            candidate = normalize(self.text(self.records["name" if field else "city"][record]))
+            # Score against the candidate's leading words, so "frnakfurt" matches "frankfurt am main"
+            ratio = SequenceMatcher(None, text, candidate[:len(text) + 2]).ratio()
+            if ratio >= threshold and ratio > scored.get(record, 0):
+                scored[record] = ratio
+        ranked = sorted(scored, key=lambda r: (-round(scored[r], 2), -int(self.records["importance"][r])))
+        return ranked[:limit]
+
+    def search(self, query, limit=10):
+        """An exact code match, then prefix matches, topped up with fuzzy matches."""
+        exact = self.find(query)
+        found = [exact] if exact is not None else []
+        found += [r for r in self.prefix_search(query, limit) if r not in found][:limit - len(found)]
+        if len(found) < limit and len(normalize(query)) >= FUZZY_MIN_LENGTH:
+            found += [r for r in self.fuzzy_search(query, limit) if r not in found][:limit - len(found)]
+        return found
+
+    # ----- tool output -----
+
+    def summary(self, record):
+        row = self.records[record]
+        return {
+            "airport_code": row["iata"].decode() or None,
+            "icao_code": row["icao"].decode() or None,
+            "name": self.text(row["name"]),
+            "city": self.text(row["city"]),
+            "country": row["country"].decode(),
+        }
+
+    def info(self, record):
+        row = self.records[record]
+        result = self.summary(record)
+        result.update({
+            "region": row["region"].decode(),
+            "type": TYPES[row["type"]].replace("_", " ") if row["type"] < len(TYPES) else "unknown",
+            "scheduled_service": bool(row["importance"] >= 4),
+            "latitude": round(float(row["latitude"]), 4),
+            "longitude": round(float(row["longitude"]), 4),
+            "elevation_ft": int(row["elevation"]),
+        })
+        zone = get_timezone_table().airport_zones.get(result["airport_code"] or "")
+        if zone:
+            result["timezone"] = zone
+        terminals = self.text(row["terminals"])
+        if terminals:
+            result["terminals"] = terminals.split(";")
+        for field in ("home_link", "wikipedia"):
+            link = self.text(row[field])
+            if link:
+                result[field] = link
+        return result
+
+    def stats(self):
+        return {
+            "airports": len(self.records),
+            "iata_codes": int(np.count_nonzero(self.iata_slots >= 0)),
+            "icao_codes": int(np.count_nonzero(self.icao_slots >= 0)),
+            "prefix_keys": len(self.keys),
+            "file_bytes": len(self._map),
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_airport_store():
+    """The process-wide AirportStore, compiling the CSV first if the binary file is missing or stale."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = os.getenv(AIRPORTS_PATH_ENV, DEFAULT_AIRPORTS_PATH)
+                source = os.getenv(AIRPORTS_CSV_ENV, DEFAULT_CSV_PATH)
+                if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(source):
+                    count = build_airports(source, path)
+                    logger.info("Compiled %d airports from %s into %s", count, source, path)
+                _store = AirportStore(path)
+    return _store
+
+
+# ----- tool functions -----
+
+def get_airport_info(airport_code):
+    """get_airport_info tool: reference data for an IATA or ICAO code."""
+    store = get_airport_store()
+    record = store.find(airport_code)
+    if record is None:
+        return {"error": f"Unknown airport code: {airport_code}"}
+    return store.info(record)
+
+
+def search_airports(query, limit=8):
+    """search_airports tool: autocomplete by city, airport name or code, tolerating typos."""
+    store = get_airport_store()
+    limit = max(1, min(int(limit or 8), 50))
+    return {"airports": [store.summary(record) for record in store.search(query, limit)]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--csv", default=DEFAULT_CSV_PATH, help="OurAirports-style airports.csv")
+    parser.add_argument("--terminals", default=DEFAULT_TERMINALS_PATH)
+    parser.add_argument("--out", default=DEFAULT_AIRPORTS_PATH)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    count = build_airports(args.csv, args.out, args.terminals)
+    print(f"Compiled {count:,} airports into {args.out} in {time.perf_counter() - started:.2f}s")
+    print(AirportStore(args.out).stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+# customer_service_agent/alerts.py
+"""Proactive flight alerts: who follows a flight, and pushing alerts to them.
+
+Run with: python -m customer_service_agent.alerts --flight AA123 --date 2026-03-05 --type DELAY --delay 45
+
+FlightAlertIndex is an inverted index from (flight number, date) to the
+sessions following that flight. The watch_flights after_tool_callback adds a
+session whenever one of its check_flight_status or create_booking calls
+succeeds, so finding everyone affected by an event is one dict lookup
+instead of a scan over every session's state.
+
+Operational events (a delay, gate change, cancellation...) are posted to
+POST /alerts on the chat server, or passed to AlertDispatcher.publish().
+The dispatcher looks up the affected sessions, groups them by delivery
+channel and queues them in batches. Each channel has a bounded queue and a
+few workers that send one whole batch per call. When a channel falls
+behind, publish() waits for queue space instead of buffering without
+limit. The built-in "session" channel (SessionInbox) appends the alert to
+state['flight_alerts'] and wakes any GET /alerts/stream listeners.
+publish() also records the alert against its flight, which
+check_flight_status reports from then on, and drops the flight's cached
+check_flight_status result so nobody is told the old status for the rest of
+its cache TTL.
+
+Once started, the dispatcher drops flights dated before yesterday (UTC)
+from the index every EXPIRE_INTERVAL seconds. Sessions that no longer exist
+are untracked when an alert finds them gone, and SqliteSessionService
+untracks a session when it is deleted.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from urllib.request import Request, urlopen
+
+from google.adk.events import Event, EventActions
+
+from .tool_cache import normalize_date, normalize_flight_number, tool_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNEL = "session"
+ALERT_TYPES = ("DELAY", "GATE_CHANGE", "CANCELLED", "BOARDING", "DIVERTED")
+BATCH_SIZE = 500
+MAX_PENDING_BATCHES = 32
+CHANNEL_WORKERS = 4
+MAX_SESSION_ALERTS = 20
+LISTEN_QUEUE_SIZE = 64
+EXPIRE_INTERVAL = 3600
+# Flights stay followed for a day past their date: a late departure can still be on its way
+EXPIRE_AFTER_DAYS = 1
+STATE_LOCK_STRIPES = 64
+# Cached tool whose result an alert makes stale
+STATUS_TOOL = "check_flight_status"
+# Alert fields that change what check_flight_status reports, and alert types that settle a flight
+UPDATE_FIELDS = ("delay_minutes", "new_departure", "gate")
+FINAL_ALERTS = ("CANCELLED", "DIVERTED")
+
+Recipient = namedtuple("Recipient", "session_id user_id channel")
+
+
+def flight_key(flight_number, date):
+    """(flight number, ISO date) as indexed, or None if either is missing."""
+    flight, day = normalize_flight_number(flight_number or ""), normalize_date(date or "")
+    if not flight or len(day) != 10:
+        return None
+    return flight, day
+
+
+class FlightAlertIndex:
+    """(flight number, date) -> sessions following it, with the reverse map for removal.
+
+    It also keeps what published alerts have said about each flight (delay,
+    new departure, gate, cancellation...), which check_flight_status reports
+    on top of the schedule.
+    """
+
+    def __init__(self):
+        self.sessions = {}
+        self.flights = {}
+        self.updates = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.flights)
+
+    def track(self, session_id, flight_number, date, user_id=None, channel=DEFAULT_CHANNEL):
+        """Follow a flight for a session; returns False if the flight or date is unusable."""
+        key = flight_key(flight_number, date)
+        if key is None:
+            return False
+        with self._lock:
+            self.sessions.setdefault(key, {})[session_id] = Recipient(session_id, user_id, channel)
+            self.flights.setdefault(session_id, set()).add(key)
+        return True
+
+    def untrack(self, session_id, flight_number=None, date=None):
+        """Stop following one flight, or every flight when none is given."""
+        with self._lock:
+            keys = self.flights.get(session_id, set())
+            if flight_number is not None:
+                keys = keys & {flight_key(flight_number, date)}
+            for key in list(keys):
+                self._remove(key, session_id)
+
+    def expire(self, before):
+        """Drop flights dated before `before` (an ISO date); returns how many."""
+        with self._lock:
+            stale = [key for key in self.sessions if key[1] < before]
+            for key in stale:
+                for session_id in list(self.sessions[key]):
+                    self._remove(key, session_id)
+            for key in [key for key in self.updates if key[1] < before]:
+                del self.updates[key]
+        return len(stale)
+
+    def record(self, alert):
+        """Merge a published alert into its flight's operational update."""
+        key = (alert["flight_number"], alert["date"])
+        with self._lock:
+            update = dict(self.updates.get(key, {}))
+            update.update({field: alert[field] for field in UPDATE_FIELDS if field in alert})
+            update.update(last_alert=alert["type"], message=alert["message"], issued_at=alert["issued_at"])
+            if alert["type"] in FINAL_ALERTS:
+                update["outcome"] = alert["type"]
+            self.updates[key] = update
+
+    def update_for(self, flight_number, date):
+        """What published alerts have said about a flight, or None."""
+        return self.updates.get(flight_key(flight_number, date))
+
+    def _remove(self, key, session_id):
+        followers = self.sessions.get(key, {})
+        followers.pop(session_id, None)
+        if not followers:
+            self.sessions.pop(key, None)
+        keys = self.flights.get(session_id, set())
+        keys.discard(key)
+        if not keys:
+            self.flights.pop(session_id, None)
+
+    def recipients(self, flight_number, date):
+        key = flight_key(flight_number, date)
+        with self._lock:
+            return list(self.sessions.get(key, {}).values())
+
+    def flights_for(self, session_id):
+        return sorted(self.flights.get(session_id, ()))
+
+    def stats(self):
+        return {"sessions": len(self.flights), "flights": len(self.sessions), "flights_updated": len(self.updates)}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_alert_index():
+    """The process-wide FlightAlertIndex."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = FlightAlertIndex()
+    return _index
+
+
+def make_alert(event):
+    """Validate an operational event and return the alert sent to customers."""
+    kind = str(event.get("type", "")).upper()
+    if kind not in ALERT_TYPES:
+        raise ValueError(f"type must be one of {', '.join(ALERT_TYPES)}")
+    key = flight_key(event.get("flight_number"), event.get("date"))
+    if key is None:
+        raise ValueError("flight_number and date (YYYY-MM-DD) are required")
+    flight, date = key
+    alert = {
+        # An id given by the caller is kept, so one alert fanned out by several workers shares it
+        "alert_id": str(event.get("alert_id") or uuid.uuid4().hex[:12]),
+        "type": kind,
+        "flight_number": flight,
+        "date": date,
+        "issued_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    for field in UPDATE_FIELDS + ("reason",):
+        if event.get(field) not in (None, ""):
+            alert[field] = event[field]
+
+    if event.get("message"):
+        alert["message"] = str(event["message"])
+    elif kind == "DELAY":
+        alert["message"] = f"{flight} on {date} is delayed by {alert.get('delay_minutes', '?')} minutes"
+        if "new_departure" in alert:
+            alert["message"] += f"; new departure {alert['new_departure']}"
+    elif kind == "GATE_CHANGE":
+        alert["message"] = f"{flight} on {date} now departs from gate {alert.get('gate', 'TBA')}"
+    elif kind == "CANCELLED":
+        alert["message"] = f"{flight} on {date} has been cancelled; ask us to rebook you"
+    elif kind == "BOARDING":
+        alert["message"] = f"{flight} is now boarding at gate {alert.get('gate', 'TBA')}"
+    else:
+        alert["message"] = f"{flight} on {date} has been diverted"
+    return alert
+
+
+class Channel:
+    """A delivery channel: `send(alert, recipients)` is awaited once per batch."""
+
+    def __init__(self, name, send, batch_size=BATCH_SIZE, max_pending=MAX_PENDING_BATCHES,
+                 workers=CHANNEL_WORKERS):
+        self.name = name
+        self.send = send
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.workers = workers
+        self.queue = None
+        self.sent = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.blocked_s = 0.0
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "batches": self.batches,
+            "queued_batches": self.queue.qsize() if self.queue else 0,
+            "max_queued_batches": self.max_depth,
+            "backpressure_wait_ms": round(self.blocked_s * 1000, 1),
+        }
+
+
+class AlertDispatcher:
+    """Fans each alert out to the sessions following its flight, per channel."""
+
+    def __init__(self, index=None, cache=None):
+        self.index = index if index is not None else get_alert_index()
+        self.cache = cache if cache is not None else tool_cache
+        self.channels = {}
+        self.published = 0
+        self.undeliverable = 0
+        self._workers = []
+
+    def add_channel(self, name, send, **options):
+        self.channels[name] = Channel(name, send, **options)
+        return self.channels[name]
+
+    async def start(self):
+        """Create the queues and workers; must be called from the event loop."""
+        for channel in self.channels.values():
+            channel.queue = asyncio.Queue(channel.max_pending)
+            self._workers += [asyncio.create_task(self._work(channel)) for _ in range(channel.workers)]
+        self._workers.append(asyncio.create_task(self._expire()))
+        return self
+
+    async def close(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def drain(self):
+        """Wait until every queued batch has been sent."""
+        for channel in self.channels.values():
+            await channel.queue.join()
+
+    async def publish(self, event):
+        """Queue an alert for everyone following its flight; returns (alert, sessions queued)."""
+        alert = make_alert(event)
+        self.index.record(alert)
+        self.cache.discard(STATUS_TOOL, kwargs={"flight_number": alert["flight_number"], "date": alert["date"]})
+        groups = {}
+        for recipient in self.index.recipients(alert["flight_number"], alert["date"]):
+            groups.setdefault(recipient.channel, []).append(recipient)
+
+        queued = 0
+        for name, recipients in groups.items():
+            channel = self.channels.get(name)
+            if channel is None:
+                self.undeliverable += len(recipients)
+                continue
+            size = channel.batch_size
+            for start in range(0, len(recipients), size):
+                # put() blocks while the channel is max_pending batches behind
+                started = time.perf_counter()
+                await channel.queue.put((alert, recipients[start:start + size]))
+                channel.blocked_s += time.perf_counter() - started
+                channel.max_depth = max(channel.max_depth, channel.queue.qsize())
+            queued += len(recipients)
+        self.published += 1
+        logger.info("Alert %s %s %s queued for %d sessions",
+                    alert["type"], alert["flight_number"], alert["date"], queued)
+        return alert, queued
+
+    async def _expire(self):
+        while True:
+            await asyncio.sleep(EXPIRE_INTERVAL)
+            cutoff = (datetime.now(timezone.utc).date() - timedelta(days=EXPIRE_AFTER_DAYS)).isoformat()
+            expired = self.index.expire(cutoff)
+            if expired:
+                logger.info("Stopped following %d flights dated before %s", expired, cutoff)
+
+    async def _work(self, channel):
+        while True:
+            alert, recipients = await channel.queue.get()
+            try:
+                await channel.send(alert, recipients)
+                channel.sent += len(recipients)
+            except Exception:
+                logger.exception("Channel %s failed to send %d alerts", channel.name, len(recipients))
+                channel.failed += len(recipients)
+            finally:
+                channel.batches += 1
+                channel.queue.task_done()
+
+    def stats(self):
+        return {
+            "published": self.published,
+            "undeliverable": self.undeliverable,
+            **self.index.stats(),
+            "channels": {name: channel.stats() for name, channel in self.channels.items()},
+        }
+
+
+class AlertStream:
+    """Async iterator over one session's alerts; a slow reader loses the oldest ones."""
+
+    def __init__(self, inbox, session_id, maxsize=LISTEN_QUEUE_SIZE):
+        self.inbox = inbox
+        self.session_id = session_id
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def put(self, alert):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(alert)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.inbox.stop_listening(self)
+
+
+class SessionInbox:
+    """The "session" channel: state['flight_alerts'] plus live listeners.
+
+    State is written with one state-delta event per session, in a worker
+    thread so the event loop keeps serving chat turns. Channel workers run
+    in parallel, so each session's read-modify-write of flight_alerts holds
+    one of STATE_LOCK_STRIPES locks. Sessions that have been deleted are
+    untracked from index. Without a session service only the live listeners
+    are notified.
+    """
+
+    def __init__(self, session_service=None, app_name=None, keep=MAX_SESSION_ALERTS, index=None):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.keep = keep
+        self.index = index if index is not None else get_alert_index()
+        self.listeners = {}
+        self._state_locks = [threading.Lock() for _ in range(STATE_LOCK_STRIPES)]
+
+    def listen(self, session_id):
+        stream = AlertStream(self, session_id)
+        self.listeners.setdefault(session_id, []).append(stream)
+        return stream
+
+    def stop_listening(self, stream):
+        streams = self.listeners.get(stream.session_id, [])
+        if stream in streams:
+            streams.remove(stream)
+        if not streams:
+            self.listeners.pop(stream.session_id, None)
+
+    async def __call__(self, alert, recipients):
+        listeners = self.listeners
+        for recipient in recipients:
+            for stream in listeners.get(recipient.session_id, ()):
+                stream.put(alert)
+        if self.session_service is not None:
+            await asyncio.to_thread(self.store, alert, recipients)
+
+    def store(self, alert, recipients):
+        for recipient in recipients:
+            with self._state_locks[hash(recipient.session_id) % STATE_LOCK_STRIPES]:
+                session = self.session_service.get_session(
+                    app_name=self.app_name, user_id=recipient.user_id, session_id=recipient.session_id
+                )
+                if session is None:
+                    self.index.untrack(recipient.session_id)
+                    continue
+                alerts = list(session.state.get("flight_alerts") or [])[-(self.keep - 1):] + [alert]
+                event = Event(
+                    invocation_id=f"alert-{alert['alert_id']}",
+                    author="system",
+                    actions=EventActions(state_delta={"flight_alerts": alerts}),
+                    timestamp=time.time(),
+                )
+                self.session_service.append_event(session, event)
+
+
+# ----- agent callback -----
+
+def watch_flights(tool, args, tool_context, tool_response):
+    """after_tool_callback: follow the flight a successful status check or booking was about."""
+    if not isinstance(tool_response, dict) or "error" in tool_response:
+        return None
+    if tool_response.get("status") == "Not booked":
+        return None
+    flight_number, date = args.get("flight_number"), args.get("date")
+    details = args.get("flight_details")
+    if isinstance(details, dict):
+        flight_number, date = details.get("flight_number"), details.get("departure_date")
+    if flight_number and date:
+        session = tool_context.session
+        get_alert_index().track(session.id, flight_number, date, user_id=session.user_id)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--flight", required=True)
+    parser.add_argument("--date", required=True)
+    parser.add_argument("--type", default="DELAY", choices=ALERT_TYPES)
+    parser.add_argument("--delay", type=int, help="delay in minutes")
+    parser.add_argument("--gate")
+    parser.add_argument("--message")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="chat server to post the event to")
+    args = parser.parse_args()
+
+    event = {"flight_number": args.flight, "date": args.date, "type": args.type,
+             "delay_minutes": args.delay, "gate": args.gate, "message": args.message}
+    request = Request(f"{args.url.rstrip('/')}/alerts", data=json.dumps(event).encode("utf-8"),
+                      headers={"Content-Type": "application/json"}, method="POST")
+    with urlopen(request) as response:
+        result = json.loads(response.read())
+    print(f"Alert {result['alert_id']} queued for {result['sessions']} sessions: {result['message']}")
+
+
+if __name__ == "__main__":
+    main()
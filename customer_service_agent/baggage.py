@@ -0,0 +1,406 @@
+# customer_service_agent/baggage.py
+"""Baggage scan event store behind track_baggage.
+
+Run with: python -m customer_service_agent.baggage --bags 1000 --out scans.log
+     or: python -m customer_service_agent.baggage --send scans.log --port 9100
+
+Bag scans (BSM check-in messages and BPM processing messages at each sort,
+load, transfer and claim point) arrive as one line per scan:
+
+    2026-03-05T14:30:12Z|AA123456|QX7K2P|SMITH|JFK|LOADED|AA123|LAX
+
+that is timestamp, tag number, booking reference, passenger last name,
+station, event, flight and destination. ScanStore keeps each tag's scans in
+time order, so its latest status is the last element of its list, and hash
+indexes on tag number and booking reference, so every lookup is O(1).
+Scans that arrive late are slotted into place without changing the latest
+status.
+
+Sessions watch a tag instead of polling: each scan that changes a bag's
+latest status pushes a delta (the fields that changed) to the tag's
+subscribers. Scans are ingested in batches from a file (replay_file) or a
+TCP feed (serve_feed, which the chat server starts when BAGGAGE_FEED_PORT
+is set). BAGGAGE_SCANS_PATH names a scan log to replay on first use.
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import logging
+import os
+import random
+import string
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from .schedule.generate import HUB_AIRPORTS
+
+logger = logging.getLogger(__name__)
+
+BAGGAGE_SCANS_ENV = "BAGGAGE_SCANS_PATH"
+BAGGAGE_FEED_PORT_ENV = "BAGGAGE_FEED_PORT"
+INGEST_BATCH = 10_000
+WATCH_QUEUE_SIZE = 256
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+Scan = namedtuple("Scan", "timestamp tag pnr last_name station event flight destination")
+
+# Scan event -> status shown to the customer
+EVENT_STATUS = {
+    "CHECKED_IN": "Checked In",
+    "SCREENED": "Screened",
+    "SORTED": "Sorted",
+    "LOADED": "In Transit",
+    "TRANSFER": "In Transfer",
+    "OFFLOADED": "Offloaded",
+    "ARRIVED": "Arrived",
+    "ON_BELT": "Ready for Claim",
+    "MISHANDLED": "Delayed",
+    "FORWARDED": "Forwarded",
+    "DELIVERED": "Delivered",
+    "CLAIMED": "Claimed",
+}
+FINAL_EVENTS = ("CLAIMED", "DELIVERED")
+DELTA_FIELDS = ("status", "current_location", "station", "event", "flight", "destination")
+
+
+def normalize_tag(reference):
+    """'aa 123456' -> 'AA123456'; also used for booking references."""
+    return "".join(str(reference).split()).upper()
+
+
+def normalize_name(name):
+    """' van der  berg' -> 'VAN DER BERG': surnames keep their inner spaces."""
+    return " ".join(str(name).split()).upper()
+
+
+def describe(scan):
+    """A scan as the status payload track_baggage returns."""
+    status = EVENT_STATUS.get(scan.event, scan.event.title())
+    when = scan.timestamp[11:16]
+    result = {
+        "tag_number": scan.tag,
+        "status": status,
+        "last_scan": f"{scan.station} Airport - {when}",
+        "last_scan_time": scan.timestamp,
+        "station": scan.station,
+        "event": scan.event,
+        "flight": scan.flight,
+        "destination": scan.destination,
+    }
+    if scan.event == "LOADED":
+        result["current_location"] = f"En route on {scan.flight}"
+    elif scan.event == "MISHANDLED":
+        result["current_location"] = f"Held at {scan.station}; will be forwarded to {scan.destination}"
+    else:
+        result["current_location"] = f"{scan.station} Airport"
+    return result
+
+
+class Subscription:
+    def __init__(self, store, tag, callback):
+        self.store = store
+        self.tag = tag
+        self.callback = callback
+
+    def close(self):
+        self.store.unsubscribe(self)
+
+
+class TagWatch:
+    """Async iterator over one tag's deltas, safe to feed from the ingest thread.
+
+    A consumer that falls WATCH_QUEUE_SIZE deltas behind loses the oldest
+    ones (counted in `dropped`); the latest status is always one lookup away.
+    """
+
+    def __init__(self, store, tag, maxsize=WATCH_QUEUE_SIZE):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.subscription = store.subscribe(tag, self._push)
+
+    def _push(self, delta):
+        self.loop.call_soon_threadsafe(self._put, delta)
+
+    def _put(self, delta):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(delta)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.subscription.close()
+
+
+class ScanStore:
+    """Per-tag, time-ordered scan history with tag and booking indexes."""
+
+    def __init__(self):
+        self.history = {}
+        self.by_pnr = {}
+        self.subscribers = {}
+        self.scans = 0
+        self.rejected = 0
+        self.late = 0
+        self._strings = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.history)
+
+    def _intern(self, value):
+        return self._strings.setdefault(value, value)
+
+    def parse(self, line):
+        """One scan line -> Scan, or None if it is malformed."""
+        fields = line.rstrip("\r\n").split("|")
+        if len(fields) != 8 or len(fields[0]) != 20 or fields[5] not in EVENT_STATUS:
+            return None
+        intern = self._intern
+        return Scan(fields[0], intern(fields[1]), intern(fields[2]), intern(normalize_name(fields[3])),
+                    intern(fields[4]), intern(fields[5]), intern(fields[6]), intern(fields[7]))
+
+    def ingest(self, lines):
+        """Parse and apply a batch of scan lines; returns how many were applied."""
+        scans = []
+        for line in lines:
+            scan = self.parse(line)
+            if scan is None:
+                if line.strip() and not line.startswith("#"):
+                    self.rejected += 1
+                continue
+            scans.append(scan)
+        self.apply(scans)
+        return len(scans)
+
+    def apply(self, scans):
+        """Add scans to the store, then push deltas to subscribers of changed tags."""
+        deltas = []
+        with self._lock:
+            history, subscribers = self.history, self.subscribers
+            for scan in scans:
+                tags = history.get(scan.tag)
+                if tags is None:
+                    history[scan.tag] = [scan]
+                    self.by_pnr.setdefault(scan.pnr, []).append(scan.tag)
+                    previous = None
+                elif scan.timestamp >= tags[-1].timestamp:
+                    previous = tags[-1]
+                    tags.append(scan)
+                else:
+                    # A late scan goes into its place in time; the latest status is unchanged
+                    bisect.insort(tags, scan, key=lambda s: s.timestamp)
+                    self.late += 1
+                    continue
+                if scan.tag in subscribers:
+                    deltas.append((scan, previous))
+            self.scans += len(scans)
+        for scan, previous in deltas:
+            self._notify(scan, previous)
+
+    def _notify(self, scan, previous):
+        current = describe(scan)
+        before = describe(previous) if previous is not None else {}
+        delta = {"tag_number": scan.tag, "timestamp": scan.timestamp}
+        delta.update({field: current[field] for field in DELTA_FIELDS if current[field] != before.get(field)})
+        delta["final"] = scan.event in FINAL_EVENTS
+        for subscription in list(self.subscribers.get(scan.tag, ())):
+            try:
+                subscription.callback(delta)
+            except Exception:
+                logger.exception("Baggage subscriber for %s failed", scan.tag)
+
+    def subscribe(self, tag, callback):
+        subscription = Subscription(self, normalize_tag(tag), callback)
+        with self._lock:
+            self.subscribers.setdefault(subscription.tag, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self.subscribers.get(subscription.tag, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            if not subscriptions:
+                self.subscribers.pop(subscription.tag, None)
+
+    def watch(self, tag, maxsize=WATCH_QUEUE_SIZE):
+        """Async iterator of deltas for tag; must be called from the event loop."""
+        return TagWatch(self, tag, maxsize)
+
+    def latest(self, tag):
+        scans = self.history.get(normalize_tag(tag))
+        return scans[-1] if scans else None
+
+    def scans_for(self, tag):
+        return list(self.history.get(normalize_tag(tag), ()))
+
+    def tags_for_booking(self, pnr):
+        return list(self.by_pnr.get(normalize_tag(pnr), ()))
+
+    def stats(self):
+        return {
+            "tags": len(self.history),
+            "scans": self.scans,
+            "late_scans": self.late,
+            "rejected": self.rejected,
+            "watched_tags": len(self.subscribers),
+        }
+
+
+def replay_file(store, path, batch=INGEST_BATCH):
+    """Stream a scan log into the store in batches; returns the scans applied."""
+    applied = 0
+    with open(path, encoding="utf-8") as lines:
+        while chunk := list(itertools.islice(lines, batch)):
+            applied += store.ingest(chunk)
+    return applied
+
+
+async def serve_feed(store, host="127.0.0.1", port=9100):
+    """Accept scan lines over TCP; each read is ingested as one batch in a worker thread."""
+
+    async def handle(reader, writer):
+        pending = b""
+        try:
+            while data := await reader.read(1 << 16):
+                pending += data
+                lines, _, pending = pending.rpartition(b"\n")
+                if lines:
+                    # Parsing runs off the event loop so chat sessions stay responsive
+                    await asyncio.to_thread(store.ingest, lines.decode("utf-8").split("\n"))
+            if pending:
+                await asyncio.to_thread(store.ingest, [pending.decode("utf-8")])
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_scan_store():
+    """The process-wide ScanStore, replaying BAGGAGE_SCANS_PATH on first use if set."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            store = ScanStore()
+            path = os.getenv(BAGGAGE_SCANS_ENV)
+            if path and os.path.exists(path):
+                count = replay_file(store, path)
+                logger.info("Replayed %d baggage scans from %s", count, path)
+            _store = store
+    return _store
+
+
+# ----- synthetic scans -----
+
+def synthetic_scans(bags, seed=11, start=datetime(2026, 3, 5, 5, 0, tzinfo=timezone.utc),
+                    hours=18, late_fraction=0.01, mishandled_fraction=0.02):
+    """Scan lines for `bags` bags in the order a hub feed receives them.
+
+    Most scans arrive as they happen; late_fraction of them are held up in
+    the feed for up to two hours, arriving after later scans of the same bag.
+    """
+    rng = random.Random(seed)
+    airports = [code for code, *_ in HUB_AIRPORTS]
+    carriers = ["AA", "UA", "DL", "BA", "LH", "AF"]
+    names = ["SMITH", "JOHNSON", "GARCIA", "MILLER", "DAVIS", "MARTIN", "LEE", "WALKER", "HALL", "YOUNG"]
+    events = []
+    for i in range(bags):
+        carrier = rng.choice(carriers)
+        tag = f"{carrier}{i:06d}"
+        pnr = "".join(rng.choices(string.ascii_uppercase + string.digits, k=6))
+        name = rng.choice(names)
+        origin, hub, destination = rng.sample(airports, 3)
+        first, second = f"{carrier}{rng.randrange(1, 3000)}", f"{carrier}{rng.randrange(1, 3000)}"
+        t = start + timedelta(seconds=rng.randrange(hours * 3600))
+        steps = [(origin, "CHECKED_IN", first, destination), (origin, "SCREENED", first, destination),
+                 (origin, "LOADED", first, destination)]
+        if rng.random() < 0.5:
+            steps.append((hub, "TRANSFER", second, destination))
+            if rng.random() < mishandled_fraction * 2:
+                steps += [(hub, "MISHANDLED", second, destination), (destination, "DELIVERED", "", destination)]
+            else:
+                steps += [(hub, "LOADED", second, destination), (destination, "ARRIVED", second, destination),
+                          (destination, "ON_BELT", second, destination), (destination, "CLAIMED", "", destination)]
+        else:
+            steps += [(destination, "ARRIVED", first, destination), (destination, "ON_BELT", first, destination),
+                      (destination, "CLAIMED", "", destination)]
+        for station, event, flight, dest in steps:
+            t += timedelta(seconds=rng.randrange(60, 5400))
+            held = timedelta(seconds=rng.randrange(7200)) if rng.random() < late_fraction else timedelta(0)
+            line = f"{t.strftime(TIMESTAMP_FORMAT)}|{tag}|{pnr}|{name}|{station}|{event}|{flight}|{dest}"
+            events.append((t + held, line))
+    events.sort(key=lambda event: event[0])
+    return [line for _, line in events]
+
+
+# ----- tool function -----
+
+def track_baggage(reference_number, last_name, store=None):
+    """track_baggage tool: latest status for a tag number, or every bag on a booking."""
+    store = store or get_scan_store()
+    reference = normalize_tag(reference_number)
+    name = normalize_name(last_name)
+    latest = store.latest(reference)
+    if latest is not None:
+        if latest.last_name != name:
+            return {"error": f"Bag {reference} is not checked in under {last_name}"}
+        return describe(latest)
+    bags = [store.latest(tag) for tag in store.tags_for_booking(reference)]
+    bags = [bag for bag in bags if bag.last_name == name]
+    if not bags:
+        return {"error": f"No bags found for {reference_number} under {last_name}"}
+    return {"booking_reference": reference, "bags": [describe(bag) for bag in bags]}
+
+
+async def send_scans(path, host, port, rate=None):
+    """Stream a scan log to a serve_feed listener, optionally paced to `rate` scans/sec."""
+    _, writer = await asyncio.open_connection(host, port)
+    sent = 0
+    with open(path, encoding="utf-8") as lines:
+        while chunk := list(itertools.islice(lines, 1000)):
+            writer.write("".join(chunk).encode("utf-8"))
+            await writer.drain()
+            sent += len(chunk)
+            if rate:
+                await asyncio.sleep(len(chunk) / rate)
+    writer.close()
+    await writer.wait_closed()
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bags", type=int, default=1000, help="synthetic bags to write with --out")
+    parser.add_argument("--out", help="write a synthetic scan log here")
+    parser.add_argument("--send", help="stream this scan log to a running feed")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100, help="feed port (BAGGAGE_FEED_PORT on the server)")
+    parser.add_argument("--rate", type=float, help="scans per second when sending (default: as fast as possible)")
+    args = parser.parse_args()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as out:
+            out.writelines(line + "\n" for line in synthetic_scans(args.bags))
+        print(f"Wrote scans for {args.bags:,} bags to {args.out}")
+    if args.send:
+        sent = asyncio.run(send_scans(args.send, args.host, args.port, args.rate))
+        print(f"Sent {sent:,} scans to {args.host}:{args.port}")
+
+
+if __name__ == "__main__":
+    main()
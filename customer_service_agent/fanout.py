@@ -0,0 +1,333 @@
+# customer_service_agent/fanout.py
+"""Concurrent execution of independent read-only tool calls within one turn.
+
+A message like "my flight to Paris is delayed, will I make my connection and
+what does my status get me?" needs lookups that normally sit behind three
+different specialists, visited one after another. The orchestrator can
+instead hand them all to `parallel_lookup` in one call. The calls are split
+into waves: a call whose arguments reference another call's result ("$0"
+or "$0.gate" means call 0's result or its "gate" field) runs in a later
+wave than the call it references, and everything else in a wave runs
+concurrently under a per-turn concurrency limit and deadline.
+
+Each call's result goes through the after_tool_callbacks of the specialist
+that owns the tool (watch_flights, record_connection_risk...) with the
+orchestrator's ToolContext, as if that specialist had made the call.
+
+Each turn is traced: the summed duration of the calls (what sequential
+execution would have taken) against the wall-clock time the fan-out took.
+Set FANOUT_MODE=sequential to run the same plan one call at a time.
+"""
+import asyncio
+import inspect
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from .registry import LazyTools
+
+logger = logging.getLogger(__name__)
+
+# Only lookups: anything that books, pays or files a claim stays with its specialist.
+# Tools are imported from their sub-agent module on first use (see registry.py).
+FANOUT_TOOLS = LazyTools({
+    "check_flight_status": ".sub_agents.flight_operations_agent.agent:check_flight_status_tool",
+    "search_flights": ".sub_agents.flight_operations_agent.agent:search_flights_tool",
+    "check_connection_risk": ".sub_agents.flight_operations_agent.agent:check_connection_risk_tool",
+    "check_weather": ".sub_agents.flight_operations_agent.agent:check_weather_tool",
+    "get_airport_info": ".sub_agents.flight_operations_agent.agent:get_airport_info_tool",
+    "search_airports": ".sub_agents.flight_operations_agent.agent:search_airports_tool",
+    "track_baggage": ".sub_agents.baggage_services_agent.agent:track_baggage_tool",
+    "check_baggage_policy": ".sub_agents.baggage_services_agent.agent:check_baggage_policy_tool",
+    "check_travel_advisory": ".sub_agents.emergency_response_agent.agent:check_travel_advisory_tool",
+    "check_weather_disruptions": ".sub_agents.emergency_response_agent.agent:check_weather_disruptions_tool",
+    "check_miles_balance": ".sub_agents.loyalty_program_agent.agent:check_miles_balance_tool",
+    "check_status_benefits": ".sub_agents.loyalty_program_agent.agent:check_status_benefits_tool",
+    "check_visa_requirements": ".sub_agents.language_cultural_agent.agent:check_visa_requirements_tool",
+    "provide_cultural_guidance": ".sub_agents.language_cultural_agent.agent:provide_cultural_guidance_tool",
+    "calculate_time_zones": ".sub_agents.language_cultural_agent.agent:calculate_time_zones_tool",
+})
+MAX_CONCURRENCY = 4
+TURN_TIMEOUT = 10.0
+MAX_CALLS = 12
+FANOUT_MODE_ENV = "FANOUT_MODE"
+REFERENCE = re.compile(r"^\$(\d+)(?:\.([\w.]+))?$")
+TRACE_WINDOW = 1000
+
+
+@dataclass
+class CallTrace:
+    index: int
+    tool: str
+    wave: int
+    status: str = "pending"
+    started_ms: float = 0.0
+    elapsed_ms: float = 0.0
+
+
+@dataclass
+class FanoutTrace:
+    mode: str
+    waves: int
+    wall_ms: float = 0.0
+    calls: list = field(default_factory=list)
+
+    @property
+    def sequential_ms(self):
+        """What running the calls back to back would have taken."""
+        return sum(call.elapsed_ms for call in self.calls)
+
+    @property
+    def saved_ms(self):
+        return max(0.0, self.sequential_ms - self.wall_ms)
+
+    def headline(self):
+        return (f"{len(self.calls)} calls in {self.waves} waves, {self.wall_ms:.0f} ms wall vs "
+                f"{self.sequential_ms:.0f} ms sequential (saved {self.saved_ms:.0f} ms)")
+
+    def summary(self):
+        return {
+            "mode": self.mode,
+            "calls": len(self.calls),
+            "waves": self.waves,
+            "wall_ms": round(self.wall_ms, 1),
+            "sequential_ms": round(self.sequential_ms, 1),
+            "saved_ms": round(self.saved_ms, 1),
+            "spans": [
+                {
+                    "tool": call.tool, "wave": call.wave, "status": call.status,
+                    "start_ms": round(call.started_ms, 1), "elapsed_ms": round(call.elapsed_ms, 1),
+                }
+                for call in self.calls
+            ],
+        }
+
+
+def references(value):
+    """Indexes of the calls referenced anywhere inside an argument value."""
+    if isinstance(value, str):
+        match = REFERENCE.match(value)
+        return {int(match.group(1))} if match else set()
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, (list, tuple)):
+        return set()
+    found = set()
+    for item in value:
+        found |= references(item)
+    return found
+
+
+def resolve(value, results):
+    """Replace "$n" / "$n.path" references with values from earlier results."""
+    if isinstance(value, str):
+        match = REFERENCE.match(value)
+        if not match:
+            return value
+        resolved = results[int(match.group(1))]
+        path = match.group(2).split(".") if match.group(2) else ()
+        for key in path:
+            resolved = resolved[int(key)] if isinstance(resolved, list) else resolved[key]
+        return resolved
+    if isinstance(value, dict):
+        return {key: resolve(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve(item, results) for item in value]
+    return value
+
+
+def plan_waves(calls):
+    """Wave number per call, or None for calls in or behind a reference cycle.
+
+    A call's wave is one more than the latest wave it references; calls
+    without references form wave 0 and all run together.
+    """
+    depends = [references(call.get("args") or {}) for call in calls]
+    waves = [None] * len(calls)
+    state = [0] * len(calls)  # 0 new, 1 visiting, 2 done
+
+    def visit(i):
+        if state[i] == 1:
+            return None
+        if state[i] == 0:
+            state[i] = 1
+            levels = [visit(j) if 0 <= j < len(calls) and j != i else None for j in depends[i]]
+            waves[i] = None if None in levels else 1 + max(levels, default=-1)
+            state[i] = 2
+        return waves[i]
+
+    for i in range(len(calls)):
+        visit(i)
+    return waves, depends
+
+
+class FanoutStats:
+    """Recent traces and running totals, reported under `fanout` in /metrics."""
+
+    def __init__(self, window=TRACE_WINDOW):
+        self.recent = deque(maxlen=window)
+        self.totals = {"turns": 0, "calls": 0, "wall_ms": 0.0, "sequential_ms": 0.0, "saved_ms": 0.0,
+                       "timeouts": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def record(self, trace):
+        with self._lock:
+            self.recent.append(trace)
+            self.totals["turns"] += 1
+            self.totals["calls"] += len(trace.calls)
+            self.totals["wall_ms"] += trace.wall_ms
+            self.totals["sequential_ms"] += trace.sequential_ms
+            self.totals["saved_ms"] += trace.saved_ms
+            self.totals["timeouts"] += sum(call.status == "timeout" for call in trace.calls)
+            self.totals["errors"] += sum(call.status == "error" for call in trace.calls)
+
+    def stats(self):
+        with self._lock:
+            totals = dict(self.totals)
+        totals["speedup"] = totals["sequential_ms"] / totals["wall_ms"] if totals["wall_ms"] else 1.0
+        return totals
+
+
+fanout_stats = FanoutStats()
+
+
+class FanoutRunner:
+    """Runs a batch of tool calls wave by wave, concurrently within a wave."""
+
+    def __init__(self, tools=None, max_concurrency=MAX_CONCURRENCY, timeout=TURN_TIMEOUT,
+                 mode=None, stats=None, tool_context=None):
+        self.tools = FANOUT_TOOLS if tools is None else tools
+        self.tool_context = tool_context
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.mode = mode or os.getenv(FANOUT_MODE_ENV, "parallel")
+        self.stats = fanout_stats if stats is None else stats
+
+    async def _invoke(self, function, args):
+        if inspect.iscoroutinefunction(function):
+            return await function(**args)
+        # Synchronous backends run in worker threads so they overlap too
+        return await asyncio.to_thread(function, **args)
+
+    async def _after_tool(self, name, args, result):
+        """Run the owning agent's after_tool_callbacks; the first one returning a dict replaces result."""
+        lookup = getattr(self.tools, "after_tool_callbacks", None)
+        if self.tool_context is None or lookup is None:
+            return result
+        for callback in lookup(name):
+            try:
+                replaced = callback(tool=self.tools[name], args=args, tool_context=self.tool_context,
+                                    tool_response=result)
+                if inspect.isawaitable(replaced):
+                    replaced = await replaced
+            except Exception:
+                logger.exception("after_tool_callback %s failed for %s", getattr(callback, "__name__", callback), name)
+                continue
+            if replaced is not None:
+                return replaced
+        return result
+
+    async def _run_call(self, call, trace, args, semaphore, deadline, started):
+        async with semaphore:
+            trace.started_ms = (time.perf_counter() - started) * 1000
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                result = await asyncio.wait_for(self._invoke(self.tools[call["tool"]].function, args), remaining)
+                trace.status = "ok"
+                result = await self._after_tool(call["tool"], args, result)
+            except asyncio.TimeoutError:
+                result, trace.status = {"error": f"{call['tool']} timed out"}, "timeout"
+            except Exception as exc:
+                logger.warning("Fan-out call %s failed: %s", call["tool"], exc)
+                result, trace.status = {"error": f"{call['tool']} failed: {exc}"}, "error"
+            trace.elapsed_ms = (time.perf_counter() - started) * 1000 - trace.started_ms
+            return result
+
+    async def run(self, calls):
+        """Results in call order plus the turn's FanoutTrace."""
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        waves, depends = plan_waves(calls)
+        concurrency = 1 if self.mode == "sequential" else self.max_concurrency
+        semaphore = asyncio.Semaphore(concurrency)
+        trace = FanoutTrace(self.mode, 1 + max((w for w in waves if w is not None), default=-1))
+        results = [None] * len(calls)
+        failed = set()
+
+        for i, call in enumerate(calls):
+            if call.get("tool") not in self.tools:
+                results[i] = {"error": f"{call.get('tool')} cannot be run in parallel_lookup"}
+                failed.add(i)
+            elif waves[i] is None:
+                results[i] = {"error": "Call references form a cycle"}
+                failed.add(i)
+
+        for wave in range(trace.waves):
+            pending, seen = [], {}
+            for i, call in enumerate(calls):
+                if waves[i] != wave or i in failed:
+                    continue
+                if depends[i] & failed:
+                    results[i] = {"error": f"Skipped: call {min(depends[i] & failed)} failed"}
+                    failed.add(i)
+                    continue
+                try:
+                    args = resolve(call.get("args") or {}, results)
+                except (KeyError, IndexError, TypeError, ValueError):
+                    results[i] = {"error": "Referenced field missing from an earlier result"}
+                    failed.add(i)
+                    continue
+                # Identical calls in one wave run once
+                key = (call["tool"], json.dumps(args, sort_keys=True, default=str))
+                if key in seen:
+                    pending.append((i, seen[key]))
+                    continue
+                call_trace = CallTrace(i, call["tool"], wave)
+                trace.calls.append(call_trace)
+                seen[key] = asyncio.ensure_future(
+                    self._run_call(call, call_trace, args, semaphore, deadline, started)
+                )
+                pending.append((i, seen[key]))
+            outcomes = await asyncio.gather(*(task for _, task in pending))
+            for (i, _), result in zip(pending, outcomes):
+                results[i] = result
+                if isinstance(result, dict) and "error" in result:
+                    failed.add(i)
+
+        trace.wall_ms = (time.perf_counter() - started) * 1000
+        self.stats.record(trace)
+        logger.info("parallel_lookup: %s", trace.headline())
+        logger.debug("parallel_lookup trace: %s", trace.summary())
+        return results, trace
+
+
+async def parallel_lookup(calls, tool_context=None):
+    """parallel_lookup tool: run independent read-only lookups concurrently.
+
+    The full trace stays in fanout_stats and the log; the model only gets a
+    one-line timing summary.
+    """
+    if not isinstance(calls, (list, tuple)):
+        return {"error": "calls must be a list of {tool, args} objects", "results": []}
+    calls = list(calls)
+    if not calls:
+        return {"error": "No calls given", "results": []}
+    if len(calls) > MAX_CALLS:
+        return {"error": f"At most {MAX_CALLS} calls per lookup", "results": []}
+    for i, call in enumerate(calls):
+        if not isinstance(call, dict) or not isinstance(call.get("tool"), str):
+            return {"error": f"Call {i} must be an object with a tool name", "results": []}
+        if not isinstance(call.get("args") or {}, dict):
+            return {"error": f"Call {i}: args must be an object", "results": []}
+    results, trace = await FanoutRunner(tool_context=tool_context).run(calls)
+    return {
+        "results": [{"tool": call["tool"], "result": result} for call, result in zip(calls, results)],
+        "timing": trace.headline(),
+    }
@@ -0,0 +1,352 @@
+# customer_service_agent/fares/engine.py
+"""Fare-rule engine for refunds and change fees.
+
+Rules are ATPCO-style records (loosely categories 16, 31 and 33: penalties,
+voluntary changes, voluntary refunds) in a CSV table, one row per sequence:
+a carrier ("*" for any), a fare basis pattern ("M*", "Q*BE"), a market
+("JFK-LAX", an IATA area pair such as "1-2", or "*") and the fees that apply.
+As in ATPCO, the first matching sequence wins, with carrier-specific rules
+tried before generic ones.
+
+Loading compiles the table into a decision table: the fee columns become
+NumPy arrays, and candidate rule lists are indexed by (carrier, first letter
+of the fare basis), so resolving a fare touches only the few rules that can
+match it. Resolutions are memoized per (carrier, fare basis, market), so a
+repeated quote is a dict hit plus arithmetic, and `quote_batch` prices
+thousands of itineraries in one vectorized pass.
+
+IATA areas for area markets come from the airport reference data
+(customer_service_agent/airports) by country and continent, so any airport
+in it can be quoted; an unknown code is an error rather than a fall-through
+to the generic rules.
+
+FARE_RULES_PATH overrides the bundled fare_rules.csv.
+"""
+import csv
+import fnmatch
+import os
+import re
+from datetime import date, datetime
+
+import numpy as np
+
+from ..airports.store import get_airport_store
+from ..tool_cache import normalize_date
+
+FARE_RULES_ENV = "FARE_RULES_PATH"
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "fare_rules.csv")
+RESIDUALS = ("refund", "credit", "forfeit")
+# Waiver codes issued for disruptions; they lift fees on waivable rules
+DISRUPTION_WAIVERS = {"IROP", "WX", "SCHED", "STRIKE", "ATC"}
+
+FEE_COLUMNS = ("cancel_fee", "cancel_pct", "change_fee", "change_pct", "late_change_fee", "late_hours",
+               "no_show_fee")
+FLAG_COLUMNS = ("refundable", "changeable", "waivable")
+# Middle East countries the reference data files under Asia; IATA puts them in area 2
+MIDDLE_EAST = {"AE", "BH", "IL", "IQ", "IR", "JO", "KW", "LB", "OM", "QA", "SA", "SY", "YE"}
+AMOUNT = re.compile(r"^(?:US)?\$?\s*([0-9][0-9,]*(?:\.[0-9]+)?)\s*(?:USD)?$", re.IGNORECASE)
+
+
+def iata_area(country, continent, longitude):
+    """IATA traffic conference area: 1 Americas, 2 Europe/Africa/Middle East, 3 Asia/Pacific."""
+    if continent in ("NA", "SA") or country == "US":  # Hawaii is filed under Oceania
+        return "1"
+    if country == "RU":
+        return "2" if longitude < 60 else "3"
+    if continent in ("EU", "AF") or country in MIDDLE_EAST:
+        return "2"
+    if continent in ("AS", "OC"):
+        return "3"
+    if longitude < -30:
+        return "1"
+    return "2" if longitude < 60 else "3"
+
+
+def airport_area(code):
+    """IATA area of an airport in the reference data, or None for an unknown code."""
+    store = get_airport_store()
+    record = store.find(code)
+    if record is None:
+        return None
+    row = store.records[record]
+    return iata_area(row["country"].decode(), row["continent"].decode(), float(row["longitude"]))
+
+
+def parse_amount(value):
+    """A money amount such as 450, "450.00" or "$1,250" as a float, or None if it is not one."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        amount = float(value)
+    else:
+        match = AMOUNT.match(str(value).strip())
+        if match is None:
+            return None
+        amount = float(match.group(1).replace(",", ""))
+    return amount if np.isfinite(amount) and amount >= 0 else None
+
+
+def load_rules(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+class FareRuleEngine:
+    """Compiled fare rules with memoized resolution and batch quoting."""
+
+    def __init__(self, rows, airport_areas=None):
+        # Carrier-specific sequences first, then by sequence number
+        rows = sorted(rows, key=lambda r: (r["carrier"] == "*", int(r["seq"])))
+        self.seq = np.array([int(r["seq"]) for r in rows], dtype=np.int32)
+        self.carrier = [r["carrier"].upper() for r in rows]
+        self.pattern = [r["fare_basis"].upper() for r in rows]
+        self.market = [r["market"].upper() for r in rows]
+        self.notes = [r.get("notes", "") for r in rows]
+        self._regex = [re.compile(fnmatch.translate(p)) for p in self.pattern]
+        for name in FEE_COLUMNS:
+            setattr(self, name, np.array([float(r[name]) for r in rows], dtype=np.float64))
+        for name in FLAG_COLUMNS:
+            setattr(self, name, np.array([r[name].upper() == "Y" for r in rows], dtype=bool))
+        self.residual = np.array([RESIDUALS.index(r["residual"]) for r in rows], dtype=np.int8)
+        # Airport -> IATA area (None if unknown), filled from the reference data on first use
+        self.airport_areas = dict(airport_areas or {})
+        self._candidates = {}
+        self._resolved = {}
+
+    @classmethod
+    def from_csv(cls, path):
+        return cls(load_rules(path))
+
+    def __len__(self):
+        return len(self.seq)
+
+    def area(self, airport):
+        """IATA area of an airport code, or None if the reference data does not know it."""
+        try:
+            return self.airport_areas[airport]
+        except KeyError:
+            area = self.airport_areas[airport] = airport_area(airport)
+            return area
+
+    def _candidate_rules(self, carrier, letter):
+        """Rule ids that can match fares of this carrier starting with letter, in precedence order."""
+        key = (carrier, letter)
+        candidates = self._candidates.get(key)
+        if candidates is None:
+            candidates = self._candidates[key] = tuple(
+                i for i, (rule_carrier, pattern) in enumerate(zip(self.carrier, self.pattern))
+                if rule_carrier in ("*", carrier) and (pattern[0] in "*?[" or pattern[0] == letter)
+            )
+        return candidates
+
+    def resolve(self, carrier, fare_basis, origin, destination):
+        """Index of the governing rule, or None if nothing matches."""
+        carrier, fare_basis = carrier.upper(), fare_basis.upper()
+        origin, destination = origin.upper(), destination.upper()
+        key = (carrier, fare_basis, origin, destination)
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+        markets = {f"{origin}-{destination}", "*"}
+        areas = self.area(origin), self.area(destination)
+        if None not in areas:
+            markets.add("-".join(areas))
+        found = None
+        for i in self._candidate_rules(carrier, fare_basis[:1]):
+            if self.market[i] in markets and self._regex[i].match(fare_basis):
+                found = i
+                break
+        self._resolved[key] = found
+        return found
+
+    def resolve_many(self, carriers, fare_bases, origins, destinations):
+        """Rule index per ticket (-1 where no rule matches); repeats hit the memo."""
+        resolve = self.resolve
+        return np.array(
+            [-1 if (rule := resolve(c, f, o, d)) is None else rule
+             for c, f, o, d in zip(carriers, fare_bases, origins, destinations)],
+            dtype=np.int64,
+        )
+
+    def describe(self, rule):
+        return {
+            "rule": int(self.seq[rule]),
+            "fare_basis_rule": self.pattern[rule],
+            "refundable": bool(self.refundable[rule]),
+            "changeable": bool(self.changeable[rule]),
+            "cancel_fee": float(self.cancel_fee[rule]),
+            "change_fee": float(self.change_fee[rule]),
+            "late_change_fee": float(self.late_change_fee[rule]),
+            "late_change_window_hours": float(self.late_hours[rule]),
+            "no_show_fee": float(self.no_show_fee[rule]),
+            "unused_value": RESIDUALS[self.residual[rule]],
+            "waivable": bool(self.waivable[rule]),
+            "notes": self.notes[rule],
+        }
+
+    def quote_batch(self, rules, fare_paid, taxes=0.0, new_fare=None, hours_to_departure=np.inf,
+                    waived=False):
+        """Refund and change quotes for many tickets at once.
+
+        rules are resolved rule indexes (from `resolve_many`; -1 rows come
+        back as NaN), the other arguments arrays or scalars broadcast against
+        them; hours_to_departure is negative after departure (a no-show).
+        Returns a dict of arrays.
+        """
+        rules = np.asarray(rules, dtype=np.int64)
+        found = rules >= 0
+        rules = np.where(found, rules, 0)
+        fare = np.broadcast_to(np.asarray(fare_paid, dtype=np.float64), rules.shape)
+        taxes = np.broadcast_to(np.asarray(taxes, dtype=np.float64), rules.shape)
+        new_fare = fare if new_fare is None else np.broadcast_to(np.asarray(new_fare, dtype=np.float64), rules.shape)
+        hours = np.broadcast_to(np.asarray(hours_to_departure, dtype=np.float64), rules.shape)
+        waived = np.broadcast_to(np.asarray(waived, dtype=bool), rules.shape) & self.waivable[rules]
+
+        no_show = hours < 0
+        late = ~no_show & (hours < self.late_hours[rules])
+        refundable = self.refundable[rules] | waived
+        residual = np.where(waived, 0, self.residual[rules])
+
+        cancel_penalty = np.where(
+            no_show, self.no_show_fee[rules], self.cancel_fee[rules] + self.cancel_pct[rules] * fare
+        )
+        cancel_penalty = np.where(waived, 0.0, np.minimum(cancel_penalty, fare))
+        unused = fare - cancel_penalty
+        refund = np.where(refundable, unused, 0.0) + taxes
+        credit = np.where(~refundable & (residual == 1), unused, 0.0)
+
+        change_penalty = np.select(
+            [no_show, late],
+            [self.no_show_fee[rules], self.late_change_fee[rules]],
+            self.change_fee[rules],
+        ) + self.change_pct[rules] * fare
+        change_penalty = np.where(waived, 0.0, change_penalty)
+        changeable = self.changeable[rules] | waived
+        difference = np.maximum(new_fare - fare, 0.0)
+        downgrade = np.maximum(fare - new_fare, 0.0)
+        quotes = {
+            "refund_amount": refund,
+            "cancel_penalty": cancel_penalty,
+            "travel_credit": credit,
+            "changeable": changeable,
+            "change_fee": np.where(changeable, change_penalty, np.nan),
+            "fare_difference": difference,
+            "amount_due": np.where(changeable, change_penalty + difference, np.nan),
+            "residual_refund": np.where(changeable & (residual == 0), downgrade, 0.0),
+            "residual_credit": np.where(changeable & (residual == 1), downgrade, 0.0),
+            "waived": waived,
+        }
+        if not found.all():
+            for name, values in quotes.items():
+                if values.dtype == np.float64:
+                    quotes[name] = np.where(found, values, np.nan)
+                else:
+                    quotes[name] = values & found
+        return quotes
+
+    def quote(self, rule, fare_paid, taxes=0.0, new_fare=None, hours_to_departure=np.inf, waived=False):
+        """Single-ticket quote as plain floats; same rules as quote_batch."""
+        batch = self.quote_batch([rule], fare_paid, taxes, new_fare, hours_to_departure, waived)
+        return {name: (bool(values[0]) if values.dtype == bool else float(values[0]))
+                for name, values in batch.items()}
+
+
+_engine = None
+
+
+def get_engine():
+    """The process-wide FareRuleEngine, compiled on first use."""
+    global _engine
+    if _engine is None:
+        _engine = FareRuleEngine.from_csv(os.getenv(FARE_RULES_ENV, DEFAULT_RULES_PATH))
+    return _engine
+
+
+def hours_until(departure_date, now=None):
+    """Hours from now to local midnight starting departure_date (inf if not given)."""
+    if not departure_date:
+        return np.inf
+    departure = datetime.combine(date.fromisoformat(normalize_date(departure_date)), datetime.min.time())
+    return (departure - (now or datetime.now())).total_seconds() / 3600
+
+
+def _governing_rule(engine, fare_basis, origin, destination, carrier):
+    origin, destination = str(origin).strip().upper(), str(destination).strip().upper()
+    for code in (origin, destination):
+        if engine.area(code) is None:
+            return None, {"error": f"Unknown airport code: {code}"}
+    rule = engine.resolve(carrier or "*", fare_basis, origin, destination)
+    if rule is None:
+        return None, {"error": f"No fare rule found for {fare_basis} {origin}-{destination}"}
+    return rule, None
+
+
+def money(value):
+    return round(float(value), 2)
+
+
+# ----- tool functions -----
+
+def check_fare_rules(fare_basis, origin, destination, carrier=None):
+    """check_fare_rules tool: the governing rule's refund and change conditions."""
+    engine = get_engine()
+    rule, error = _governing_rule(engine, fare_basis, origin, destination, carrier)
+    return error or engine.describe(rule)
+
+
+def calculate_refund(fare_basis, origin, destination, fare_paid, taxes_paid=0.0, departure_date=None,
+                     carrier=None, waiver_code=None):
+    """calculate_refund tool: refund, penalty and travel credit for cancelling a ticket."""
+    engine = get_engine()
+    rule, error = _governing_rule(engine, fare_basis, origin, destination, carrier)
+    if error:
+        return error
+    try:
+        hours = hours_until(departure_date)
+    except ValueError:
+        return {"error": "departure_date must be YYYY-MM-DD"}
+    fare, taxes = parse_amount(fare_paid), parse_amount(taxes_paid or 0)
+    if fare is None or taxes is None:
+        return {"error": "fare_paid and taxes_paid must be amounts such as 450 or $450.00"}
+    waived = (waiver_code or "").upper() in DISRUPTION_WAIVERS
+    quote = engine.quote(rule, fare, taxes, hours_to_departure=hours, waived=waived)
+    return {
+        "refund_amount": money(quote["refund_amount"]),
+        "cancellation_penalty": money(quote["cancel_penalty"]),
+        "travel_credit": money(quote["travel_credit"]),
+        "taxes_refunded": money(taxes),
+        "waiver_applied": quote["waived"],
+        "rule": int(engine.seq[rule]),
+        "notes": engine.notes[rule],
+    }
+
+
+def calculate_change_fee(fare_basis, origin, destination, fare_paid, new_fare=None, departure_date=None,
+                         carrier=None, waiver_code=None):
+    """calculate_change_fee tool: change penalty, fare difference and residual value."""
+    engine = get_engine()
+    rule, error = _governing_rule(engine, fare_basis, origin, destination, carrier)
+    if error:
+        return error
+    try:
+        hours = hours_until(departure_date)
+    except ValueError:
+        return {"error": "departure_date must be YYYY-MM-DD"}
+    fare = parse_amount(fare_paid)
+    new = fare if new_fare is None else parse_amount(new_fare)
+    if fare is None or new is None:
+        return {"error": "fare_paid and new_fare must be amounts such as 450 or $450.00"}
+    waived = (waiver_code or "").upper() in DISRUPTION_WAIVERS
+    quote = engine.quote(rule, fare, new_fare=new, hours_to_departure=hours, waived=waived)
+    if not quote["changeable"]:
+        return {"changeable": False, "rule": int(engine.seq[rule]), "notes": engine.notes[rule]}
+    return {
+        "changeable": True,
+        "change_fee": money(quote["change_fee"]),
+        "fare_difference": money(quote["fare_difference"]),
+        "total_due": money(quote["amount_due"]),
+        "residual_refund": money(quote["residual_refund"]),
+        "residual_credit": money(quote["residual_credit"]),
+        "waiver_applied": quote["waived"],
+        "rule": int(engine.seq[rule]),
+        "notes": engine.notes[rule],
+    }
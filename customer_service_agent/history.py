@@ -0,0 +1,195 @@
+# customer_service_agent/history.py
+"""Bounded conversation history and budgeted instruction rendering.
+
+state['interaction_history'] keeps only the last `max_turns` entries verbatim;
+older entries are folded into a short rolling summary in
+state['history_summary']. When an agent instruction is rendered, the history
+and booking sections are filled newest-first until the session's prompt token
+budget is reached, so prompt size stays flat as a conversation grows. Each
+render is recorded in `prompt_sizes` and logged for measurement.
+
+Templates keep their static text first: the part before the first
+placeholder is byte-identical across sessions, so the model provider can
+serve it from its prompt prefix cache. Each render records that prefix's
+size and hash.
+"""
+import hashlib
+import logging
+import re
+import time
+from collections import deque
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TURNS = 12
+DEFAULT_SUMMARY_CHARS = 600
+DEFAULT_TOKEN_BUDGET = 2500
+TOKEN_BUDGET_KEY = "prompt_token_budget"
+SUMMARY_KEY = "history_summary"
+
+TEMPLATE_VARIABLE = re.compile(r"\{([A-Za-z_][A-Za-z0-9_:]*)(\??)\}")
+
+# Recent renders: one dict per instruction built, for measuring savings.
+prompt_sizes = deque(maxlen=10_000)
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+def _clip(text, limit):
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[: limit - 3].rstrip() + "..."
+
+
+def summarize_entry(entry):
+    """One short clause describing a history entry, used in the rolling summary."""
+    action = entry.get("action")
+    if action == "user_query":
+        return f"customer asked: {_clip(entry.get('query', ''), 80)}"
+    if action == "agent_response":
+        first_sentence = re.split(r"(?<=[.!?])\s", str(entry.get("response", "")), 1)[0]
+        return f"{entry.get('agent') or 'agent'} replied: {_clip(first_sentence, 80)}"
+    return _clip(", ".join(f"{k}={v}" for k, v in entry.items() if k != "timestamp"), 80)
+
+
+def format_entry(entry):
+    """Render a history entry as a single prompt line."""
+    stamp = f"[{entry['timestamp']}] " if entry.get("timestamp") else ""
+    action = entry.get("action")
+    if action == "user_query":
+        return f"- {stamp}Customer: {entry.get('query', '')}"
+    if action == "agent_response":
+        return f"- {stamp}{entry.get('agent') or 'Agent'}: {entry.get('response', '')}"
+    return f"- {stamp}{entry}"
+
+
+class HistoryManager:
+    """Ring buffer of recent turns plus a rolling summary of older ones."""
+
+    def __init__(self, max_turns=DEFAULT_MAX_TURNS, summary_chars=DEFAULT_SUMMARY_CHARS):
+        self.max_turns = max_turns
+        self.summary_chars = summary_chars
+
+    def append(self, history, summary, entry):
+        """Return (history, summary) with entry added and overflow folded in."""
+        history = list(history or [])
+        history.append(entry)
+        overflow, history = history[: -self.max_turns], history[-self.max_turns:]
+        if overflow:
+            summary = self.fold(summary, overflow)
+        return history, summary or ""
+
+    def fold(self, summary, entries):
+        """Fold entries into the summary, dropping its oldest clauses past the cap."""
+        summary = summary or ""
+        truncated = summary.startswith("...")
+        clauses = [c for c in summary.split("; ") if c and c != "..."]
+        clauses += [summarize_entry(e) for e in entries]
+        while len(clauses) > 1 and len("; ".join(["...", *clauses])) > self.summary_chars:
+            clauses.pop(0)
+            truncated = True
+        return "; ".join(["...", *clauses] if truncated else clauses)
+
+
+history_manager = HistoryManager()
+
+
+def template_variables(template):
+    return {m.group(1) for m in TEMPLATE_VARIABLE.finditer(template)}
+
+
+@lru_cache(maxsize=64)
+def static_prefix(template):
+    """The template text before its first placeholder, and a short hash of it."""
+    match = TEMPLATE_VARIABLE.search(template)
+    prefix = template[: match.start()] if match else template
+    return prefix, hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+
+
+def _fit_newest(lines, budget):
+    """Keep the newest lines whose total token estimate fits the budget."""
+    kept, used = [], 0
+    for line in reversed(lines):
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    kept.reverse()
+    return kept, used
+
+
+def render_instruction(template, state, token_budget=None, label="agent"):
+    """Fill {state} placeholders, bounding interaction and booking history.
+
+    Placeholders other than interaction_history and booking_history are
+    substituted as-is (missing keys render empty, like "{key?}" in ADK). The
+    two history sections share whatever remains of the token budget after
+    the rest of the instruction; the rolling summary and the newest turns are
+    kept first, then the newest past bookings.
+    """
+    budget = token_budget or state.get(TOKEN_BUDGET_KEY) or DEFAULT_TOKEN_BUDGET
+
+    def substitute(values):
+        return TEMPLATE_VARIABLE.sub(lambda m: str(values.get(m.group(1), "")), template)
+
+    base_values = {key: state.get(key, "") for key in template_variables(template)}
+    base_values["interaction_history"] = ""
+    base_values["booking_history"] = ""
+    remaining = max(0, budget - estimate_tokens(substitute(base_values)))
+
+    summary = state.get(SUMMARY_KEY, "")
+    history = list(state.get("interaction_history") or [])
+    history_lines = [format_entry(e) for e in history if isinstance(e, dict)]
+    summary_line = f"Earlier in this conversation: {summary}" if summary else ""
+    if summary_line and estimate_tokens(summary_line) <= remaining:
+        remaining -= estimate_tokens(summary_line) + 1
+    else:
+        summary_line = ""
+    kept_turns, used = _fit_newest(history_lines, remaining)
+    remaining -= used
+
+    bookings = list(state.get("booking_history") or [])
+    kept_bookings, _ = _fit_newest([str(b) for b in bookings], remaining)
+
+    omitted = len(history_lines) - len(kept_turns)
+    turn_block = [summary_line] if summary_line else []
+    if omitted:
+        turn_block.append(f"({omitted} earlier turns omitted)")
+    turn_block += kept_turns
+    base_values["interaction_history"] = "\n".join(turn_block) or "No previous interactions."
+    base_values["booking_history"] = "[" + ", ".join(kept_bookings) + "]"
+    if len(kept_bookings) < len(bookings):
+        base_values["booking_history"] += f" ({len(bookings) - len(kept_bookings)} older bookings omitted)"
+
+    rendered = substitute(base_values)
+    prefix, prefix_hash = static_prefix(template)
+    record = {
+        "agent": label,
+        "timestamp": time.time(),
+        "prompt_chars": len(rendered),
+        "prompt_tokens": estimate_tokens(rendered),
+        "history_entries": len(kept_turns),
+        "history_omitted": omitted,
+        "token_budget": budget,
+        "prefix_tokens": estimate_tokens(prefix),
+        "prefix_hash": prefix_hash,
+    }
+    prompt_sizes.append(record)
+    logger.info(
+        "%s instruction: ~%d tokens, ~%d static prefix (%d history turns kept, %d omitted, budget %d)",
+        label, record["prompt_tokens"], record["prefix_tokens"], len(kept_turns), omitted, budget,
+    )
+    return rendered
+
+
+def bounded_instruction(template, label="agent"):
+    """ADK InstructionProvider rendering template with render_instruction."""
+
+    def provider(context):
+        return render_instruction(template, context.state, label=label)
+
+    return provider
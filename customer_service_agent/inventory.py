@@ -0,0 +1,520 @@
+# customer_service_agent/inventory.py
+"""In-process seat and fare-bucket inventory for select_seat and create_booking.
+
+Each flight operation has a FlightInventory: the seat map is a pair of
+integer bitmaps (bit i = seat i taken / sold) and fare buckets are plain
+counters. Holds are optimistic: a booker snapshots the bitmap, picks seats
+and a bucket, prices them (which may await), then commits. The commit runs
+under a short lock: if a chosen seat went meanwhile, equivalent seats are
+re-picked on the spot, and only a bucket that sold out (a fare change)
+sends the booker back to quote again with SeatConflict. Nothing is locked
+across an await, so bookers on one flight never queue behind each other's
+pricing or payment calls.
+
+Unconfirmed holds expire through a hashed timer wheel, which is advanced
+lazily on every inventory call (or by `InventoryService.run_expiry`).
+"""
+import asyncio
+import math
+import random
+import re
+import string
+import threading
+import time
+from dataclasses import dataclass, field
+
+from .tool_cache import normalize_date, normalize_flight_number
+
+# Aircraft type -> (seat letters, business rows, aisle letters)
+SEAT_LAYOUTS = {
+    "E175": ("ACDF", 3, "CD"),
+    "A320": ("ABCDEF", 3, "CD"),
+    "B738": ("ABCDEF", 4, "CD"),
+    "A321": ("ABCDEF", 4, "CD"),
+    "B789": ("ABCDEFGHK", 6, "CDFG"),
+    "A359": ("ABCDEFGHK", 6, "CDFG"),
+}
+DEFAULT_AIRCRAFT = ("A320", 150)
+ECONOMY_PLUS_ROWS = 3
+ECONOMY_PLUS_FEE = 45.0
+# Seat preferences that ask to move up to Economy Plus
+UPGRADE_PREFERENCES = ("economy plus", "extra legroom", "upgrade")
+
+# Economy buckets sell cheapest first; share of economy seats and fare multiplier
+ECONOMY_BUCKETS = (("Q", 0.30, 0.8), ("M", 0.30, 1.0), ("B", 0.25, 1.3), ("Y", 0.15, 1.8))
+BUSINESS_BUCKETS = (("J", 1.0, 3.5),)
+
+HOLD_TTL = 15 * 60
+MAX_RETRIES = 16
+MAX_SPREAD = 64
+SEAT_NUMBER = re.compile(r"^(\d{1,2})([A-K])$")
+
+
+class InventoryError(Exception):
+    pass
+
+
+class SeatConflict(InventoryError):
+    """The chosen seats or bucket changed between snapshot and commit."""
+
+
+class SoldOut(InventoryError):
+    pass
+
+
+class TimerWheel:
+    """Hashed timer wheel: O(1) schedule/cancel, expiry in tick-sized steps."""
+
+    def __init__(self, tick=1.0, slots=512, clock=time.monotonic):
+        self.tick = tick
+        self.slots = [dict() for _ in range(slots)]
+        self.clock = clock
+        self.current = int(clock() / tick)
+        self._where = {}
+
+    def schedule(self, key, delay):
+        due = max(self.current + 1, math.ceil((self.clock() + delay) / self.tick))
+        slot = due % len(self.slots)
+        self.slots[slot][key] = due
+        self._where[key] = slot
+
+    def cancel(self, key):
+        slot = self._where.pop(key, None)
+        if slot is not None:
+            self.slots[slot].pop(key, None)
+
+    def advance(self):
+        """Return keys whose deadline has passed, removing them from the wheel."""
+        now = int(self.clock() / self.tick)
+        if now - self.current >= len(self.slots):
+            slots = range(len(self.slots))  # a full revolution or more passed
+        else:
+            slots = [tick % len(self.slots) for tick in range(self.current + 1, now + 1)]
+        expired = []
+        for slot in slots:
+            bucket = self.slots[slot]
+            # Entries due in a later revolution share the slot and stay put
+            due = [key for key, deadline in bucket.items() if deadline <= now]
+            for key in due:
+                del bucket[key]
+                del self._where[key]
+            expired += due
+        self.current = max(self.current, now)
+        return expired
+
+    def __len__(self):
+        return len(self._where)
+
+
+@dataclass
+class Hold:
+    hold_id: str
+    seats: int  # bitmask
+    bucket: str
+    fare: float
+    expires_at: float
+    confirmed: bool = False
+
+
+@dataclass
+class FlightInventory:
+    """Seat bitmaps, bucket counters and live holds for one flight operation."""
+
+    flight_key: tuple
+    letters: str
+    rows: int
+    business_rows: int
+    aisle: str
+    base_fare: float
+    taken: int = 0
+    sold: int = 0
+    buckets: dict = field(default_factory=dict)
+    fares: dict = field(default_factory=dict)
+    holds: dict = field(default_factory=dict)
+    conflicts: int = 0
+    repicks: int = 0
+    pending: int = 0  # bookers between choosing seats and committing them
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @classmethod
+    def for_aircraft(cls, flight_key, aircraft, seats, base_fare):
+        letters, business_rows, aisle = SEAT_LAYOUTS.get(aircraft, SEAT_LAYOUTS[DEFAULT_AIRCRAFT[0]])
+        rows = max(business_rows + 1, math.ceil(seats / len(letters)))
+        inventory = cls(flight_key, letters, rows, business_rows, aisle, base_fare)
+        economy = (rows - business_rows) * len(letters)
+        for cabin, buckets, capacity in (
+            ("economy", ECONOMY_BUCKETS, economy),
+            ("business", BUSINESS_BUCKETS, business_rows * len(letters)),
+        ):
+            remaining = capacity
+            for i, (bucket, share, multiplier) in enumerate(buckets):
+                count = remaining if i == len(buckets) - 1 else int(capacity * share)
+                inventory.buckets[bucket] = count
+                inventory.fares[bucket] = round(base_fare * multiplier, 2)
+                remaining -= count
+        return inventory
+
+    # ----- seat map -----
+
+    @property
+    def width(self):
+        return len(self.letters)
+
+    def seat_index(self, seat):
+        match = SEAT_NUMBER.match(seat.strip().upper())
+        if not match or match.group(2) not in self.letters:
+            return None
+        row = int(match.group(1)) - 1
+        return row * self.width + self.letters.index(match.group(2)) if 0 <= row < self.rows else None
+
+    def seat_name(self, index):
+        return f"{index // self.width + 1}{self.letters[index % self.width]}"
+
+    def seat_names(self, mask):
+        return [self.seat_name(i) for i in range(self.rows * self.width) if mask >> i & 1]
+
+    def cabin_of(self, index):
+        return "business" if index // self.width < self.business_rows else "economy"
+
+    def seat_type(self, index):
+        row = index // self.width
+        if row < self.business_rows:
+            return "Business"
+        return "Economy Plus" if row < self.business_rows + ECONOMY_PLUS_ROWS else "Economy"
+
+    def seat_types(self, mask):
+        return [self.seat_type(i) for i in range(self.rows * self.width) if mask >> i & 1]
+
+    def economy_plus_mask(self):
+        rows = min(ECONOMY_PLUS_ROWS, self.rows - self.business_rows)
+        return ((1 << (rows * self.width)) - 1) << (self.business_rows * self.width)
+
+    def free_count(self, cabin="economy"):
+        first = 0 if cabin == "business" else self.business_rows
+        last = self.business_rows if cabin == "business" else self.rows
+        block = (self.taken >> (first * self.width)) & ((1 << ((last - first) * self.width)) - 1)
+        return (last - first) * self.width - bin(block).count("1")
+
+    def choose(self, taken, count, preferences=(), cabin="economy", spread=1, plus=False):
+        """Seat bitmask for count seats free in `taken`, or None.
+
+        preferences may name exactly count seats ("12A") or kinds: window,
+        aisle, front, back, together (default for more than one seat). With spread > 1 the
+        pick is random among the first `spread` acceptable options, so
+        bookers retrying after a conflict stop racing for the same seat.
+        Economy Plus rows are left out of an economy pick unless plus is set
+        or the preferences ask for an upgrade; named seats are taken as given.
+        """
+        preferences = [str(p).strip().lower() for p in preferences or ()]
+        named = [self.seat_index(p) for p in preferences if SEAT_NUMBER.match(p.upper())]
+        if named:
+            if None in named or len(set(named)) != count:
+                return None
+            if any(self.cabin_of(i) != cabin for i in named):
+                return None
+            mask = sum(1 << i for i in named)
+            return mask if not taken & mask else None
+
+        if cabin == "economy" and not plus and not any(p in UPGRADE_PREFERENCES for p in preferences):
+            taken |= self.economy_plus_mask()
+        first = 0 if cabin == "business" else self.business_rows
+        last = self.business_rows if cabin == "business" else self.rows
+        rows = list(range(first, last))
+        if "back" in preferences:
+            rows.reverse()
+        columns = list(range(self.width))
+        if "window" in preferences:
+            columns.sort(key=lambda c: c not in (0, self.width - 1))
+        elif "aisle" in preferences:
+            columns.sort(key=lambda c: self.letters[c] not in self.aisle)
+
+        if count > 1 or "together" in preferences:
+            # Adjacent seats in one row
+            blocks = []
+            for row in rows:
+                base = row * self.width
+                for start in range(self.width - count + 1):
+                    mask = ((1 << count) - 1) << (base + start)
+                    if not taken & mask:
+                        blocks.append(mask)
+                        if len(blocks) == spread:
+                            return random.choice(blocks)
+            if blocks:
+                return random.choice(blocks)
+        free = []
+        for row in rows:
+            for column in columns:
+                index = row * self.width + column
+                if not taken >> index & 1:
+                    free.append(index)
+                    if len(free) == count + spread - 1:
+                        break
+            else:
+                continue
+            break
+        if len(free) < count:
+            return None
+        return sum(1 << i for i in random.sample(free, count))
+
+    def open_bucket(self, cabin, count):
+        buckets = BUSINESS_BUCKETS if cabin == "business" else ECONOMY_BUCKETS
+        for bucket, _, _ in buckets:
+            if self.buckets.get(bucket, 0) >= count:
+                return bucket
+        return None
+
+    # ----- commits (short critical sections, never across an await) -----
+
+    def commit_hold(self, hold_id, mask, bucket, ttl, repick=None):
+        """Take mask's seats and one bucket count per seat.
+
+        If a chosen seat was taken meanwhile, repick(taken) may supply
+        replacement seats inside the lock; the quoted bucket must still be
+        open, since its fare is what the booker priced.
+        """
+        count = bin(mask).count("1")
+        with self._lock:
+            if self.taken & mask and repick is not None:
+                mask = repick(self.taken) or mask
+                self.repicks += 1
+            if self.taken & mask or self.buckets.get(bucket, 0) < count:
+                self.conflicts += 1
+                raise SeatConflict(self.flight_key)
+            self.taken |= mask
+            self.buckets[bucket] -= count
+            hold = Hold(hold_id, mask, bucket, self.fares[bucket] * count, time.monotonic() + ttl)
+            self.holds[hold_id] = hold
+            return hold
+
+    def confirm(self, hold_id):
+        with self._lock:
+            hold = self.holds.get(hold_id)
+            if hold is None:
+                raise InventoryError(f"Hold {hold_id} expired or was released")
+            hold.confirmed = True
+            self.sold |= hold.seats
+            return hold
+
+    def move(self, hold_id, mask):
+        """Swap a hold's seats for mask, failing if any new seat was taken meanwhile."""
+        with self._lock:
+            hold = self.holds.get(hold_id)
+            if hold is None:
+                raise InventoryError(f"Hold {hold_id} expired or was released")
+            others = self.taken & ~hold.seats
+            if others & mask:
+                self.conflicts += 1
+                raise SeatConflict(self.flight_key)
+            self.taken = others | mask
+            if hold.confirmed:
+                self.sold = (self.sold & ~hold.seats) | mask
+            hold.seats = mask
+            return hold
+
+    def release(self, hold_id):
+        """Return a hold's (or a confirmed booking's) seats and bucket count."""
+        with self._lock:
+            hold = self.holds.pop(hold_id, None)
+            if hold is None:
+                return None
+            self.taken &= ~hold.seats
+            self.sold &= ~hold.seats
+            self.buckets[hold.bucket] += bin(hold.seats).count("1")
+            return hold
+
+
+@dataclass
+class Booking:
+    reference: str
+    flight_key: tuple
+    hold_id: str
+    passengers: list
+    contact: dict
+
+
+class InventoryService:
+    """Flight inventories keyed by (flight_number, date), created on first use."""
+
+    def __init__(self, flight_lookup=None, hold_ttl=HOLD_TTL, wheel=None):
+        self.flight_lookup = flight_lookup or schedule_lookup
+        self.hold_ttl = hold_ttl
+        self.wheel = wheel if wheel is not None else TimerWheel()
+        self.flights = {}
+        self.bookings = {}
+        self.expired_holds = 0
+        self._create_lock = threading.Lock()
+
+    def flight(self, flight_number, date):
+        key = (normalize_flight_number(flight_number), date)
+        inventory = self.flights.get(key)
+        if inventory is None:
+            with self._create_lock:
+                inventory = self.flights.get(key)
+                if inventory is None:
+                    found = self.flight_lookup(*key)
+                    if found is None:
+                        raise InventoryError(f"No flight {key[0]} on {date}")
+                    aircraft, seats, fare = found
+                    inventory = self.flights[key] = FlightInventory.for_aircraft(key, aircraft, seats, fare)
+        return inventory
+
+    def expire_holds(self):
+        """Release holds whose TTL has passed; returns how many were released."""
+        released = 0
+        for flight_key, hold_id in self.wheel.advance():
+            inventory = self.flights.get(flight_key)
+            hold = inventory.holds.get(hold_id) if inventory else None
+            if hold is not None and not hold.confirmed:
+                inventory.release(hold_id)
+                released += 1
+        self.expired_holds += released
+        return released
+
+    async def run_expiry(self, interval=None):
+        """Background task advancing the timer wheel every tick."""
+        while True:
+            await asyncio.sleep(interval or self.wheel.tick)
+            self.expire_holds()
+
+    async def hold(self, flight_number, date, count=1, preferences=(), cabin="economy",
+                   ttl=None, quote=None):
+        """Hold seats optimistically, retrying on conflicting commits.
+
+        quote, if given, is awaited between choosing and committing (fare
+        lookups, payment pre-auth); it is where other bookers interleave.
+        """
+        self.expire_holds()
+        inventory = self.flight(flight_number, date)
+        for attempt in range(MAX_RETRIES):
+            # Spread picks over more options when others are mid-hold, so
+            # racing bookers stop converging on the same seat
+            spread = min(MAX_SPREAD, inventory.pending + 1)
+            mask = inventory.choose(inventory.taken, count, preferences, cabin, spread)
+            bucket = inventory.open_bucket(cabin, count)
+            if mask is None or bucket is None:
+                raise SoldOut(f"No {count} {cabin} seat(s) left on {flight_number} {date}")
+            hold_id = "".join(random.choices(string.ascii_uppercase + string.digits, k=10))
+            inventory.pending += 1
+            try:
+                if quote is not None:
+                    await quote(inventory, mask, bucket)
+                hold = inventory.commit_hold(
+                    hold_id, mask, bucket, ttl or self.hold_ttl,
+                    repick=lambda taken: inventory.choose(taken, count, preferences, cabin),
+                )
+            except SeatConflict:
+                continue
+            finally:
+                inventory.pending -= 1
+            self.wheel.schedule((inventory.flight_key, hold_id), ttl or self.hold_ttl)
+            return inventory, hold
+        raise SeatConflict(f"Gave up on {flight_number} {date} after {MAX_RETRIES} conflicts")
+
+    def confirm(self, inventory, hold):
+        self.wheel.cancel((inventory.flight_key, hold.hold_id))
+        return inventory.confirm(hold.hold_id)
+
+    def new_reference(self):
+        while True:
+            reference = "".join(random.choices(string.ascii_uppercase + string.digits, k=6))
+            if reference not in self.bookings:
+                return reference
+
+
+def schedule_lookup(flight_number, date):
+    """(aircraft, seats, base fare) of a flight from the schedule store."""
+    from .schedule.search import get_engine
+
+    store = get_engine().store
+    row = store.find_flight(flight_number, date)
+    if row is None:
+        return None
+    return store.aircraft_types[store.aircraft[row]], int(store.seats[row]), float(store.fare[row])
+
+
+inventory_service = InventoryService()
+
+
+# ----- tool functions -----
+
+async def create_booking(flight_details, passenger_info, contact_info):
+    """create_booking tool: hold and confirm seats and a fare bucket."""
+    try:
+        flight_number = normalize_flight_number(flight_details.get("flight_number", ""))
+        date = normalize_date(flight_details.get("departure_date", ""))
+        count = int(flight_details.get("passenger_count") or len(passenger_info) or 1)
+        passenger_info, contact_info = list(passenger_info), dict(contact_info)
+    except (AttributeError, TypeError, ValueError):
+        return {"status": "Not booked", "reason": "flight_details needs flight_number, departure_date and "
+                                                  "passenger_count; passenger_info a list; contact_info an object"}
+    if len(date) != 10:
+        return {"status": "Not booked", "reason": f"Unrecognized departure date {date!r}, use YYYY-MM-DD"}
+    if count < 1:
+        return {"status": "Not booked", "reason": "passenger_count must be at least 1"}
+    try:
+        inventory, hold = await inventory_service.hold(flight_number, date, count)
+    except InventoryError as exc:
+        return {"status": "Not booked", "reason": str(exc)}
+    inventory_service.confirm(inventory, hold)
+
+    reference = inventory_service.new_reference()
+    inventory_service.bookings[reference] = Booking(
+        reference, inventory.flight_key, hold.hold_id, passenger_info, contact_info
+    )
+    return {
+        "booking_reference": reference,
+        "status": "Confirmed",
+        "flight": f"{flight_number} {date}",
+        "fare_class": hold.bucket,
+        "assigned_seats": inventory.seat_names(hold.seats),
+        "total_price": f"${hold.fare:,.2f}",
+    }
+
+
+async def select_seat(booking_reference, flight_number, seat_preferences=None):
+    """select_seat tool: move a booking to seats matching the preferences.
+
+    An Economy booking stays out of the Economy Plus rows unless the
+    preferences ask for an upgrade or name the seats; the fee applies only
+    to Economy Plus seats the booking did not already have.
+    """
+    booking = inventory_service.bookings.get(str(booking_reference).strip().upper())
+    if booking is None:
+        return {"error": f"Booking {booking_reference} not found"}
+    if booking.flight_key[0] != normalize_flight_number(flight_number):
+        return {"error": f"Booking {booking.reference} is not on flight {flight_number}"}
+    inventory = inventory_service.flight(*booking.flight_key)
+    current = inventory.holds[booking.hold_id]
+    count = bin(current.seats).count("1")
+    cabin = inventory.cabin_of((current.seats & -current.seats).bit_length() - 1)
+    current_plus = inventory.seat_types(current.seats).count("Economy Plus")
+    preferences = [str(p).strip().lower() for p in seat_preferences or ()]
+    named = any(SEAT_NUMBER.match(p.upper()) for p in preferences)
+    # An upgrade moves only into Economy Plus; a booking already there may move within it
+    closed = 0
+    if cabin == "economy" and not named and any(p in UPGRADE_PREFERENCES for p in preferences):
+        closed = ((1 << (inventory.rows * inventory.width)) - 1) & ~inventory.economy_plus_mask()
+
+    # Seats already on the booking count as free when choosing new ones
+    for attempt in range(MAX_RETRIES):
+        mask = inventory.choose(
+            (inventory.taken & ~current.seats) | closed, count, preferences, cabin,
+            spread=min(MAX_SPREAD, 1 << attempt), plus=bool(current_plus),
+        )
+        if mask is None:
+            return {
+                "error": "Requested seats are not available",
+                "assigned_seats": inventory.seat_names(current.seats),
+            }
+        try:
+            inventory.move(booking.hold_id, mask)
+        except SeatConflict:
+            continue
+        types = inventory.seat_types(mask)
+        extra = ECONOMY_PLUS_FEE * max(0, types.count("Economy Plus") - current_plus)
+        return {
+            "assigned_seats": inventory.seat_names(mask),
+            "seat_type": ", ".join(sorted(set(types))),
+            "additional_cost": f"${extra:,.2f}",
+        }
+    return {"error": "Seat map is busy, please try again"}
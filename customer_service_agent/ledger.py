@@ -0,0 +1,480 @@
+# customer_service_agent/ledger.py
+"""Append-only miles ledger for the loyalty tools.
+
+Run with: python -m customer_service_agent.ledger --members 1000 --transactions 20000
+
+Every accrual, redemption, transfer and expiry is one row in `transactions`,
+which triggers keep insert-only. Reads never replay that history:
+
+- `balances` holds each member's running balance, lifetime and qualifying
+  miles, updated in the same SQLite transaction as the posting, so a
+  balance lookup is one primary-key read however long the history is.
+  Each posting also records balance_after, the snapshot at that point.
+- `lots` tracks unexpired credits by (member, expiry date). Debits consume
+  the earliest-expiring lots first, so "miles expiring in the next 90 days"
+  is a range read on the member's lots and the nightly expiry job walks the
+  expiry-date index instead of scanning members.
+
+A transfer posts the debit and the credit under one BEGIN IMMEDIATE
+transaction: either both rows and both balance updates land or neither.
+The database path comes from LEDGER_DB_PATH (default data/ledger.db).
+"""
+import argparse
+import os
+import random
+import string
+import threading
+from collections import deque
+from datetime import date, timedelta
+
+import numpy as np
+
+from .session_store import ConnectionPool
+from .tool_cache import normalize_code
+
+LEDGER_DB_ENV = "LEDGER_DB_PATH"
+# data/ at the repository root, whatever directory the process starts in
+DEFAULT_LEDGER_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ledger.db")
+EXPIRY_DAYS = 730
+EXPIRING_SOON_DAYS = 90
+RECENT_ACTIVITY = 5
+LOAD_BATCH = 100_000
+
+# Miles per redemption type, used when details carry no explicit miles
+REDEMPTION_MILES = {"flight": 25000, "upgrade": 15000, "hotel": 10000, "car": 5000}
+MILE_VALUE = 0.018  # dollars of value per redeemed mile
+TRANSFER_FEE_PER_MILE = 0.0075  # dollars; family transfers are free
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    txn_id TEXT NOT NULL,
+    member TEXT NOT NULL,
+    posted_on TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    balance_after INTEGER NOT NULL,
+    description TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS transactions_by_member ON transactions (member, id);
+CREATE TRIGGER IF NOT EXISTS transactions_no_update BEFORE UPDATE ON transactions
+BEGIN SELECT RAISE(ABORT, 'the miles ledger is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS transactions_no_delete BEFORE DELETE ON transactions
+BEGIN SELECT RAISE(ABORT, 'the miles ledger is append-only'); END;
+CREATE TABLE IF NOT EXISTS balances (
+    member TEXT PRIMARY KEY,
+    balance INTEGER NOT NULL,
+    lifetime INTEGER NOT NULL,
+    qualifying INTEGER NOT NULL,
+    qualifying_year INTEGER NOT NULL,
+    last_txn INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS lots (
+    member TEXT NOT NULL,
+    expires_on TEXT NOT NULL,
+    txn INTEGER NOT NULL,
+    remaining INTEGER NOT NULL,
+    PRIMARY KEY (member, expires_on, txn)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS lots_by_expiry ON lots (expires_on);
+"""
+
+
+class LedgerError(Exception):
+    pass
+
+
+class InsufficientMiles(LedgerError):
+    pass
+
+
+def new_txn_id(prefix):
+    return prefix + "".join(random.choices(string.ascii_uppercase + string.digits, k=8))
+
+
+class MilesLedger:
+    """Postings, balances and expiry lots in one SQLite database."""
+
+    def __init__(self, db_path=DEFAULT_LEDGER_PATH, pool_size=4):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.pool = ConnectionPool(db_path, size=pool_size)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def close(self):
+        self.pool.close()
+
+    # ----- writes -----
+
+    def _post(self, conn, member, kind, amount, on, txn_id, description=""):
+        """Append one posting and update the member's snapshot and lots.
+
+        Runs inside the caller's transaction; raises InsufficientMiles
+        before writing anything if a debit exceeds the balance.
+        """
+        row = conn.execute(
+            "SELECT balance, lifetime, qualifying, qualifying_year FROM balances WHERE member = ?",
+            (member,),
+        ).fetchone()
+        balance, lifetime, qualifying, year = row or (0, 0, 0, on.year)
+        if balance + amount < 0:
+            raise InsufficientMiles(f"{member} has {balance:,} miles, needs {-amount:,}")
+        if year != on.year:
+            qualifying, year = 0, on.year
+        balance += amount
+        if amount > 0 and kind != "transfer_in":
+            lifetime += amount
+        if kind == "flight":
+            qualifying += amount
+
+        txn = conn.execute(
+            "INSERT INTO transactions (txn_id, member, posted_on, kind, amount, balance_after, description)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (txn_id, member, on.isoformat(), kind, amount, balance, description),
+        ).lastrowid
+        conn.execute(
+            "INSERT OR REPLACE INTO balances VALUES (?, ?, ?, ?, ?, ?)",
+            (member, balance, lifetime, qualifying, year, txn),
+        )
+        if amount > 0:
+            expires_on = (on + timedelta(days=EXPIRY_DAYS)).isoformat()
+            conn.execute("INSERT INTO lots VALUES (?, ?, ?, ?)", (member, expires_on, txn, amount))
+        elif kind != "expiry":
+            self._consume_lots(conn, member, -amount)
+        return balance
+
+    @staticmethod
+    def _consume_lots(conn, member, miles):
+        """Take miles from the member's earliest-expiring lots."""
+        lots = conn.execute(
+            "SELECT expires_on, txn, remaining FROM lots WHERE member = ? ORDER BY expires_on, txn",
+            (member,),
+        ).fetchall()
+        for expires_on, txn, remaining in lots:
+            if not miles:
+                break
+            take = min(miles, remaining)
+            if take == remaining:
+                conn.execute("DELETE FROM lots WHERE member = ? AND expires_on = ? AND txn = ?",
+                             (member, expires_on, txn))
+            else:
+                conn.execute("UPDATE lots SET remaining = ? WHERE member = ? AND expires_on = ? AND txn = ?",
+                             (remaining - take, member, expires_on, txn))
+            miles -= take
+
+    def _transaction(self, postings, prefix):
+        """Apply [(member, kind, amount, description)] atomically; returns (txn_id, balances)."""
+        txn_id, on = new_txn_id(prefix), date.today()
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                balances = [self._post(conn, member, kind, amount, on, txn_id, description)
+                            for member, kind, amount, description in postings]
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+        return txn_id, balances
+
+    def credit(self, member, miles, kind="flight", description=""):
+        return self._transaction([(member, kind, miles, description)], "ACR")
+
+    def redeem(self, member, miles, description=""):
+        return self._transaction([(member, "redemption", -miles, description)], "RWD")
+
+    def transfer(self, from_member, to_member, miles, description="", external=False):
+        """Debit one member and credit another in a single transaction.
+
+        external transfers (to a partner program) only post the debit.
+        """
+        if from_member == to_member:
+            raise LedgerError("Cannot transfer miles to the same account")
+        postings = [(from_member, "transfer_out", -miles, description or f"Transfer to {to_member}")]
+        if not external:
+            postings.append((to_member, "transfer_in", miles, description or f"Transfer from {from_member}"))
+        return self._transaction(postings, "TRF")
+
+    def expire(self, on=None):
+        """Post expiry debits for every lot past its date; returns miles expired.
+
+        Walks the expiry-date index, so the cost depends on how many lots
+        are due, not on the number of members.
+        """
+        on = on or date.today()
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                due = conn.execute(
+                    "SELECT member, SUM(remaining) FROM lots WHERE expires_on < ? GROUP BY member",
+                    (on.isoformat(),),
+                ).fetchall()
+                txn_id = new_txn_id("EXP")
+                for member, miles in due:
+                    self._post(conn, member, "expiry", -miles, on, txn_id, "Miles expired")
+                conn.execute("DELETE FROM lots WHERE expires_on < ?", (on.isoformat(),))
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+        return sum(miles for _, miles in due)
+
+    # ----- reads -----
+
+    def account(self, member):
+        """(balance, lifetime, qualifying this year) from the snapshot, or None."""
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT balance, lifetime, qualifying, qualifying_year FROM balances WHERE member = ?",
+                (member,),
+            ).fetchone()
+        if row is None:
+            return None
+        balance, lifetime, qualifying, year = row
+        return balance, lifetime, qualifying if year == date.today().year else 0
+
+    def activity(self, member, limit=RECENT_ACTIVITY):
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT posted_on, kind, description, amount FROM transactions"
+                " WHERE member = ? ORDER BY id DESC LIMIT ?",
+                (member, limit),
+            ).fetchall()
+        return [
+            {"date": posted_on, "description": description or kind.replace("_", " ").title(), "miles": amount}
+            for posted_on, kind, description, amount in rows
+        ]
+
+    def expiring(self, member, within_days=EXPIRING_SOON_DAYS, on=None):
+        """(miles, earliest expiry date) of lots expiring within the window."""
+        on = on or date.today()
+        with self.pool.connection() as conn:
+            miles, first = conn.execute(
+                "SELECT COALESCE(SUM(remaining), 0), MIN(expires_on) FROM lots"
+                " WHERE member = ? AND expires_on >= ? AND expires_on <= ?",
+                (member, on.isoformat(), (on + timedelta(days=within_days)).isoformat()),
+            ).fetchone()
+        return miles, first
+
+    def replay_balance(self, member):
+        """Balance recomputed from the full history; the slow path snapshots avoid."""
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE member = ?", (member,)
+            ).fetchone()[0]
+
+    # ----- bulk loading -----
+
+    def bulk_load(self, rows):
+        """Load (member, posted_on, kind, amount, description) rows in posting order.
+
+        For seeding and benchmarks on an empty ledger: balances and lots are
+        computed in memory and written once at the end, and debits larger
+        than the balance are clamped. Returns the number of postings written.
+        """
+        with self.pool.connection() as conn:
+            if conn.execute("SELECT 1 FROM transactions LIMIT 1").fetchone():
+                raise LedgerError("bulk_load needs an empty ledger")
+            # Indexes are rebuilt once at the end instead of updated per row
+            conn.execute("DROP INDEX IF EXISTS transactions_by_member")
+            accounts, lots, batch, txn = {}, {}, [], 0
+            iso_dates = {}  # date -> (posted_on, expires_on) strings
+            for member, posted_on, kind, amount, description in rows:
+                balance, lifetime, qualifying, year, _ = accounts.get(member) or (0, 0, 0, posted_on.year, 0)
+                if amount < 0:
+                    amount = -min(-amount, balance)
+                    if not amount:
+                        continue
+                if year != posted_on.year:
+                    qualifying, year = 0, posted_on.year
+                txn += 1
+                balance += amount
+                dates = iso_dates.get(posted_on)
+                if dates is None:
+                    dates = iso_dates[posted_on] = (
+                        posted_on.isoformat(), (posted_on + timedelta(days=EXPIRY_DAYS)).isoformat()
+                    )
+                member_lots = lots.get(member)
+                if member_lots is None:
+                    member_lots = lots[member] = deque()
+                if amount > 0:
+                    lifetime += amount if kind != "transfer_in" else 0
+                    qualifying += amount if kind == "flight" else 0
+                    member_lots.append([dates[1], txn, amount])
+                else:
+                    owed = -amount
+                    while owed:
+                        lot = member_lots[0]
+                        take = min(owed, lot[2])
+                        lot[2] -= take
+                        owed -= take
+                        if not lot[2]:
+                            member_lots.popleft()
+                accounts[member] = (balance, lifetime, qualifying, year, txn)
+                batch.append((txn, f"BLK{txn:08d}", member, dates[0], kind, amount, balance, description))
+                if len(batch) >= LOAD_BATCH:
+                    conn.executemany("INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                    batch.clear()
+            conn.executemany("INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            # Key order turns the B-tree inserts into appends
+            members = sorted(accounts)
+            conn.executemany(
+                "INSERT INTO balances VALUES (?, ?, ?, ?, ?, ?)",
+                ((member, *accounts[member]) for member in members),
+            )
+            conn.execute("DROP INDEX IF EXISTS lots_by_expiry")
+            conn.executemany(
+                "INSERT INTO lots VALUES (?, ?, ?, ?)",
+                ((member, expires_on, lot_txn, remaining)
+                 for member in members for expires_on, lot_txn, remaining in sorted(lots[member])),
+            )
+            conn.commit()
+            conn.executescript(SCHEMA)
+        return txn
+
+
+def synthetic_member(index):
+    return f"FF{100000000 + index:09d}"
+
+
+def synthetic_history(members, transactions, start=None, days=3 * 365, seed=11):
+    """Yield plausible postings for bulk_load, oldest first.
+
+    Activity per member is skewed (a few frequent flyers, many occasional
+    ones); about 80% of postings are accruals and the rest redemptions.
+    """
+    rng = np.random.default_rng(seed)
+    start = start or date.today() - timedelta(days=days)
+    chunk = 1_000_000
+    offsets = np.sort(rng.integers(0, days, size=transactions))
+    weights = 1.0 / np.arange(1, members + 1) ** 0.6
+    weights /= weights.sum()
+    names = [synthetic_member(i) for i in range(members)]
+    dates = [start + timedelta(days=day) for day in range(days)]
+    kinds = ("flight", "partner", "bonus", "redemption")
+    for lo in range(0, transactions, chunk):
+        n = min(chunk, transactions - lo)
+        who = rng.choice(members, size=n, p=weights).tolist()
+        kind = rng.choice(4, size=n, p=[0.55, 0.15, 0.1, 0.2])
+        amount = np.select(
+            [kind == 0, kind == 1, kind == 2],
+            [rng.integers(300, 6000, size=n), rng.integers(100, 2000, size=n), rng.integers(500, 5000, size=n)],
+            -rng.choice([5000, 10000, 15000, 25000], size=n),
+        ).tolist()
+        day = offsets[lo:lo + n].tolist()
+        kind = kind.tolist()
+        for i in range(n):
+            yield names[who[i]], dates[day[i]], kinds[kind[i]], amount[i], ""
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger():
+    """The process-wide MilesLedger at LEDGER_DB_PATH, opened on first use."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = MilesLedger(os.getenv(LEDGER_DB_ENV, DEFAULT_LEDGER_PATH))
+    return _ledger
+
+
+# ----- tool functions -----
+
+def parse_miles(value):
+    """A miles amount ("5,000", 5000, 5000.0) as a positive int, or None if it is not a positive whole number."""
+    if isinstance(value, bool):
+        return None
+    try:
+        miles = float(str(value).replace(",", "").strip())
+    except ValueError:
+        return None
+    return int(miles) if miles > 0 and miles.is_integer() else None
+
+
+def check_miles_balance(member_number, include_activity=True):
+    """check_miles_balance tool: snapshot balance, recent activity, expiring miles."""
+    member_number = normalize_code(member_number)
+    ledger = get_ledger()
+    account = ledger.account(member_number)
+    if account is None:
+        return {"error": f"No loyalty account {member_number}"}
+    balance, lifetime, qualifying = account
+    miles, expiry_date = ledger.expiring(member_number)
+    result = {
+        "current_balance": balance,
+        "lifetime_miles": lifetime,
+        "qualifying_miles": qualifying,
+        "expiring_soon": {"miles": miles, "expiry_date": expiry_date},
+    }
+    if include_activity:
+        result["recent_activity"] = ledger.activity(member_number)
+    return result
+
+
+def redeem_miles(member_number, redemption_type, details=None):
+    """redeem_miles tool: debit the redemption in one ledger posting."""
+    details = details if isinstance(details, dict) else {}
+    member_number = normalize_code(member_number)
+    if redemption_type not in REDEMPTION_MILES:
+        return {"redemption_confirmed": False, "error": f"Unknown redemption type {redemption_type}"}
+    requested = details.get("miles")
+    miles = REDEMPTION_MILES[redemption_type] if requested is None else parse_miles(requested)
+    if miles is None:
+        return {"redemption_confirmed": False, "error": "miles must be a positive whole number"}
+    description = details.get("description") or f"{redemption_type.title()} redemption"
+    try:
+        txn_id, (balance,) = get_ledger().redeem(member_number, miles, description)
+    except InsufficientMiles as exc:
+        return {"redemption_confirmed": False, "error": str(exc)}
+    return {
+        "redemption_confirmed": True,
+        "miles_used": miles,
+        "confirmation_code": txn_id,
+        "remaining_balance": balance,
+        "value_received": f"${miles * MILE_VALUE:,.0f}",
+    }
+
+
+def transfer_miles(from_account, to_account, miles_amount, transfer_type="member"):
+    """transfer_miles tool: atomic debit and credit between two members."""
+    miles_amount = parse_miles(miles_amount)
+    if miles_amount is None:
+        return {"transfer_completed": False, "error": "miles_amount must be a positive whole number"}
+    from_account, to_account = normalize_code(from_account), normalize_code(to_account)
+    ledger = get_ledger()
+    if ledger.account(to_account) is None and transfer_type != "partner":
+        return {"transfer_completed": False, "error": f"No loyalty account {to_account}"}
+    try:
+        txn_id, balances = ledger.transfer(
+            from_account, to_account, miles_amount, external=transfer_type == "partner"
+        )
+    except LedgerError as exc:
+        return {"transfer_completed": False, "error": str(exc)}
+    fee = 0.0 if transfer_type == "family" else miles_amount * TRANSFER_FEE_PER_MILE
+    return {
+        "transfer_completed": True,
+        "miles_transferred": miles_amount,
+        "transfer_fee": f"${fee:,.0f}",
+        "new_balance": balances[0],
+        "transaction_id": txn_id,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--transactions", type=int, default=20_000)
+    parser.add_argument("--db", default=os.getenv(LEDGER_DB_ENV, DEFAULT_LEDGER_PATH))
+    args = parser.parse_args()
+
+    ledger = MilesLedger(args.db)
+    count = ledger.bulk_load(synthetic_history(args.members, args.transactions))
+    print(f"Loaded {count:,} postings for {args.members:,} members into {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+# customer_service_agent/metering.py
+"""Token metering per agent, session and tool, with per-session budgets.
+
+The orchestrator and seven specialists carry long instructions, and every
+transfer re-sends the conversation to another agent, so token spend grows
+with each turn and nothing capped it. meter_runner() puts a MeteredLlm in
+front of the agent tree's model. Every call counts prompt, cached and
+completion tokens (from the response's usage metadata) against the agent
+and the session, along with the estimated size of the system instruction.
+Every tool result counts its size against the tool the first time it
+reaches the model.
+
+With SESSION_TOKEN_BUDGET set, or state['session_token_budget'] for one
+session, a session degrades instead of failing as it nears its budget. At
+TRIM_AT of it, requests keep only the last KEEP_TURNS customer turns of
+history. The instruction still carries the rolling summary from
+history.py. At CHEAPER_AT, calls also go to BUDGET_FALLBACK_MODEL. Past the
+budget, the model is not called at all: every answer is BUDGET_REACHED_REPLY,
+so a session ends at most one call's tokens over its budget.
+
+The counters are in server.py's GET /metrics under "tokens". With
+METRICS_ENDPOINT=host:port set, their increments are also pushed every
+METRICS_INTERVAL_S as StatsD counters over UDP. That works unchanged with
+pre-fork workers, since each one pushes its own.
+
+Run with: python -m customer_service_agent.metering --listen 127.0.0.1:8125
+"""
+import argparse
+import asyncio
+import atexit
+import logging
+import os
+import socket
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from contextvars import ContextVar
+from typing import Any
+
+from google.adk.models import BaseLlm, LlmResponse
+from google.genai import types
+
+from .history import estimate_tokens
+from .models.replay import canonical, customer_message, request_agent, tool_results
+from .models.stub import use_model
+
+logger = logging.getLogger(__name__)
+
+SESSION_TOKEN_BUDGET_ENV = "SESSION_TOKEN_BUDGET"
+BUDGET_FALLBACK_MODEL_ENV = "BUDGET_FALLBACK_MODEL"
+METRICS_ENDPOINT_ENV = "METRICS_ENDPOINT"
+METRICS_INTERVAL_ENV = "METRICS_INTERVAL_S"
+SESSION_BUDGET_KEY = "session_token_budget"
+
+DEFAULT_FALLBACK_MODEL = "gemini-2.0-flash-lite"
+DEFAULT_INTERVAL_S = 10.0
+# Share of the budget at which each degradation starts
+TRIM_AT = 0.6
+CHEAPER_AT = 0.8
+KEEP_TURNS = 2
+BUDGET_REACHED_REPLY = ("I'm sorry, this conversation has reached its usage limit, so I can't look into "
+                        "anything further here. Please start a new conversation or contact an agent.")
+# Degradation levels, in order; a session's level only goes up
+LEVELS = ("full", "trim_history", "cheaper_model", "exhausted")
+MAX_SESSIONS = 50_000
+TOP_SESSIONS = 10
+STATSD_PREFIX = "airline_assist"
+MAX_DATAGRAM = 1432
+
+_session = ContextVar("metering_session", default=None)
+
+
+def metric_name(value):
+    """A model, agent or tool name as one StatsD path segment."""
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in str(value))
+
+
+class TokenMeter:
+    """Token counters per agent, session, tool and model, safe to update from any thread.
+
+    Sessions are kept in LRU order, at most max_sessions of them; an evicted
+    session starts again from zero if it comes back.
+    """
+
+    def __init__(self, budget=0, max_sessions=MAX_SESSIONS):
+        self.budget = budget
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self.agents = defaultdict(Counter)
+        self.tools = defaultdict(Counter)
+        self.models = Counter()
+        self.degraded = Counter()
+        self.sessions = OrderedDict()
+
+    def has_session(self, session_id):
+        return session_id in self.sessions
+
+    def open_session(self, session_id, budget=None):
+        """Start tracking a session, with its own budget if given."""
+        with self._lock:
+            self._session(session_id)["budget"] = int(budget or self.budget or 0)
+
+    def _session(self, session_id):
+        record = self.sessions.get(session_id)
+        if record is None:
+            record = self.sessions[session_id] = {
+                "budget": self.budget, "level": 0, "tokens": 0, "calls": 0,
+                "prompt": 0, "completion": 0, "tool_result_tokens": 0, "agents": Counter(),
+            }
+            if len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(session_id)
+        return record
+
+    def level(self, session_id):
+        """Degradation level a session's next call runs at (an index into LEVELS)."""
+        if session_id is None:
+            return 0
+        with self._lock:
+            record = self._session(session_id)
+            budget = record["budget"]
+            if not budget:
+                return 0
+            used = record["tokens"] / budget
+            level = 3 if used >= 1 else 2 if used >= CHEAPER_AT else 1 if used >= TRIM_AT else 0
+            if level > record["level"]:
+                logger.info("Session %s has used %d of %d tokens: %s",
+                            session_id, record["tokens"], budget, LEVELS[level])
+                record["level"] = level
+            level = record["level"]
+            if level:
+                self.degraded[LEVELS[level]] += 1
+            return level
+
+    def record_call(self, session_id, agent, model, usage, instruction_tokens):
+        prompt = (usage and usage.prompt_token_count) or 0
+        completion = (usage and usage.candidates_token_count) or 0
+        with self._lock:
+            counts = self.agents[agent]
+            counts["calls"] += 1
+            counts["prompt_tokens"] += prompt
+            counts["completion_tokens"] += completion
+            counts["cached_tokens"] += (usage and usage.cached_content_token_count) or 0
+            counts["instruction_tokens"] += instruction_tokens
+            self.models[model] += 1
+            if session_id is not None:
+                record = self._session(session_id)
+                record["calls"] += 1
+                record["prompt"] += prompt
+                record["completion"] += completion
+                record["tokens"] += prompt + completion
+                record["agents"][agent] += prompt + completion
+
+    def record_tool(self, session_id, name, size):
+        tokens = size // 4 + 1
+        with self._lock:
+            counts = self.tools[name]
+            counts["results"] += 1
+            counts["result_bytes"] += size
+            counts["result_tokens"] += tokens
+            if session_id is not None:
+                self._session(session_id)["tool_result_tokens"] += tokens
+
+    def session(self, session_id):
+        """One session's counters, or None if it is not tracked."""
+        with self._lock:
+            record = self.sessions.get(session_id)
+            if record is None:
+                return None
+            return dict(record, level=LEVELS[record["level"]], agents=dict(record["agents"]))
+
+    def counters(self):
+        """Flat name -> cumulative count of everything pushed as StatsD counters."""
+        with self._lock:
+            flat = {f"budget.{name}": n for name, n in self.degraded.items()}
+            for agent, counts in self.agents.items():
+                flat.update({f"agent.{metric_name(agent)}.{key}": n for key, n in counts.items()})
+            for tool, counts in self.tools.items():
+                flat.update({f"tool.{metric_name(tool)}.{key}": n for key, n in counts.items()})
+            flat.update({f"model.{metric_name(model)}.calls": n for model, n in self.models.items()})
+        return flat
+
+    def gauges(self):
+        with self._lock:
+            return {
+                "sessions.tracked": len(self.sessions),
+                "sessions.degraded": sum(1 for record in self.sessions.values() if record["level"]),
+            }
+
+    def stats(self):
+        with self._lock:
+            agents = {agent: dict(counts) for agent, counts in self.agents.items()}
+            top = sorted(self.sessions.items(), key=lambda item: item[1]["tokens"], reverse=True)[:TOP_SESSIONS]
+            levels = Counter(LEVELS[record["level"]] for record in self.sessions.values())
+            return {
+                "budget_tokens": self.budget,
+                "prompt_tokens": sum(counts["prompt_tokens"] for counts in agents.values()),
+                "completion_tokens": sum(counts["completion_tokens"] for counts in agents.values()),
+                "agents": agents,
+                "tools": {tool: dict(counts) for tool, counts in self.tools.items()},
+                "models": dict(self.models),
+                "degraded_calls": dict(self.degraded),
+                "sessions": {
+                    "tracked": len(self.sessions),
+                    "by_level": dict(levels),
+                    "top": [{"session_id": session_id, "tokens": record["tokens"], "budget": record["budget"],
+                             "level": LEVELS[record["level"]]} for session_id, record in top],
+                },
+            }
+
+
+def trim_history(llm_request, keep_turns):
+    """Drop contents before the keep_turns-th newest customer message; returns how many were dropped."""
+    contents = llm_request.contents or []
+    starts = [i for i, content in enumerate(contents) if customer_message(content)]
+    if len(starts) <= keep_turns:
+        return 0
+    cut = starts[-keep_turns]
+    llm_request.contents = contents[cut:]
+    return cut
+
+
+class MeteredLlm(BaseLlm):
+    """Counts the tokens of every call to the wrapped model and applies the session's budget.
+
+    inner and cheap are models or model names; names are resolved through
+    ADK's model registry on first use. A model given as an object (a stub,
+    or replayed fixtures) only switches to a cheaper one if
+    BUDGET_FALLBACK_MODEL names it explicitly.
+    """
+
+    model: str = "metered"
+    inner: Any = None
+    cheap: Any = None
+    meter: Any = None
+
+    @classmethod
+    def wrap(cls, model, meter, cheap=None):
+        if isinstance(model, cls):
+            return model
+        if isinstance(model, str):
+            cheap = cheap or os.getenv(BUDGET_FALLBACK_MODEL_ENV, DEFAULT_FALLBACK_MODEL)
+            return cls(model=model, inner=model, meter=meter, cheap=cheap)
+        return cls(model=model.model, inner=model, meter=meter, cheap=cheap or os.getenv(BUDGET_FALLBACK_MODEL_ENV))
+
+    def resolve(self, field):
+        model = getattr(self, field)
+        if isinstance(model, str):
+            from google.adk.models.registry import LLMRegistry
+
+            model = LLMRegistry.new_llm(model)
+            setattr(self, field, model)
+        return model
+
+    async def generate_content_async(self, llm_request, stream=False):
+        session_id = _session.get()
+        agent = request_agent(llm_request)
+        level = self.meter.level(session_id)
+        if level >= 3:
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=BUDGET_REACHED_REPLY)]))
+            return
+        model = self.resolve("inner")
+        if level:
+            trim_history(llm_request, KEEP_TURNS)
+            if level >= 2 and self.cheap:
+                model = self.resolve("cheap")
+                llm_request.model = model.model
+        for result in tool_results(llm_request):
+            self.meter.record_tool(session_id, result["name"], len(canonical(result["response"])))
+        config = llm_request.config
+        instruction_tokens = estimate_tokens(str(config.system_instruction or "")) if config else 0
+
+        usage = None
+        try:
+            async for response in model.generate_content_async(llm_request, stream):
+                # Streamed chunks carry running totals; the last one seen wins
+                usage = response.usage_metadata or usage
+                yield response
+        finally:
+            self.meter.record_call(session_id, agent, model.model, usage, instruction_tokens)
+
+
+def meter_runner(runner, meter=None):
+    """Meter the runner's agent tree and tell the model which session each turn belongs to."""
+    meter = meter or get_meter()
+    if getattr(runner.run_async, "metered", False):
+        return runner
+    use_model(runner.agent, MeteredLlm.wrap(runner.agent.model, meter))
+    run_async = runner.run_async
+
+    def metered_run_async(*, user_id, session_id, **kwargs):
+        if not meter.has_session(session_id):
+            session = runner.session_service.get_session(
+                app_name=runner.app_name, user_id=user_id, session_id=session_id)
+            meter.open_session(session_id, session and session.state.get(SESSION_BUDGET_KEY))
+        return metered_turn(run_async(user_id=user_id, session_id=session_id, **kwargs), session_id)
+
+    metered_run_async.metered = True
+    runner.run_async = metered_run_async
+    return runner
+
+
+async def metered_turn(events, session_id):
+    """Pass a turn's events through with the session set only while ADK works on them."""
+    while True:
+        token = _session.set(session_id)
+        try:
+            event = await events.__anext__()
+        except StopAsyncIteration:
+            return
+        finally:
+            _session.reset(token)
+        yield event
+
+
+class StatsdPusher(threading.Thread):
+    """Pushes a meter's counter increments and gauges to a StatsD endpoint every interval."""
+
+    def __init__(self, meter, endpoint, interval=DEFAULT_INTERVAL_S):
+        super().__init__(name="token-metrics", daemon=True)
+        host, _, port = endpoint.rpartition(":")
+        self.address = (host or "127.0.0.1", int(port))
+        self.meter = meter
+        self.interval = interval
+        self.sent = {}
+        self.datagrams = 0
+        self._push_lock = threading.Lock()
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            self.push()
+
+    def lines(self):
+        counters = self.meter.counters()
+        lines = []
+        for name, value in counters.items():
+            delta = value - self.sent.get(name, 0)
+            if delta:
+                lines.append(f"{STATSD_PREFIX}.{name}:{delta}|c")
+        self.sent = counters
+        lines += [f"{STATSD_PREFIX}.{name}:{value}|g" for name, value in self.meter.gauges().items()]
+        return lines
+
+    def push(self):
+        """Send everything counted since the last push; a down endpoint only loses those increments."""
+        with self._push_lock:
+            datagram = ""
+            for line in self.lines():
+                if datagram and len(datagram) + len(line) + 1 > MAX_DATAGRAM:
+                    self._send(datagram)
+                    datagram = ""
+                datagram = f"{datagram}\n{line}" if datagram else line
+            if datagram:
+                self._send(datagram)
+
+    def _send(self, datagram):
+        try:
+            self._socket.sendto(datagram.encode("utf-8"), self.address)
+            self.datagrams += 1
+        except OSError as exc:
+            logger.debug("Could not push token metrics to %s:%d: %s", *self.address, exc)
+
+
+_meter = None
+_meter_lock = threading.Lock()
+
+
+def get_meter():
+    """The process-wide TokenMeter, pushing to METRICS_ENDPOINT if it is set."""
+    global _meter
+    if _meter is None:
+        with _meter_lock:
+            if _meter is None:
+                meter = TokenMeter(int(os.getenv(SESSION_TOKEN_BUDGET_ENV, "0") or 0))
+                endpoint = os.getenv(METRICS_ENDPOINT_ENV)
+                if endpoint:
+                    pusher = StatsdPusher(meter, endpoint,
+                                          float(os.getenv(METRICS_INTERVAL_ENV, DEFAULT_INTERVAL_S)))
+                    pusher.start()
+                    atexit.register(pusher.push)
+                    logger.info("Pushing token metrics to %s every %.0f s", endpoint, pusher.interval)
+                _meter = meter
+    return _meter
+
+
+class StatsdReceiver(asyncio.DatagramProtocol):
+    """Minimal local StatsD endpoint: sums counters and keeps the latest gauges per sender."""
+
+    def __init__(self):
+        self.counters = Counter()
+        self.gauges = defaultdict(dict)
+
+    def datagram_received(self, data, addr):
+        for line in data.decode("utf-8", "replace").splitlines():
+            name, _, rest = line.partition(":")
+            value, _, kind = rest.partition("|")
+            try:
+                number = float(value)
+            except ValueError:
+                continue
+            if kind.startswith("c"):
+                self.counters[name] += number
+            elif kind.startswith("g"):
+                self.gauges[name][addr] = number
+
+    def report(self):
+        print(f"\n{time.strftime('%H:%M:%S')}")
+        for name, value in sorted(self.counters.items()):
+            print(f"  {name:<72} {value:>14,.0f}")
+        for name, values in sorted(self.gauges.items()):
+            print(f"  {name:<72} {sum(values.values()):>14,.0f}")
+
+
+async def receive(host, port, interval):
+    receiver = StatsdReceiver()
+    transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+        lambda: receiver, local_addr=(host, port))
+    print(f"Listening for token metrics on udp://{host}:{port}")
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            receiver.report()
+    finally:
+        transport.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receive the token counters pushed to METRICS_ENDPOINT")
+    parser.add_argument("--listen", default="127.0.0.1:8125", help="host:port to receive StatsD on")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL_S, help="seconds between reports")
+    args = parser.parse_args()
+    host, _, port = args.listen.rpartition(":")
+    try:
+        asyncio.run(receive(host or "127.0.0.1", int(port), args.interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+# models/replay.py
+"""Record/replay model backend: real model responses captured once, served offline.
+
+Every turn of airline_assist_agent needs gemini-2.0-flash and the network,
+so nothing about the agent could be measured offline. RecordingLlm wraps
+the real model and appends each call to a JSONL fixture file: the response
+chunks as the model sent them (text, function calls, usage metadata) with
+the time each one arrived, plus the tool results the call was given.
+ReplayLlm serves those responses back for matching requests, either with
+the recorded timing scaled by latency_scale or with a fixed synthetic
+latency, so a benchmark measures the agent stack around the model.
+
+Requests are matched on (agent, turn, query, step): the agent's internal
+name from its system instruction, which customer message of the session
+this is, that message's text, and how many responses the agent has given
+since it; a request whose older turns were trimmed from its history falls
+back to the same key without the turn. Instructions, history and tool
+results are not part of the key, so session state and volatile tool output
+(timestamps, seat counts) do not break replay; tool results that differ
+from the recording are counted as drift instead. Prompt tokens are
+re-estimated from the actual request, scaled by the recorded
+tokens-per-character, so prompt changes show up in the counts; completion
+tokens are the recorded ones.
+
+Set MODEL_RECORD=calls.jsonl to record from server.py or main.py, or
+MODEL_REPLAY=benchmarks/data/fixtures to answer from fixtures instead.
+
+Run with: python -m customer_service_agent.models.replay benchmarks/data/fixtures
+"""
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Optional
+
+from google.adk.models import BaseLlm, LlmResponse
+from google.genai import types
+from pydantic import Field
+
+from .stub import CHARS_PER_TOKEN, request_text, use_model
+
+logger = logging.getLogger(__name__)
+
+MODEL_RECORD_ENV = "MODEL_RECORD"
+MODEL_REPLAY_ENV = "MODEL_REPLAY"
+REPLAY_LATENCY_SCALE_ENV = "REPLAY_LATENCY_SCALE"
+
+# ADK's identity instruction names the agent a request is for
+AGENT_NAME = re.compile(r'Your internal name is "([^"]+)"')
+# Other agents' turns reach a sub-agent as user messages with this prefix
+CONTEXT_PREFIX = "For context:"
+
+_write_lock = threading.Lock()
+
+
+class ReplayMiss(KeyError):
+    """No fixture matches a request made to a strict ReplayLlm."""
+
+
+def customer_message(content):
+    """The text of a content if it is a customer message, else ""."""
+    if content.role == "model":
+        return ""
+    text = "".join(part.text or "" for part in content.parts or [])
+    return "" if text.startswith(CONTEXT_PREFIX) else text
+
+
+def request_agent(llm_request):
+    """Name of the agent a request is for (or a fingerprint of its tools)."""
+    config = llm_request.config
+    match = AGENT_NAME.search(str(config.system_instruction or "")) if config else None
+    return match.group(1) if match else "tools:" + ",".join(sorted(llm_request.tools_dict or ()))
+
+
+def request_key(llm_request):
+    """(agent, turn, query, step) identifying a model call within a scripted session."""
+    turn, query, step = 0, "", 0
+    for content in llm_request.contents or []:
+        if content.role == "model":
+            step += 1
+            continue
+        text = customer_message(content)
+        if text:
+            turn, query, step = turn + 1, " ".join(text.split()), 0
+    return request_agent(llm_request), turn, query, step
+
+
+def tool_results(llm_request):
+    """Function responses the request carries after the agent's last model response."""
+    trailing = []
+    for content in reversed(llm_request.contents or []):
+        if content.role == "model":
+            break
+        trailing.append(content)
+    return [
+        {"name": part.function_response.name, "response": part.function_response.response}
+        for content in reversed(trailing)
+        for part in content.parts or []
+        if part.function_response
+    ]
+
+
+def canonical(value):
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def completion_tokens(content):
+    """Estimated output tokens of a response's text and function calls."""
+    chars = 0
+    for part in (content.parts if content else None) or []:
+        if part.text:
+            chars += len(part.text)
+        elif part.function_call:
+            chars += len(canonical({"name": part.function_call.name, "args": part.function_call.args}))
+    return chars // CHARS_PER_TOKEN + 1
+
+
+def fixture_files(paths):
+    files = []
+    for path in paths:
+        files += sorted(glob.glob(os.path.join(path, "*.jsonl"))) if os.path.isdir(path) else [path]
+    return files
+
+
+def load_fixtures(paths):
+    """Yield fixture entries from .jsonl files and directories of them."""
+    for path in fixture_files(paths):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class RecordingLlm(BaseLlm):
+    """Passes calls through to a real model and appends each one to a fixture file."""
+
+    model: str = "recording"
+    inner: Any = None
+    path: str = "calls.jsonl"
+
+    @classmethod
+    def wrap(cls, model, path):
+        """Record calls to model (a BaseLlm, or a model name such as "gemini-2.0-flash") into path."""
+        if isinstance(model, str):
+            from google.adk.models.registry import LLMRegistry
+
+            model = LLMRegistry.new_llm(model)
+        return cls(model=model.model, inner=model, path=path)
+
+    async def generate_content_async(self, llm_request, stream=False):
+        agent, turn, query, step = request_key(llm_request)
+        prompt_chars = len(request_text(llm_request))
+        results = tool_results(llm_request)
+        started = time.perf_counter()
+        responses = []
+        async for response in self.inner.generate_content_async(llm_request, stream):
+            responses.append({
+                "offset_ms": round((time.perf_counter() - started) * 1000, 1),
+                "response": response.model_dump(mode="json", exclude_none=True),
+            })
+            yield response
+        entry = {
+            "agent": agent, "turn": turn, "query": query, "step": step,
+            "model": self.model, "source": "recorded", "stream": stream,
+            "prompt_chars": prompt_chars, "tool_results": results, "responses": responses,
+        }
+        with _write_lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, default=str) + "\n")
+
+
+class ReplayLlm(BaseLlm):
+    """Answers from recorded fixtures instead of calling a model.
+
+    With latency unset, responses arrive at their recorded offsets times
+    latency_scale (0 replays instantly). With latency set, the first
+    response arrives after latency and each later chunk token_latency after
+    the one before. A request without a fixture raises ReplayMiss when
+    strict, and otherwise gets the fallback reply and counts as a miss.
+
+    stats counts calls, hits, misses and drift; tokens holds calls, prompt
+    and completion tokens per agent. reset() clears both.
+    """
+
+    model: str = "replay"
+    fixtures: dict = Field(default_factory=dict)
+    by_query: dict = Field(default_factory=dict)
+    latency_scale: float = 1.0
+    latency: Optional[float] = None
+    token_latency: float = 0.0
+    strict: bool = True
+    fallback: str = "I'm sorry, I can't help with that right now."
+    stats: Any = Field(default_factory=Counter)
+    tokens: Any = Field(default_factory=lambda: defaultdict(Counter))
+
+    @classmethod
+    def from_paths(cls, paths, **options):
+        """A ReplayLlm over every fixture in paths; the first entry for a key wins."""
+        fixtures = {}
+        for entry in load_fixtures(paths):
+            key = (entry["agent"], entry["turn"], " ".join(entry["query"].split()), entry["step"])
+            if key in fixtures:
+                logger.debug("Duplicate fixture for %s ignored", key)
+                continue
+            fixtures[key] = entry
+        by_query = {}
+        for (agent, turn, query, step), entry in fixtures.items():
+            by_query.setdefault((agent, query, step), entry)
+        return cls(fixtures=fixtures, by_query=by_query, **options)
+
+    def reset(self):
+        self.stats.clear()
+        self.tokens.clear()
+
+    def lookup(self, llm_request):
+        key = request_key(llm_request)
+        entry = self.fixtures.get(key) or self.by_query.get((key[0], key[2], key[3]))
+        self.stats["calls"] += 1
+        if entry is None:
+            self.stats["misses"] += 1
+            if self.strict:
+                raise ReplayMiss(key)
+            logger.warning("No fixture for %s, turn %d, step %d: %r", key[0], key[1], key[3], key[2])
+            reply = LlmResponse(content=types.Content(role="model", parts=[types.Part(text=self.fallback)]))
+            return key[0], {"responses": [{"offset_ms": 0.0, "response": reply.model_dump(mode="json",
+                                                                                         exclude_none=True)}]}
+        self.stats["hits"] += 1
+        if "tool_results" in entry and canonical(entry["tool_results"]) != canonical(tool_results(llm_request)):
+            self.stats["drift"] += 1
+        return key[0], entry
+
+    def usage(self, entry, llm_request, final):
+        recorded = final.usage_metadata
+        prompt_chars = len(request_text(llm_request))
+        if recorded and recorded.prompt_token_count and entry.get("prompt_chars"):
+            prompt_tokens = max(1, round(recorded.prompt_token_count * prompt_chars / entry["prompt_chars"]))
+        else:
+            prompt_tokens = prompt_chars // CHARS_PER_TOKEN + 1
+        output_tokens = (recorded and recorded.candidates_token_count) or completion_tokens(final.content)
+        return types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+
+    async def generate_content_async(self, llm_request, stream=False):
+        agent, entry = self.lookup(llm_request)
+        recorded = [r for r in entry["responses"] if stream or not r["response"].get("partial")]
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        due = 0.0
+        for i, chunk in enumerate(recorded):
+            if self.latency is None:
+                due = chunk.get("offset_ms", 0.0) / 1000 * self.latency_scale
+            else:
+                due = self.latency if i == 0 else due + self.token_latency
+            wait = due - (loop.time() - started)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            response = LlmResponse.model_validate(chunk["response"])
+            if i == len(recorded) - 1:
+                response.usage_metadata = self.usage(entry, llm_request, response)
+                counts = self.tokens[agent]
+                counts["calls"] += 1
+                counts["prompt"] += response.usage_metadata.prompt_token_count
+                counts["completion"] += response.usage_metadata.candidates_token_count
+            yield response
+
+
+def configure_model(agent):
+    """Point agent and its sub-agents at a replay or recording model when MODEL_REPLAY/MODEL_RECORD is set."""
+    replay = os.getenv(MODEL_REPLAY_ENV)
+    record = os.getenv(MODEL_RECORD_ENV)
+    if replay:
+        model = ReplayLlm.from_paths(replay.split(os.pathsep), strict=False,
+                                     latency_scale=float(os.getenv(REPLAY_LATENCY_SCALE_ENV, "1")))
+        logger.info("Replaying %d model fixtures from %s", len(model.fixtures), replay)
+        use_model(agent, model)
+    elif record:
+        use_model(agent, RecordingLlm.wrap(agent.model, record))
+        logger.info("Recording model calls to %s", record)
+    return agent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize model fixture files")
+    parser.add_argument("paths", nargs="+", help="fixture .jsonl files, or directories of them")
+    args = parser.parse_args()
+
+    for path in fixture_files(args.paths):
+        entries = list(load_fixtures([path]))
+        agents = Counter(entry["agent"] for entry in entries)
+        sources = Counter(entry.get("source", "recorded") for entry in entries)
+        calls = Counter()
+        output_tokens = model_ms = 0
+        for entry in entries:
+            final = LlmResponse.model_validate(entry["responses"][-1]["response"])
+            output_tokens += (final.usage_metadata and final.usage_metadata.candidates_token_count
+                              ) or completion_tokens(final.content)
+            model_ms += entry["responses"][-1].get("offset_ms", 0.0)
+            calls.update(part.function_call.name for part in (final.content.parts if final.content else None) or []
+                         if part.function_call)
+        print(f"\n{path}: {len(entries)} model calls over {max((e['turn'] for e in entries), default=0)} turns "
+              f"({', '.join(f'{n} {source}' for source, n in sources.items())})")
+        print(f"  recorded model time {model_ms / 1000:.2f} s, {output_tokens:,} completion tokens")
+        for agent, n in agents.most_common():
+            print(f"  {agent:<32} {n:>4} calls")
+        for name, n in calls.most_common():
+            print(f"  -> {name:<29} {n:>4} calls")
+
+
+if __name__ == "__main__":
+    main()
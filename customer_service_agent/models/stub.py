@@ -0,0 +1,119 @@
+# models/stub.py
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any
+
+from google.adk.models import BaseLlm, LlmResponse
+from google.genai import types
+
+CHARS_PER_TOKEN = 4
+
+
+class PrefixCache:
+    """Simulated provider-side prompt prefix cache.
+
+    Providers cache prompts in fixed-size blocks: a request is billed as
+    cached for every leading block that matches an earlier request exactly,
+    up to the first difference. Blocks are keyed by a chained hash, so a
+    change anywhere invalidates that block and everything after it. Prompts
+    shorter than min_tokens are never cached.
+    """
+
+    def __init__(self, block_tokens=128, min_tokens=1024, capacity=100_000):
+        self.block_chars = block_tokens * CHARS_PER_TOKEN
+        self.min_chars = min_tokens * CHARS_PER_TOKEN
+        self.capacity = capacity
+        self.blocks = OrderedDict()
+
+    def lookup(self, text):
+        """Return (prompt_tokens, cached_tokens) for text, then cache its blocks."""
+        total = len(text) // CHARS_PER_TOKEN + 1
+        if len(text) < self.min_chars:
+            return total, 0
+        cached_chars, digest, hit = 0, b"", True
+        for start in range(0, len(text) - self.block_chars + 1, self.block_chars):
+            digest = hashlib.blake2b(digest + text[start:start + self.block_chars].encode("utf-8"),
+                                     digest_size=16).digest()
+            if hit and digest in self.blocks:
+                self.blocks.move_to_end(digest)
+                cached_chars += self.block_chars
+                continue
+            hit = False
+            self.blocks[digest] = True
+            if len(self.blocks) > self.capacity:
+                self.blocks.popitem(last=False)
+        return total, min(total, cached_chars // CHARS_PER_TOKEN)
+
+
+def request_text(llm_request):
+    """The prompt as the provider sees it: system instruction, then the conversation."""
+    config = llm_request.config
+    chunks = [str(config.system_instruction or "")] if config else []
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            chunks.append(part.text or str(part.function_call or part.function_response or ""))
+    return "\n".join(chunks)
+
+
+class StubLlm(BaseLlm):
+    """Local stand-in for gemini-2.0-flash used by benchmarks and offline runs.
+
+    Replies with a canned answer after a fixed synthetic latency so load tests
+    measure the serving stack rather than the network. When streaming, the
+    reply is emitted word by word with token_latency between chunks, followed
+    by the aggregated response the way Gemini's SSE mode behaves.
+
+    Responses carry usage metadata. With a PrefixCache attached, prompt
+    tokens served from the cache are reported as cached_content_token_count
+    and cost cached_prefill_latency instead of prefill_latency.
+    """
+
+    model: str = "stub-llm"
+    latency: float = 0.05
+    token_latency: float = 0.005
+    prefill_latency: float = 0.0
+    cached_prefill_latency: float = 0.0
+    prefix_cache: Any = None
+    reply: str = "Thank you for contacting AirlineAssist Pro. How can I help you today?"
+
+    def usage(self, llm_request):
+        text = request_text(llm_request)
+        if self.prefix_cache is not None:
+            prompt_tokens, cached_tokens = self.prefix_cache.lookup(text)
+        else:
+            prompt_tokens, cached_tokens = len(text) // CHARS_PER_TOKEN + 1, 0
+        return types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            cached_content_token_count=cached_tokens,
+            candidates_token_count=len(self.reply) // CHARS_PER_TOKEN + 1,
+        )
+
+    async def generate_content_async(self, llm_request, stream=False):
+        usage = self.usage(llm_request)
+        cached = usage.cached_content_token_count
+        await asyncio.sleep(self.latency + (usage.prompt_token_count - cached) * self.prefill_latency
+                            + cached * self.cached_prefill_latency)
+        if stream:
+            words = self.reply.split(" ")
+            for i, word in enumerate(words):
+                chunk = word if i == len(words) - 1 else word + " "
+                yield LlmResponse(
+                    content=types.Content(role="model", parts=[types.Part(text=chunk)]),
+                    partial=True,
+                )
+                await asyncio.sleep(self.token_latency)
+        else:
+            await asyncio.sleep(self.token_latency * len(self.reply.split(" ")))
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=self.reply)]),
+            usage_metadata=usage,
+        )
+
+
+def use_model(agent, model):
+    """Point an agent and all of its sub-agents at the given model."""
+    agent.model = model
+    for sub_agent in agent.sub_agents:
+        use_model(sub_agent, model)
+    return agent
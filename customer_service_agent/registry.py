@@ -0,0 +1,167 @@
+# customer_service_agent/registry.py
+"""Lazy sub-agent registry for the orchestrator.
+
+Each specialist module builds its Agent, its Tool objects and a long
+instruction string at import time, and pulls in its backing store (schedule
+index, seat inventory, miles ledger, fare rules). Importing all seven up
+front made every cold start pay for specialists most sessions never reach.
+
+The orchestrator only needs a sub-agent's name and description to route,
+so each one is declared here as a LazySubAgent placeholder. The placeholder
+imports its module and hands the turn to the real agent the first time it is
+transferred to; after that it just delegates. LazyTools does the same for the
+tool map behind parallel_lookup.
+
+Set SUBAGENT_LOADING=eager to import everything at startup instead, e.g. on
+long-lived instances that would rather pay at boot than on a first turn.
+"""
+import importlib
+import logging
+import os
+import time
+from collections.abc import Mapping
+from typing import Any, AsyncGenerator
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+
+from .tracing import agent_load, trace_agent, trace_tool
+
+logger = logging.getLogger(__name__)
+
+SUBAGENT_LOADING_ENV = "SUBAGENT_LOADING"
+PACKAGE = __package__
+
+# target -> (agent, load time in ms). Kept at module level because ADK may run
+# a model_copy of the placeholder, whose own state would not write back.
+_loaded = {}
+
+# name, description and "module:attribute" of every specialist, in routing order
+SUB_AGENTS = (
+    ("flight_operations", "Specialized agent for flight operations and real-time information",
+     ".sub_agents.flight_operations_agent.agent:flight_operations_agent"),
+    ("booking_management", "Specialized agent for flight bookings and reservations",
+     ".sub_agents.booking_management_agent.agent:booking_management_agent"),
+    ("baggage_services", "Specialized agent for baggage tracking, claims, and policies",
+     ".sub_agents.baggage_services_agent.agent:baggage_services_agent"),
+    ("policy_billing", "Specialized agent for fare rules, refunds, change fees and billing",
+     ".sub_agents.policy_billing_agent.agent:policy_billing_agent"),
+    ("loyalty_program", "Specialized agent for frequent flyer program management",
+     ".sub_agents.loyalty_program_agent.agent:loyalty_program_agent"),
+    ("emergency_response", "Specialized agent for crisis management and emergency situations",
+     ".sub_agents.emergency_response_agent.agent:emergency_response_agent"),
+    ("language_cultural", "Specialized agent for language support and cultural guidance",
+     ".sub_agents.language_cultural_agent.agent:language_cultural_agent"),
+)
+
+
+def load_object(target):
+    """Import "module:attribute" (module relative to this package) and return the attribute."""
+    module_name, attribute = target.split(":")
+    return getattr(importlib.import_module(module_name, PACKAGE), attribute)
+
+
+class LazySubAgent(BaseAgent):
+    """Routing placeholder that materializes its specialist on first use.
+
+    On load the real agent takes the placeholder's slot in the parent's
+    sub_agents, so later transfers and resumed sessions reach it directly.
+    The placeholder derives from BaseAgent because a new Agent subclass costs
+    more to define (pydantic schema build) than the imports it saves.
+    """
+
+    target: str
+    model: Any = ""
+
+    @property
+    def loaded(self):
+        return self.target in _loaded
+
+    def load(self):
+        entry = _loaded.get(self.target)
+        if entry is None:
+            started = time.perf_counter()
+            with agent_load(self.name):
+                agent = load_object(self.target)
+            if agent.name != self.name:
+                raise ValueError(f"{self.target} is named {agent.name!r}, registered as {self.name!r}")
+            if self.model:
+                agent.model = self.model
+            trace_agent(agent)
+            parent = self.parent_agent
+            if parent is not None:
+                agent.parent_agent = parent
+                slots = [i for i, sub_agent in enumerate(parent.sub_agents) if sub_agent.name == self.name]
+                for i in slots:
+                    parent.sub_agents[i] = agent
+            entry = _loaded[self.target] = (agent, (time.perf_counter() - started) * 1000)
+            logger.info("Loaded sub-agent %s in %.1f ms", self.name, entry[1])
+        return entry[0]
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        async for event in self.load().run_async(ctx):
+            yield event
+
+    async def _run_live_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        async for event in self.load().run_live(ctx):
+            yield event
+
+
+class LazyTools(Mapping):
+    """A name -> Tool mapping whose tools are imported on first lookup.
+
+    after_tool_callbacks(name) returns the callbacks of the specialist that
+    owns a tool, so tools run outside that agent still update its state.
+    """
+
+    def __init__(self, targets):
+        self.targets = dict(targets)
+        self._tools = {}
+        self._callbacks = {}
+
+    def __getitem__(self, name):
+        tool = self._tools.get(name)
+        if tool is None:
+            tool = self._tools[name] = trace_tool(load_object(self.targets[name]))
+        return tool
+
+    def __iter__(self):
+        return iter(self.targets)
+
+    def __len__(self):
+        return len(self.targets)
+
+    def after_tool_callbacks(self, name):
+        callbacks = self._callbacks.get(name)
+        if callbacks is None:
+            module = self.targets[name].split(":")[0]
+            owners = [target for _, _, target in SUB_AGENTS if target.split(":")[0] == module]
+            callback = load_object(owners[0]).after_tool_callback if owners else None
+            if callback is None:
+                callbacks = []
+            else:
+                callbacks = list(callback) if isinstance(callback, (list, tuple)) else [callback]
+            self._callbacks[name] = callbacks
+        return callbacks
+
+    def __contains__(self, name):
+        return name in self.targets
+
+
+def lazy_sub_agents():
+    return [LazySubAgent(name=name, description=description, target=target)
+            for name, description, target in SUB_AGENTS]
+
+
+def preload(agents, force=False):
+    """Materialize every placeholder now when SUBAGENT_LOADING=eager (or force is set)."""
+    if force or os.getenv(SUBAGENT_LOADING_ENV, "lazy") == "eager":
+        for agent in list(agents):
+            if isinstance(agent, LazySubAgent):
+                agent.load()
+
+
+def loading_stats():
+    """Load time in ms of every specialist materialized so far."""
+    return {agent.name: round(load_ms, 1) for agent, load_ms in _loaded.values()}
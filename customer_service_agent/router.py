@@ -0,0 +1,394 @@
+# customer_service_agent/router.py
+"""Local intent pre-router for the orchestrator.
+
+Most customer messages name their topic outright ("where is my bag",
+"flight AA123 status"), so asking gemini-2.0-flash which sub-agent should
+handle them costs a model round-trip for an answer we can compute locally.
+IntentRouter scores a message with a compiled keyword trie and a small hashed
+TF-IDF centroid model; `pre_route` plugs it into the orchestrator as a
+before_model_callback and answers with a transfer_to_agent call when the
+classifier is confident, skipping the LLM hop. Anything ambiguous falls
+through to the orchestrator model unchanged.
+"""
+import re
+import time
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+from google.adk.models import LlmResponse
+from google.genai import types
+
+from .models.replay import CONTEXT_PREFIX
+
+AGENT_NAMES = (
+    "flight_operations",
+    "booking_management",
+    "baggage_services",
+    "policy_billing",
+    "loyalty_program",
+    "emergency_response",
+    "language_cultural",
+)
+
+# Keyword phrases and weights per sub-agent, following the orchestrator's
+# "Routing Guidelines". Multi-word phrases win over their single-word parts.
+ROUTING_KEYWORDS = {
+    "flight_operations": {
+        "flight status": 3, "status of flight": 3, "status of my flight": 3,
+        "<flight_no>": 1, "on time": 2, "delayed": 1, "delay": 1, "gate": 2,
+        "departure time": 2, "arrival time": 2, "departs": 1, "arrives": 1,
+        "land": 1, "landing": 1, "boarding time": 2, "weather": 2,
+        "search flights": 3, "find a flight": 3, "flights from": 3, "flights to": 2,
+        "cheapest flight": 3, "nonstop": 2, "terminal": 2, "airport parking": 3,
+        "parking": 2, "security wait": 3, "tsa": 2, "schedule": 1,
+    },
+    "booking_management": {
+        "book": 2, "book a flight": 3, "booking": 1, "reservation": 2,
+        "change my flight": 2, "change my booking": 3, "modify my booking": 3,
+        "cancel my booking": 2, "cancel my reservation": 2, "seat": 3,
+        "seats": 3, "window seat": 3, "aisle seat": 3, "exit row": 3,
+        "sit together": 3, "meal": 2, "vegetarian": 2, "wheelchair": 3,
+        "pet": 2, "unaccompanied minor": 3, "add a passenger": 3,
+        "name on my ticket": 3, "group booking": 3, "special assistance": 2,
+    },
+    "baggage_services": {
+        "bag": 3, "bags": 3, "baggage": 3, "luggage": 3, "suitcase": 3,
+        "<bag_tag>": 3, "carry on": 2, "checked bag": 3, "lost": 1,
+        "damaged": 1, "golf clubs": 3, "skis": 3, "surfboard": 3, "bike": 2,
+        "stroller": 2, "instrument": 2, "baggage claim": 3, "overweight": 2,
+    },
+    "policy_billing": {
+        "refund": 3, "refunds": 3, "refundable": 3, "fee": 2, "fees": 2,
+        "change fee": 3, "penalty": 2, "fare rules": 3, "fare": 1, "charged": 2, "charge": 1,
+        "payment": 2, "billing": 3, "invoice": 3, "receipt": 2,
+        "insurance": 3, "travel insurance": 3, "dispute": 2, "twice": 1,
+        "credit card": 1, "money back": 3, "basic economy": 1,
+    },
+    "loyalty_program": {
+        "miles": 3, "mileage": 3, "points": 2, "award": 2, "redeem": 3,
+        "redemption": 3, "frequent flyer": 3, "loyalty": 3, "elite": 2,
+        "elite status": 3, "status match": 3, "tier": 2, "gold": 2,
+        "platinum": 2, "silver": 2, "diamond": 2, "member": 1,
+        "membership": 2, "lounge access": 2, "companion certificate": 3,
+        "transfer miles": 3, "status benefits": 3,
+    },
+    "emergency_response": {
+        "emergency": 4, "medical": 3, "stranded": 4, "cancelled": 2,
+        "canceled": 2, "flight was cancelled": 4, "flight was canceled": 4,
+        "hurricane": 3, "storm": 2, "snowstorm": 3, "strike": 3,
+        "evacuation": 4, "airport closed": 4, "airport is closed": 4,
+        "diverted": 3, "missed my connection": 3, "missed connection": 3,
+        "travel advisory": 3, "advisory": 2, "urgent": 2, "heart attack": 4,
+        "ill": 1, "hotel voucher": 2,
+    },
+    "language_cultural": {
+        "visa": 4, "passport": 2, "translate": 4, "translation": 3,
+        "language": 3, "speak": 1, "spanish": 2, "french": 2, "german": 2,
+        "japanese": 2, "chinese": 2, "arabic": 2, "customs": 2, "culture": 3,
+        "cultural": 3, "etiquette": 3, "tipping": 3, "time zone": 3,
+        "time difference": 3, "jet lag": 3, "entry requirements": 3, "esta": 3,
+    },
+}
+
+# Labelled utterances used to fit the similarity centroids. Kept disjoint from
+# the evaluation set in benchmarks/data/routing_queries.csv.
+TRAINING_EXAMPLES = {
+    "flight_operations": [
+        "is my flight on time",
+        "what gate does my flight leave from",
+        "has flight UA220 been delayed",
+        "what time does the plane land in denver",
+        "show me flights from boston to chicago tomorrow",
+        "how is the weather at o'hare",
+        "which terminal is the lounge in at heathrow",
+        "when does boarding start for my flight",
+        "how long is the security line at lax",
+    ],
+    "booking_management": [
+        "i want to book a ticket to miami",
+        "can i change my flight to an earlier one",
+        "please pick a window seat for me",
+        "can my family sit together on the flight",
+        "i need a wheelchair at the airport",
+        "request a vegetarian meal for my trip",
+        "can i bring my dog in the cabin",
+        "add my son to the reservation",
+        "cancel my reservation for next week",
+    ],
+    "baggage_services": [
+        "my suitcase did not arrive",
+        "where is my luggage",
+        "the airline damaged my bag",
+        "how much does a second checked bag cost",
+        "can i bring golf clubs on the plane",
+        "what size carry on is allowed",
+        "my bag is delayed when will it be delivered",
+        "file a claim for lost baggage",
+    ],
+    "policy_billing": [
+        "can i get a refund for my ticket",
+        "how much is the change fee",
+        "i was charged twice for my booking",
+        "what are the fare rules for basic economy",
+        "does my ticket include travel insurance",
+        "i need a receipt for my expense report",
+        "is my fare refundable",
+        "dispute a charge on my credit card",
+    ],
+    "loyalty_program": [
+        "how many miles do i have",
+        "use my points for an upgrade",
+        "what benefits does gold status give me",
+        "how close am i to platinum",
+        "transfer miles to my wife's account",
+        "my miles from last trip are missing",
+        "can i access the lounge with my status",
+        "redeem an award ticket to tokyo",
+    ],
+    "emergency_response": [
+        "my flight was cancelled and i am stuck at the airport",
+        "there is a medical emergency on board",
+        "the airport is closed because of the storm",
+        "i missed my connection and need a hotel",
+        "is it safe to travel there right now",
+        "a hurricane is coming what do i do",
+        "pilots are on strike how do i get home",
+        "my flight diverted to another city",
+    ],
+    "language_cultural": [
+        "do i need a visa to visit india",
+        "can you help me in spanish",
+        "translate this message into french",
+        "what is the tipping custom in japan",
+        "what is the time difference between new york and tokyo",
+        "how do i avoid jet lag",
+        "what documents do i need to enter brazil",
+        "what should i wear when visiting temples",
+    ],
+}
+
+# Two-letter words that precede numbers in ordinary sentences ("in 2025", "at 10")
+NOT_AIRLINES = "in|on|at|to|by"
+# Matched on the original text: an upper-case designator ("AA 123", "B6 45"),
+# or a lower-case one written without a space ("aa123")
+FLIGHT_NUMBER_PATTERN = re.compile(
+    rf"\b(?!(?i:{NOT_AIRLINES})\s?\d)(?:[A-Z][A-Z0-9]|\d[A-Z])\s?\d{{1,4}}\b"
+    rf"|\b(?!(?:{NOT_AIRLINES})\d)[a-z]{{2}}\d{{2,4}}\b"
+)
+BAG_TAG_PATTERN = re.compile(r"\b[a-z]{2}\d{6}\b", re.IGNORECASE)
+TOKEN_PATTERN = re.compile(r"<[a-z_]+>|[a-z0-9']+")
+
+
+def tokenize(text):
+    """Lower-case word tokens with bag tags and flight numbers replaced by markers."""
+    text = BAG_TAG_PATTERN.sub(" <bag_tag> ", text)
+    text = FLIGHT_NUMBER_PATTERN.sub(" <flight_no> ", text)
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class KeywordTrie:
+    """Token-level trie over keyword phrases with longest-match scanning."""
+
+    _END = None
+
+    def __init__(self):
+        self.root = {}
+
+    @classmethod
+    def compile(cls, keywords):
+        """Build a trie from {agent: {phrase: weight}}."""
+        trie = cls()
+        for agent, phrases in keywords.items():
+            for phrase, weight in phrases.items():
+                node = trie.root
+                for token in tokenize(phrase):
+                    node = node.setdefault(token, {})
+                node.setdefault(cls._END, []).append((agent, weight))
+        return trie
+
+    def scan(self, tokens):
+        """Yield (agent, weight) for each longest phrase match in the token list."""
+        i = 0
+        while i < len(tokens):
+            node, j, match, match_end = self.root, i, None, i + 1
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if self._END in node:
+                    match, match_end = node[self._END], j
+            if match:
+                yield from match
+                i = match_end
+            else:
+                i += 1
+
+
+class SimilarityModel:
+    """Hashed TF-IDF features with one L2-normalized centroid per agent.
+
+    Features are word unigrams, bigrams and padded character trigrams, hashed
+    into a fixed-size vector so scoring a batch is a single matrix product.
+    """
+
+    def __init__(self, dim=4096):
+        self.dim = dim
+        self.idf = np.ones(dim, dtype=np.float32)
+        self.centroids = np.zeros((len(AGENT_NAMES), dim), dtype=np.float32)
+
+    def _features(self, tokens):
+        feats = list(tokens)
+        feats += [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for token in tokens:
+            padded = f"#{token}#"
+            feats += [padded[k:k + 3] for k in range(len(padded) - 2)]
+        return [zlib.crc32(f.encode()) % self.dim for f in feats]
+
+    def _matrix(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            np.add.at(matrix[row], self._features(tokenize(text)), 1.0)
+        return matrix
+
+    @staticmethod
+    def _normalize(matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-9)
+
+    def fit(self, examples):
+        texts = [t for agent in AGENT_NAMES for t in examples[agent]]
+        labels = [i for i, agent in enumerate(AGENT_NAMES) for _ in examples[agent]]
+        counts = self._matrix(texts)
+        df = np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+        weighted = self._normalize(counts * self.idf)
+        for i in range(len(AGENT_NAMES)):
+            self.centroids[i] = weighted[np.asarray(labels) == i].mean(axis=0)
+        self.centroids = self._normalize(self.centroids)
+        return self
+
+    def scores(self, texts):
+        """Cosine similarity of each text to each agent centroid, shape (n, agents)."""
+        return self._normalize(self._matrix(texts) * self.idf) @ self.centroids.T
+
+
+@dataclass
+class RouteDecision:
+    agent_name: str
+    confidence: float
+    method: str
+    elapsed_ms: float = 0.0
+
+    @property
+    def routed(self):
+        return self.method != "fallback"
+
+
+class IntentRouter:
+    """Combines keyword and similarity scores into a routing decision.
+
+    The keyword share (top agent's fraction of all keyword weight) and the
+    similarity share are blended; a message is routed only when the blended
+    confidence reaches min_confidence and the runner-up trails by min_margin.
+    """
+
+    def __init__(
+        self,
+        keywords=ROUTING_KEYWORDS,
+        examples=TRAINING_EXAMPLES,
+        min_confidence=0.55,
+        min_margin=0.2,
+        keyword_weight=0.7,
+    ):
+        self.trie = KeywordTrie.compile(keywords)
+        self.similarity = SimilarityModel().fit(examples)
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+        self.keyword_weight = keyword_weight
+        self._index = {name: i for i, name in enumerate(AGENT_NAMES)}
+
+    def _keyword_scores(self, text):
+        scores = np.zeros(len(AGENT_NAMES), dtype=np.float32)
+        for agent, weight in self.trie.scan(tokenize(text)):
+            scores[self._index[agent]] += weight
+        return scores
+
+    def classify_many(self, texts):
+        """Route a batch of messages; similarity is scored in one matrix product."""
+        started = time.perf_counter()
+        similarity = np.clip(self.similarity.scores(texts), 0.0, None)
+        decisions = []
+        for text, sim in zip(texts, similarity):
+            keyword = self._keyword_scores(text)
+            keyword_share = keyword / keyword.sum() if keyword.sum() else keyword
+            sim_share = sim / sim.sum() if sim.sum() else sim
+            blended = self.keyword_weight * keyword_share + (1 - self.keyword_weight) * sim_share
+            # Without any keyword hit the similarity model alone must be sure.
+            if not keyword.any():
+                blended = blended * 0.8
+            first, second = np.argsort(blended)[::-1][:2]
+            confidence = float(blended[first])
+            if confidence >= self.min_confidence and confidence - blended[second] >= self.min_margin:
+                method = "keyword" if keyword.any() else "similarity"
+                decisions.append(RouteDecision(AGENT_NAMES[first], confidence, method))
+            else:
+                decisions.append(RouteDecision(AGENT_NAMES[first], confidence, "fallback"))
+        elapsed_ms = (time.perf_counter() - started) * 1000 / max(len(texts), 1)
+        for decision in decisions:
+            decision.elapsed_ms = elapsed_ms
+        return decisions
+
+    def classify(self, text):
+        return self.classify_many([text])[0]
+
+
+intent_router = IntentRouter()
+
+
+def _user_text(content):
+    if not content or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text)
+
+
+def pre_route(callback_context, llm_request):
+    """before_model_callback for the orchestrator.
+
+    On the first model call of a turn, answer with a transfer_to_agent call
+    when the local router is confident; return None to let the LLM decide.
+    A specialist transferring back shows up as a "For context:" user
+    message; that call is left to the LLM so the turn is not sent straight
+    back to the agent that declined it.
+    """
+    contents = llm_request.contents
+    if not contents or contents[-1].role != "user":
+        return None
+    if any(part.function_response for part in contents[-1].parts or []):
+        return None
+    if _user_text(contents[-1]).startswith(CONTEXT_PREFIX):
+        return None
+
+    text = _user_text(callback_context.user_content)
+    if not text:
+        return None
+    decision = intent_router.classify(text)
+    callback_context.state["last_route"] = {
+        "agent": decision.agent_name,
+        "confidence": round(decision.confidence, 3),
+        "method": decision.method,
+    }
+    if not decision.routed:
+        return None
+    return LlmResponse(
+        content=types.Content(
+            role="model",
+            parts=[
+                types.Part(
+                    function_call=types.FunctionCall(
+                        name="transfer_to_agent",
+                        args={"agent_name": decision.agent_name},
+                    )
+                )
+            ],
+        )
+    )
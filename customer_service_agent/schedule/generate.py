@@ -0,0 +1,166 @@
+# customer_service_agent/schedule/generate.py
+"""Synthetic SSIM-like schedule generator.
+
+Run with: python -m customer_service_agent.schedule.generate --legs 500000 --out data/schedule.csv
+
+Builds a hub-and-spoke network: real major airports act as hubs with dense
+banks of flights between them, synthetic "Q"-coded spoke airports connect to
+two or three hubs, and each route is flown on every day of the period. Block
+times come from great-circle distance, so connections are geographically
+plausible. Departures are fixed in local time, and UTC offsets come from the
+airport time zone table, so they follow daylight saving time (spokes use
+their hub's zone). One CSV row is one operated leg on one date.
+"""
+import argparse
+import csv
+import math
+import os
+import random
+from datetime import date, timedelta
+
+import numpy as np
+
+from .store import EPOCH, MINUTES_PER_DAY
+from .timezones import get_timezone_table
+
+CSV_COLUMNS = (
+    "airline", "flight_number", "date", "origin", "destination",
+    "departure", "arrival", "arrival_day_offset",
+    "dep_utc_offset", "arr_utc_offset", "aircraft", "seats", "fare",
+)
+
+# IATA code, latitude, longitude, standard UTC offset in minutes (offsets used for
+# the schedule come from the time zone table, which applies DST)
+HUB_AIRPORTS = [
+    ("ATL", 33.64, -84.43, -300), ("DFW", 32.90, -97.04, -360), ("DEN", 39.86, -104.67, -420),
+    ("ORD", 41.98, -87.90, -360), ("LAX", 33.94, -118.41, -480), ("JFK", 40.64, -73.78, -300),
+    ("LAS", 36.08, -115.15, -480), ("MCO", 28.43, -81.31, -300), ("MIA", 25.79, -80.29, -300),
+    ("CLT", 35.21, -80.94, -300), ("SEA", 47.45, -122.31, -480), ("PHX", 33.43, -112.01, -420),
+    ("EWR", 40.69, -74.17, -300), ("SFO", 37.62, -122.38, -480), ("IAH", 29.98, -95.34, -360),
+    ("BOS", 42.36, -71.01, -300), ("MSP", 44.88, -93.22, -360), ("DTW", 42.21, -83.35, -300),
+    ("PHL", 39.87, -75.24, -300), ("LGA", 40.78, -73.87, -300), ("YYZ", 43.68, -79.63, -300),
+    ("MEX", 19.44, -99.07, -360), ("LHR", 51.47, -0.45, 0), ("CDG", 49.01, 2.55, 60),
+    ("FRA", 50.03, 8.56, 60), ("AMS", 52.31, 4.76, 60), ("MAD", 40.47, -3.56, 60),
+    ("DXB", 25.25, 55.36, 240), ("NRT", 35.77, 140.39, 540), ("HND", 35.55, 139.78, 540),
+    ("SIN", 1.36, 103.99, 480), ("HKG", 22.31, 113.91, 480), ("SYD", -33.94, 151.18, 600),
+    ("GRU", -23.43, -46.47, -180),
+]
+AIRLINES = ["AA", "UA", "DL", "BA", "LH", "AF"]
+AIRCRAFT = [("E175", 76), ("A320", 150), ("B738", 172), ("A321", 190), ("B789", 290), ("A359", 300)]
+
+
+def great_circle_km(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[1], a[2], b[1], b[2]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(h))
+
+
+def spoke_airports(count, rng):
+    """Synthetic regional airports scattered around the hubs, each tagged with its hub's code."""
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    codes = [f"Q{a}{b}" for a in letters for b in letters][:count]
+    spokes = []
+    for code in codes:
+        hub = rng.choice(HUB_AIRPORTS)
+        spokes.append((code, hub[1] + rng.uniform(-6, 6), hub[2] + rng.uniform(-8, 8), hub[3], hub[0]))
+    return spokes
+
+
+def zone_code(airport):
+    """Airport whose time zone applies: the hub for a spoke, else the airport itself."""
+    return airport[4] if len(airport) > 4 else airport[0]
+
+
+def build_routes(spokes, rng):
+    """(origin, destination) airport tuples, each direction listed once."""
+    routes = []
+    for i, a in enumerate(HUB_AIRPORTS):
+        for b in HUB_AIRPORTS[i + 1:]:
+            if great_circle_km(a, b) < 9000 or rng.random() < 0.3:
+                routes += [(a, b), (b, a)]
+    for spoke in spokes:
+        hubs = sorted(HUB_AIRPORTS, key=lambda hub: great_circle_km(spoke, hub))[: rng.randint(2, 3)]
+        for hub in hubs:
+            routes += [(spoke, hub), (hub, spoke)]
+    return routes
+
+
+def generate(legs, days=14, start=date(2026, 3, 1), spokes=400, seed=7):
+    """Yield CSV rows totalling roughly `legs` legs over `days` days."""
+    rng = random.Random(seed)
+    routes = build_routes(spoke_airports(spokes, rng), rng)
+    per_day = max(1, legs // days)
+    # Hub-to-hub routes get proportionally more frequencies than spoke routes
+    weights = [1.0 if o[0].startswith("Q") or d[0].startswith("Q") else 3.0 for o, d in routes]
+    scale = per_day / sum(weights)
+
+    table = get_timezone_table()
+    day_starts = ((start - EPOCH).days + np.arange(days)) * MINUTES_PER_DAY
+    flight_numbers = {}
+    for (origin, destination), weight in zip(routes, weights):
+        km = great_circle_km(origin, destination)
+        block = int(35 + km / 13.5)  # minutes: taxi/climb allowance plus ~810 km/h cruise
+        frequency = max(1, round(weight * scale))
+        airline = rng.choice(AIRLINES)
+        aircraft, seats = AIRCRAFT[min(len(AIRCRAFT) - 1, int(km // 1500))]
+        base_fare = 49 + km * rng.uniform(0.08, 0.14)
+        departures = sorted(rng.randrange(5 * 60, 23 * 60, 5) for _ in range(frequency))
+        # (departure, day) grids of local and UTC times for the whole route at once
+        local = np.array(departures)[:, None] + day_starts[None, :]
+        dep_utc = table.to_utc(table.airport_ids[zone_code(origin)], local)
+        arr_utc = dep_utc + block
+        arr_local = table.to_local(table.airport_ids[zone_code(destination)], arr_utc)
+        dep_offsets, arr_offsets = (local - dep_utc).tolist(), (arr_local - arr_utc).tolist()
+        arrivals = (arr_local - day_starts[None, :]).tolist()
+        for i, departure in enumerate(departures):
+            number = flight_numbers.setdefault(airline, 100)
+            flight_numbers[airline] = 100 + (number - 99) % 9800
+            for day in range(days):
+                arrival_local = arrivals[i][day]
+                yield (
+                    airline, number, (start + timedelta(days=day)).isoformat(),
+                    origin[0], destination[0],
+                    f"{departure // 60:02d}:{departure % 60:02d}",
+                    f"{arrival_local % 1440 // 60:02d}:{arrival_local % 60:02d}",
+                    arrival_local // 1440,
+                    dep_offsets[i][day], arr_offsets[i][day], aircraft, seats,
+                    round(base_fare * rng.uniform(0.8, 1.6)),
+                )
+
+
+def write_schedule(path, rows):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    count = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--legs", type=int, default=500_000)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--start", default="2026-03-01")
+    parser.add_argument("--spokes", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default=os.path.join("data", "schedule.csv"))
+    parser.add_argument("--snapshot", action="store_true", help="also write a .npz snapshot for fast loading")
+    args = parser.parse_args()
+
+    rows = generate(args.legs, args.days, date.fromisoformat(args.start), args.spokes, args.seed)
+    count = write_schedule(args.out, rows)
+    print(f"Wrote {count:,} legs to {args.out}")
+    if args.snapshot:
+        from .store import ScheduleStore
+
+        snapshot = os.path.splitext(args.out)[0] + ".npz"
+        ScheduleStore.from_csv(args.out).save(snapshot)
+        print(f"Wrote snapshot {snapshot}")
+
+
+if __name__ == "__main__":
+    main()
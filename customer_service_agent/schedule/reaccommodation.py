@@ -0,0 +1,414 @@
+# customer_service_agent/schedule/reaccommodation.py
+"""Batch re-accommodation of passengers from cancelled flights.
+
+When an airport closes, every passenger on a cancelled leg needs a seat on
+an alternative itinerary. The solver works on arrays rather than objects:
+
+- capacity: open seats per leg (cancelled legs have none), one int32 vector.
+- options: for each distinct origin/destination among the passengers, up to
+  `options_per_od` itineraries from FlightSearch over the next
+  `horizon_days`, as an (n_options, 3) matrix of leg rows padded with a
+  sentinel leg of unlimited capacity, sorted by arrival time plus a penalty
+  per stop.
+- passengers: columnar arrays (origin, destination, tier, ...).
+
+Greedy: passengers are taken in priority order (loyalty tier, medical
+needs, then connection risk: how soon they must arrive for an onward
+flight) and each gets the best option whose legs all still have a seat.
+
+Repair: each passenger left without a seat tries to free one on a full leg
+by moving someone already on it to another option with room that arrives
+at most REPAIR_SLACK minutes later. Moved passengers stay accommodated, so
+repair only ever adds accommodated passengers.
+"""
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from ..tool_cache import normalize_date
+from .search import get_engine
+from .store import MINUTES_PER_DAY, day_number, format_day
+
+TIERS = ("none", "silver", "gold", "platinum", "executive_platinum")
+TIER_PRIORITY = np.array([0, 10, 20, 30, 40], dtype=np.float64)
+MEDICAL_PRIORITY = 100.0
+CONNECTION_PRIORITY = 15.0
+STOP_PENALTY = 90  # minutes of arrival delay one extra stop is worth
+REPAIR_SLACK = 120  # minutes later a passenger may arrive when moved to free a seat
+REPAIR_CANDIDATES = 50  # passengers on a full leg tried per repair attempt
+OPTIONS_PER_OD = 40
+HORIZON_DAYS = 2
+MAX_LEGS = 3
+UNLIMITED = np.iinfo(np.int32).max
+
+
+@dataclass
+class Passengers:
+    """Disrupted passengers as parallel arrays, one element per passenger."""
+
+    origin: np.ndarray  # airport ids in the schedule store
+    destination: np.ndarray
+    original_arrival: np.ndarray  # UTC minutes
+    tier: np.ndarray  # index into TIERS
+    medical: np.ndarray  # bool
+    connection_deadline: np.ndarray  # UTC minutes of the onward departure, -1 if none
+
+    def __len__(self):
+        return len(self.origin)
+
+    def priority(self):
+        """Higher is served first."""
+        connecting = self.connection_deadline >= 0
+        # Tighter onward connections (deadline close to the original arrival) rank higher
+        slack_hours = np.where(connecting, (self.connection_deadline - self.original_arrival) / 60, 24)
+        urgency = np.clip(1 - slack_hours / 24, 0, 1)
+        return (
+            TIER_PRIORITY[self.tier]
+            + MEDICAL_PRIORITY * self.medical
+            + connecting * CONNECTION_PRIORITY * (0.5 + urgency)
+        )
+
+
+@dataclass
+class Reaccommodation:
+    """Solver output: option_legs[assignment[i]] are passenger i's new legs."""
+
+    assignment: np.ndarray  # option index per passenger, -1 if unaccommodated
+    option_legs: np.ndarray  # (n_options, MAX_LEGS), -1 padded
+    arrival: np.ndarray  # new UTC arrival per passenger, -1 if unaccommodated
+    timings: dict = field(default_factory=dict)
+    repaired: int = 0
+
+    def summary(self, passengers, disruption_day=None):
+        assigned = self.assignment >= 0
+        delay = (self.arrival - passengers.original_arrival)[assigned]
+        connecting = passengers.connection_deadline >= 0
+        missed = connecting & (~assigned | (self.arrival > passengers.connection_deadline))
+        result = {
+            "passengers": len(passengers),
+            "accommodated": int(assigned.sum()),
+            "unaccommodated": int((~assigned).sum()),
+            "accommodated_pct": round(100 * float(assigned.mean()), 2) if len(passengers) else 0.0,
+            "mean_delay_minutes": round(float(delay.mean()), 1) if len(delay) else 0.0,
+            "p95_delay_minutes": round(float(np.percentile(delay, 95)), 1) if len(delay) else 0.0,
+            "missed_connections": int(missed.sum()),
+            "repaired_by_moves": self.repaired,
+            "accommodated_pct_by_tier": {
+                name: round(100 * float(assigned[passengers.tier == i].mean()), 2)
+                for i, name in enumerate(TIERS) if (passengers.tier == i).any()
+            },
+        }
+        if disruption_day is not None:
+            same_day = assigned & (self.arrival // MINUTES_PER_DAY <= disruption_day + 1)
+            result["arriving_by_" + format_day(disruption_day + 1)] = int(same_day.sum())
+        result["timings_ms"] = {k: round(v * 1000, 1) for k, v in self.timings.items()}
+        return result
+
+
+class ReaccommodationSolver:
+    """Greedy + repair assignment of passengers to alternative itineraries."""
+
+    def __init__(self, engine, options_per_od=OPTIONS_PER_OD, horizon_days=HORIZON_DAYS):
+        self.engine = engine
+        self.store = engine.store
+        self.options_per_od = options_per_od
+        self.horizon_days = horizon_days
+
+    def build_options(self, passengers, capacity, not_before):
+        """Option matrix, per-option cost and CSR pointers per origin/destination."""
+        store = self.store
+        n_airports = len(store.airports)
+        od_keys = passengers.origin.astype(np.int64) * n_airports + passengers.destination
+        unique_ods, od_index = np.unique(od_keys, return_inverse=True)
+        first_day = (int(not_before) + int(store.dep_offset.min())) // MINUTES_PER_DAY
+        legs, costs, od_ptr = [], [], [0]
+        for key in unique_ods:
+            origin, destination = divmod(int(key), n_airports)
+            found = []
+            for day in range(first_day, first_day + self.horizon_days + 1):
+                found += self.engine.search(
+                    store.airports[origin], store.airports[destination], format_day(day),
+                    limit=self.options_per_od, seats=capacity, earliest_utc=not_before,
+                )
+            found = sorted(
+                set(found),
+                key=lambda option: int(store.arr_utc[option[-1]]) + STOP_PENALTY * (len(option) - 1),
+            )[: self.options_per_od]
+            for option in found:
+                legs.append(option + (-1,) * (MAX_LEGS - len(option)))
+                costs.append(int(store.arr_utc[option[-1]]))
+            od_ptr.append(len(legs))
+        option_legs = np.array(legs, dtype=np.int64).reshape(-1, MAX_LEGS)
+        return option_legs, np.array(costs, dtype=np.int64), np.array(od_ptr), od_index
+
+    def solve(self, passengers, capacity, not_before, priority=None):
+        """Assign passengers to options; capacity is open seats per leg (not modified).
+
+        priority defaults to Passengers.priority(); ties go to the passenger
+        whose original flight arrived first.
+        """
+        timings = {}
+        started = time.perf_counter()
+        option_legs, option_arrival, od_ptr, od_index = self.build_options(passengers, capacity, not_before)
+        timings["options"] = time.perf_counter() - started
+
+        # Padding (-1) indexes the sentinel leg appended at the end of seats
+        seats = np.append(capacity.astype(np.int64), UNLIMITED)
+        padded = np.where(option_legs >= 0, option_legs, len(capacity))
+        priority = passengers.priority() if priority is None else priority
+        order = np.lexsort((passengers.original_arrival, -priority))
+        assignment = np.full(len(passengers), -1, dtype=np.int64)
+
+        started = time.perf_counter()
+        for p in order:
+            lo, hi = od_ptr[od_index[p]], od_ptr[od_index[p] + 1]
+            if lo == hi:
+                continue
+            open_options = np.flatnonzero(seats[padded[lo:hi]].min(axis=1) > 0)
+            if len(open_options):
+                chosen = lo + open_options[0]
+                assignment[p] = chosen
+                seats[padded[chosen]] -= 1
+        timings["greedy"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        repaired = self._repair(order, assignment, seats, padded, option_arrival, od_ptr, od_index)
+        timings["repair"] = time.perf_counter() - started
+
+        arrival = np.where(assignment >= 0, option_arrival[np.maximum(assignment, 0)], -1)
+        return Reaccommodation(assignment, option_legs, arrival, timings, repaired)
+
+    def _repair(self, order, assignment, seats, padded, option_arrival, od_ptr, od_index):
+        """Free seats for unassigned passengers by moving others to nearby options.
+
+        For an unassigned passenger, any of their options blocked by exactly
+        one full leg is a candidate. A passenger on that leg may give up the
+        seat if another option of theirs avoids the leg, has room and arrives
+        no more than REPAIR_SLACK minutes later than their current one.
+        """
+        unassigned = [p for p in order if assignment[p] < 0 and od_ptr[od_index[p]] < od_ptr[od_index[p] + 1]]
+        if not unassigned:
+            return 0
+        occupants = {}
+        for p in np.flatnonzero(assignment >= 0):
+            for leg in padded[assignment[p]]:
+                occupants.setdefault(int(leg), []).append(int(p))
+
+        def relocate(victim, blocked_leg):
+            """Move victim to an open option avoiding blocked_leg; True on success."""
+            lo, hi = od_ptr[od_index[victim]], od_ptr[od_index[victim] + 1]
+            candidates = padded[lo:hi]
+            ok = (
+                (seats[candidates].min(axis=1) > 0)
+                & ~(candidates == blocked_leg).any(axis=1)
+                & (option_arrival[lo:hi] <= option_arrival[assignment[victim]] + REPAIR_SLACK)
+            )
+            open_options = np.flatnonzero(ok)
+            if not len(open_options):
+                return False
+            old, new = assignment[victim], lo + open_options[0]
+            seats[padded[old]] += 1
+            seats[padded[new]] -= 1
+            assignment[victim] = new
+            for leg in padded[old]:
+                occupants[int(leg)].remove(victim)
+            for leg in padded[new]:
+                occupants.setdefault(int(leg), []).append(victim)
+            return True
+
+        repaired = 0
+        exhausted = set()  # full legs nobody could be moved off
+        for p in unassigned:
+            lo, hi = od_ptr[od_index[p]], od_ptr[od_index[p] + 1]
+            full = seats[padded[lo:hi]] <= 0
+            for option in lo + np.flatnonzero(full.sum(axis=1) == 1):
+                leg = int(padded[option][seats[padded[option]] <= 0][0])
+                if leg in exhausted:
+                    continue
+                if any(relocate(v, leg) for v in occupants.get(leg, ())[:REPAIR_CANDIDATES]):
+                    assignment[p] = option
+                    seats[padded[option]] -= 1
+                    for used in padded[option]:
+                        occupants.setdefault(int(used), []).append(int(p))
+                    repaired += 1
+                    break
+                exhausted.add(leg)
+        return repaired
+
+
+def open_seats(store, seed=0, load_factor=(0.7, 0.95)):
+    """Synthetic open seats per leg: aircraft seats minus a random booked load."""
+    rng = np.random.default_rng(seed)
+    booked = store.seats * rng.uniform(*load_factor, size=len(store))
+    return (store.seats - booked).astype(np.int32)
+
+
+def closure_legs(store, airport, start_utc, end_utc):
+    """Boolean mask of legs departing or arriving at airport inside the window."""
+    touches = (store.origin == airport) | (store.destination == airport)
+    in_window = (
+        ((store.dep_utc >= start_utc) & (store.dep_utc < end_utc))
+        | ((store.arr_utc >= start_utc) & (store.arr_utc < end_utc))
+    )
+    return touches & in_window
+
+
+def synthetic_passengers(store, cancelled, count, seed=0, load_factor=0.85):
+    """Passengers booked on the cancelled legs, with tiers and onward connections."""
+    rng = np.random.default_rng(seed)
+    rows = np.flatnonzero(cancelled)
+    booked = (store.seats[rows] * load_factor).astype(np.int64)
+    if booked.sum() == 0:
+        rows, booked = rows[:0], booked[:0]
+    leg = rng.choice(np.repeat(rows, booked), size=min(count, int(booked.sum())), replace=False)
+    arrival = store.arr_utc[leg].astype(np.int64)
+    connecting = rng.random(len(leg)) < 0.3
+    return Passengers(
+        origin=store.origin[leg].astype(np.int64),
+        destination=store.destination[leg].astype(np.int64),
+        original_arrival=arrival,
+        tier=rng.choice(len(TIERS), size=len(leg), p=[0.7, 0.12, 0.1, 0.06, 0.02]),
+        medical=rng.random(len(leg)) < 0.005,
+        connection_deadline=np.where(connecting, arrival + rng.integers(60, 6 * 60, len(leg)), -1),
+    )
+
+
+# ----- tool functions -----
+
+# Airline designators have at least one letter, so a year or a time is never read as a flight
+BOOKING_FLIGHT = re.compile(r"\b([A-Z][A-Z0-9]|\d[A-Z])\s?0*(\d{1,4})\b")
+BOOKING_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+CLOCK_TIME = re.compile(r"^(\d{1,2})(?::(\d{2}))?\s*([ap]m)?$", re.IGNORECASE)
+MAX_CLOSURE_HOURS = 72
+PROTECTED_SEATS = 2  # last seats on a flight are held for priority passengers
+PRIORITY_LEVELS = ("elite", "medical", "connecting")
+
+_open_seats = None
+
+
+def get_open_seats():
+    """Open seats per leg of the search engine's schedule, shared by both tools."""
+    global _open_seats
+    if _open_seats is None:
+        _open_seats = open_seats(get_engine().store)
+    return _open_seats
+
+
+def emergency_rebook(original_booking, disruption_type, priority_level="standard", alternatives_needed=3):
+    """emergency_rebook tool: alternatives for one passenger on a disrupted flight.
+
+    original_booking must name the flight ("AA123" or "AA123 2026-03-05").
+    Standard passengers are only offered flights with more than
+    PROTECTED_SEATS open seats; elite, medical and connecting passengers may
+    take the last ones.
+    """
+    text = str(original_booking).upper()
+    date = BOOKING_DATE.search(text)
+    flight = BOOKING_FLIGHT.search(BOOKING_DATE.sub(" ", text))
+    if flight is None:
+        return {"error": "Include the flight number in original_booking, e.g. 'AA123 2026-03-05'"}
+    engine = get_engine()
+    store = engine.store
+    try:
+        row = store.find_flight("".join(flight.groups()), date.group(0) if date else None)
+    except ValueError:
+        return {"error": f"Invalid date {date.group(0)}, use YYYY-MM-DD"}
+    if row is None:
+        return {"error": f"No flight {''.join(flight.groups())} found in the schedule"}
+
+    seats = get_open_seats().copy()
+    seats[row] = 0
+    needed = 1 if priority_level in PRIORITY_LEVELS else PROTECTED_SEATS + 1
+    original_day = int(store.dep_local[row]) // MINUTES_PER_DAY
+    options = []
+    for day in (original_day, original_day + 1):
+        options += engine.search(
+            store.airports[store.origin[row]], store.airports[store.destination[row]], format_day(day),
+            passengers=needed, limit=alternatives_needed, seats=seats,
+            earliest_utc=int(store.dep_utc[row]),
+        )
+        if len(options) >= alternatives_needed:
+            break
+    options = options[:alternatives_needed]
+
+    rebook_options = []
+    for legs in options:
+        option = engine.itinerary(legs)
+        del option["available_seats"]
+        option["seats_available"] = int(seats[list(legs)].min())
+        # Legs from the store carry aircraft capacity; report what is left to sell
+        for leg, leg_row in zip(option.get("legs", ()), legs):
+            leg["available_seats"] = int(seats[leg_row])
+        option["delay_minutes"] = int(store.arr_utc[legs[-1]]) - int(store.arr_utc[row])
+        rebook_options.append(option)
+    delay = rebook_options[0]["delay_minutes"] if rebook_options else None
+    return {
+        "original_flight": store.leg(row),
+        "disruption_type": disruption_type,
+        "priority_level": priority_level,
+        "rebook_options": rebook_options,
+        "hotel_needed": not options or int(store.dep_local[options[0][0]]) // MINUTES_PER_DAY > original_day,
+        "meal_vouchers": "$30 per person" if delay is None or delay >= 3 * 60 else None,
+    }
+
+
+def parse_time(value):
+    """Minutes after midnight for "06:00", "6:30 pm" or "6am", or None."""
+    match = CLOCK_TIME.match(" ".join(str(value).split()))
+    if match is None:
+        return None
+    hours, minutes, half = int(match.group(1)), int(match.group(2) or 0), (match.group(3) or "").lower()
+    if half:
+        if not 1 <= hours <= 12:
+            return None
+        hours = hours % 12 + (12 if half == "pm" else 0)
+    return hours * 60 + minutes if hours < 24 and minutes < 60 else None
+
+
+async def mass_rebook(closed_airport, date, start_time="00:00", duration_hours=8, passengers=20_000):
+    """mass_rebook tool: re-accommodate everyone booked through a closed airport.
+
+    Cancels every leg departing or arriving at closed_airport inside the
+    closure window (local time) and re-accommodates the booked passengers.
+    Passenger manifests are synthesized from seat loads. The solve takes
+    seconds of CPU, so it runs in a worker thread.
+    """
+    engine = get_engine()
+    store = engine.store
+    airport = store.airport_id(closed_airport)
+    if airport is None:
+        return {"error": f"Unknown airport code: {closed_airport}"}
+    minutes = parse_time(start_time)
+    if minutes is None:
+        return {"error": f"start_time must be a local time such as 06:00, got {start_time!r}"}
+    try:
+        day = day_number(normalize_date(date))
+    except ValueError:
+        return {"error": "date must be YYYY-MM-DD"}
+    try:
+        duration = float(duration_hours)
+    except (TypeError, ValueError):
+        duration = 0.0
+    if not 0 < duration <= MAX_CLOSURE_HOURS:
+        return {"error": f"duration_hours must be between 0 and {MAX_CLOSURE_HOURS}"}
+    rows = np.flatnonzero(store.origin == airport)
+    offset = int(store.dep_offset[rows[0]]) if len(rows) else 0
+    start = day * MINUTES_PER_DAY + minutes - offset
+    end = start + int(duration * 60)
+    return await asyncio.to_thread(rebook_closure, engine, airport, start, end, passengers)
+
+
+def rebook_closure(engine, airport, start, end, passengers):
+    """Cancel the closure's legs and re-accommodate their passengers; returns the summary."""
+    store = engine.store
+    cancelled = closure_legs(store, airport, start, end)
+    capacity = get_open_seats().copy()
+    capacity[cancelled] = 0
+    manifest = synthetic_passengers(store, cancelled, passengers)
+    result = ReaccommodationSolver(engine).solve(manifest, capacity, start)
+    summary = result.summary(manifest, start // MINUTES_PER_DAY)
+    summary["cancelled_flights"] = int(cancelled.sum())
+    return summary
@@ -0,0 +1,354 @@
+# customer_service_agent/schedule/search.py
+"""Direct and connecting itinerary search over a ScheduleStore.
+
+Search expands from the origin's departures on the requested local date.
+Every connection must respect the minimum connect time (MCT) of the
+connecting airport and a maximum layover; intermediate airports are only
+expanded when they have a route to the destination (or, for two-stop
+trips, to an airport that does), and itineraries longer than
+`max_duration` are dropped. Two-stop trips are only searched when direct
+and one-stop results do not fill the requested limit.
+
+Layovers of the returned itineraries, and of booked itineraries checked
+with check_connection_risk, are rated against the same MCTs by
+timezones.connection_times in one vectorized pass.
+
+check_flight_status reports a scheduled leg with the weather delay risk at
+its origin around departure and at its destination around arrival, read
+from the shared weather table.
+"""
+import logging
+import os
+import time
+from datetime import date
+
+import numpy as np
+
+from ..alerts import get_alert_index
+from ..tool_cache import normalize_date
+from ..weather import get_weather_table, risk_level
+from .store import MINUTES_PER_DAY, day_number, format_minutes, load_schedule
+from .timezones import RISK_LEVELS, connection_times
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MCT = 45
+HUB_MCT = 60
+MAX_LAYOVER = 6 * 60
+MAX_DURATION = 30 * 60
+ONWARD_OPTIONS = 3  # onward legs kept per arriving leg and route
+WEATHER_DELAY_SCORE = 35  # weather delay risk (0-100) from which a scheduled flight is flagged
+SCHEDULE_PATH_ENV = "SCHEDULE_PATH"
+DEFAULT_SCHEDULE_PATH = os.path.join("data", "schedule.csv")
+
+
+def expand_ranges(lo, hi):
+    """Flatten [lo[i], hi[i]) ranges into (owner index, position) arrays."""
+    counts = np.maximum(hi - lo, 0)
+    owner = np.repeat(np.arange(len(lo)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, np.repeat(lo, counts) + offsets
+
+
+def rank_within(owner):
+    """0, 1, 2... position of each element within its run of equal owners."""
+    if not len(owner):
+        return owner
+    index = np.arange(len(owner))
+    run_start = np.r_[True, owner[1:] != owner[:-1]]
+    return index - np.maximum.accumulate(np.where(run_start, index, 0))
+
+
+class FlightSearch:
+    """Itinerary search with minimum-connect-time pruning."""
+
+    def __init__(self, store, mct=None, default_mct=DEFAULT_MCT, hub_mct=HUB_MCT,
+                 max_layover=MAX_LAYOVER, max_duration=MAX_DURATION):
+        self.store = store
+        self.max_layover = max_layover
+        self.max_duration = max_duration
+        # Busy airports (top decile by departures) get the longer hub MCT
+        departures = np.diff(store.origin_ptr)
+        self.mct = np.where(departures >= np.percentile(departures, 90), hub_mct, default_mct).astype(np.int32)
+        for code, minutes in (mct or {}).items():
+            airport = store.airport_id(code)
+            if airport is not None:
+                self.mct[airport] = minutes
+
+    def connect(self, rows, targets, seats, passengers=1, per_row=ONWARD_OPTIONS):
+        """Onward legs from each row's arrival airport to any airport in targets.
+
+        targets is a boolean mask over airports. Returns (owner, onward):
+        onward[k] departs the arrival airport of rows[owner[k]] between MCT
+        and the maximum layover after it lands and has at least `passengers`
+        seats; only the earliest `per_row` options per row and route are kept.
+        """
+        store = self.store
+        hubs = store.destination[rows]
+        arrivals = store.arr_utc[rows]
+        earliest = arrivals + self.mct[hubs]
+        latest = arrivals + self.max_layover
+        owners, onward = [], []
+        for hub in np.unique(hubs):
+            selected = np.flatnonzero(hubs == hub)
+            routes = store.routes_from[hub]
+            for target in routes[targets[routes]]:
+                start, end = store.pair_slices[(int(hub), int(target))]
+                block = store.pair_dep[start:end]
+                lo = start + np.searchsorted(block, earliest[selected], "left")
+                hi = start + np.searchsorted(block, latest[selected], "right")
+                owner, position = expand_ranges(lo, hi)
+                legs = store.pair_order[position]
+                ok = seats[legs] >= passengers
+                owner, legs = owner[ok], legs[ok]
+                keep = rank_within(owner) < per_row
+                owners.append(selected[owner[keep]])
+                onward.append(legs[keep])
+        if not owners:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(owners), np.concatenate(onward).astype(np.int64)
+
+    def search(self, origin, destination, departure_date, max_stops=2, passengers=1, limit=10,
+               seats=None, earliest_utc=None):
+        """Itineraries (tuples of leg rows) sorted by stops, elapsed time and fare.
+
+        seats overrides the per-leg seat counts (e.g. open seats left, zero
+        for cancelled legs); earliest_utc drops first legs departing before it.
+        """
+        store = self.store
+        seats = store.seats if seats is None else seats
+        o, d = store.airport_id(origin), store.airport_id(destination)
+        if o is None or d is None or o == d:
+            return []
+        first = store.departures_on(o, day_number(departure_date))
+        first = first[seats[first] >= passengers]
+        if earliest_utc is not None:
+            first = first[store.dep_utc[first] >= earliest_utc]
+        hubs = store.destination[first]
+        inbound = store.inbound.get(d)
+        only_d = np.zeros(len(store.airports), dtype=bool)
+        only_d[d] = True
+
+        # Each group is an (n, legs) array of row indexes; fewer stops sort first,
+        # so a longer search only runs while shorter ones leave room under limit
+        groups = [first[hubs == d][:, None]]
+        if max_stops >= 1 and inbound is not None and len(groups[0]) < limit:
+            via = first[(hubs != d) & inbound[hubs]]
+            owner, last = self.connect(via, only_d, seats, passengers)
+            groups.append(np.column_stack((via[owner], last)))
+
+        found = sum(len(group) for group in groups)
+        if max_stops >= 2 and inbound is not None and found < limit:
+            # Middle legs may only go to airports with a route on to d
+            middle_hubs = inbound.copy()
+            middle_hubs[[o, d]] = False
+            via = first[hubs != d]
+            owner, middle = self.connect(via, middle_hubs, seats, passengers)
+            owner2, last = self.connect(middle, only_d, seats, passengers)
+            groups.append(np.column_stack((via[owner[owner2]], middle[owner2], last)))
+
+        ranked = []
+        for group in groups:
+            if not len(group):
+                continue
+            elapsed = store.arr_utc[group[:, -1]] - store.dep_utc[group[:, 0]]
+            fare = store.fare[group].sum(axis=1)
+            keep = elapsed <= self.max_duration
+            group, elapsed, fare = group[keep], elapsed[keep], fare[keep]
+            order = np.lexsort((fare, elapsed))[: limit - len(ranked)]
+            ranked += [tuple(int(row) for row in legs) for legs in group[order]]
+            if len(ranked) >= limit:
+                break
+        return ranked
+
+    def layovers(self, itineraries, delays=None):
+        """Connections of each itinerary as [{airport, minutes, risk}, ...] lists.
+
+        Itineraries with the same number of legs are rated together; delays
+        optionally gives per-leg arrival delays in minutes, aligned with legs.
+        """
+        store = self.store
+        out = [[] for _ in itineraries]
+        for size in {len(legs) for legs in itineraries if len(legs) > 1}:
+            members = [i for i, legs in enumerate(itineraries) if len(legs) == size]
+            rows = np.array([itineraries[i] for i in members], dtype=np.int64)
+            late = 0 if delays is None else np.array([delays[i] for i in members])[:, :-1]
+            hubs = store.destination[rows[:, :-1]]
+            minutes, risk = connection_times(store.arr_utc[rows[:, :-1]], store.dep_utc[rows[:, 1:]],
+                                             self.mct[hubs], delay=late)
+            for k, i in enumerate(members):
+                out[i] = [
+                    {"airport": store.airports[hub], "minutes": int(m), "risk": RISK_LEVELS[r]}
+                    for hub, m, r in zip(hubs[k], minutes[k], risk[k])
+                ]
+        return out
+
+    def itinerary(self, legs, layovers=None):
+        """Tool-facing dict for one itinerary."""
+        store = self.store
+        details = [store.leg(row) for row in legs]
+        elapsed = int(store.arr_utc[legs[-1]]) - int(store.dep_utc[legs[0]])
+        arrival_day = (int(store.arr_utc[legs[-1]]) + int(store.arr_offset[legs[-1]])) // MINUTES_PER_DAY
+        departure_day = int(store.dep_local[legs[0]]) // MINUTES_PER_DAY
+        result = {
+            "flight_number": " / ".join(leg["flight_number"] for leg in details),
+            "departure": details[0]["departure"],
+            "arrival": details[-1]["arrival"],
+            "arrival_day_offset": arrival_day - departure_day,
+            "duration": f"{elapsed // 60}h{elapsed % 60:02d}m",
+            "stops": len(legs) - 1,
+            "price": f"${sum(leg['fare'] for leg in details):,.0f}",
+            "available_seats": min(leg["available_seats"] for leg in details),
+        }
+        if len(details) > 1:
+            result["connections"] = [leg["destination"] for leg in details[:-1]]
+            result["legs"] = details
+            if layovers:
+                result["layovers"] = layovers
+        return result
+
+
+_engine = None
+
+
+def get_engine():
+    """The process-wide FlightSearch, loaded on first use.
+
+    Reads SCHEDULE_PATH (default data/schedule.csv). Without a schedule file
+    a small synthetic schedule is generated so the agent still answers.
+    """
+    global _engine
+    if _engine is None:
+        path = os.getenv(SCHEDULE_PATH_ENV, DEFAULT_SCHEDULE_PATH)
+        if os.path.exists(path):
+            store = load_schedule(path)
+        else:
+            from .generate import generate
+            from .store import ScheduleStore
+
+            logger.warning("No schedule at %s; using a generated 20k-leg schedule", path)
+            store = ScheduleStore.from_rows(generate(20_000, days=14, start=date.today()))
+        _engine = FlightSearch(store)
+    return _engine
+
+
+def search_flights(origin, destination, departure_date, return_date=None, passengers=1):
+    """search_flights tool: direct and connecting options, plus returns if asked."""
+    engine = get_engine()
+    for code in (origin, destination):
+        if engine.store.airport_id(code) is None:
+            return {"error": f"Unknown airport code: {code}", "flights": []}
+    try:
+        outbound = engine.search(origin, destination, normalize_date(departure_date), passengers=passengers)
+        inbound = (
+            engine.search(destination, origin, normalize_date(return_date), passengers=passengers)
+            if return_date else None
+        )
+    except ValueError:
+        return {"error": "Dates must be YYYY-MM-DD", "flights": []}
+
+    result = {"flights": [engine.itinerary(legs, layovers)
+                          for legs, layovers in zip(outbound, engine.layovers(outbound))]}
+    if inbound is not None:
+        result["return_flights"] = [engine.itinerary(legs, layovers)
+                                    for legs, layovers in zip(inbound, engine.layovers(inbound))]
+    return result
+
+
+def alert_delay(update):
+    """Minutes of delay a flight's published alerts announced (0 if none or unreadable)."""
+    try:
+        return max(0, int(update.get("delay_minutes") or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def check_flight_status(flight_number, date):
+    """check_flight_status tool: schedule, progress and weather delay risk of one flight.
+
+    Published alerts (see alerts.py) override the schedule: a delay moves
+    the estimated times, and gate changes, boarding, cancellations and
+    diversions show up in the status.
+    """
+    store = get_engine().store
+    try:
+        row = store.find_flight(str(flight_number), normalize_date(date))
+    except ValueError:
+        return {"error": "date must be YYYY-MM-DD"}
+    if row is None:
+        return {"error": f"Flight {flight_number} not found on {date}"}
+    result = store.leg(row)
+    update = get_alert_index().update_for(result["flight_number"], result["date"]) or {}
+    delay = alert_delay(update)
+    departure, arrival = int(store.dep_utc[row]) + delay, int(store.arr_utc[row]) + delay
+    now = int(time.time() // 60)
+    result["status"] = ("Landed" if now >= arrival else "Departed" if now >= departure
+                        else "Delayed" if delay else "Scheduled")
+    if delay:
+        result["delay_minutes"] = delay
+        result["estimated_departure"] = format_minutes(int(store.dep_local[row]) + delay)
+        result["estimated_arrival"] = format_minutes(arrival + int(store.arr_offset[row]))
+
+    weather = get_weather_table()
+    outlook = {"origin": weather.delay_outlook(result["origin"], departure, hours=1),
+               "destination": weather.delay_outlook(result["destination"], arrival, hours=1)}
+    known = [o["score"] for o in outlook.values() if o is not None]
+    if result["status"] != "Landed" and known:
+        score = max(known)
+        result["delay_risk"] = {"score": score, "level": risk_level(score), **outlook}
+        if result["status"] == "Scheduled" and score >= WEATHER_DELAY_SCORE:
+            result["status"] = "Scheduled - weather delays likely"
+
+    if update.get("new_departure"):
+        result["estimated_departure"] = str(update["new_departure"])
+    if update.get("gate"):
+        result["gate"] = str(update["gate"])
+    if update.get("outcome"):
+        result["status"] = update["outcome"].title()
+        result.pop("delay_risk", None)
+    elif update.get("last_alert") == "BOARDING" and now < departure:
+        result["status"] = "Boarding"
+    if update:
+        result["latest_alert"] = {"message": update["message"], "issued_at": update["issued_at"]}
+    return result
+
+
+def check_connection_risk(flights):
+    """check_connection_risk tool: layover and risk at each connection of a booked itinerary.
+
+    flights is the itinerary in order, each {"flight_number", "date"} with an
+    optional "delay_minutes" (expected late arrival of that leg).
+    """
+    engine = get_engine()
+    store = engine.store
+    if not isinstance(flights, list) or len(flights) < 2:
+        return {"error": "Give at least two flights, in travel order"}
+    rows, delays = [], []
+    for flight in flights:
+        try:
+            row = store.find_flight(str(flight["flight_number"]), normalize_date(flight["date"]))
+        except (KeyError, TypeError, ValueError):
+            return {"error": "Each flight needs a flight_number and a YYYY-MM-DD date"}
+        if row is None:
+            return {"error": f"Flight {flight['flight_number']} not found on {flight['date']}"}
+        rows.append(row)
+        delays.append(int(flight.get("delay_minutes") or 0))
+    for inbound, onward in zip(rows, rows[1:]):
+        if store.destination[inbound] != store.origin[onward]:
+            return {"error": f"{store.leg(onward)['flight_number']} does not depart from "
+                             f"{store.airports[store.destination[inbound]]}"}
+
+    connections = engine.layovers([tuple(rows)], [delays])[0]
+    for connection, inbound, onward in zip(connections, rows, rows[1:]):
+        connection["arriving_flight"] = store.leg(inbound)["flight_number"]
+        connection["departing_flight"] = store.leg(onward)["flight_number"]
+        connection["minimum_connect_minutes"] = int(engine.mct[store.destination[inbound]])
+    overall = max((RISK_LEVELS.index(c["risk"]) for c in connections), default=0)
+    return {"connections": connections, "overall_risk": RISK_LEVELS[overall]}
+
+
+def record_connection_risk(tool, args, tool_context, tool_response):
+    """after_tool_callback: keep the latest connection check in state['connection_risk']."""
+    if tool.name == "check_connection_risk" and isinstance(tool_response, dict) and "error" not in tool_response:
+        tool_context.state["connection_risk"] = tool_response
+    return None
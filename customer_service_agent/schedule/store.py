@@ -0,0 +1,236 @@
+# customer_service_agent/schedule/store.py
+"""Columnar, indexed store of operated flight legs.
+
+Each leg attribute is one NumPy array (airport, airline and aircraft codes
+are interned to small integers), so 500k legs take a few tens of MB and
+vectorized filters run over contiguous memory. Legs are sorted by
+(origin, UTC departure) and these indexes sit on top:
+
+- origin_ptr: legs departing airport a are rows origin_ptr[a]:origin_ptr[a+1],
+  in departure order, so "departures from X on date D" or "departures from
+  X between t0 and t1" is two binary searches.
+- pair_slices: (origin, destination) -> a slice of pair_order, the legs on
+  that route in departure order, for the onward legs of a connection.
+- flight_slices: (airline, flight number) -> a slice of flight_order, every
+  operation of that flight in departure order, for status and rebooking
+  lookups by flight number.
+
+Times are kept as minutes since the Unix epoch in UTC; the per-leg UTC
+offsets from the schedule file convert back to local times for display.
+"""
+import csv
+import os
+from datetime import date
+
+import numpy as np
+
+EPOCH = date(1970, 1, 1)
+MINUTES_PER_DAY = 24 * 60
+
+# Stored arrays and their dtypes, in save/load order
+COLUMNS = {
+    "airline": np.uint8,
+    "flight_number": np.uint16,
+    "origin": np.uint16,
+    "destination": np.uint16,
+    "dep_utc": np.int32,
+    "arr_utc": np.int32,
+    "dep_offset": np.int16,
+    "arr_offset": np.int16,
+    "aircraft": np.uint8,
+    "seats": np.int16,
+    "fare": np.float32,
+}
+
+
+def day_number(iso_date):
+    return (date.fromisoformat(iso_date) - EPOCH).days
+
+
+def format_minutes(minutes):
+    """Local minutes since the epoch -> 'HH:MM'."""
+    minutes = int(minutes) % MINUTES_PER_DAY
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def format_day(day):
+    return date.fromordinal(EPOCH.toordinal() + int(day)).isoformat()
+
+
+class ScheduleStore:
+    """Immutable set of flight legs with origin and route indexes."""
+
+    def __init__(self, columns, airports, airlines, aircraft):
+        order = np.lexsort((columns["dep_utc"], columns["origin"]))
+        for name, dtype in COLUMNS.items():
+            setattr(self, name, np.ascontiguousarray(columns[name][order], dtype=dtype))
+        self.airports = [str(code) for code in airports]
+        self.airlines = [str(code) for code in airlines]
+        self.aircraft_types = [str(code) for code in aircraft]
+        self.airport_index = {code: i for i, code in enumerate(self.airports)}
+        self._build_indexes()
+
+    def __len__(self):
+        return len(self.dep_utc)
+
+    def _build_indexes(self):
+        n_airports = len(self.airports)
+        counts = np.bincount(self.origin, minlength=n_airports)
+        self.origin_ptr = np.zeros(n_airports + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.origin_ptr[1:])
+        self.dep_local = self.dep_utc + self.dep_offset
+
+        self.pair_order = np.lexsort((self.dep_utc, self.destination, self.origin)).astype(np.int32)
+        pair_keys = self.origin[self.pair_order].astype(np.int64) * n_airports + self.destination[self.pair_order]
+        self.pair_dep = self.dep_utc[self.pair_order]
+        starts = np.flatnonzero(np.r_[True, pair_keys[1:] != pair_keys[:-1]])
+        ends = np.r_[starts[1:], len(pair_keys)]
+        self.pair_slices = {
+            divmod(int(pair_keys[s]), n_airports): (int(s), int(e)) for s, e in zip(starts, ends)
+        }
+        self.flight_order = np.lexsort((self.dep_utc, self.flight_number, self.airline)).astype(np.int32)
+        flight_keys = (self.airline[self.flight_order].astype(np.int64) << 16) | self.flight_number[self.flight_order]
+        starts = np.flatnonzero(np.r_[True, flight_keys[1:] != flight_keys[:-1]])
+        ends = np.r_[starts[1:], len(flight_keys)]
+        self.flight_slices = {
+            divmod(int(flight_keys[s]), 1 << 16): (int(s), int(e)) for s, e in zip(starts, ends)
+        }
+
+        # inbound[d] marks every airport with at least one leg to d;
+        # routes_from[o] lists the airports o has legs to
+        self.inbound = {}
+        routes_from = [[] for _ in range(n_airports)]
+        for origin, destination in self.pair_slices:
+            self.inbound.setdefault(destination, np.zeros(n_airports, dtype=bool))[origin] = True
+            routes_from[origin].append(destination)
+        self.routes_from = [np.array(sorted(r), dtype=np.int64) for r in routes_from]
+
+    # ----- loading -----
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from CSV_COLUMNS-ordered rows (strings or typed values)."""
+        airports, airlines, aircraft = {}, {}, {}
+        values = {name: [] for name in COLUMNS}
+        for row in rows:
+            (airline, number, day, origin, destination, dep, arr, arr_days,
+             dep_offset, arr_offset, equipment, seats, fare) = row
+            dep_day = day_number(day)
+            dep_local = dep_day * MINUTES_PER_DAY + int(dep[:2]) * 60 + int(dep[3:5])
+            arr_local = (dep_day + int(arr_days)) * MINUTES_PER_DAY + int(arr[:2]) * 60 + int(arr[3:5])
+            values["airline"].append(airlines.setdefault(airline, len(airlines)))
+            values["flight_number"].append(int(number))
+            values["origin"].append(airports.setdefault(origin, len(airports)))
+            values["destination"].append(airports.setdefault(destination, len(airports)))
+            values["dep_utc"].append(dep_local - int(dep_offset))
+            values["arr_utc"].append(arr_local - int(arr_offset))
+            values["dep_offset"].append(int(dep_offset))
+            values["arr_offset"].append(int(arr_offset))
+            values["aircraft"].append(aircraft.setdefault(equipment, len(aircraft)))
+            values["seats"].append(int(seats))
+            values["fare"].append(float(fare))
+        columns = {name: np.asarray(column, dtype=COLUMNS[name]) for name, column in values.items()}
+        return cls(columns, airports, airlines, aircraft)
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            next(reader)
+            return cls.from_rows(reader)
+
+    @classmethod
+    def from_npz(cls, path):
+        with np.load(path) as data:
+            columns = {name: data[name] for name in COLUMNS}
+            return cls(columns, data["airports"], data["airlines"], data["aircraft_types"])
+
+    def save(self, path):
+        """Write a compressed .npz snapshot; loading it skips CSV parsing."""
+        np.savez_compressed(
+            path,
+            airports=np.array(self.airports),
+            airlines=np.array(self.airlines),
+            aircraft_types=np.array(self.aircraft_types),
+            **{name: getattr(self, name) for name in COLUMNS},
+        )
+
+    # ----- lookups -----
+
+    def airport_id(self, code):
+        return self.airport_index.get(str(code).strip().upper())
+
+    def find_flight(self, flight_number, date=None):
+        """Row of a flight ('AA123') on an ISO date, or of its first operation."""
+        text = "".join(str(flight_number).split()).upper()
+        airline, number = text[:2], text[2:]
+        if airline not in self.airlines or not number.isdigit():
+            return None
+        bounds = self.flight_slices.get((self.airlines.index(airline), int(number)))
+        if bounds is None:
+            return None
+        # In departure order, so the first match is the earliest operation
+        rows = self.flight_order[bounds[0]:bounds[1]]
+        if date is not None:
+            rows = rows[self.dep_local[rows] // MINUTES_PER_DAY == day_number(date)]
+        return int(rows[0]) if len(rows) else None
+
+    def departures_between(self, airport, start_utc, end_utc):
+        """Row indexes of legs leaving airport with start_utc <= departure <= end_utc."""
+        lo, hi = self.origin_ptr[airport], self.origin_ptr[airport + 1]
+        block = self.dep_utc[lo:hi]
+        return np.arange(
+            lo + np.searchsorted(block, start_utc, "left"),
+            lo + np.searchsorted(block, end_utc, "right"),
+        )
+
+    def departures_on(self, airport, day):
+        """Row indexes of legs leaving airport on a local calendar day."""
+        # UTC offsets are within +-14h, so widen the UTC window and filter locally
+        start = day * MINUTES_PER_DAY
+        rows = self.departures_between(airport, start - 14 * 60, start + MINUTES_PER_DAY + 14 * 60)
+        local = self.dep_local[rows]
+        return rows[(local >= start) & (local < start + MINUTES_PER_DAY)]
+
+    def route_departures(self, origin, destination, start_utc, end_utc):
+        """Row indexes of origin->destination legs departing within the window."""
+        bounds = self.pair_slices.get((origin, destination))
+        if bounds is None:
+            return self.pair_order[:0]
+        s, e = bounds
+        block = self.pair_dep[s:e]
+        lo = s + np.searchsorted(block, start_utc, "left")
+        hi = s + np.searchsorted(block, end_utc, "right")
+        return self.pair_order[lo:hi]
+
+    def leg(self, row):
+        """One leg as a plain dict for tool output."""
+        dep_local = int(self.dep_local[row])
+        arr_local = int(self.arr_utc[row]) + int(self.arr_offset[row])
+        return {
+            "flight_number": f"{self.airlines[self.airline[row]]}{int(self.flight_number[row])}",
+            "origin": self.airports[self.origin[row]],
+            "destination": self.airports[self.destination[row]],
+            "date": format_day(dep_local // MINUTES_PER_DAY),
+            "departure": format_minutes(dep_local),
+            "arrival": format_minutes(arr_local),
+            "arrival_day_offset": arr_local // MINUTES_PER_DAY - dep_local // MINUTES_PER_DAY,
+            "aircraft": self.aircraft_types[self.aircraft[row]],
+            "available_seats": int(self.seats[row]),
+            "fare": float(self.fare[row]),
+        }
+
+    def nbytes(self):
+        arrays = [getattr(self, name) for name in COLUMNS]
+        arrays += [self.origin_ptr, self.dep_local, self.pair_order, self.pair_dep, self.flight_order]
+        return sum(a.nbytes for a in arrays)
+
+
+def load_schedule(path):
+    """Load a schedule from .csv or .npz, preferring a fresh .npz beside a CSV."""
+    if path.endswith(".npz"):
+        return ScheduleStore.from_npz(path)
+    snapshot = os.path.splitext(path)[0] + ".npz"
+    if os.path.exists(snapshot) and os.path.getmtime(snapshot) >= os.path.getmtime(path):
+        return ScheduleStore.from_npz(snapshot)
+    return ScheduleStore.from_csv(path)
@@ -0,0 +1,366 @@
+# customer_service_agent/schedule/timezones.py
+"""Preloaded airport time zone table and connection-time calculator.
+
+Run with: python -m customer_service_agent.schedule.timezones JFK NRT --at "2026-03-05 18:00"
+
+Every airport in airport_timezones.csv (override with AIRPORT_TIMEZONES_PATH)
+is mapped to its IANA zone, and each zone's UTC offset transitions between
+START_YEAR and END_YEAR are read from zoneinfo once and cached. The
+transitions for all zones are flattened into one sorted key array
+(zone * span + minute), so the offset of any (zone, instant) pair is one
+binary search. That lets UTC <-> local conversions run vectorized over
+whole itineraries instead of one datetime per leg. Times are minutes since
+the Unix epoch, as in ScheduleStore.
+
+connection_times() turns arrival/departure arrays and the connecting
+airport's MCT into layovers and a risk level. FlightSearch uses it for the
+layovers it reports, check_connection_risk for booked itineraries (the
+result lands in state['connection_risk']), and calculate_time_zones is
+the language agent's conversion and jet-lag tool.
+"""
+import argparse
+import csv
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+
+from .store import EPOCH, MINUTES_PER_DAY
+
+logger = logging.getLogger(__name__)
+
+AIRPORT_TIMEZONES_ENV = "AIRPORT_TIMEZONES_PATH"
+DEFAULT_AIRPORT_TIMEZONES_PATH = os.path.join(os.path.dirname(__file__), "airport_timezones.csv")
+START_YEAR = 2015
+END_YEAR = 2040
+SAMPLE_MINUTES = 7 * MINUTES_PER_DAY  # no zone changes offset twice within a week
+TIGHT_BUFFER = 30  # minutes above MCT that still count as a tight connection
+RISK_LEVELS = ("ok", "tight", "below_mct", "missed")
+BUSINESS_HOURS = (9, 17)
+# Abbreviations people type, mapped to a representative zone (DST is applied by the zone)
+ABBREVIATIONS = {
+    "UTC": "UTC", "GMT": "UTC", "Z": "UTC",
+    "EST": "America/New_York", "EDT": "America/New_York", "ET": "America/New_York",
+    "CST": "America/Chicago", "CDT": "America/Chicago", "CT": "America/Chicago",
+    "MST": "America/Denver", "MDT": "America/Denver", "MT": "America/Denver",
+    "PST": "America/Los_Angeles", "PDT": "America/Los_Angeles", "PT": "America/Los_Angeles",
+    "BST": "Europe/London", "CET": "Europe/Paris", "CEST": "Europe/Paris", "EET": "Europe/Athens",
+    "GST": "Asia/Dubai", "IST": "Asia/Kolkata", "SGT": "Asia/Singapore", "HKT": "Asia/Hong_Kong",
+    "JST": "Asia/Tokyo", "KST": "Asia/Seoul", "AEST": "Australia/Sydney", "AEDT": "Australia/Sydney",
+    "NZST": "Pacific/Auckland", "NZDT": "Pacific/Auckland",
+}
+TIME_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%H:%M", "%I:%M %p", "%I:%M%p", "%I %p", "%I%p")
+
+
+def minutes_at(year):
+    """UTC minutes since the epoch at the start of a year."""
+    return (date(year, 1, 1) - EPOCH).days * MINUTES_PER_DAY
+
+
+def format_difference(minutes):
+    """Signed hours, with minutes only for zones off the hour: '+13', '-4:30'."""
+    sign = "+" if minutes >= 0 else "-"
+    hours, rest = divmod(abs(int(minutes)), 60)
+    return f"{sign}{hours}:{rest:02d}" if rest else f"{sign}{hours}"
+
+
+def format_local(minutes):
+    """Local minutes since the epoch -> 'YYYY-MM-DD HH:MM'."""
+    moment = datetime(1970, 1, 1) + timedelta(minutes=int(minutes))
+    return moment.strftime("%Y-%m-%d %H:%M")
+
+
+@lru_cache(maxsize=None)
+def zone_transitions(zone, start_year=START_YEAR, end_year=END_YEAR):
+    """(times, offsets) for a zone: UTC minute of each offset change, first entry the window start.
+
+    zoneinfo is sampled weekly and every change is narrowed to the minute
+    by bisection, so a zone costs a couple of thousand utcoffset() calls
+    once per process.
+    """
+    tz = ZoneInfo(zone)
+
+    def offset(minute):
+        return int(datetime.fromtimestamp(minute * 60, tz).utcoffset().total_seconds()) // 60
+
+    start, end = minutes_at(start_year), minutes_at(end_year + 1)
+    times, offsets = [start], [offset(start)]
+    previous = start
+    while previous < end:
+        sample = min(previous + SAMPLE_MINUTES, end)
+        current = offset(sample)
+        if current != offsets[-1]:
+            lo, hi = previous, sample
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if offset(mid) == offsets[-1]:
+                    lo = mid
+                else:
+                    hi = mid
+            times.append(hi)
+            offsets.append(current)
+        previous = sample
+    return tuple(times), tuple(offsets)
+
+
+def load_airport_zones(path):
+    """{IATA code: IANA zone} from a code,timezone CSV."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row["code"].strip().upper(): row["timezone"].strip() for row in csv.DictReader(f)}
+
+
+class TimeZoneTable:
+    """UTC offsets for a fixed set of zones and airports, looked up in bulk.
+
+    Zones are addressed by small integer ids (zone_id() resolves airport
+    codes, IANA names, common abbreviations and city names). offsets(),
+    to_local() and to_utc() accept arrays of any shape and broadcast zone
+    ids against times. Instants outside the preloaded years take the
+    offset in force at the nearest edge of the window.
+    """
+
+    def __init__(self, airport_zones, zones=(), start_year=START_YEAR, end_year=END_YEAR):
+        self.start_year, self.end_year = start_year, end_year
+        self.zones = sorted(set(airport_zones.values()) | set(zones) | {"UTC"})
+        self.zone_index = {zone: i for i, zone in enumerate(self.zones)}
+        self.airport_zones = dict(airport_zones)
+        self.airport_ids = {code: self.zone_index[zone] for code, zone in airport_zones.items()}
+        self.cities = {zone.rsplit("/", 1)[-1].replace("_", " ").lower(): zone for zone in self.zones}
+        self.start, self.end = minutes_at(start_year), minutes_at(end_year + 1)
+        self.span = self.end - self.start
+        keys, offsets = [], []
+        for i, zone in enumerate(self.zones):
+            times, values = zone_transitions(zone, start_year, end_year)
+            keys.append(i * self.span + np.asarray(times, dtype=np.int64) - self.start)
+            offsets.append(np.asarray(values, dtype=np.int16))
+        self.keys = np.concatenate(keys)
+        self.offset_values = np.concatenate(offsets)
+
+    @classmethod
+    def from_csv(cls, path, **kwargs):
+        return cls(load_airport_zones(path), **kwargs)
+
+    def with_zones(self, zones):
+        """A copy of this table that also covers `zones` (IANA names)."""
+        return TimeZoneTable(self.airport_zones, set(self.zones) | set(zones), self.start_year, self.end_year)
+
+    def zone_name(self, value):
+        """IANA zone for an airport code, zone name, abbreviation or city, or None."""
+        text = str(value).strip()
+        upper = text.upper()
+        # Abbreviations first: the argument is a time zone, so "IST" is India, not Istanbul
+        if upper in ABBREVIATIONS:
+            return ABBREVIATIONS[upper]
+        if upper in self.airport_zones:
+            return self.airport_zones[upper]
+        if text in self.zone_index:
+            return text
+        city = text.lower()
+        if city in self.cities:
+            return self.cities[city]
+        if "/" in text:
+            return text  # any other IANA name; resolve_zone() checks it exists
+        return None
+
+    def zone_id(self, value):
+        """Zone id for an airport code, zone name, abbreviation or city in this table, or None."""
+        zone = self.zone_name(value)
+        return self.zone_index.get(zone) if zone else None
+
+    def airport_zone_ids(self, codes):
+        """Zone id per airport code, -1 where the airport is unknown."""
+        return np.array([self.airport_ids.get(str(code).upper(), -1) for code in codes], dtype=np.int32)
+
+    def offsets(self, zone_ids, utc):
+        """UTC offset in minutes of each zone at each UTC instant."""
+        zone_ids, utc = np.broadcast_arrays(np.asarray(zone_ids, dtype=np.int64), np.asarray(utc, dtype=np.int64))
+        minute = np.clip(utc - self.start, 0, self.span - 1)
+        position = np.searchsorted(self.keys, zone_ids * self.span + minute, "right") - 1
+        return self.offset_values[position].astype(np.int32)
+
+    def to_local(self, zone_ids, utc):
+        """Local wall-clock minutes for UTC minutes."""
+        utc = np.asarray(utc, dtype=np.int64)
+        return utc + self.offsets(zone_ids, utc)
+
+    def to_utc(self, zone_ids, local):
+        """UTC minutes for local wall-clock minutes.
+
+        Ambiguous times in a fall-back hour resolve to the earlier instant
+        and non-existent ones in a spring-forward gap are pushed past it,
+        as zoneinfo does with fold=0.
+        """
+        local = np.asarray(local, dtype=np.int64)
+        # Offsets on either side of the (at most one) transition near this wall time
+        before = self.offsets(zone_ids, local - 14 * 60)
+        after = self.offsets(zone_ids, local + 14 * 60)
+        early, late = local - before, local - after
+        use_late = (self.offsets(zone_ids, early) != before) & (self.offsets(zone_ids, late) == after)
+        return np.where(use_late, late, early)
+
+    def utc_offset(self, zone_id, utc):
+        return int(self.offsets(zone_id, utc))
+
+    def stats(self):
+        return {
+            "airports": len(self.airport_ids),
+            "zones": len(self.zones),
+            "transitions": len(self.keys) - len(self.zones),
+            "years": f"{self.start_year}-{self.end_year}",
+            "bytes": self.keys.nbytes + self.offset_values.nbytes,
+        }
+
+
+def connection_times(arrivals_utc, departures_utc, mct, delay=0, tight_buffer=TIGHT_BUFFER):
+    """(layover minutes, risk index into RISK_LEVELS) for each connection.
+
+    arrivals_utc are the inbound legs' arrivals, departures_utc the onward
+    legs' departures and mct the connecting airports' minimum connect
+    times; delay is added to the arrivals. All arguments broadcast.
+    """
+    layover = np.asarray(departures_utc, dtype=np.int64) - np.asarray(arrivals_utc, dtype=np.int64) - delay
+    mct = np.asarray(mct)
+    risk = np.select([layover < 0, layover < mct, layover < mct + tight_buffer], [3, 2, 1], 0)
+    return layover, risk.astype(np.int8)
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_timezone_table():
+    """The process-wide TimeZoneTable, preloaded on first use."""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                path = os.getenv(AIRPORT_TIMEZONES_ENV, DEFAULT_AIRPORT_TIMEZONES_PATH)
+                _table = TimeZoneTable.from_csv(path, zones=set(ABBREVIATIONS.values()))
+                logger.info("Loaded time zones for %d airports (%d zones)", len(_table.airport_ids), len(_table.zones))
+    return _table
+
+
+def resolve_zone(value):
+    """(table, zone id) for a zone reference, extending the shared table with new IANA zones."""
+    global _table
+    table = get_timezone_table()
+    zone = table.zone_name(value)
+    if zone is None:
+        return table, None
+    if zone not in table.zone_index:
+        try:
+            ZoneInfo(zone)
+        except (ZoneInfoNotFoundError, ValueError):
+            return table, None
+        with _table_lock:
+            if zone not in _table.zone_index:
+                _table = _table.with_zones([zone])
+            table = _table
+    return table, table.zone_index[zone]
+
+
+def parse_local_time(text, today):
+    """Minutes since the epoch for a local 'HH:MM', '3 PM' or 'YYYY-MM-DD HH:MM' string."""
+    text = str(text).strip().upper()
+    for fmt in TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        if "%Y" not in fmt:
+            parsed = datetime.combine(today, parsed.time())
+        return int((parsed - datetime(1970, 1, 1)).total_seconds()) // 60
+    return None
+
+
+def overlap_hours(table, origin, destination, day_start_utc, hours=BUSINESS_HOURS):
+    """Origin-local (start, end) hours when both places are inside business hours, or None."""
+    utc = day_start_utc + np.arange(0, MINUTES_PER_DAY, 60)
+    origin_hour = table.to_local(origin, utc) % MINUTES_PER_DAY // 60
+    destination_hour = table.to_local(destination, utc) % MINUTES_PER_DAY // 60
+    both = np.flatnonzero((origin_hour >= hours[0]) & (origin_hour < hours[1])
+                          & (destination_hour >= hours[0]) & (destination_hour < hours[1]))
+    if not len(both):
+        return None
+    return int(origin_hour[both].min()), int(origin_hour[both].max()) + 1
+
+
+def jet_lag_advice(difference_minutes):
+    # The body clock takes the shorter way round: +14h is adjusted to as -10h
+    difference_minutes = (difference_minutes + 12 * 60) % MINUTES_PER_DAY - 12 * 60
+    hours = abs(difference_minutes) / 60
+    if hours < 3:
+        return "Minimal jet lag expected; keep your usual schedule"
+    # Rule of thumb: about a day per hour gained flying east, two-thirds of that flying west
+    if difference_minutes > 0:
+        return (f"Expect about {round(hours)} days to adjust. Go to bed an hour earlier each night "
+                "for a few days before departure and get morning daylight at the destination")
+    return (f"Expect about {round(hours * 2 / 3)} days to adjust. Stay up until local bedtime on "
+            "arrival and get afternoon daylight for the first few days")
+
+
+# ----- tool function -----
+
+def calculate_time_zones(origin_timezone, destination_timezone, preferred_time=None, now=None):
+    """calculate_time_zones tool: time difference, conversions, contact window and jet lag."""
+    for value in (origin_timezone, destination_timezone):
+        if resolve_zone(value)[1] is None:
+            return {"error": f"Unknown time zone or airport: {value}"}
+    table = get_timezone_table()
+    origin, destination = table.zone_id(origin_timezone), table.zone_id(destination_timezone)
+
+    now = now or datetime.now(timezone.utc)
+    now_utc = int(now.timestamp()) // 60
+    origin_now, destination_now = (int(x) for x in table.to_local([origin, destination], now_utc))
+    difference = destination_now - origin_now
+
+    def describe(zone, local, reference):
+        moment = datetime(1970, 1, 1) + timedelta(minutes=local)
+        abbreviation = moment.replace(tzinfo=ZoneInfo(table.zones[zone])).tzname()
+        day = local // MINUTES_PER_DAY - reference // MINUTES_PER_DAY
+        return f"{format_local(local)} {abbreviation}" + {1: " (next day)", -1: " (previous day)"}.get(day, "")
+
+    result = {
+        "origin_timezone": table.zones[origin],
+        "destination_timezone": table.zones[destination],
+        "time_difference": f"{format_difference(difference)} hours",
+        "current_time_origin": describe(origin, origin_now, origin_now),
+        "current_time_destination": describe(destination, destination_now, origin_now),
+    }
+    if preferred_time:
+        local = parse_local_time(preferred_time, EPOCH + timedelta(days=origin_now // MINUTES_PER_DAY))
+        if local is None:
+            return {"error": "preferred_time must be HH:MM, H AM/PM or YYYY-MM-DD HH:MM"}
+        utc = int(table.to_utc(origin, local))
+        # A time inside a spring-forward gap comes back an hour later
+        local = int(table.to_local(origin, utc))
+        result["preferred_time_origin"] = describe(origin, local, local)
+        result["preferred_time_destination"] = describe(destination, int(table.to_local(destination, utc)), local)
+
+    day_start = int(table.to_utc(origin, origin_now - origin_now % MINUTES_PER_DAY))
+    window = overlap_hours(table, origin, destination, day_start)
+    result["business_hours_overlap"] = (
+        f"{window[0]:02d}:00 - {window[1]:02d}:00 {table.zones[origin]}" if window else "None"
+    )
+    result["jet_lag_advice"] = jet_lag_advice(difference)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("origin", help="airport code, IANA zone, abbreviation or city")
+    parser.add_argument("destination")
+    parser.add_argument("--at", help="local time at the origin")
+    args = parser.parse_args()
+
+    for key, value in calculate_time_zones(args.origin, args.destination, args.at).items():
+        print(f"{key:28s} {value}")
+    print(f"{'table':28s} {get_timezone_table().stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+# customer_service_agent/session_store.py
+"""SQLite-backed ADK session service.
+
+Drop-in replacement for InMemorySessionService that survives restarts and can
+be shared by several worker processes on one host:
+
+- The database runs in WAL mode so readers never block the single writer.
+- Connections come from a small pool instead of being opened per call.
+- append_event applies state deltas to the in-memory Session immediately and
+  queues the rows; a background thread writes queued rows in one transaction
+  every flush_interval seconds (or sooner once batch_size events are queued).
+  Repeated writes to the same key within a batch are coalesced. Reads in the
+  same process see queued writes; other processes see them after the flush.
+- Large keys such as interaction_history and booking_history are not read
+  with the rest of the state; they are fetched on first access.
+
+State keys prefixed with "app:" and "user:" are shared across sessions of the
+same app / user, and "temp:" keys are never persisted, as in ADK.
+"""
+import atexit
+import json
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import ListSessionsResponse
+
+from .alerts import get_alert_index
+
+LAZY_STATE_KEYS = ("interaction_history", "booking_history")
+
+APP_PREFIX = "app:"
+USER_PREFIX = "user:"
+TEMP_PREFIX = "temp:"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE TABLE IF NOT EXISTS state (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    event TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_session ON events (app_name, user_id, session_id);
+"""
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections configured for WAL."""
+
+    def __init__(self, db_path, size=4):
+        self.db_path = db_path
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._all = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+
+
+class _Unloaded:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "<not loaded>"
+
+
+_UNLOADED = _Unloaded()
+
+
+class LazyState(dict):
+    """Session state whose large keys are fetched from the database on first access."""
+
+    def __init__(self, data, lazy_keys, loader):
+        super().__init__(data)
+        self._loader = loader
+        for key in lazy_keys:
+            if not dict.__contains__(self, key):
+                dict.__setitem__(self, key, _UNLOADED)
+
+    def _resolve(self, key):
+        value = dict.__getitem__(self, key)
+        if value is _UNLOADED:
+            value = self._loader(key)
+            dict.__setitem__(self, key, value)
+        return value
+
+    def __getitem__(self, key):
+        return self._resolve(key)
+
+    def get(self, key, default=None):
+        return self._resolve(key) if dict.__contains__(self, key) else default
+
+    def __iter__(self):
+        return iter(dict.keys(self))
+
+    def keys(self):
+        return dict.keys(self)
+
+    def items(self):
+        return [(key, self._resolve(key)) for key in dict.keys(self)]
+
+    def values(self):
+        return [self._resolve(key) for key in dict.keys(self)]
+
+    def copy(self):
+        return dict(self.items())
+
+    def pop(self, key, *default):
+        if dict.__contains__(self, key):
+            self._resolve(key)
+        return dict.pop(self, key, *default)
+
+    def setdefault(self, key, default=None):
+        if dict.__contains__(self, key):
+            return self._resolve(key)
+        dict.__setitem__(self, key, default)
+        return default
+
+    def __eq__(self, other):
+        return dict(self.items()) == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class _PendingWrites:
+    __slots__ = ("state", "events", "update_time", "is_new")
+
+    def __init__(self):
+        self.state = {}
+        self.events = []
+        self.update_time = None
+        self.is_new = False
+
+
+class SqliteSessionService(BaseSessionService):
+    """Persistent session service on SQLite with pooled connections and write-behind."""
+
+    def __init__(
+        self,
+        db_path="sessions.db",
+        pool_size=4,
+        batch_size=256,
+        flush_interval=0.5,
+        lazy_keys=LAZY_STATE_KEYS,
+    ):
+        self.db_path = db_path
+        self.pool = ConnectionPool(db_path, size=pool_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lazy_keys = tuple(lazy_keys)
+
+        # Queued writes keyed by (app_name, user_id, session_id); app- and
+        # user-scoped state uses "" for the missing parts of the key.
+        self._pending = {}
+        self._pending_events = 0
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+        self._flusher = None
+        if flush_interval:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="session-flush", daemon=True
+            )
+            self._flusher.start()
+        atexit.register(self.close)
+
+    # ===== Write-behind queue =====
+
+    def _queue(self, key):
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _PendingWrites()
+        return pending
+
+    def _queue_state(self, app_name, user_id, session_id, delta):
+        for key, value in delta.items():
+            if key.startswith(TEMP_PREFIX):
+                continue
+            if key.startswith(APP_PREFIX):
+                scope = (app_name, "", "")
+            elif key.startswith(USER_PREFIX):
+                scope = (app_name, user_id, "")
+            else:
+                scope = (app_name, user_id, session_id)
+            self._queue(scope).state[key] = json.dumps(value)
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write all queued sessions, state and events in a single transaction."""
+        with self._flush_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+                self._pending_events = 0
+            if not pending:
+                return
+
+            sessions, state_rows, event_rows = [], [], []
+            for (app_name, user_id, session_id), writes in pending.items():
+                if session_id:
+                    sessions.append((app_name, user_id, session_id, writes.update_time))
+                state_rows.extend(
+                    (app_name, user_id, session_id, key, value) for key, value in writes.state.items()
+                )
+                event_rows.extend(
+                    (app_name, user_id, session_id, ts, payload) for ts, payload in writes.events
+                )
+
+            with self.pool.connection() as conn, conn:
+                conn.executemany(
+                    "INSERT INTO sessions (app_name, user_id, id, update_time) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (app_name, user_id, id) "
+                    "DO UPDATE SET update_time = max(update_time, excluded.update_time)",
+                    sessions,
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO state (app_name, user_id, session_id, key, value) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    state_rows,
+                )
+                conn.executemany(
+                    "INSERT INTO events (app_name, user_id, session_id, timestamp, event) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    event_rows,
+                )
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self.pool.close()
+
+    # ===== BaseSessionService =====
+
+    def create_session(self, *, app_name, user_id, state=None, session_id=None):
+        session_id = session_id or str(uuid.uuid4())
+        now = time.time()
+        state = dict(state or {})
+        with self._pending_lock:
+            pending = self._queue((app_name, user_id, session_id))
+            pending.is_new = True
+            pending.update_time = now
+            self._queue_state(app_name, user_id, session_id, state)
+
+        session = Session(id=session_id, app_name=app_name, user_id=user_id, last_update_time=now)
+        session.state = {k: v for k, v in state.items() if not k.startswith(TEMP_PREFIX)}
+        return session
+
+    def _load_lazy(self, app_name, user_id, session_id, key):
+        with self._pending_lock:
+            pending = self._pending.get((app_name, user_id, session_id))
+            if pending is not None and key in pending.state:
+                return json.loads(pending.state[key])
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT value FROM state WHERE app_name = ? AND user_id = ? AND session_id = ? AND key = ?",
+                (app_name, user_id, session_id, key),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_session(self, *, app_name, user_id, session_id, config=None):
+        # Holding the flush lock keeps queued rows from moving to the database
+        # between reading the queue and reading the tables.
+        with self._flush_lock:
+            with self._pending_lock:
+                own = self._pending.get((app_name, user_id, session_id))
+                overlay_state = {}
+                for scope in ((app_name, "", ""), (app_name, user_id, "")):
+                    if scope in self._pending:
+                        overlay_state.update(self._pending[scope].state)
+                overlay_events = []
+                if own is not None:
+                    overlay_state.update(own.state)
+                    overlay_events = list(own.events)
+                pending_time = own.update_time if own is not None else None
+                is_new = own is not None and own.is_new
+
+            with self.pool.connection() as conn:
+                row = None
+                if not is_new:
+                    row = conn.execute(
+                        "SELECT update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                        (app_name, user_id, session_id),
+                    ).fetchone()
+                    if row is None and own is None:
+                        return None
+
+                # App, user and session scopes as three primary-key lookups,
+                # ordered so narrower scopes override wider ones.
+                lazy = ",".join("?" * len(self.lazy_keys)) or "NULL"
+                state_rows = conn.execute(
+                    "SELECT key, value FROM state WHERE app_name = ? AND user_id = '' AND session_id = '' "
+                    "UNION ALL "
+                    "SELECT key, value FROM state WHERE app_name = ? AND user_id = ? AND session_id = '' "
+                    "UNION ALL "
+                    f"SELECT key, CASE WHEN key IN ({lazy}) THEN NULL ELSE value END FROM state "
+                    "WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                    (app_name, app_name, user_id, *self.lazy_keys, app_name, user_id, session_id),
+                ).fetchall()
+
+                event_rows = []
+                if not is_new:
+                    where = "app_name = ? AND user_id = ? AND session_id = ?"
+                    params = [app_name, user_id, session_id]
+                    if config is not None and config.after_timestamp:
+                        where += " AND timestamp >= ?"
+                        params.append(config.after_timestamp)
+                    if config is not None and config.num_recent_events:
+                        query = (
+                            "SELECT event FROM (SELECT rowid AS seq, event FROM events "
+                            f"WHERE {where} ORDER BY seq DESC LIMIT ?) ORDER BY seq"
+                        )
+                        params.append(config.num_recent_events)
+                    else:
+                        query = f"SELECT event FROM events WHERE {where} ORDER BY rowid"
+                    event_rows = conn.execute(query, params).fetchall()
+
+        loaded, lazy_present = {}, set()
+        for key, value in state_rows:
+            if value is None:
+                lazy_present.add(key)
+            else:
+                loaded[key] = json.loads(value)
+        for key, value in overlay_state.items():
+            loaded[key] = json.loads(value)
+            lazy_present.discard(key)
+
+        events = [Event.model_validate_json(payload) for (payload,) in event_rows]
+        events += [Event.model_validate_json(payload) for _, payload in overlay_events]
+        if config is not None and config.num_recent_events:
+            events = events[-config.num_recent_events:]
+
+        update_time = max(t for t in (row[0] if row else None, pending_time) if t is not None)
+        session = Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            events=events,
+            last_update_time=update_time,
+        )
+        session.state = LazyState(
+            loaded,
+            lazy_present,
+            lambda key: self._load_lazy(app_name, user_id, session_id, key),
+        )
+        return session
+
+    def list_sessions(self, *, app_name, user_id):
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT id, update_time FROM sessions WHERE app_name = ? AND user_id = ?",
+                (app_name, user_id),
+            ).fetchall()
+        found = {session_id: update_time for session_id, update_time in rows}
+        with self._pending_lock:
+            for (app, user, session_id), pending in self._pending.items():
+                if app == app_name and user == user_id and session_id:
+                    found[session_id] = max(found.get(session_id, 0), pending.update_time or 0)
+        return ListSessionsResponse(
+            sessions=[
+                Session(id=session_id, app_name=app_name, user_id=user_id, last_update_time=t)
+                for session_id, t in found.items()
+            ]
+        )
+
+    def delete_session(self, *, app_name, user_id, session_id):
+        with self._pending_lock:
+            self._pending.pop((app_name, user_id, session_id), None)
+        with self._flush_lock, self.pool.connection() as conn, conn:
+            params = (app_name, user_id, session_id)
+            conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", params)
+            conn.execute(
+                "DELETE FROM state WHERE app_name = ? AND user_id = ? AND session_id = ?", params
+            )
+            conn.execute(
+                "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", params
+            )
+        get_alert_index().untrack(session_id)
+
+    def list_events(self, *, app_name, user_id, session_id):
+        session = self.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        return session.events if session else []
+
+    def append_event(self, session, event):
+        if event.partial:
+            return event
+
+        delta = event.actions.state_delta if event.actions else None
+        if delta:
+            for key, value in delta.items():
+                if not key.startswith(TEMP_PREFIX):
+                    session.state[key] = value
+        session.events.append(event)
+        session.last_update_time = event.timestamp
+
+        payload = event.model_dump_json(exclude_none=True)
+        with self._pending_lock:
+            pending = self._queue((session.app_name, session.user_id, session.id))
+            pending.update_time = event.timestamp
+            pending.events.append((event.timestamp, payload))
+            if delta:
+                self._queue_state(session.app_name, session.user_id, session.id, delta)
+            self._pending_events += 1
+            flush_now = self._pending_events >= self.batch_size
+        if flush_now:
+            self.flush()
+        return event
@@ -2,6 +2,9 @@
 from google.adk.agents import Agent
 from google.adk.tools import Tool
 
+from ...baggage import track_baggage
+from ...tool_cache import POLICY_TTL, cache_tool
+
 # Track baggage tool
 track_baggage_tool = Tool(
     name="track_baggage",
@@ -9,17 +12,12 @@ track_baggage_tool = Tool(
     parameters={
         "type": "object",
         "properties": {
-            "reference_number": {"type": "string", "description": "Baggage tag or reference number"},
+            "reference_number": {"type": "string", "description": "Baggage tag number (e.g., AA123456) or booking reference"},
             "last_name": {"type": "string", "description": "Passenger last name"}
         },
         "required": ["reference_number", "last_name"]
     },
-    function=lambda **kwargs: {
-        "status": "In Transit",
-        "last_scan": "JFK Airport - 14:30",
-        "expected_arrival": "LAX Airport - 18:45",
-        "current_location": "En route on AA123"
-    }
+    function=track_baggage
 )
 
 # File baggage claim tool
@@ -102,6 +100,9 @@ arrange_special_baggage_tool = Tool(
     }
 )
 
+# Read-only lookups are shared across sessions through the tool cache
+cache_tool(check_baggage_policy_tool, ttl=POLICY_TTL)
+
 baggage_services_agent = Agent(
     name="baggage_services",
     model="gemini-2.0-flash",
@@ -143,7 +144,7 @@ baggage_services_agent = Agent(
        - Pet carriers
     
     **Available Tools:**
-    - track_baggage: Track baggage location and status
+    - track_baggage: Latest scan status for a tag number, or every bag on a booking reference
     - file_baggage_claim: File claims for lost/damaged baggage
     - check_baggage_policy: Check allowances and fees
     - arrange_special_baggage: Arrange special item handling
@@ -2,6 +2,9 @@
 from google.adk.agents import Agent
 from google.adk.tools import Tool
 
+from ...alerts import watch_flights
+from ...inventory import create_booking, select_seat
+
 # Create new booking tool
 create_booking_tool = Tool(
     name="create_booking",
@@ -39,12 +42,7 @@ create_booking_tool = Tool(
         },
         "required": ["flight_details", "passenger_info", "contact_info"]
     },
-    function=lambda **kwargs: {
-        "booking_reference": "ABC123",
-        "status": "Confirmed",
-        "total_price": "$486.00",
-        "payment_due": "2024-12-01"
-    }
+    function=create_booking
 )
 
 # Modify booking tool
@@ -86,11 +84,7 @@ select_seat_tool = Tool(
         },
         "required": ["booking_reference", "flight_number"]
     },
-    function=lambda **kwargs: {
-        "assigned_seats": ["12A", "12B"],
-        "seat_type": "Economy Plus",
-        "additional_cost": "$45.00"
-    }
+    function=select_seat
 )
 
 # Special services tool
@@ -184,6 +178,7 @@ booking_management_agent = Agent(
     Always prioritize accuracy in bookings and ensure customers understand
     all terms and conditions before confirming reservations.
     """,
+    after_tool_callback=watch_flights,
     tools=[
         create_booking_tool,
         modify_booking_tool,
@@ -1 +1 @@
-from . import agentfrom . import agent
\ No newline at end of file
+from . import agent
\ No newline at end of file
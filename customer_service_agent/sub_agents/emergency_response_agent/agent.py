@@ -2,6 +2,9 @@
 from google.adk.agents import Agent
 from google.adk.tools import Tool
 
+from ...schedule.reaccommodation import emergency_rebook, mass_rebook
+from ...weather import check_weather_disruptions
+
 # Emergency rebooking tool
 emergency_rebook_tool = Tool(
     name="emergency_rebook",
@@ -9,31 +12,31 @@ emergency_rebook_tool = Tool(
     parameters={
         "type": "object",
         "properties": {
-            "original_booking": {"type": "string"},
+            "original_booking": {"type": "string", "description": "Booking including the flight number and date (e.g. AA123 2026-03-05)"},
             "disruption_type": {"type": "string", "enum": ["weather", "mechanical", "strike", "emergency"]},
             "priority_level": {"type": "string", "enum": ["standard", "elite", "medical", "connecting"]},
             "alternatives_needed": {"type": "integer", "default": 3}
         },
         "required": ["original_booking", "disruption_type"]
     },
-    function=lambda **kwargs: {
-        "rebook_options": [
-            {
-                "flight": "AA456",
-                "departure": "18:30",
-                "arrival": "22:45",
-                "seats_available": 12
-            },
-            {
-                "flight": "Partner UA789",
-                "departure": "19:15",
-                "arrival": "23:30",
-                "seats_available": 5
-            }
-        ],
-        "hotel_needed": True,
-        "meal_vouchers": "$30 per person"
-    }
+    function=emergency_rebook
+)
+
+# Mass re-accommodation tool
+mass_rebook_tool = Tool(
+    name="mass_rebook",
+    description="Re-accommodate all passengers booked through a closed airport",
+    parameters={
+        "type": "object",
+        "properties": {
+            "closed_airport": {"type": "string", "description": "Airport code (e.g. ORD)"},
+            "date": {"type": "string", "description": "Closure date (YYYY-MM-DD)"},
+            "start_time": {"type": "string", "description": "Closure start, local time (HH:MM)", "default": "00:00"},
+            "duration_hours": {"type": "number", "default": 8}
+        },
+        "required": ["closed_airport", "date"]
+    },
+    function=mass_rebook
 )
 
 # Crisis management tool
@@ -103,6 +106,25 @@ check_travel_advisory_tool = Tool(
     }
 )
 
+# Weather disruption tool
+check_weather_disruptions_tool = Tool(
+    name="check_weather_disruptions",
+    description="List airports whose current or forecast weather puts flights at risk of delay",
+    parameters={
+        "type": "object",
+        "properties": {
+            "airports": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "IATA or ICAO codes to check (default: every airport with weather reports)"
+            },
+            "min_level": {"type": "string", "enum": ["moderate", "high", "severe"], "default": "high"},
+            "hours": {"type": "integer", "description": "Forecast hours to look ahead", "default": 6}
+        }
+    },
+    function=check_weather_disruptions
+)
+
 emergency_response_agent = Agent(
     name="emergency_response",
     model="gemini-2.0-flash",
@@ -147,9 +169,12 @@ emergency_response_agent = Agent(
     
     **Available Tools:**
     - emergency_rebook: Fast rebooking for disrupted passengers
+    - mass_rebook: Re-accommodate every passenger affected by an airport closure
     - manage_crisis: Coordinate major disruption response
     - handle_medical_emergency: Medical emergency coordination
     - check_travel_advisory: Travel warnings and restrictions
+    - check_weather_disruptions: Airports at risk of weather delays now or in
+      the next hours, worst first, with the conditions behind each score
     
     **Priority Levels:**
     1. Medical emergencies
@@ -192,8 +217,10 @@ emergency_response_agent = Agent(
     """,
     tools=[
         emergency_rebook_tool,
+        mass_rebook_tool,
         manage_crisis_tool,
         handle_medical_emergency_tool,
-        check_travel_advisory_tool
+        check_travel_advisory_tool,
+        check_weather_disruptions_tool
     ]
 )
\ No newline at end of file
@@ -2,6 +2,12 @@
 from google.adk.agents import Agent
 from google.adk.tools import Tool
 
+from ...airports.store import get_airport_info, search_airports
+from ...alerts import watch_flights
+from ...schedule.search import check_connection_risk, check_flight_status, record_connection_risk, search_flights
+from ...tool_cache import FLIGHT_STATUS_TTL, cache_tool
+from ...weather import check_weather
+
 # Flight status checking tool
 check_flight_status_tool = Tool(
     name="check_flight_status",
@@ -14,19 +20,13 @@ check_flight_status_tool = Tool(
         },
         "required": ["flight_number", "date"]
     },
-    function=lambda flight_number, date: {
-        "status": "On Time",
-        "departure": "14:30",
-        "arrival": "17:45",
-        "gate": "B12",
-        "aircraft": "Boeing 737-800"
-    }
+    function=check_flight_status
 )
 
 # Flight search tool
 search_flights_tool = Tool(
     name="search_flights",
-    description="Search for available flights",
+    description="Search for available direct and connecting flights",
     parameters={
         "type": "object",
         "properties": {
@@ -38,43 +38,47 @@ search_flights_tool = Tool(
         },
         "required": ["origin", "destination", "departure_date"]
     },
-    function=lambda **kwargs: {
-        "flights": [
-            {
-                "flight_number": "AA123",
-                "departure": "08:00",
-                "arrival": "11:15",
-                "price": "$245",
-                "available_seats": 45
-            },
-            {
-                "flight_number": "AA456",
-                "departure": "14:30",
-                "arrival": "17:45",
-                "price": "$312",
-                "available_seats": 23
+    function=search_flights
+)
+
+# Connection risk tool
+check_connection_risk_tool = Tool(
+    name="check_connection_risk",
+    description="Check layovers and misconnection risk for a multi-leg itinerary",
+    parameters={
+        "type": "object",
+        "properties": {
+            "flights": {
+                "type": "array",
+                "description": "Legs in travel order",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "flight_number": {"type": "string"},
+                        "date": {"type": "string", "description": "Local departure date (YYYY-MM-DD)"},
+                        "delay_minutes": {"type": "integer", "description": "Expected arrival delay"}
+                    },
+                    "required": ["flight_number", "date"]
+                }
             }
-        ]
-    }
+        },
+        "required": ["flights"]
+    },
+    function=check_connection_risk
 )
 
 # Weather information tool
 check_weather_tool = Tool(
     name="check_weather",
-    description="Check weather conditions at airports",
+    description="Check current weather, forecast and weather delay risk at an airport",
     parameters={
         "type": "object",
         "properties": {
-            "airport_code": {"type": "string", "description": "Airport code (e.g., JFK)"}
+            "airport_code": {"type": "string", "description": "IATA or ICAO airport code (e.g., JFK, KJFK)"}
         },
         "required": ["airport_code"]
     },
-    function=lambda airport_code: {
-        "conditions": "Clear",
-        "temperature": "72°F",
-        "visibility": "10 miles",
-        "delays": "No weather delays"
-    }
+    function=check_weather
 )
 
 # Airport information tool
@@ -84,18 +88,33 @@ get_airport_info_tool = Tool(
     parameters={
         "type": "object",
         "properties": {
-            "airport_code": {"type": "string", "description": "Airport code (e.g., LAX)"}
+            "airport_code": {"type": "string", "description": "IATA or ICAO airport code (e.g., LAX, KLAX)"}
         },
         "required": ["airport_code"]
     },
-    function=lambda airport_code: {
-        "terminals": 4,
-        "lounges": ["Admirals Club", "Centurion Lounge"],
-        "services": ["WiFi", "Currency Exchange", "Medical Center"],
-        "parking": "Available - $25/day"
-    }
+    function=get_airport_info
 )
 
+# Airport search tool
+search_airports_tool = Tool(
+    name="search_airports",
+    description="Find airports by city, airport name or code; tolerates misspellings",
+    parameters={
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "City, airport name or partial code (e.g., Frankfurt, heathrow)"},
+            "limit": {"type": "integer", "description": "Maximum results", "default": 8}
+        },
+        "required": ["query"]
+    },
+    function=search_airports
+)
+
+# Read-only lookups are shared across sessions through the tool cache; airport
+# reference data and weather are not cached because the memory-mapped store
+# and the in-process weather table are already direct lookups
+cache_tool(check_flight_status_tool, ttl=FLIGHT_STATUS_TTL)
+
 flight_operations_agent = Agent(
     name="flight_operations",
     model="gemini-2.0-flash",
@@ -131,10 +150,16 @@ flight_operations_agent = Agent(
        - Security wait times and TSA PreCheck info
     
     **Available Tools:**
-    - check_flight_status: Get real-time flight status
-    - search_flights: Search for available flights
-    - check_weather: Check airport weather conditions
-    - get_airport_info: Get airport services information
+    - check_flight_status: Get flight status, with the weather delay risk at
+      both ends of the flight
+    - search_flights: Search for available flights (connecting options include
+      each layover and its risk against the airport's minimum connect time)
+    - check_connection_risk: Rate the layovers of a booked itinerary, optionally
+      with expected delays
+    - check_weather: Check airport weather, the forecast for the next hours and
+      the weather delay risk (low, moderate, high, severe)
+    - get_airport_info: Get airport reference data (name, city, time zone, terminals)
+    - search_airports: Resolve a city or airport name the customer typed into codes
     
     **Communication Guidelines:**
     - Always provide accurate, real-time information
@@ -144,17 +169,22 @@ flight_operations_agent = Agent(
     - Use 24-hour time format for clarity
     
     **State Management:**
-    - Update state['flight_alerts'] for important changes
+    - Sessions that check a flight are alerted to its delays and gate changes;
+      pushed alerts appear in state['flight_alerts'], so mention any new ones
     - Track searched flights in state['flight_search_history']
-    - Monitor connection risks in state['connection_risk']
+    - The latest check_connection_risk result is kept in state['connection_risk'];
+      warn about tight, below_mct or missed connections and offer alternatives
     
     When detecting severe disruptions or emergencies, immediately flag for escalation
     to the Emergency Response Agent through the orchestrator.
     """,
+    after_tool_callback=[watch_flights, record_connection_risk],
     tools=[
         check_flight_status_tool,
         search_flights_tool,
+        check_connection_risk_tool,
         check_weather_tool,
-        get_airport_info_tool
+        get_airport_info_tool,
+        search_airports_tool
     ]
 )
\ No newline at end of file
@@ -2,6 +2,11 @@
 from google.adk.agents import Agent
 from google.adk.tools import Tool
 
+from ...schedule.timezones import calculate_time_zones
+from ...tool_cache import CULTURAL_GUIDANCE_TTL, cache_tool
+from ...translation import translate_content
+from ...visa.matrix import check_visa_requirements
+
 # Translation tool
 translate_content_tool = Tool(
     name="translate_content",
@@ -15,11 +20,7 @@ translate_content_tool = Tool(
         },
         "required": ["text", "target_language"]
     },
-    function=lambda **kwargs: {
-        "translated_text": "Translated content here",
-        "detected_language": "English",
-        "confidence": 0.98
-    }
+    function=translate_content
 )
 
 # Visa requirements tool
@@ -32,24 +33,16 @@ check_visa_requirements_tool = Tool(
             "nationality": {"type": "string"},
             "destination": {"type": "string"},
             "purpose": {"type": "string", "enum": ["tourism", "business", "transit", "student"]},
-            "duration": {"type": "integer", "description": "Stay duration in days"}
+            "duration": {"type": "integer", "description": "Stay duration in days"},
+            "connections": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Connecting airports or countries, in order"
+            }
         },
         "required": ["nationality", "destination", "purpose"]
     },
-    function=lambda **kwargs: {
-        "visa_required": True,
-        "visa_type": "Tourist visa",
-        "processing_time": "5-7 business days",
-        "requirements": [
-            "Valid passport (6 months validity)",
-            "Completed application form",
-            "2 passport photos",
-            "Proof of accommodation",
-            "Return ticket"
-        ],
-        "fee": "$160",
-        "visa_on_arrival": False
-    }
+    function=check_visa_requirements
 )
 
 # Cultural guidance tool
@@ -90,21 +83,19 @@ calculate_time_zones_tool = Tool(
     parameters={
         "type": "object",
         "properties": {
-            "origin_timezone": {"type": "string"},
-            "destination_timezone": {"type": "string"},
-            "preferred_time": {"type": "string", "description": "Time in origin timezone"}
+            "origin_timezone": {"type": "string", "description": "IANA zone, abbreviation, city or airport code"},
+            "destination_timezone": {"type": "string", "description": "IANA zone, abbreviation, city or airport code"},
+            "preferred_time": {"type": "string", "description": "Time in origin timezone (HH:MM or YYYY-MM-DD HH:MM)"}
         },
         "required": ["origin_timezone", "destination_timezone"]
     },
-    function=lambda **kwargs: {
-        "time_difference": "+13 hours",
-        "current_time_origin": "10:00 AM EST",
-        "current_time_destination": "11:00 PM JST (next day)",
-        "business_hours_overlap": "8:00 PM - 10:00 PM EST",
-        "jet_lag_advice": "Expect 5-7 days adjustment"
-    }
+    function=calculate_time_zones
 )
 
+# Read-only lookups are shared across sessions through the tool cache; visa
+# rules are not cached because the matrix is already O(1) and reloads live
+cache_tool(provide_cultural_guidance_tool, ttl=CULTURAL_GUIDANCE_TTL)
+
 language_cultural_agent = Agent(
     name="language_cultural",
     model="gemini-2.0-flash",
@@ -150,8 +141,10 @@ language_cultural_agent = Agent(
        - Health and safety tips
     
     **Available Tools:**
-    - translate_content: Translate text between languages
-    - check_visa_requirements: Verify visa and documentation needs
+    - translate_content: Translate text between languages (reuses translation memory;
+      send a whole message in one call rather than sentence by sentence)
+    - check_visa_requirements: Verify visa and documentation needs (pass connecting
+      airports to check transit rules for the whole itinerary)
     - provide_cultural_guidance: Offer cultural tips and etiquette
     - calculate_time_zones: Time zone conversions and jet lag advice
     
@@ -2,6 +2,9 @@
 from google.adk.agents import Agent
 from google.adk.tools import Tool
 
+from ...ledger import check_miles_balance, redeem_miles, transfer_miles
+from ...tool_cache import STATUS_BENEFITS_TTL, cache_tool
+
 # Check miles balance tool
 check_miles_balance_tool = Tool(
     name="check_miles_balance",
@@ -14,16 +17,7 @@ check_miles_balance_tool = Tool(
         },
         "required": ["member_number"]
     },
-    function=lambda **kwargs: {
-        "current_balance": 75420,
-        "lifetime_miles": 524300,
-        "qualifying_miles": 42000,
-        "recent_activity": [
-            {"date": "2024-11-15", "description": "Flight AA123", "miles": 2340},
-            {"date": "2024-11-01", "description": "Partner purchase", "miles": 450}
-        ],
-        "expiring_soon": {"miles": 5000, "expiry_date": "2025-03-31"}
-    }
+    function=check_miles_balance
 )
 
 # Redeem miles tool
@@ -39,13 +33,7 @@ redeem_miles_tool = Tool(
         },
         "required": ["member_number", "redemption_type", "details"]
     },
-    function=lambda **kwargs: {
-        "redemption_confirmed": True,
-        "miles_used": 25000,
-        "confirmation_code": "RWRD789",
-        "remaining_balance": 50420,
-        "value_received": "$450"
-    }
+    function=redeem_miles
 )
 
 # Check status benefits tool
@@ -90,15 +78,12 @@ transfer_miles_tool = Tool(
         },
         "required": ["from_account", "to_account", "miles_amount"]
     },
-    function=lambda **kwargs: {
-        "transfer_completed": True,
-        "miles_transferred": 10000,
-        "transfer_fee": "$75",
-        "new_balance": 65420,
-        "transaction_id": "TRF456789"
-    }
+    function=transfer_miles
 )
 
+# Read-only lookups are shared across sessions through the tool cache
+cache_tool(check_status_benefits_tool, ttl=STATUS_BENEFITS_TTL)
+
 loyalty_program_agent = Agent(
     name="loyalty_program",
     model="gemini-2.0-flash",
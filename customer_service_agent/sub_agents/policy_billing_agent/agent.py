@@ -1,74 +1,124 @@
+# sub_agents/policy_billing_agent/agent.py
 from google.adk.agents import Agent
+from google.adk.tools import Tool
 
-# Create the root customer service agent
-customer_service_agent = Agent(
-    name="customer_service",
-    model="gemini-2.0-flash",
-    description="Customer service agent for AI Developer Accelerator community",
-    instruction="""
-    You are the primary customer service agent for the AI Developer Accelerator community.
-    Your role is to help users with their questions and direct them to the appropriate specialized agent.
-
-    **Core Capabilities:**
-
-    1. Query Understanding & Routing
-       - Understand user queries about policies, course purchases, course support, and orders
-       - Direct users to the appropriate specialized agent
-       - Maintain conversation context using state
-
-    2. State Management
-       - Track user interactions in state['interaction_history']
-       - Monitor user's purchased courses in state['purchased_courses']
-         - Course information is stored as objects with "id" and "purchase_date" properties
-       - Use state to provide personalized responses
-
-    **User Information:**
-    <user_info>
-    Name: {user_name}
-    </user_info>
-
-    **Purchase Information:**
-    <purchase_info>
-    Purchased Courses: {purchased_courses}
-    </purchase_info>
+from ...fares.engine import calculate_change_fee, calculate_refund, check_fare_rules
 
-    **Interaction History:**
-    <interaction_history>
-    {interaction_history}
-    </interaction_history>
+# Fare rules lookup tool
+check_fare_rules_tool = Tool(
+    name="check_fare_rules",
+    description="Look up the refund and change conditions of a fare",
+    parameters={
+        "type": "object",
+        "properties": {
+            "fare_basis": {"type": "string", "description": "Fare basis code from the ticket (e.g., MH7NUS)"},
+            "origin": {"type": "string", "description": "Origin airport code"},
+            "destination": {"type": "string", "description": "Destination airport code"},
+            "carrier": {"type": "string", "description": "Validating carrier code (e.g., BA)"}
+        },
+        "required": ["fare_basis", "origin", "destination"]
+    },
+    function=check_fare_rules
+)
 
-    You have access to the following specialized agents:
+# Refund calculation tool
+calculate_refund_tool = Tool(
+    name="calculate_refund",
+    description="Calculate the refund, penalty and travel credit for cancelling a ticket",
+    parameters={
+        "type": "object",
+        "properties": {
+            "fare_basis": {"type": "string"},
+            "origin": {"type": "string"},
+            "destination": {"type": "string"},
+            "fare_paid": {"type": "number", "description": "Base fare paid, excluding taxes"},
+            "taxes_paid": {"type": "number", "default": 0},
+            "departure_date": {"type": "string", "description": "Departure date (YYYY-MM-DD)"},
+            "carrier": {"type": "string"},
+            "waiver_code": {"type": "string", "description": "Disruption waiver code, if one was issued"}
+        },
+        "required": ["fare_basis", "origin", "destination", "fare_paid"]
+    },
+    function=calculate_refund
+)
 
-    1. Policy Agent
-       - For questions about community guidelines, course policies, refunds
-       - Direct policy-related queries here
+# Change fee calculation tool
+calculate_change_fee_tool = Tool(
+    name="calculate_change_fee",
+    description="Calculate the change fee, fare difference and residual value for a ticket change",
+    parameters={
+        "type": "object",
+        "properties": {
+            "fare_basis": {"type": "string"},
+            "origin": {"type": "string"},
+            "destination": {"type": "string"},
+            "fare_paid": {"type": "number", "description": "Base fare paid, excluding taxes"},
+            "new_fare": {"type": "number", "description": "Base fare of the new itinerary"},
+            "departure_date": {"type": "string", "description": "Original departure date (YYYY-MM-DD)"},
+            "carrier": {"type": "string"},
+            "waiver_code": {"type": "string", "description": "Disruption waiver code, if one was issued"}
+        },
+        "required": ["fare_basis", "origin", "destination", "fare_paid"]
+    },
+    function=calculate_change_fee
+)
 
-    2. Sales Agent
-       - For questions about purchasing the AI Marketing Platform course
-       - Handles course purchases and updates state
-       - Course price: $149
-
-    3. Course Support Agent
-       - For questions about course content
-       - Only available for courses the user has purchased
-       - Check if a course with id "ai_marketing_platform" exists in the purchased courses before directing here
-
-    4. Order Agent
-       - For checking purchase history and processing refunds
-       - Shows courses user has bought
-       - Can process course refunds (30-day money-back guarantee)
-       - References the purchased courses information
-
-    Tailor your responses based on the user's purchase history and previous interactions.
-    When the user hasn't purchased any courses yet, encourage them to explore the AI Marketing Platform.
-    When the user has purchased courses, offer support for those specific courses.
-
-    When users express dissatisfaction or ask for a refund:
-    - Direct them to the Order Agent, which can process refunds
-    - Mention our 30-day money-back guarantee policy
-
-    Always maintain a helpful and professional tone. If you're unsure which agent to delegate to,
-    ask clarifying questions to better understand the user's needs.
+policy_billing_agent = Agent(
+    name="policy_billing",
+    model="gemini-2.0-flash",
+    description="Specialized agent for fare rules, refunds, change fees and billing",
+    instruction="""
+    You are the Policy & Billing Agent for AirlineAssist Pro.
+    You explain fare rules and calculate refunds and change fees, and you help with
+    payment and billing questions.
+    
+    **Core Responsibilities:**
+    
+    1. Fare Rules
+       - Explain whether a fare is refundable or changeable
+       - Describe change, cancellation and no-show penalties
+       - Explain what happens to unused ticket value (refund, travel credit or forfeit)
+    
+    2. Refunds
+       - Calculate refund amounts for cancelled tickets
+       - Apply disruption waivers when a waiver code has been issued
+       - Explain refund timelines (7 business days to the original form of payment)
+    
+    3. Change Fees
+       - Quote change fees and fare differences
+       - Explain late-change fees close to departure
+       - Explain residual value when the new fare is lower
+    
+    4. Billing & Insurance
+       - Payment issues and duplicate charges
+       - Receipts and invoices
+       - Travel insurance coverage questions
+    
+    **Available Tools:**
+    - check_fare_rules: Look up a fare's refund and change conditions
+    - calculate_refund: Compute refund, penalty and travel credit
+    - calculate_change_fee: Compute change fee, fare difference and residual value
+    
+    **Service Guidelines:**
+    - Always quote amounts from the tools, never estimate fees yourself
+    - Ask for the fare basis code, route and fare paid if they are missing
+    - Mention the rule number so the customer can reference it later
+    - Offer the cheapest option (travel credit, later date) when a refund is not possible
+    
+    **State Management:**
+    - Track refund requests in state['refund_requests']
+    - Record billing disputes in state['billing_disputes']
+    
+    **Escalation Triggers:**
+    - Disputed charges above $500
+    - Requests for exceptions to non-waivable fare rules
+    - Suspected fraud on the form of payment
+    
+    Be transparent about every fee and always explain how an amount was calculated.
     """,
-    tools=[],
-)
\ No newline at end of file
+    tools=[
+        check_fare_rules_tool,
+        calculate_refund_tool,
+        calculate_change_fee_tool
+    ]
+)
@@ -0,0 +1,281 @@
+# customer_service_agent/tool_cache.py
+"""Shared TTL + LRU response cache for idempotent, read-only tools.
+
+During irregular operations thousands of sessions ask about the same handful
+of flights, airports and visa rules. A tool opts in with
+
+    cache_tool(check_flight_status_tool, ttl=FLIGHT_STATUS_TTL)
+
+which wraps its `function`. Arguments are canonicalized before keying
+("jfk" and " JFK" share an entry, "03/15/2025" and "2025-03-15" too), each
+tool gets its own TTL, and concurrent identical calls share one in-flight
+request. Canonical arguments are used for the key only; the tool still
+receives what the model sent. Exceptions are never cached.
+"""
+import asyncio
+import copy
+import functools
+import inspect
+import json
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import Future
+from datetime import datetime
+
+# TTLs in seconds, from most to least volatile
+FLIGHT_STATUS_TTL = 30
+WEATHER_TTL = 5 * 60
+STATUS_BENEFITS_TTL = 60 * 60
+POLICY_TTL = 24 * 60 * 60
+AIRPORT_INFO_TTL = 24 * 60 * 60
+VISA_RULES_TTL = 7 * 24 * 60 * 60
+CULTURAL_GUIDANCE_TTL = 7 * 24 * 60 * 60
+
+DEFAULT_MAX_ENTRIES = 50_000
+
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%Y%m%d", "%m/%d/%Y", "%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y")
+FLIGHT_NUMBER = re.compile(r"^([A-Z0-9]{2}[A-Z]?)\s*-?\s*0*(\d{1,4})([A-Z]?)$")
+
+
+def normalize_code(value):
+    """Airport, airline and member codes: trimmed and upper-case."""
+    return str(value).strip().upper()
+
+
+def normalize_flight_number(value):
+    """'aa 0123' -> 'AA123'."""
+    text = normalize_code(value)
+    match = FLIGHT_NUMBER.match(text)
+    return "".join(match.groups()) if match else re.sub(r"\s+", "", text)
+
+
+def normalize_date(value):
+    """Any of DATE_FORMATS -> ISO 'YYYY-MM-DD'; unknown formats are left trimmed."""
+    text = " ".join(str(value).split())
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return text
+
+
+def normalize_text(value):
+    """Free text and enum values: whitespace collapsed, case folded."""
+    return " ".join(str(value).split()).casefold()
+
+
+def normalize_topics(value):
+    """Unordered enum lists: ['Tipping', 'customs'] == ['customs', 'tipping']."""
+    return sorted({normalize_text(v) for v in value})
+
+
+# Argument name -> normalizer, shared by every cached tool. Anything not
+# listed is treated as free text (strings) or left alone (other types).
+ARGUMENT_NORMALIZERS = {
+    "airport_code": normalize_code,
+    "origin": normalize_code,
+    "destination": normalize_code,
+    "member_number": normalize_code,
+    "flight_number": normalize_flight_number,
+    "date": normalize_date,
+    "departure_date": normalize_date,
+    "return_date": normalize_date,
+    "topics": normalize_topics,
+}
+
+
+def canonicalize(value, normalizer=None):
+    if value is None:
+        return None
+    if normalizer is not None:
+        return normalizer(value)
+    if isinstance(value, dict):
+        return {k: canonicalize(v, ARGUMENT_NORMALIZERS.get(k)) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(v) for v in value]
+    if isinstance(value, str):
+        return normalize_text(value)
+    return value
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at")
+
+    def __init__(self, value, expires_at):
+        self.value = value
+        self.expires_at = expires_at
+
+
+class ToolCache:
+    """LRU cache of tool results with per-entry expiry and single-flight calls."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._counters = defaultdict(Counter)
+
+    def make_key(self, tool_name, args, kwargs, normalizers=None):
+        canonical = {}
+        for name, value in kwargs.items():
+            normalizer = (normalizers or {}).get(name, ARGUMENT_NORMALIZERS.get(name))
+            canonical[name] = canonicalize(value, normalizer)
+        return tool_name + json.dumps(
+            [canonicalize(args), canonical], sort_keys=True, default=str
+        )
+
+    def _lookup(self, tool_name, key):
+        """Return (hit, value) and count the lookup. Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry.expires_at <= self.clock():
+            del self._entries[key]
+            self._counters[tool_name]["expired"] += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self._counters[tool_name]["hits"] += 1
+        return True, entry.value
+
+    def _store(self, tool_name, key, value, ttl):
+        """Insert a fresh result and evict least recently used overflow."""
+        self._entries[key] = _Entry(value, self.clock() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted_key, _ = self._entries.popitem(last=False)
+            self._counters[evicted_key.split("[", 1)[0]]["evictions"] += 1
+
+    def call(self, tool_name, ttl, function, args, kwargs, normalizers=None):
+        key = self.make_key(tool_name, args, kwargs, normalizers)
+        with self._lock:
+            hit, value = self._lookup(tool_name, key)
+            if hit:
+                return copy.deepcopy(value)
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self._counters[tool_name]["misses"] += 1
+            else:
+                self._counters[tool_name]["inflight_joins"] += 1
+
+        if not leader:
+            return copy.deepcopy(future.result())
+        try:
+            value = function(*args, **kwargs)
+        except BaseException as exc:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._store(tool_name, key, value, ttl)
+            del self._inflight[key]
+        future.set_result(value)
+        return copy.deepcopy(value)
+
+    async def call_async(self, tool_name, ttl, function, args, kwargs, normalizers=None):
+        key = self.make_key(tool_name, args, kwargs, normalizers)
+        with self._lock:
+            hit, value = self._lookup(tool_name, key)
+            if hit:
+                return copy.deepcopy(value)
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = asyncio.get_running_loop().create_future()
+                self._counters[tool_name]["misses"] += 1
+            else:
+                self._counters[tool_name]["inflight_joins"] += 1
+
+        if not leader:
+            return copy.deepcopy(await asyncio.shield(future))
+        try:
+            value = await function(*args, **kwargs)
+        except BaseException as exc:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(exc)
+            # Retrieve it so a leader-only failure is not logged as unhandled
+            future.exception()
+            raise
+        with self._lock:
+            self._store(tool_name, key, value, ttl)
+            del self._inflight[key]
+        future.set_result(value)
+        return copy.deepcopy(value)
+
+    def wrap(self, tool_name, function, ttl, normalizers=None):
+        """Return function with its results cached under tool_name for ttl seconds."""
+        if inspect.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def cached_async(*args, **kwargs):
+                return await self.call_async(tool_name, ttl, function, args, kwargs, normalizers)
+
+            cached_async.uncached = function
+            return cached_async
+
+        @functools.wraps(function)
+        def cached(*args, **kwargs):
+            return self.call(tool_name, ttl, function, args, kwargs, normalizers)
+
+        cached.uncached = function
+        return cached
+
+    def invalidate(self, tool_name=None):
+        """Drop every entry, or only the entries of one tool."""
+        with self._lock:
+            if tool_name is None:
+                self._entries.clear()
+                return
+            prefix = tool_name + "["
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def discard(self, tool_name, args=(), kwargs=None, normalizers=None):
+        """Drop the cached result of one call, e.g. because its data just changed; True if one was cached."""
+        key = self.make_key(tool_name, args, kwargs or {}, normalizers)
+        with self._lock:
+            if self._entries.pop(key, None) is None:
+                return False
+            self._counters[tool_name]["invalidated"] += 1
+        return True
+
+    def stats(self):
+        """Hit/miss/eviction counters, overall and per tool."""
+        with self._lock:
+            per_tool = {name: dict(counts) for name, counts in self._counters.items()}
+            entries = len(self._entries)
+        totals = Counter()
+        for counts in per_tool.values():
+            totals.update(counts)
+        lookups = totals["hits"] + totals["misses"] + totals["inflight_joins"]
+        return {
+            "entries": entries,
+            "hits": totals["hits"],
+            "misses": totals["misses"],
+            "inflight_joins": totals["inflight_joins"],
+            "evictions": totals["evictions"],
+            "expired": totals["expired"],
+            "hit_ratio": (totals["hits"] + totals["inflight_joins"]) / lookups if lookups else 0.0,
+            "tools": per_tool,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._counters.clear()
+
+
+tool_cache = ToolCache()
+
+
+def cache_tool(tool, ttl, normalizers=None, cache=None):
+    """Opt a read-only Tool into the shared cache by wrapping its function."""
+    tool.function = (cache or tool_cache).wrap(tool.name, tool.function, ttl, normalizers)
+    return tool
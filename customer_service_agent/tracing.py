@@ -0,0 +1,477 @@
+# customer_service_agent/tracing.py
+"""Per-turn tracing: where a slow turn spent its time, as OpenTelemetry spans in local files.
+
+Run with: python -m customer_service_agent.tracing traces/ --slowest 5
+
+Set TRACE_DIR to turn tracing on. Each process then appends its spans to
+TRACE_DIR/spans-<pid>.jsonl, one OTLP/JSON export request per line (the
+format the OpenTelemetry Collector's otlpjsonfile receiver reads), through
+the SDK's batch processor, so spans are written off the request path.
+TRACE_SAMPLE_RATE (0..1, default 1) keeps that share of turns.
+
+instrument_runner() wraps a Runner so that every turn is one "turn" span
+with these children:
+  - "llm_call": one model call, from the request (turn start or the last
+    tool result) to its final response event, with the agent, time to
+    first token and token counts from the response's usage metadata
+  - "agent_transfer": a transfer_to_agent call, from the model asking for
+    it to ADK handing the turn over
+  - "agent_load": a lazily registered sub-agent imported on first use
+  - "tool": one Tool function call (wrapped like cache_tool wraps it)
+  - "session.<method>": a session service read or write
+Tools of sub-agents loaded later are wrapped as registry.py loads them.
+
+With TRACE_DIR unset nothing is wrapped: instrument_runner() and the
+registry hooks return their argument untouched, so the per-call cost is
+zero, and opentelemetry is never imported.
+
+The CLI reads every spans-*.jsonl file under the given directories and
+prints p50/p95/p99 latency per agent (model calls), per tool, per session
+operation and per transfer, and optionally the slowest turns broken down
+by where their time went.
+"""
+import argparse
+import contextlib
+import contextvars
+import functools
+import glob
+import inspect
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+TRACE_DIR_ENV = "TRACE_DIR"
+TRACE_SAMPLE_ENV = "TRACE_SAMPLE_RATE"
+SERVICE_NAME = "airline-assist"
+SCOPE_NAME = "customer_service_agent.tracing"
+EXPORT_DELAY_MS = 2000
+SESSION_METHODS = ("create_session", "get_session", "list_sessions", "delete_session", "append_event")
+TRANSFER_TOOL = "transfer_to_agent"
+
+# Keyword arguments recorded on tool and session spans, and their attribute names
+ARGUMENT_ATTRIBUTES = {"session_id": "session.id", "user_id": "user.id"}
+
+# Agent whose events the current turn is on, for tool spans
+_agent = contextvars.ContextVar("traced_agent", default=None)
+# When the last sub-agent load ended, so the next model call starts after it
+_loaded_at = contextvars.ContextVar("traced_loaded_at", default=0)
+
+_tracer = None
+_provider = None
+_tracer_checked = False
+_tracer_lock = threading.Lock()
+
+
+# ----- exporter -----
+
+
+def otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+def otlp_attributes(attributes):
+    return [{"key": key, "value": otlp_value(value)} for key, value in (attributes or {}).items()]
+
+
+def otlp_span(span):
+    context = span.get_span_context()
+    encoded = {
+        "traceId": f"{context.trace_id:032x}",
+        "spanId": f"{context.span_id:016x}",
+        "name": span.name,
+        "kind": span.kind.value + 1,  # OTLP counts SPAN_KIND_UNSPECIFIED as 0
+        "startTimeUnixNano": str(span.start_time),
+        "endTimeUnixNano": str(span.end_time),
+        "attributes": otlp_attributes(span.attributes),
+        "status": {"code": span.status.status_code.value},
+    }
+    if span.parent is not None:
+        encoded["parentSpanId"] = f"{span.parent.span_id:016x}"
+    if span.status.description:
+        encoded["status"]["message"] = span.status.description
+    if span.events:
+        encoded["events"] = [{"name": event.name, "timeUnixNano": str(event.timestamp),
+                              "attributes": otlp_attributes(event.attributes)} for event in span.events]
+    return encoded
+
+
+def make_exporter(path):
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+    class SpanFileExporter(SpanExporter):
+        """Appends each batch of spans to path as one OTLP/JSON ExportTraceServiceRequest line."""
+
+        def __init__(self):
+            self.file = open(path, "a", encoding="utf-8")
+            self.lock = threading.Lock()
+
+        def export(self, spans):
+            if not spans:
+                return SpanExportResult.SUCCESS
+            request = {"resourceSpans": [{
+                "resource": {"attributes": otlp_attributes(spans[0].resource.attributes)},
+                "scopeSpans": [{"scope": {"name": SCOPE_NAME}, "spans": [otlp_span(span) for span in spans]}],
+            }]}
+            with self.lock:
+                self.file.write(json.dumps(request, separators=(",", ":")) + "\n")
+                self.file.flush()
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self):
+            with self.lock:
+                self.file.close()
+
+    return SpanFileExporter()
+
+
+def get_tracer():
+    """The process-wide tracer, or None when TRACE_DIR is not set."""
+    global _tracer, _provider, _tracer_checked
+    if _tracer_checked:
+        return _tracer
+    with _tracer_lock:
+        if not _tracer_checked:
+            directory = os.getenv(TRACE_DIR_ENV)
+            if directory:
+                from opentelemetry.sdk.resources import Resource
+                from opentelemetry.sdk.trace import TracerProvider
+                from opentelemetry.sdk.trace.export import BatchSpanProcessor
+                from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+                os.makedirs(directory, exist_ok=True)
+                provider = TracerProvider(
+                    resource=Resource.create({"service.name": SERVICE_NAME, "process.pid": os.getpid()}),
+                    sampler=ParentBased(TraceIdRatioBased(float(os.getenv(TRACE_SAMPLE_ENV, "1")))),
+                )
+                exporter = make_exporter(os.path.join(directory, f"spans-{os.getpid()}.jsonl"))
+                provider.add_span_processor(BatchSpanProcessor(exporter, schedule_delay_millis=EXPORT_DELAY_MS))
+                _tracer, _provider = provider.get_tracer(SCOPE_NAME), provider
+            _tracer_checked = True
+    return _tracer
+
+
+def flush():
+    """Write out buffered spans now (the SDK also does so at exit)."""
+    if _provider is not None:
+        _provider.force_flush()
+
+
+def span(name, **attributes):
+    """A current span when tracing is on, else a no-op context manager."""
+    tracer = get_tracer()
+    if tracer is None:
+        return contextlib.nullcontext()
+    return tracer.start_as_current_span(name, attributes=attributes)
+
+
+@contextlib.contextmanager
+def agent_load(name):
+    """Span for registry.py importing a sub-agent on its first transfer."""
+    with span("agent_load", **{"agent.name": name}):
+        yield
+    _loaded_at.set(time.time_ns())
+
+
+# ----- wrappers -----
+
+
+def call_attributes(attributes, kwargs):
+    found = {ARGUMENT_ATTRIBUTES[key]: str(kwargs[key]) for key in ARGUMENT_ATTRIBUTES.keys() & kwargs.keys()}
+    agent = _agent.get()
+    if agent is not None:
+        found["agent.name"] = agent
+    return {**attributes, **found}
+
+
+def mark_result(current, result):
+    # Tools report failures as {"error": ...} rather than raising
+    if isinstance(result, dict) and "error" in result:
+        from opentelemetry.trace import Status, StatusCode
+
+        current.set_status(Status(StatusCode.ERROR, str(result["error"])[:200]))
+
+
+def traced(tracer, name, function, attributes):
+    """Wrap a sync or async function so every call is a span named name."""
+    if inspect.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name, attributes=call_attributes(attributes, kwargs)) as current:
+                result = await function(*args, **kwargs)
+                mark_result(current, result)
+                return result
+    else:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name, attributes=call_attributes(attributes, kwargs)) as current:
+                result = function(*args, **kwargs)
+                mark_result(current, result)
+                return result
+    wrapper.traced = True
+    return wrapper
+
+
+def trace_tool(tool):
+    """Wrap tool.function in a "tool" span, once; returns the tool."""
+    tracer = get_tracer()
+    function = getattr(tool, "function", None)
+    if tracer is None or function is None or getattr(function, "traced", False):
+        return tool
+    tool.function = traced(tracer, "tool", function, {"tool.name": tool.name})
+    return tool
+
+
+def trace_agent(agent):
+    """Wrap the tools of agent and of its sub-agents that are already loaded."""
+    if get_tracer() is None:
+        return agent
+    for tool in getattr(agent, "tools", None) or ():
+        trace_tool(tool)
+    for sub_agent in getattr(agent, "sub_agents", None) or ():
+        trace_agent(sub_agent)
+    return agent
+
+
+def trace_session_service(service):
+    """Record each session service read and write as a "session.<method>" span."""
+    tracer = get_tracer()
+    if tracer is None:
+        return service
+    for method in SESSION_METHODS:
+        function = getattr(service, method, None)
+        if function is not None and not getattr(function, "traced", False):
+            setattr(service, method, traced(tracer, f"session.{method}", function, {"session.operation": method}))
+    return service
+
+
+def instrument_runner(runner):
+    """Trace the runner's turns, its session service and its agent tree's tools; no-op unless TRACE_DIR is set."""
+    tracer = get_tracer()
+    if tracer is None or getattr(runner.run_async, "traced", False):
+        return runner
+    trace_session_service(runner.session_service)
+    trace_agent(runner.agent)
+    run_async = runner.run_async
+
+    def traced_run_async(*, user_id, session_id, **kwargs):
+        return trace_turn(tracer, run_async(user_id=user_id, session_id=session_id, **kwargs), user_id, session_id)
+
+    traced_run_async.traced = True
+    runner.run_async = traced_run_async
+    return runner
+
+
+async def trace_turn(tracer, events, user_id, session_id):
+    """Pass a turn's events through, deriving the turn, model call and transfer spans from them."""
+    from opentelemetry import context, trace
+
+    turn = tracer.start_span("turn", attributes={"session.id": session_id, "user.id": user_id})
+    turn_context = trace.set_span_in_context(turn)
+    call_started, first_token, transfer, agent = time.time_ns(), None, None, None
+    tokens = {"prompt": 0, "completion": 0}
+    try:
+        while True:
+            # The turn span is current only while ADK works, so tools and
+            # session calls nest under it without leaking into the caller
+            token = context.attach(turn_context)
+            try:
+                event = await events.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                context.detach(token)
+            now = time.time_ns()
+            author = event.author
+            if author and author != "user":
+                agent = author
+                _agent.set(author)
+
+            responses = event.get_function_responses()
+            if event.partial:
+                first_token = first_token or now
+            elif responses:
+                if transfer is not None and any(response.name == TRANSFER_TOOL for response in responses):
+                    end_span(tracer, "agent_transfer", turn_context, transfer[2], now,
+                             {"agent.from": transfer[0], "agent.to": transfer[1]})
+                    transfer = None
+                call_started, first_token = now, None  # the next model call starts from the tool results
+            elif author != "user" and (event.content or event.usage_metadata):
+                # A sub-agent imported on its first transfer is its own span, not model time
+                call_started = max(call_started, _loaded_at.get())
+                calls = event.get_function_calls()
+                attributes = {"agent.name": author, "tool_calls": len(calls)}
+                usage = getattr(event, "usage_metadata", None)
+                if usage is not None:
+                    attributes["gen_ai.usage.input_tokens"] = usage.prompt_token_count or 0
+                    attributes["gen_ai.usage.output_tokens"] = usage.candidates_token_count or 0
+                    tokens["prompt"] += attributes["gen_ai.usage.input_tokens"]
+                    tokens["completion"] += attributes["gen_ai.usage.output_tokens"]
+                if first_token is not None:
+                    attributes["ttft_ms"] = (first_token - call_started) / 1e6
+                end_span(tracer, "llm_call", turn_context, call_started, now, attributes)
+                call_started, first_token = now, None
+                for call in calls:
+                    if call.name == TRANSFER_TOOL:
+                        transfer = (author, (call.args or {}).get("agent_name"), now)
+            yield event
+    finally:
+        turn.set_attribute("agent.name", agent or "")
+        turn.set_attribute("gen_ai.usage.input_tokens", tokens["prompt"])
+        turn.set_attribute("gen_ai.usage.output_tokens", tokens["completion"])
+        turn.end()
+        _agent.set(None)
+
+
+def end_span(tracer, name, parent, start, end, attributes):
+    """Record a span after the fact, from timestamps taken off the event stream."""
+    tracer.start_span(name, context=parent, start_time=start, attributes=attributes).end(end_time=end)
+
+
+# ----- aggregation -----
+
+
+def span_files(paths):
+    files = []
+    for path in paths:
+        files += sorted(glob.glob(os.path.join(path, "spans-*.jsonl"))) if os.path.isdir(path) else [path]
+    return files
+
+
+def attribute_value(value):
+    for kind in ("stringValue", "intValue", "doubleValue", "boolValue"):
+        if kind in value:
+            return int(value[kind]) if kind == "intValue" else value[kind]
+    return None
+
+
+def read_spans(paths):
+    """Yield (name, trace id, span id, parent id, start ns, duration ms, attributes) from span files."""
+    for path in span_files(paths):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut short by a crash
+                for resource in request.get("resourceSpans", []):
+                    for scope in resource.get("scopeSpans", []):
+                        for encoded in scope.get("spans", []):
+                            start, end = int(encoded["startTimeUnixNano"]), int(encoded["endTimeUnixNano"])
+                            attributes = {item["key"]: attribute_value(item["value"])
+                                          for item in encoded.get("attributes", [])}
+                            yield (encoded["name"], encoded["traceId"], encoded["spanId"],
+                                   encoded.get("parentSpanId"), start, (end - start) / 1e6, attributes)
+
+
+def group_key(name, attributes):
+    """(section, row) a span is reported under."""
+    if name == "llm_call":
+        return "agents (model calls)", attributes.get("agent.name", "?")
+    if name == "tool":
+        return "tools", attributes.get("tool.name", "?")
+    if name.startswith("session."):
+        return "session service", name.removeprefix("session.")
+    if name == "agent_transfer":
+        return "transfers", f"{attributes.get('agent.from', '?')} -> {attributes.get('agent.to', '?')}"
+    if name == "agent_load":
+        return "sub-agent loads", attributes.get("agent.name", "?")
+    if name == "turn":
+        return "turns", attributes.get("agent.name") or "?"
+    return "other", name
+
+
+def summarize(spans):
+    """{section: {row: {count, p50_ms, p95_ms, p99_ms, total_ms, errors}}} over all spans."""
+    durations = defaultdict(lambda: defaultdict(list))
+    for name, _, _, _, _, duration_ms, attributes in spans:
+        section, row = group_key(name, attributes)
+        durations[section][row].append(duration_ms)
+    report = {}
+    for section, rows in durations.items():
+        report[section] = {}
+        for row, values in sorted(rows.items(), key=lambda item: -sum(item[1])):
+            values = np.array(values)
+            p50, p95, p99 = np.percentile(values, [50, 95, 99], method="inverted_cdf")
+            report[section][row] = {"count": len(values), "p50_ms": float(p50), "p95_ms": float(p95),
+                                    "p99_ms": float(p99), "total_ms": float(values.sum())}
+    return report
+
+
+def slowest_turns(spans, count):
+    """The slowest turns, each with its time split by span kind (model, tools, session, transfer)."""
+    spans = list(spans)
+    turns = sorted((span for span in spans if span[0] == "turn"), key=lambda span: -span[5])[:count]
+    children = defaultdict(list)
+    wanted = {span[1] for span in turns}
+    for span in spans:
+        if span[1] in wanted and span[0] != "turn":
+            children[span[1]].append(span)
+    result = []
+    for name, trace_id, _, _, start, duration_ms, attributes in turns:
+        split = defaultdict(float)
+        for child in children[trace_id]:
+            section, row = group_key(child[0], child[6])
+            split[f"{section.split(' (')[0]}: {row}"] += child[5]
+        result.append({
+            "trace_id": trace_id,
+            "session_id": attributes.get("session.id"),
+            "agent": attributes.get("agent.name"),
+            "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start / 1e9)),
+            "total_ms": duration_ms,
+            "split_ms": dict(sorted(split.items(), key=lambda item: -item[1])),
+        })
+    return result
+
+
+def print_summary(report):
+    for section in ("turns", "agents (model calls)", "transfers", "sub-agent loads", "tools",
+                    "session service", "other"):
+        rows = report.get(section)
+        if not rows:
+            continue
+        width = max(len(row) for row in rows)
+        print(f"\n{section}")
+        print(f"{'':<{width}}  {'count':>7}  {'p50 ms':>9}  {'p95 ms':>9}  {'p99 ms':>9}  {'total s':>9}")
+        for row, stats in rows.items():
+            print(f"{row:<{width}}  {stats['count']:>7,}  {stats['p50_ms']:>9.2f}  {stats['p95_ms']:>9.2f}  "
+                  f"{stats['p99_ms']:>9.2f}  {stats['total_ms'] / 1000:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate span files written with TRACE_DIR set")
+    parser.add_argument("paths", nargs="*", default=[os.getenv(TRACE_DIR_ENV, "traces")],
+                        help="directories of spans-*.jsonl files, or span files")
+    parser.add_argument("--slowest", type=int, default=0, help="also break down the N slowest turns")
+    parser.add_argument("--json", action="store_true", help="print the aggregates as JSON")
+    args = parser.parse_args()
+
+    spans = list(read_spans(args.paths))
+    report = summarize(spans)
+    if args.json:
+        print(json.dumps({"summary": report, "slowest": slowest_turns(spans, args.slowest)}, indent=2))
+        return
+    print(f"{len(spans):,} spans from {len(span_files(args.paths))} files")
+    print_summary(report)
+    for turn in slowest_turns(spans, args.slowest):
+        print(f"\nturn {turn['trace_id']} ({turn['agent']}, session {turn['session_id']}, "
+              f"{turn['started']}): {turn['total_ms']:.1f} ms")
+        for part, ms in turn["split_ms"].items():
+            print(f"  {part:<48} {ms:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+# customer_service_agent/visa/matrix.py
+"""Visa and entry requirements matrix behind check_visa_requirements.
+
+Rules live in visa_rules.csv, one row per (nationalities, destinations,
+purposes) block: each side is "*", a country code, a group from
+countries.csv ("@SCHENGEN") or a ";"-separated list of those. Rows are
+applied in file order onto a dense nationality x destination x purpose
+matrix, so later, narrower rows override the defaults above them, the way
+the published rule tables are read. A country entering itself is always
+allowed without a visa.
+
+Each cell stores small integers only: a requirement code whose value is
+also its severity, the maximum stay, fee and processing days, and indexes
+into interned tables of document lists and notes. A lookup is one array
+read, and check_itineraries evaluates the final destination and every
+connection of thousands of itineraries in a few NumPy operations.
+
+countries.csv maps names, demonyms and airport codes to countries.
+VISA_RULES_PATH / VISA_COUNTRIES_PATH override the bundled files.
+get_visa_matrix() rereads them when they change on disk (checked at most
+every VISA_RELOAD_INTERVAL seconds) and swaps the new matrix in, so rule
+updates need no restart.
+"""
+import csv
+import logging
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VISA_RULES_ENV = "VISA_RULES_PATH"
+VISA_COUNTRIES_ENV = "VISA_COUNTRIES_PATH"
+VISA_RELOAD_ENV = "VISA_RELOAD_INTERVAL"
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "visa_rules.csv")
+DEFAULT_COUNTRIES_PATH = os.path.join(os.path.dirname(__file__), "countries.csv")
+RELOAD_INTERVAL = 5.0
+
+PURPOSES = ("tourism", "business", "transit", "student")
+TRANSIT = PURPOSES.index("transit")
+# Ordered by severity: an itinerary needs the worst requirement on any of its legs
+REQUIREMENTS = ("NONE", "VISA_FREE", "ETA", "VOA", "EVISA", "VISA", "NOT_PERMITTED")
+REQUIREMENT_LABELS = {
+    "NONE": "No visa needed",
+    "VISA_FREE": "Visa-free entry",
+    "ETA": "Electronic travel authorization",
+    "VOA": "Visa on arrival",
+    "EVISA": "eVisa (apply online)",
+    "VISA": "Visa required before travel",
+    "NOT_PERMITTED": "Entry not permitted",
+}
+NONE, VISA_FREE, ETA, VOA, EVISA, VISA = range(6)
+UNKNOWN = -1
+
+# A stay such as "90", "90 days", "2 weeks" or "3 months"
+DURATION = re.compile(r"^\s*(\d+)\s*(d|days?|w|wks?|weeks?|m|mos?|months?)?\s*$", re.IGNORECASE)
+DAYS_PER_UNIT = {"d": 1, "w": 7, "m": 30}
+
+
+def parse_duration(value):
+    """Stay length in days from an int or text like "2 weeks"; None if it is not one."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if value > 0 else None
+    if isinstance(value, float):
+        return int(value) if value > 0 and value.is_integer() else None
+    match = DURATION.match(str(value))
+    if not match or int(match.group(1)) < 1:
+        return None
+    return int(match.group(1)) * DAYS_PER_UNIT[(match.group(2) or "d")[0].lower()]
+
+
+def load_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+class VisaMatrix:
+    """Integer-coded nationality x destination x purpose requirements."""
+
+    def __init__(self, countries, rules, version=""):
+        self.version = version
+        self.codes = [row["code"].upper() for row in countries]
+        self.names = [row["name"] for row in countries]
+        n = len(self.codes)
+        self.country_ids = {}
+        self.groups = {}
+        self.airport_country = {}
+        for i, row in enumerate(countries):
+            for alias in [row["code"], row["name"], *row.get("aliases", "").split(";")]:
+                if alias.strip():
+                    self.country_ids[alias.strip().upper()] = i
+            for group in row.get("groups", "").split():
+                self.groups.setdefault(group.upper(), []).append(i)
+            for airport in row.get("airports", "").split():
+                self.airport_country[airport.upper()] = i
+
+        shape = (n, n, len(PURPOSES))
+        self.requirement = np.full(shape, VISA, dtype=np.int8)
+        self.max_stay = np.zeros(shape, dtype=np.int16)
+        self.fee = np.zeros(shape, dtype=np.int16)
+        self.processing_days = np.zeros(shape, dtype=np.int16)
+        self.documents_id = np.zeros(shape, dtype=np.int16)
+        self.notes_id = np.zeros(shape, dtype=np.int16)
+        # Interned string tables; cells hold indexes into them
+        interned_documents, interned_notes = {(): 0}, {"": 0}
+
+        for line, rule in enumerate(rules, start=2):
+            try:
+                cells = np.ix_(self._ids(rule["nationality"]), self._ids(rule["destination"]),
+                               self._purposes(rule["purpose"]))
+                code = REQUIREMENTS.index(rule["requirement"].strip().upper())
+            except (KeyError, ValueError) as exc:
+                raise ValueError(f"visa rule on line {line}: {exc}") from None
+            documents = tuple(d.strip() for d in rule["documents"].split(";") if d.strip())
+            self.requirement[cells] = code
+            self.max_stay[cells] = int(rule["max_stay_days"] or 0)
+            self.fee[cells] = int(rule["fee_usd"] or 0)
+            self.processing_days[cells] = int(rule["processing_days"] or 0)
+            self.documents_id[cells] = interned_documents.setdefault(documents, len(interned_documents))
+            self.notes_id[cells] = interned_notes.setdefault(rule["notes"], len(interned_notes))
+
+        # Citizens never need a visa for their own country
+        own = np.arange(n)
+        self.requirement[own, own, :] = NONE
+        self.max_stay[own, own, :] = 0
+        self.fee[own, own, :] = 0
+        self.processing_days[own, own, :] = 0
+        self.documents_id[own, own, :] = interned_documents.setdefault(("Valid passport or national ID card",),
+                                                                       len(interned_documents))
+        self.notes_id[own, own, :] = interned_notes.setdefault("Citizen", len(interned_notes))
+        self.documents = list(interned_documents)
+        self.notes = list(interned_notes)
+
+    @classmethod
+    def from_files(cls, rules_path=DEFAULT_RULES_PATH, countries_path=DEFAULT_COUNTRIES_PATH):
+        version = "-".join(str(int(os.stat(p).st_mtime)) for p in (rules_path, countries_path))
+        return cls(load_rows(countries_path), load_rows(rules_path), version)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _ids(self, spec):
+        ids = []
+        for token in spec.split(";"):
+            token = token.strip().upper()
+            if token == "*":
+                return list(range(len(self.codes)))
+            if token.startswith("@"):
+                ids += self.groups.get(token[1:], [])
+            elif token in self.country_ids:
+                ids.append(self.country_ids[token])
+            else:
+                raise ValueError(f"unknown country {token!r}")
+        return ids
+
+    def _purposes(self, spec):
+        if spec.strip() == "*":
+            return list(range(len(PURPOSES)))
+        return [PURPOSES.index(p.strip().lower()) for p in spec.split(";")]
+
+    def country_id(self, value):
+        """Country index for a code, name, demonym or airport code; None if unknown."""
+        key = " ".join(str(value or "").split()).upper()
+        country = self.country_ids.get(key)
+        return country if country is not None else self.airport_country.get(key)
+
+    def check(self, nationality, destination, purpose, duration=None):
+        """Requirement code for one trip, escalated to VISA if the stay is longer than allowed."""
+        cell = nationality, destination, purpose
+        code = int(self.requirement[cell])
+        limit = int(self.max_stay[cell])
+        if duration and limit and duration > limit and code < VISA:
+            code = VISA
+        return code
+
+    def describe(self, nationality, destination, purpose, duration=None):
+        cell = nationality, destination, purpose
+        code = self.check(nationality, destination, purpose, duration)
+        result = {
+            "nationality": self.names[nationality],
+            "destination": self.names[destination],
+            "purpose": PURPOSES[purpose],
+            "requirement": REQUIREMENTS[code],
+            "visa_required": code >= EVISA,
+            "visa_type": REQUIREMENT_LABELS[REQUIREMENTS[code]],
+            "visa_on_arrival": code == VOA,
+            "max_stay_days": int(self.max_stay[cell]) or None,
+            "fee": f"${int(self.fee[cell])}",
+            "processing_time": (f"{int(self.processing_days[cell])} days" if self.processing_days[cell]
+                                else "None"),
+            "requirements": list(self.documents[self.documents_id[cell]]),
+            "notes": self.notes[self.notes_id[cell]],
+        }
+        if code != self.requirement[cell]:
+            result["notes"] = (f"Stays over {result['max_stay_days']} days need a visa. "
+                               + result["notes"]).strip()
+        return result
+
+    def check_itineraries(self, nationalities, destinations, purposes, connections=None, durations=None):
+        """Worst requirement per itinerary and the leg that causes it, in one vectorized pass.
+
+        All arguments are integer arrays of country / purpose ids, one row per
+        itinerary. `connections` is (itineraries, stops), padded with UNKNOWN;
+        stops in the traveller's own country or the destination are skipped.
+        Returns (requirement codes, leg index): the index is the stop that
+        sets the worst requirement, or the number of stops if the
+        destination itself does.
+        """
+        nationalities = np.asarray(nationalities)
+        destinations = np.asarray(destinations)
+        purposes = np.asarray(purposes)
+        final = self.requirement[nationalities, destinations, purposes].astype(np.int8)
+        if durations is not None:
+            durations = np.asarray(durations)
+            limit = self.max_stay[nationalities, destinations, purposes]
+            overstay = (limit > 0) & (durations > limit) & (final < VISA)
+            final = np.where(overstay, np.int8(VISA), final)
+        if connections is None:
+            return final, np.zeros(len(final), dtype=np.int16)
+
+        stops = np.asarray(connections)
+        transit = self.requirement[nationalities[:, None], np.maximum(stops, 0), TRANSIT]
+        skip = (stops < 0) | (stops == nationalities[:, None]) | (stops == destinations[:, None])
+        transit = np.where(skip, np.int8(NONE), transit)
+        legs = np.concatenate([transit, final[:, None]], axis=1)
+        # argmax of the reversed row picks the destination on ties
+        worst_leg = legs.shape[1] - 1 - np.argmax(legs[:, ::-1], axis=1)
+        return legs.max(axis=1), worst_leg.astype(np.int16)
+
+    def stats(self):
+        arrays = (self.requirement, self.max_stay, self.fee, self.processing_days, self.documents_id,
+                  self.notes_id)
+        return {
+            "countries": len(self.codes),
+            "cells": int(self.requirement.size),
+            "matrix_bytes": sum(a.nbytes for a in arrays),
+            "documents": len(self.documents),
+            "notes": len(self.notes),
+            "version": self.version,
+        }
+
+
+_matrix = None
+_checked_at = 0.0
+_matrix_lock = threading.Lock()
+
+
+def rule_paths():
+    return os.getenv(VISA_RULES_ENV, DEFAULT_RULES_PATH), os.getenv(VISA_COUNTRIES_ENV, DEFAULT_COUNTRIES_PATH)
+
+
+def get_visa_matrix():
+    """The current VisaMatrix, rebuilt when the rule files change on disk.
+
+    A rebuild happens off to the side and replaces the reference in one
+    assignment; callers holding the old matrix finish with it undisturbed.
+    A rule file that fails to load is logged and the old matrix kept.
+    """
+    global _matrix, _checked_at
+    now = time.monotonic()
+    if _matrix is not None and now - _checked_at < float(os.getenv(VISA_RELOAD_ENV, RELOAD_INTERVAL)):
+        return _matrix
+    with _matrix_lock:
+        if _matrix is not None and now - _checked_at < float(os.getenv(VISA_RELOAD_ENV, RELOAD_INTERVAL)):
+            return _matrix
+        _checked_at = now
+        rules_path, countries_path = rule_paths()
+        try:
+            version = "-".join(str(int(os.stat(p).st_mtime)) for p in (rules_path, countries_path))
+            if _matrix is None or version != _matrix.version:
+                matrix = VisaMatrix.from_files(rules_path, countries_path)
+                if _matrix is not None:
+                    logger.info("Reloaded visa rules (%s)", matrix.version)
+                _matrix = matrix
+        except (OSError, ValueError, KeyError):
+            if _matrix is None:
+                raise
+            logger.exception("Keeping visa rules %s; reload failed", _matrix.version)
+    return _matrix
+
+
+# ----- tool function -----
+
+def check_visa_requirements(nationality, destination, purpose="tourism", duration=None, connections=None):
+    """check_visa_requirements tool: entry rules for the destination and every connection."""
+    matrix = get_visa_matrix()
+    citizen, country = matrix.country_id(nationality), matrix.country_id(destination)
+    if citizen is None:
+        return {"error": f"Unknown nationality: {nationality}"}
+    if country is None:
+        return {"error": f"Unknown destination: {destination}"}
+    purpose = str(purpose or "tourism").strip().lower()
+    if purpose not in PURPOSES:
+        return {"error": f"purpose must be one of {', '.join(PURPOSES)}"}
+    purpose_id = PURPOSES.index(purpose)
+    if duration in (None, ""):
+        duration = None
+    else:
+        days = parse_duration(duration)
+        if days is None:
+            return {"error": f"duration must be a number of days, e.g. 90 (got {duration!r})"}
+        duration = days
+    if isinstance(connections, str):
+        connections = [stop.strip() for stop in connections.split(",") if stop.strip()]
+
+    result = matrix.describe(citizen, country, purpose_id, duration)
+    if connections:
+        stops = [matrix.country_id(stop) for stop in connections]
+        unknown = [stop for stop, found in zip(connections, stops) if found is None]
+        if unknown:
+            return {"error": f"Unknown connection point: {', '.join(map(str, unknown))}"}
+        worst, leg = matrix.check_itineraries([citizen], [country], [purpose_id], [stops],
+                                              [duration or 0])
+        result["transit"] = [
+            {"connection": str(stop), **{k: v for k, v in matrix.describe(citizen, stop_id, TRANSIT).items()
+                                        if k in ("requirement", "visa_required", "fee", "requirements", "notes")}}
+            for stop, stop_id in zip(connections, stops)
+            if stop_id not in (citizen, country)
+        ]
+        result["itinerary_requirement"] = REQUIREMENTS[int(worst[0])]
+        if leg[0] < len(stops):
+            result["strictest_connection"] = str(connections[int(leg[0])])
+    return result
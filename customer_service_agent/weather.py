@@ -0,0 +1,1126 @@
+# customer_service_agent/weather.py
+"""METAR/TAF weather table and per-airport delay risk behind check_weather.
+
+Run with: python -m customer_service_agent.weather --stations 500 --hours 24 --out metars.txt --tafs-out tafs.txt
+     or: python -m customer_service_agent.weather --metars metars.txt --tafs tafs.txt --airport JFK
+
+Bulk feeds are plain text files of METAR reports, one per line:
+
+    METAR KJFK 051451Z 31015G25KT 10SM -RA BKN012 OVC025 04/02 A2992 RMK AO2
+
+and of TAF forecasts, each starting at a "TAF" token and running over as
+many lines as it needs. NOAA's cycle files (a date line before each report)
+and the raw_text column of its CSV caches read the same way.
+
+A METAR file is parsed in one vectorized pass. Every token of every report
+goes into one flat array of token ids, and each distinct token is
+classified once. The classification is cached, and most tokens ("10SM",
+"BKN012", "A2992") repeat thousands of times in a day of reports. Wind,
+visibility, ceiling, weather, temperature and pressure are then pulled out
+for all reports with NumPy masks and scatter operations. Remarks and trend
+groups (RMK, NOSIG, TEMPO, BECMG) are masked off per report with one
+cumulative sum. TAFs are fewer and are walked group by group, which gives
+time periods whose conditions are scored in the same vectorized way.
+
+WeatherTable keeps the latest observation per station and the periods of
+the latest TAF. Each ingest builds a new table and swaps the reference in
+one assignment, so readers never lock. The table is shared by every agent
+in the process. A delay-risk score (0-100) is derived for each station from
+its ceiling, visibility, wind and weather. check_weather,
+check_flight_status and the emergency agent's check_weather_disruptions
+read it directly, with no round-trip to a weather service.
+
+WEATHER_METARS_PATH / WEATHER_TAFS_PATH name the feed files.
+get_weather_table() re-ingests them when they change on disk (checked at
+most every WEATHER_RELOAD_INTERVAL seconds). Without a METAR file a few
+hours of synthetic reports for the bundled airports are generated, so the
+agent still answers.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import chain
+
+import numpy as np
+
+from .airports.store import get_airport_store
+from .schedule.timezones import format_local
+
+logger = logging.getLogger(__name__)
+
+WEATHER_METARS_ENV = "WEATHER_METARS_PATH"
+WEATHER_TAFS_ENV = "WEATHER_TAFS_PATH"
+WEATHER_RELOAD_ENV = "WEATHER_RELOAD_INTERVAL"
+RELOAD_INTERVAL = 60.0
+STALE_MINUTES = 3 * 60  # older observations no longer count as current conditions
+FORECAST_HOURS = 6
+DISRUPTIONS_LIMIT = 50  # airports listed by check_weather_disruptions, worst first
+NO_CEILING = 99_999
+NO_TEMPERATURE = -999
+METERS_PER_MILE = 1609.34
+EPOCH = datetime(1970, 1, 1)
+HEADERS = {"METAR", "SPECI", "COR", "AMD"}
+LINE_BREAK = "\x00"  # token standing for the end of a line
+
+# Token kinds; a, b and c hold:
+OTHER = 0
+TIME = 1         # day, hour, minute
+WIND = 2         # direction (-1 variable), speed kt, gust kt (0 none)
+VISIBILITY = 3   # meters, 1 for a statute-mile fraction that a whole-mile token may precede
+WHOLE_MILES = 4  # the "1" of "1 1/2SM"
+CLOUD = 5        # cover (0 clear, 1 FEW, 2 SCT, 3 BKN, 4 OVC, 5 VV), base ft, 1 for CB/TCU
+TEMPERATURE = 6  # temperature C, dewpoint C
+PRESSURE = 7     # tenths of hPa
+WEATHER = 8      # phenomena flags, flags seen in the vicinity (VC)
+END = 9          # RMK, NOSIG: the rest of the report is not current conditions
+TEMPO = 10
+BECMG = 11
+PROB = 12        # percent
+FROM = 13        # day, hour, minute
+PERIOD = 14      # start day * 100 + hour, end day * 100 + hour
+HEADER = 15      # METAR, SPECI, COR, AMD
+LINE = 16        # LINE_BREAK
+
+COVERS = {"FEW": 1, "SCT": 2, "BKN": 3, "OVC": 4, "VV": 5}
+COVER_NAMES = ("Clear", "Mostly clear", "Partly cloudy", "Mostly cloudy", "Overcast", "Obscured")
+DESCRIPTORS = {"MI": "shallow", "PR": "partial", "BC": "patches of", "DR": "drifting", "BL": "blowing",
+               "SH": "showers", "TS": "thunderstorm", "FZ": "freezing"}
+PHENOMENA = {"DZ": "drizzle", "RA": "rain", "SN": "snow", "SG": "snow grains", "IC": "ice crystals",
+             "PL": "ice pellets", "GR": "hail", "GS": "small hail", "UP": "unknown precipitation",
+             "BR": "mist", "FG": "fog", "FU": "smoke", "VA": "volcanic ash", "DU": "dust", "SA": "sand",
+             "HZ": "haze", "PY": "spray", "PO": "dust whirls", "SQ": "squalls", "FC": "funnel cloud",
+             "SS": "sandstorm", "DS": "duststorm"}
+FLAGS = {code: 1 << i for i, code in enumerate([*DESCRIPTORS, *PHENOMENA, "HEAVY", "CB"])}
+MARKERS = {
+    "RMK": (END, 0, 0, 0), "NOSIG": (END, 0, 0, 0), "TEMPO": (TEMPO, 0, 0, 0), "BECMG": (BECMG, 0, 0, 0),
+    "CAVOK": (VISIBILITY, 9999, 0, 0), "NSW": (WEATHER, 0, 0, 0),
+    **{code: (CLOUD, 0, NO_CEILING, 0) for code in ("SKC", "CLR", "NSC", "NCD")},
+    **{code: (HEADER, 0, 0, 0) for code in HEADERS},
+    LINE_BREAK: (LINE, 0, 0, 0),
+}
+
+# Delay probability per factor, strongest first
+CEILING_RISK = ((200, 0.45), (500, 0.30), (1000, 0.15), (3000, 0.05))      # base below ft
+VISIBILITY_RISK = ((800, 0.45), (1600, 0.30), (3200, 0.15), (5000, 0.05))  # below meters
+WIND_RISK = ((35, 0.40), (25, 0.20), (20, 0.08))                           # sustained kt, at or above
+GUST_RISK = ((50, 0.40), (40, 0.25), (30, 0.10))                           # gust kt, at or above
+WEATHER_RISK = {"FC": 0.60, "VA": 0.60, "FZ": 0.40, "TS": 0.40, "SQ": 0.35, "GR": 0.35, "PL": 0.30,
+                "SS": 0.30, "DS": 0.30, "SN": 0.20, "GS": 0.15, "CB": 0.15, "SG": 0.10, "RA": 0.03,
+                "DZ": 0.02}
+HEAVY_RISK = 0.25   # added to the weather factor for heavy precipitation
+VICINITY_SHARE = 0.5  # weight of phenomena only reported in the vicinity
+TEMPO_WEIGHT = 0.7  # TEMPO conditions come and go within the period
+RISK_LEVELS = ("low", "moderate", "high", "severe")
+RISK_THRESHOLDS = (15, 35, 60)
+FACTORS = ("ceiling", "visibility", "wind", "weather")
+
+TIME_RE = re.compile(r"(\d{2})(\d{2})(\d{2})Z")
+WIND_RE = re.compile(r"(\d{3}|VRB)(\d{2,3})(?:G(\d{2,3}))?(KT|MPS|KMH)")
+METRIC_VISIBILITY_RE = re.compile(r"(\d{4})(?:NDV)?")
+MILES_RE = re.compile(r"([PM])?(\d{1,2})(?:/(\d{1,2}))?SM")
+CLOUD_RE = re.compile(r"(FEW|SCT|BKN|OVC|VV)(\d{3}|///)(CB|TCU|///)?")
+TEMPERATURE_RE = re.compile(r"(M?\d{2})/(M?\d{2})?")
+PRESSURE_RE = re.compile(r"([AQ])(\d{4})")
+WEATHER_RE = re.compile(r"(\+|-|VC)?((?:[A-Z]{2})+)")
+PERIOD_RE = re.compile(r"(\d{2})(\d{2})/(\d{2})(\d{2})")
+FROM_RE = re.compile(r"FM(\d{2})(\d{2})(\d{2})")
+PROB_RE = re.compile(r"PROB(\d{2})")
+
+
+# ----- tokens -----
+
+def weather_flags(code):
+    """Flags of a run of two-letter weather codes ("TSRA"), or None if it is not one."""
+    flags = 0
+    for i in range(0, len(code), 2):
+        part = code[i:i + 2]
+        if part not in FLAGS or part in ("HEAVY", "CB"):
+            return None
+        flags |= FLAGS[part]
+    return flags
+
+
+def classify(token):
+    """(kind, a, b, c) of one report token; see the kind constants for what a, b and c hold."""
+    if token in MARKERS:
+        return MARKERS[token]
+    if m := TIME_RE.fullmatch(token):
+        return TIME, int(m[1]), int(m[2]), int(m[3])
+    if m := WIND_RE.fullmatch(token):
+        scale = {"KT": 1.0, "MPS": 1.944, "KMH": 0.54}[m[4]]
+        direction = -1 if m[1] == "VRB" else int(m[1])
+        return WIND, direction, round(int(m[2]) * scale), round(int(m[3] or 0) * scale)
+    if m := METRIC_VISIBILITY_RE.fullmatch(token):
+        return VISIBILITY, int(m[1]), 0, 0
+    if m := MILES_RE.fullmatch(token):
+        miles = int(m[2]) / int(m[3]) if m[3] else int(m[2])
+        if m[1] == "M":
+            miles /= 2
+        return VISIBILITY, round(miles * METERS_PER_MILE), int(bool(m[3])), 0
+    if len(token) == 1 and token.isdigit():
+        return WHOLE_MILES, int(token), 0, 0
+    if m := CLOUD_RE.fullmatch(token):
+        base = int(m[2]) * 100 if m[2] != "///" else (0 if m[1] == "VV" else NO_CEILING)
+        return CLOUD, COVERS[m[1]], base, int(m[3] in ("CB", "TCU"))
+    if m := TEMPERATURE_RE.fullmatch(token):
+        temp, dew = (int(v.replace("M", "-")) if v else NO_TEMPERATURE for v in (m[1], m[2]))
+        return TEMPERATURE, temp, dew, 0
+    if m := PRESSURE_RE.fullmatch(token):
+        value = int(m[2])
+        return PRESSURE, round(value * 3.38639) if m[1] == "A" else value * 10, 0, 0
+    if m := PERIOD_RE.fullmatch(token):
+        return PERIOD, int(m[1]) * 100 + int(m[2]), int(m[3]) * 100 + int(m[4]), 0
+    if m := FROM_RE.fullmatch(token):
+        return FROM, int(m[1]), int(m[2]), int(m[3])
+    if m := PROB_RE.fullmatch(token):
+        return PROB, int(m[1]), 0, 0
+    if (m := WEATHER_RE.fullmatch(token)) and (flags := weather_flags(m[2])) is not None:
+        if m[1] == "+" and flags & ~(FLAGS["TS"] | FLAGS["SH"] | FLAGS["FZ"]):
+            flags |= FLAGS["HEAVY"]
+        return (WEATHER, 0, flags, 0) if m[1] == "VC" else (WEATHER, flags, 0, 0)
+    return OTHER, 0, 0, 0
+
+
+class Vocabulary:
+    """Token -> id, with each distinct token classified once."""
+
+    def __init__(self):
+        self.index = {}
+        self.tokens = []
+        self.fields = []
+        self._arrays = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def ids(self, tokens):
+        new = set(tokens).difference(self.index)
+        if new:
+            for token in new:
+                self.index[token] = len(self.index)
+                self.tokens.append(token)
+                self.fields.append(classify(token))
+            self._arrays = None
+        return np.fromiter(map(self.index.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+
+    def strings(self, ids):
+        return [self.tokens[i] for i in ids.tolist()]
+
+    def arrays(self):
+        """(kind, a, b, c) arrays indexed by token id."""
+        if self._arrays is None:
+            table = np.array(self.fields, dtype=np.int64).reshape(-1, 4)
+            self._arrays = tuple(table[:, i] for i in range(4))
+        return self._arrays
+
+
+def resolve_minutes(day, hour, minute, reference):
+    """UTC minutes since the epoch of day-of-month stamps, in the month nearest `reference`."""
+    day, hour, minute = (np.asarray(v, dtype=np.int64) for v in (day, hour, minute))
+    month = np.datetime64(int(reference), "m").astype("datetime64[M]")
+    offset = (day - 1) * 1440 + hour * 60 + minute
+    candidates = np.stack([
+        (month + shift).astype("datetime64[m]").astype(np.int64) + offset for shift in (-1, 0, 1)
+    ])
+    best = np.argmin(np.abs(candidates - int(reference)), axis=0)
+    return np.take_along_axis(candidates, best[None], axis=0)[0]
+
+
+def resolve_minute(day, hour, minute, reference):
+    """resolve_minutes for one stamp, without the NumPy overhead."""
+    moment = EPOCH + timedelta(minutes=int(reference))
+    best = None
+    for shift in (-1, 0, 1):
+        year, month = divmod(moment.year * 12 + moment.month - 1 + shift, 12)
+        start = (datetime(year, month + 1, 1) - EPOCH) // timedelta(minutes=1)
+        candidate = start + (day - 1) * 1440 + hour * 60 + minute
+        if best is None or abs(candidate - reference) < abs(best - reference):
+            best = candidate
+    return best
+
+
+def first_per_owner(mask, owner, n):
+    """Index of the first True element of each owner's run, -1 where there is none."""
+    first = np.full(n, -1, dtype=np.int64)
+    index = np.flatnonzero(mask)
+    if len(index):
+        runs = owner[index]
+        keep = np.r_[True, runs[1:] != runs[:-1]]
+        first[runs[keep]] = index[keep]
+    return first
+
+
+# ----- METARs -----
+
+FIELDS = {
+    "time": (np.int64, -1),
+    "wind_dir": (np.int16, 0),
+    "wind_kt": (np.int16, 0),
+    "gust_kt": (np.int16, 0),
+    "visibility_m": (np.int32, -1),
+    "ceiling_ft": (np.int32, NO_CEILING),
+    "cover": (np.int8, 0),
+    "temp_c": (np.int16, NO_TEMPERATURE),
+    "dewpoint_c": (np.int16, NO_TEMPERATURE),
+    "pressure": (np.int32, 0),
+    "weather": (np.int64, 0),
+    "vicinity": (np.int64, 0),
+}
+
+
+def empty_fields(n):
+    return {name: np.full(n, default, dtype=dtype) for name, (dtype, default) in FIELDS.items()}
+
+
+def tokenize(lines):
+    """All tokens of lines in one list, each line ended by LINE_BREAK, and the report text per line.
+
+    The split is a single str.split over the joined text. For CSV caches
+    only the first column (the raw report) is kept.
+    """
+    if any("," in line for line in lines[:10]):
+        lines = [line.split(",", 1)[0] for line in lines]
+    text = "\n".join(lines).replace("=", " ").replace("\n", f" {LINE_BREAK} ")
+    return text.split() + [LINE_BREAK], lines
+
+
+def parse_metars(lines, now=None, vocabulary=None):
+    """Field arrays for every METAR in lines, plus "station" and "raw" lists, in one vectorized pass.
+
+    Day-of-month timestamps resolve to the month nearest `now` (UTC
+    minutes since the epoch, default the clock). Lines that are not a
+    report (no ddhhmmZ time after the station) are skipped.
+    """
+    now = int(time.time() // 60) if now is None else int(now)
+    vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+    lines = list(lines)
+    tokens, lines = tokenize(lines)
+    ids = vocabulary.ids(tokens)
+    kind = vocabulary.arrays()[0][ids]
+    breaks = kind == LINE
+    line = np.cumsum(breaks) - breaks
+    keep = ~breaks & (kind != HEADER)
+    ids, line = ids[keep], line[keep]
+    kind, a, b, c = (column[ids] for column in vocabulary.arrays())
+
+    # A report is a line with a station, a time and at least one more group
+    counts = np.bincount(line, minlength=len(lines))
+    starts = np.cumsum(counts) - counts
+    reports = np.flatnonzero(counts >= 3)
+    reports = reports[kind[starts[reports] + 1] == TIME]
+    selected = np.zeros(len(lines), dtype=bool)
+    selected[reports] = True
+    taken = selected[line]
+    ids, kind, a, b, c = ids[taken], kind[taken], a[taken], b[taken], c[taken]
+    n = len(reports)
+    counts = counts[reports]
+    starts = np.cumsum(counts) - counts
+    owner = np.repeat(np.arange(n), counts)
+    position = np.arange(len(ids)) - starts[owner]
+    # Everything from RMK or a trend group on is not current conditions
+    ending = np.isin(kind, (END, TEMPO, BECMG)) & (position >= 2)
+    ended = np.cumsum(ending)
+    before = ended[starts] - ending[starts]
+    active = (position >= 2) & (ended - np.repeat(before, counts) == 0)
+
+    fields = empty_fields(n)
+    stamp = starts + 1
+    fields["time"][:] = resolve_minutes(a[stamp], b[stamp], c[stamp], now)
+
+    wind = first_per_owner(active & (kind == WIND), owner, n)
+    has = wind >= 0
+    for name, values in (("wind_dir", a), ("wind_kt", b), ("gust_kt", c)):
+        fields[name][has] = values[wind[has]]
+
+    # "1 1/2SM": a whole-mile token adds to the fraction after it
+    meters = np.where(kind == VISIBILITY, a, -1)
+    whole = np.flatnonzero((kind[:-1] == WHOLE_MILES) & (kind[1:] == VISIBILITY) & (b[1:] == 1)
+                           & (owner[:-1] == owner[1:]))
+    meters[whole + 1] += np.round(a[whole] * METERS_PER_MILE).astype(np.int64)
+    visibility = first_per_owner(active & (kind == VISIBILITY), owner, n)
+    has = visibility >= 0
+    fields["visibility_m"][has] = meters[visibility[has]]
+
+    clouds = active & (kind == CLOUD)
+    np.maximum.at(fields["cover"], owner[clouds], a[clouds].astype(np.int8))
+    layers = clouds & (a >= COVERS["BKN"])
+    np.minimum.at(fields["ceiling_ft"], owner[layers], b[layers].astype(np.int32))
+    towering = clouds & (c == 1)
+    np.bitwise_or.at(fields["weather"], owner[towering], FLAGS["CB"])
+
+    weather = active & (kind == WEATHER)
+    np.bitwise_or.at(fields["weather"], owner[weather], a[weather])
+    np.bitwise_or.at(fields["vicinity"], owner[weather], b[weather])
+
+    temperature = first_per_owner(active & (kind == TEMPERATURE), owner, n)
+    has = temperature >= 0
+    fields["temp_c"][has] = a[temperature[has]]
+    fields["dewpoint_c"][has] = b[temperature[has]]
+    pressure = first_per_owner(active & (kind == PRESSURE), owner, n)
+    has = pressure >= 0
+    fields["pressure"][has] = a[pressure[has]]
+
+    fields["station"] = vocabulary.strings(ids[starts])
+    fields["raw"] = [lines[i].strip() for i in reports.tolist()]
+    return fields
+
+
+# ----- TAFs -----
+
+def split_tafs(lines):
+    """Token lists of the TAFs in lines: each runs from a TAF token to the next."""
+    tafs = []
+    for token in tokenize(list(lines))[0]:
+        if token == "TAF":
+            tafs.append([])
+        elif tafs and token != LINE_BREAK and not (token in HEADERS and not tafs[-1]):
+            tafs[-1].append(token)
+    return [taf for taf in tafs if len(taf) >= 3]
+
+
+def parse_tafs(lines, now=None, vocabulary=None):
+    """Forecast periods of the latest TAF per station in lines.
+
+    Returns per-period "station", "start", "end" (UTC minutes), "weight" and
+    the period's conditions as FIELDS arrays, plus "issued" and "raw" per
+    station. FM groups and BECMG change the prevailing conditions; TEMPO
+    and PROB groups are periods of their own over the prevailing ones,
+    weighted by how likely they are.
+    """
+    now = int(time.time() // 60) if now is None else int(now)
+    vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+    tafs = split_tafs(lines)
+    ids = vocabulary.ids(list(chain.from_iterable(tafs)))
+    kinds, values_a, values_b, values_c = (column[ids].tolist() for column in vocabulary.arrays())
+    latest, offset = {}, 0
+    for tokens in tafs:
+        span = slice(offset, offset + len(tokens))
+        offset += len(tokens)
+        kind, a, b, c = kinds[span], values_a[span], values_b[span], values_c[span]
+        if kind[1] != TIME or kind[2] != PERIOD:
+            continue
+        issued = resolve_minute(a[1], b[1], c[1], now)
+        if tokens[0] in latest and latest[tokens[0]][0] >= issued:
+            continue
+        latest[tokens[0]] = (issued, tokens, kind, a, b, c)
+
+    periods, stations, issued_at, raw = [], [], {}, {}
+    for station, (issued, tokens, kind, a, b, c) in latest.items():
+        def at(day_hour, minute=0):
+            return resolve_minute(day_hour // 100, day_hour % 100, minute, issued)
+
+        valid_from, valid_to = at(a[2]), at(b[2])
+        groups = []  # (type, start, end, weight, first token, end token)
+        group, i = ("from", valid_from, valid_to, 1.0, 3), 3
+        while i < len(tokens) and kind[i] != END:
+            k = kind[i]
+            if k not in (FROM, TEMPO, BECMG, PROB):
+                i += 1
+                continue
+            if group is not None:
+                groups.append((*group, i))
+            if k == FROM:
+                group, i = ("from", resolve_minute(a[i], b[i], c[i], issued), valid_to, 1.0, i + 1), i + 1
+                continue
+            name, weight = ("becmg", 1.0) if k == BECMG else ("tempo", TEMPO_WEIGHT)
+            if k == PROB:
+                weight = a[i] / 100
+                if i + 1 < len(tokens) and kind[i + 1] == TEMPO:
+                    i += 1
+            if i + 1 < len(tokens) and kind[i + 1] == PERIOD:
+                group, i = (name, at(a[i + 1]), at(b[i + 1]), weight, i + 2), i + 2
+            else:
+                group, i = None, i + 1
+        if group is not None:
+            groups.append((*group, i))
+
+        # FM and BECMG groups change the prevailing conditions until the next change
+        changes = sorted((g for g in groups if g[0] != "tempo"), key=lambda g: g[1])
+        prevailing, states = {}, []
+        for n, (_, start, _, _, first, last) in enumerate(changes):
+            prevailing = {**prevailing, **taf_conditions(first, last, kind, a, b, c)}
+            states.append((start, prevailing))
+            end = next((g[1] for g in changes[n + 1:] if g[1] > start), valid_to)
+            periods.append((start, max(end, start), 1.0, prevailing))
+        for name, start, end, weight, first, last in groups:
+            if name == "tempo":
+                fallback = states[0][1] if states else {}
+                base = next((state for since, state in reversed(states) if since <= start), fallback)
+                periods.append((start, end, weight, {**base, **taf_conditions(first, last, kind, a, b, c)}))
+        stations += [station] * (len(periods) - len(stations))
+        issued_at[station] = issued
+        raw[station] = "TAF " + " ".join(tokens)
+
+    n = len(periods)
+    fields = empty_fields(n)
+    for i, (_, _, _, conditions) in enumerate(periods):
+        for name, value in conditions.items():
+            fields[name][i] = value
+    return {
+        "station": stations,
+        "start": np.array([p[0] for p in periods], dtype=np.int64),
+        "end": np.array([p[1] for p in periods], dtype=np.int64),
+        "weight": np.array([p[2] for p in periods], dtype=np.float32),
+        **{name: fields[name] for name in ("wind_kt", "gust_kt", "visibility_m", "ceiling_ft", "weather",
+                                           "vicinity")},
+        "issued": issued_at,
+        "raw": raw,
+    }
+
+
+def taf_conditions(first, last, kind, a, b, c):
+    """Conditions stated by tokens [first, last) of a TAF group; fields left out are inherited."""
+    out = {}
+    clouds, weather = None, None
+    for i in range(first, last):
+        k = kind[i]
+        if k == WIND:
+            out["wind_kt"], out["gust_kt"] = b[i], c[i]
+        elif k == VISIBILITY:
+            out["visibility_m"] = a[i] + (round(a[i - 1] * METERS_PER_MILE) if kind[i - 1] == WHOLE_MILES else 0)
+        elif k == CLOUD:
+            clouds = clouds if clouds is not None else [NO_CEILING, 0]
+            if a[i] >= COVERS["BKN"]:
+                clouds[0] = min(clouds[0], b[i])
+            if c[i]:
+                clouds[1] |= FLAGS["CB"]
+        elif k == WEATHER:
+            weather = weather if weather is not None else [0, 0]
+            weather[0] |= a[i]
+            weather[1] |= b[i]
+    if clouds is not None:
+        out["ceiling_ft"] = clouds[0]
+    if weather is not None or clouds is not None:
+        weather = weather or [0, 0]
+        out["weather"] = weather[0] | (clouds[1] if clouds else 0)
+        out["vicinity"] = weather[1]
+    return out
+
+
+# ----- delay risk -----
+
+def threshold_factor(values, table, below):
+    out = np.zeros(len(values), dtype=np.float32)
+    for limit, probability in reversed(table):
+        out = np.where(values < limit if below else values >= limit, np.float32(probability), out)
+    return out
+
+
+def weather_factor(flags):
+    out = np.zeros(len(flags), dtype=np.float32)
+    for code, probability in WEATHER_RISK.items():
+        out = np.where(flags & FLAGS[code], np.maximum(out, probability), out)
+    heavy = (flags & FLAGS["HEAVY"]) != 0
+    return np.where(heavy, np.minimum(out + HEAVY_RISK, 0.9), out)
+
+
+def risk_factors(visibility_m, ceiling_ft, wind_kt, gust_kt, weather, vicinity):
+    """Delay probabilities (n, 4) from ceiling, visibility, wind and weather."""
+    visibility_m = np.asarray(visibility_m)
+    return np.stack([
+        threshold_factor(np.asarray(ceiling_ft), CEILING_RISK, below=True),
+        np.where(visibility_m >= 0, threshold_factor(visibility_m, VISIBILITY_RISK, below=True), 0),
+        np.maximum(threshold_factor(np.asarray(wind_kt), WIND_RISK, below=False),
+                   threshold_factor(np.asarray(gust_kt), GUST_RISK, below=False)),
+        np.maximum(weather_factor(np.asarray(weather)), VICINITY_SHARE * weather_factor(np.asarray(vicinity))),
+    ], axis=1)
+
+
+def delay_risk(factors):
+    """0-100 score: the chance that at least one factor causes delays, taking them as independent."""
+    return (100 * (1 - np.prod(1 - factors, axis=1))).astype(np.float32)
+
+
+def risk_level(score):
+    """Level of a score, rounded first so the level always agrees with the score shown."""
+    return RISK_LEVELS[int(np.searchsorted(RISK_THRESHOLDS, round(float(score)), side="right"))]
+
+
+def describe_factors(fields, row, probabilities, weather_text):
+    """Plain-language factors with a nonzero delay probability for one row of FIELDS arrays."""
+    out = []
+    for factor, probability in zip(FACTORS, probabilities[row].tolist()):
+        if probability <= 0:
+            continue
+        if factor == "ceiling":
+            out.append(f"ceiling {int(fields['ceiling_ft'][row]):,} ft")
+        elif factor == "visibility":
+            out.append(f"visibility {format_visibility(int(fields['visibility_m'][row]))}")
+        elif factor == "wind":
+            gust = int(fields["gust_kt"][row])
+            out.append(f"wind {int(fields['wind_kt'][row])} kt" + (f" gusting {gust} kt" if gust else ""))
+        else:
+            out.append(weather_text or "cumulonimbus nearby")
+    return out
+
+
+def field_factors(fields):
+    return risk_factors(*(fields[name] for name in ("visibility_m", "ceiling_ft", "wind_kt", "gust_kt",
+                                                    "weather", "vicinity")))
+
+
+# ----- table -----
+
+class WeatherTable:
+    """Latest observation per station and the latest TAF's periods; merge() returns a new table."""
+
+    def __init__(self, stations=(), fields=None, raw=None, forecasts=None):
+        self.stations = list(stations)
+        self.index = {code: i for i, code in enumerate(self.stations)}
+        n = len(self.stations)
+        self.fields = fields if fields is not None else empty_fields(n)
+        self.raw = raw if raw is not None else [None] * n
+        self.probabilities = field_factors(self.fields)
+        self.risk = delay_risk(self.probabilities)
+        forecasts = forecasts or empty_forecasts()
+        order = np.argsort(forecasts["station_id"], kind="stable")
+        self.forecasts = {name: values[order] for name, values in forecasts.items()
+                          if isinstance(values, np.ndarray)}
+        self.forecast_probabilities = field_factors(self.forecasts)
+        self.forecasts["risk"] = delay_risk(self.forecast_probabilities) * self.forecasts["weight"]
+        self.forecast_ptr = np.searchsorted(self.forecasts["station_id"], np.arange(n + 1))
+        self.taf_issued = forecasts["issued"]
+        self.taf_raw = forecasts["raw"]
+
+    def __len__(self):
+        return len(self.stations)
+
+    def merge(self, observations=None, forecasts=None):
+        """A new table with newer observations and TAFs applied; this one is left as it was."""
+        index = dict(self.index)
+        for code in chain(observations["station"] if observations else (), forecasts["station"] if forecasts else ()):
+            index.setdefault(code, len(index))
+        n, grown = len(index), len(index) - len(self)
+        fields = {name: np.r_[values, np.full(grown, FIELDS[name][1], dtype=values.dtype)]
+                  for name, values in self.fields.items()}
+        raw = self.raw + [None] * grown
+
+        if observations and len(observations["station"]):
+            ids = np.fromiter(map(index.__getitem__, observations["station"]), dtype=np.int64,
+                              count=len(observations["station"]))
+            order = np.lexsort((observations["time"], ids))
+            last = order[np.r_[ids[order][1:] != ids[order][:-1], True]]
+            newer = last[observations["time"][last] >= fields["time"][ids[last]]]
+            for name in FIELDS:
+                fields[name][ids[newer]] = observations[name][newer]
+            for i, row in zip(newer.tolist(), ids[newer].tolist()):
+                raw[row] = observations["raw"][i]
+
+        merged = {name: values for name, values in self.forecasts.items() if name != "risk"}
+        issued, taf_raw = dict(self.taf_issued), dict(self.taf_raw)
+        if forecasts and forecasts["issued"]:
+            replaced = [index[code] for code, at in forecasts["issued"].items()
+                        if at >= issued.get(code, -1)]
+            for code in forecasts["issued"]:
+                if forecasts["issued"][code] >= issued.get(code, -1):
+                    issued[code], taf_raw[code] = forecasts["issued"][code], forecasts["raw"][code]
+            station_ids = np.fromiter(map(index.__getitem__, forecasts["station"]), dtype=np.int64,
+                                      count=len(forecasts["station"]))
+            fresh = np.isin(station_ids, replaced)
+            kept = ~np.isin(merged["station_id"], replaced)
+            merged = {name: np.r_[values[kept], (station_ids if name == "station_id" else forecasts[name])[fresh]]
+                      for name, values in merged.items()}
+        return WeatherTable(list(index), fields, raw, {**merged, "issued": issued, "raw": taf_raw})
+
+    # ----- lookups -----
+
+    def station_id(self, code):
+        """Row of an ICAO station, or of the station at an IATA airport code."""
+        code = str(code or "").strip().upper()
+        if code in self.index:
+            return self.index[code]
+        icao = icao_code(code)
+        return self.index.get(icao) if icao else None
+
+    def forecast_risk(self, rows, start, end):
+        """Highest weighted forecast risk per row over [start, end) UTC minutes; NaN without a TAF."""
+        rows = np.asarray(rows, dtype=np.int64)
+        lo, hi = self.forecast_ptr[rows], self.forecast_ptr[rows + 1]
+        counts = hi - lo
+        owner = np.repeat(np.arange(len(rows)), counts)
+        period = np.repeat(lo, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        start, end = np.broadcast_to(start, rows.shape)[owner], np.broadcast_to(end, rows.shape)[owner]
+        overlaps = (self.forecasts["start"][period] < end) & (self.forecasts["end"][period] > start)
+        out = np.full(len(rows), np.nan, dtype=np.float32)
+        covered = np.zeros(len(rows), dtype=bool)
+        covered[owner[overlaps]] = True
+        out[covered] = 0
+        np.fmax.at(out, owner[overlaps], self.forecasts["risk"][period[overlaps]])
+        return out
+
+    def assess(self, rows, at, hours=FORECAST_HOURS):
+        """(current, forecast, combined) risk per row around UTC minute `at`; NaN where unknown.
+
+        An observation counts as current conditions within STALE_MINUTES of
+        `at`; the forecast covers [at, at + hours).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        at = np.broadcast_to(np.asarray(at, dtype=np.int64), rows.shape)
+        observed = self.fields["time"][rows]
+        fresh = (observed >= 0) & (np.abs(at - observed) <= STALE_MINUTES)
+        current = np.where(fresh, self.risk[rows], np.nan).astype(np.float32)
+        forecast = self.forecast_risk(rows, at, at + hours * 60)
+        return current, forecast, np.fmax(current, forecast)
+
+    def delay_outlook(self, code, at=None, hours=FORECAST_HOURS):
+        """Delay risk at one airport around UTC minute `at` (default now), or None without data."""
+        row = self.station_id(code)
+        if row is None:
+            return None
+        at = int(time.time() // 60) if at is None else int(at)
+        current, forecast, combined = (float(v[0]) for v in self.assess([row], at, hours))
+        if np.isnan(combined):
+            return None
+        return {
+            "score": round(combined),
+            "level": risk_level(combined),
+            "source": "observation" if not np.isnan(current) and not current < forecast else "forecast",
+            "factors": (self.factors(row) if not np.isnan(current) and not current < forecast
+                        else self.forecast_factors(row, at, at + hours * 60)),
+        }
+
+    def factors(self, row):
+        """Plain-language conditions behind a station's current delay risk."""
+        return describe_factors(self.fields, row, self.probabilities, describe_weather(self.raw[row]))
+
+    def forecast_factors(self, row, start, end):
+        """Plain-language conditions of the riskiest TAF period overlapping [start, end)."""
+        lo, hi = int(self.forecast_ptr[row]), int(self.forecast_ptr[row + 1])
+        f = self.forecasts
+        overlapping = [i for i in range(lo, hi) if f["start"][i] < end and f["end"][i] > start]
+        if not overlapping:
+            return []
+        worst = max(overlapping, key=lambda i: f["risk"][i])
+        return describe_factors(f, worst, self.forecast_probabilities, flag_text(int(f["weather"][worst])))
+
+    def disruptions(self, at=None, min_score=RISK_THRESHOLDS[1], hours=FORECAST_HOURS, stations=None):
+        """(row, current, forecast, combined) of stations at or above min_score, worst first."""
+        at = int(time.time() // 60) if at is None else int(at)
+        rows = np.arange(len(self)) if stations is None else np.asarray(stations, dtype=np.int64)
+        current, forecast, combined = self.assess(rows, at, hours)
+        hit = np.flatnonzero(np.nan_to_num(combined, nan=-1) >= min_score)
+        hit = hit[np.argsort(-combined[hit], kind="stable")]
+        return rows[hit], current[hit], forecast[hit], combined[hit]
+
+    def describe(self, row, now=None):
+        """check_weather output for one station."""
+        now = int(time.time() // 60) if now is None else int(now)
+        f = {name: int(values[row]) for name, values in self.fields.items()}
+        result = {"station": self.stations[row]}
+        if f["time"] >= 0:
+            conditions = describe_weather(self.raw[row])
+            result.update({
+                "observed_at": format_local(f["time"]) + "Z",
+                "conditions": (conditions[:1].upper() + conditions[1:]) if conditions else COVER_NAMES[f["cover"]],
+                "temperature": format_temperature(f["temp_c"]),
+                "wind": format_wind(f["wind_dir"], f["wind_kt"], f["gust_kt"]),
+                "visibility": format_visibility(f["visibility_m"]),
+                "ceiling": f"{f['ceiling_ft']:,} ft" if f["ceiling_ft"] < NO_CEILING else "None",
+                "flight_category": flight_category(f["ceiling_ft"], f["visibility_m"]),
+                "raw_metar": self.raw[row],
+            })
+            if now - f["time"] > STALE_MINUTES:
+                result["stale"] = True
+        outlook = self.delay_outlook(self.stations[row], now)
+        if outlook is not None:
+            result["delay_risk"] = outlook
+            result["delays"] = {
+                "low": "No weather delays expected",
+                "moderate": "Minor weather delays possible",
+                "high": "Weather delays likely",
+                "severe": "Significant weather delays and cancellations likely",
+            }[outlook["level"]]
+        forecast = float(self.forecast_risk([row], now, now + FORECAST_HOURS * 60)[0])
+        if not np.isnan(forecast):
+            result["forecast"] = {
+                f"next_{FORECAST_HOURS}h_risk": round(forecast),
+                "level": risk_level(forecast),
+                "raw_taf": self.taf_raw.get(self.stations[row]),
+            }
+        return result
+
+    def stats(self):
+        observed = self.fields["time"] >= 0
+        return {
+            "stations": len(self),
+            "observed": int(np.count_nonzero(observed)),
+            "with_taf": len(self.taf_issued),
+            "forecast_periods": len(self.forecasts["start"]),
+            "latest_observation": format_local(self.fields["time"].max()) + "Z" if observed.any() else None,
+            "high_risk": int(np.count_nonzero(observed & (self.risk >= RISK_THRESHOLDS[1]))),
+        }
+
+
+def empty_forecasts():
+    n = 0
+    fields = empty_fields(n)
+    return {
+        "station_id": np.zeros(n, dtype=np.int64),
+        "start": np.zeros(n, dtype=np.int64),
+        "end": np.zeros(n, dtype=np.int64),
+        "weight": np.zeros(n, dtype=np.float32),
+        **{name: fields[name] for name in ("wind_kt", "gust_kt", "visibility_m", "ceiling_ft", "weather",
+                                           "vicinity")},
+        "issued": {},
+        "raw": {},
+    }
+
+
+@lru_cache(maxsize=8192)
+def icao_code(code):
+    """ICAO station of an IATA airport code from the airport store, or None."""
+    store = get_airport_store()
+    record = store.find(code)
+    return store.summary(record)["icao_code"] if record is not None else None
+
+
+@lru_cache(maxsize=8192)
+def iata_code(station):
+    store = get_airport_store()
+    record = store.find(station)
+    return store.summary(record)["airport_code"] if record is not None else None
+
+
+# ----- display -----
+
+def describe_weather(raw):
+    """'light rain, mist' from the present-weather groups of a raw METAR."""
+    phrases = []
+    for token in (raw or "").split()[2:]:
+        if token in ("RMK", "NOSIG", "TEMPO", "BECMG"):
+            break
+        m = WEATHER_RE.fullmatch(token)
+        if not m or weather_flags(m[2]) is None:
+            continue
+        codes = [m[2][i:i + 2] for i in range(0, len(m[2]), 2)]
+        descriptor = codes[0] if codes[0] in DESCRIPTORS else None
+        names = " and ".join(PHENOMENA[code] for code in codes if code in PHENOMENA)
+        intensity = {"+": "heavy ", "-": "light "}.get(m[1], "")
+        if descriptor == "TS":
+            phrase = "thunderstorm" + (f" with {intensity}{names}" if names else "")
+        elif descriptor == "SH":
+            phrase = f"{intensity}{names} showers" if names else "showers"
+        elif descriptor:
+            phrase = f"{intensity}{DESCRIPTORS[descriptor]} {names}"
+        else:
+            phrase = intensity + names
+        phrases.append(phrase + (" in the vicinity" if m[1] == "VC" else ""))
+    return ", ".join(phrases)
+
+
+def flag_text(flags):
+    """'thunderstorm, rain' from weather flags, for forecast periods that have no raw group."""
+    names = [DESCRIPTORS.get(code) or PHENOMENA[code] for code in FLAGS
+             if code in WEATHER_RISK and code != "CB" and flags & FLAGS[code]]
+    return ", ".join(names)
+
+
+def format_temperature(celsius):
+    if celsius == NO_TEMPERATURE:
+        return None
+    return f"{round(celsius * 9 / 5 + 32)}°F ({celsius}°C)"
+
+
+def format_wind(direction, speed, gust):
+    if speed == 0:
+        return "Calm"
+    heading = "Variable" if direction < 0 else f"{direction:03d}°"
+    return f"{heading} at {speed} kt" + (f", gusts {gust} kt" if gust else "")
+
+
+def format_visibility(meters):
+    if meters < 0:
+        return None
+    if meters == 9999:
+        return "6+ miles (10+ km)"
+    return f"{meters / METERS_PER_MILE:.1f}".rstrip("0").rstrip(".") + " miles"
+
+
+def flight_category(ceiling_ft, visibility_m):
+    visibility_m = visibility_m if visibility_m >= 0 else 99_999
+    if ceiling_ft < 500 or visibility_m < METERS_PER_MILE:
+        return "LIFR"
+    if ceiling_ft < 1000 or visibility_m < 3 * METERS_PER_MILE:
+        return "IFR"
+    if ceiling_ft <= 3000 or visibility_m <= 5 * METERS_PER_MILE:
+        return "MVFR"
+    return "VFR"
+
+
+# ----- shared table -----
+
+_table = WeatherTable()
+_vocabulary = Vocabulary()
+_version = None
+_checked_at = None
+_table_lock = threading.Lock()
+
+
+def ingest(metar_lines=(), taf_lines=(), now=None):
+    """Parse a batch of METAR and TAF lines into the shared table; returns (reports, TAFs) parsed."""
+    global _table
+    with _table_lock:
+        observations = parse_metars(metar_lines, now, _vocabulary)
+        forecasts = parse_tafs(taf_lines, now, _vocabulary)
+        _table = _table.merge(observations, forecasts)
+    return len(observations["station"]), len(forecasts["issued"])
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read().splitlines()
+
+
+def get_weather_table():
+    """The shared WeatherTable, re-ingesting the feed files when they change on disk."""
+    global _version, _checked_at
+    now = time.monotonic()
+    if _checked_at is not None and now - _checked_at < float(os.getenv(WEATHER_RELOAD_ENV, RELOAD_INTERVAL)):
+        return _table
+    with _table_lock:
+        if _checked_at is not None and now - _checked_at < float(os.getenv(WEATHER_RELOAD_ENV, RELOAD_INTERVAL)):
+            return _table
+        _checked_at = now
+        paths = [os.getenv(WEATHER_METARS_ENV), os.getenv(WEATHER_TAFS_ENV)]
+        version = tuple(os.stat(p).st_mtime_ns if p and os.path.exists(p) else None for p in paths)
+        changed = version != _version
+        _version = version
+    if changed and version[0] is None and version[1] is None and not len(_table):
+        logger.warning("No METAR feed at %s; using generated observations", WEATHER_METARS_ENV)
+        stations = airport_stations()
+        ingest(synthetic_metars(stations, hours=3), synthetic_tafs(stations, hours=1))
+    elif changed:
+        try:
+            metars, tafs = (read_lines(p) if p and os.path.exists(p) else () for p in paths)
+            count, forecasts = ingest(metars, tafs)
+            logger.info("Ingested %d METARs and %d TAFs", count, forecasts)
+        except (OSError, ValueError):
+            logger.exception("Keeping weather table; ingest failed")
+    return _table
+
+
+def airport_stations():
+    """ICAO stations of the airports in the airport store that also have an IATA code."""
+    store = get_airport_store()
+    return sorted({row["icao"].decode() for row in store.records if row["icao"] and row["iata"]})
+
+
+# ----- synthetic feeds -----
+
+def synthetic_metars(stations, hours=24, end=None, seed=17):
+    """Hourly METARs (and a few SPECIs) per station for `hours` hours up to `end` (UTC minutes)."""
+    end = int(time.time() // 60) if end is None else int(end)
+    rng = random.Random(seed)
+    climate = {station: station_climate(station) for station in stations}
+    first = (end // 60 - hours + 1) * 60
+    lines = []
+    for hour in range(hours):
+        base = first + hour * 60
+        for station in stations:
+            for minute in [51] + ([rng.randrange(0, 50)] if rng.random() < 0.08 else []):
+                if base - 60 + minute > end:
+                    continue
+                lines.append(synthetic_report(station, base - 60 + minute, climate[station], rng,
+                                              special=minute != 51))
+    return lines
+
+
+def station_climate(station):
+    """(mean temperature C, wetness 0-1) of a synthetic station, the same in METARs and TAFs."""
+    rng = random.Random(station)
+    return rng.uniform(-15, 32), rng.random() ** 2
+
+
+def synthetic_conditions(rng, temperature, wetness):
+    """A random (wind, visibility m, cloud layers, weather) draw, mostly benign."""
+    roll = rng.random()
+    wind_dir, wind = rng.randrange(0, 36) * 10, max(0, round(rng.gammavariate(2, 4.5)))
+    gust = wind + rng.randrange(8, 20) if wind >= 15 and rng.random() < 0.6 else 0
+    weather, visibility, clouds = [], 9999, []
+    if roll < 0.015 + 0.03 * wetness:
+        weather = [rng.choice(["TSRA", "+TSRA", "VCTS", "TS"])]
+        visibility, clouds = rng.choice([3000, 5000, 8000]), [("SCT", 30, "CB"), ("BKN", 60, "")]
+        gust = max(gust, wind + 15)
+    elif roll < 0.06 + 0.15 * wetness:
+        kind = "SN" if temperature <= 0 else "RA" if temperature > 2 else rng.choice(["FZRA", "SN", "RA"])
+        weather = [rng.choice(["-", "", "", "+"]) + kind]
+        visibility = rng.choice([1200, 2500, 4000, 6000, 9999])
+        clouds = [("BKN", rng.randrange(5, 30), ""), ("OVC", rng.randrange(30, 80), "")]
+    elif roll < 0.08 + 0.05 * wetness:
+        weather = ["FG" if rng.random() < 0.6 else "BR"]
+        visibility = rng.choice([150, 400, 800, 1500, 3000])
+        clouds = [("OVC" if rng.random() < 0.5 else "VV", rng.randrange(1, 6), "")]
+    else:
+        clouds = [(rng.choice(["FEW", "SCT", "BKN"]), rng.randrange(15, 250), "")
+                  for _ in range(rng.choice([0, 1, 1, 2, 3]))]
+        clouds.sort(key=lambda layer: layer[1])
+    return wind_dir, wind, gust, visibility, clouds, weather
+
+
+def synthetic_report(station, minute, climate, rng, special=False):
+    temperature, wetness = climate
+    wind_dir, wind, gust, visibility, clouds, weather = synthetic_conditions(rng, temperature, wetness)
+    day, hour, minute_of_hour = (format_local(minute)[8:10], format_local(minute)[11:13],
+                                 format_local(minute)[14:16])
+    us = station.startswith("K")
+    tokens = ["SPECI" if special else "METAR", station, f"{day}{hour}{minute_of_hour}Z"]
+    tokens.append("00000KT" if wind == 0 else f"{wind_dir:03d}{wind:02d}" + (f"G{gust:02d}" if gust else "") + "KT")
+    if us:
+        miles = visibility / METERS_PER_MILE
+        tokens += ["10SM"] if visibility == 9999 else (
+            ["1/4SM"] if miles < 0.375 else ["1/2SM"] if miles < 0.75 else ["1", "1/2SM"] if 1.25 <= miles < 1.75
+            else [f"{max(1, round(miles))}SM"])
+    else:
+        tokens.append(f"{visibility:04d}")
+    tokens += weather
+    tokens += [f"{cover}{height:03d}{extra}" for cover, height, extra in clouds] or (["CLR"] if us else ["NSC"])
+    temp = round(temperature + rng.uniform(-3, 3))
+    dew = temp - rng.randrange(0, 12)
+    tokens.append("/".join(f"M{-v:02d}" if v < 0 else f"{v:02d}" for v in (temp, dew)))
+    pressure = rng.gauss(1013, 8)
+    tokens.append(f"A{round(pressure / 0.338639):04d}" if us else f"Q{round(pressure):04d}")
+    tokens += ["RMK", "AO2", f"SLP{round(pressure * 10) % 1000:03d}"] if us else ["NOSIG"]
+    return " ".join(tokens)
+
+
+def synthetic_tafs(stations, hours=24, end=None, seed=23):
+    """Six-hourly 24-hour TAFs per station issued over `hours` hours up to `end` (UTC minutes)."""
+    end = int(time.time() // 60) if end is None else int(end)
+    rng = random.Random(seed)
+    lines = []
+    issue_hours = [h for h in range(end // 60 - hours + 1, end // 60 + 1) if h % 6 == 5] or [end // 60 // 6 * 6 - 1]
+    for issue_hour in issue_hours:
+        issued = issue_hour * 60 + 20
+        start = (issue_hour + 1) * 60
+        for station in stations:
+            climate = station_climate(station)
+            tokens = ["TAF", station, f"{format_local(issued)[8:10]}{format_local(issued)[11:13]}20Z",
+                      f"{day_hour(start)}/{day_hour(start + 24 * 60)}"]
+            tokens += taf_group(rng, climate)
+            for _ in range(rng.choice([0, 1, 1, 2])):
+                at = start + rng.randrange(3, 22) * 60
+                tokens += [f"FM{day_hour(at)}00"] + taf_group(rng, climate)
+            if rng.random() < 0.35:
+                at = start + rng.randrange(0, 20) * 60
+                tokens += [rng.choice(["TEMPO", "PROB30", "PROB40"]), f"{day_hour(at)}/{day_hour(at + 4 * 60)}"]
+                tokens += taf_group(rng, (climate[0], max(climate[1], 0.5)), change=True)
+            lines.append(" ".join(tokens) + "=")
+    return lines
+
+
+def day_hour(minute):
+    stamp = format_local(minute)
+    return stamp[8:10] + stamp[11:13]
+
+
+def taf_group(rng, climate, change=False):
+    wind_dir, wind, gust, visibility, clouds, weather = synthetic_conditions(rng, *climate)
+    tokens = [] if change and rng.random() < 0.5 else [
+        "00000KT" if wind == 0 else f"{wind_dir:03d}{wind:02d}" + (f"G{gust:02d}" if gust else "") + "KT"]
+    tokens.append(f"{visibility:04d}")
+    tokens += weather
+    tokens += [f"{cover}{height:03d}{extra}" for cover, height, extra in clouds] or ([] if change else ["NSC"])
+    return tokens
+
+
+# ----- tool functions -----
+
+def check_weather(airport_code):
+    """check_weather tool: current conditions, forecast and delay risk at an airport."""
+    table = get_weather_table()
+    row = table.station_id(airport_code)
+    if row is None:
+        return {"error": f"No weather reports for {airport_code}"}
+    result = {"airport_code": iata_code(table.stations[row]) or table.stations[row]}
+    result.update(table.describe(row))
+    return result
+
+
+def check_weather_disruptions(airports=None, min_level="high", hours=FORECAST_HOURS):
+    """check_weather_disruptions tool: airports whose weather risks delays now or in the next hours."""
+    if min_level not in RISK_LEVELS[1:]:
+        return {"error": f"min_level must be one of {', '.join(RISK_LEVELS[1:])}"}
+    if hours in (None, ""):
+        hours = FORECAST_HOURS
+    try:
+        hours = int(str(hours).strip())
+    except ValueError:
+        hours = 0
+    if not 1 <= hours <= 24:
+        return {"error": "hours must be a whole number from 1 to 24"}
+    if isinstance(airports, str):
+        airports = [code.strip() for code in airports.split(",") if code.strip()]
+    table = get_weather_table()
+    rows = None
+    if airports:
+        rows = [table.station_id(code) for code in airports]
+        unknown = [code for code, row in zip(airports, rows) if row is None]
+        if unknown:
+            return {"error": f"No weather reports for {', '.join(map(str, unknown))}"}
+    threshold = RISK_THRESHOLDS[RISK_LEVELS.index(min_level) - 1]
+    now = int(time.time() // 60)
+    flagged = table.disruptions(now, threshold, hours, rows)
+    found, current, forecast, combined = (values[:DISRUPTIONS_LIMIT] for values in flagged)
+    return {
+        "airports": [
+            {
+                "airport_code": iata_code(table.stations[row]) or table.stations[row],
+                "station": table.stations[row],
+                "score": round(float(score)),
+                "level": risk_level(score),
+                "current_risk": None if np.isnan(now_risk) else round(float(now_risk)),
+                f"next_{hours}h_risk": None if np.isnan(ahead) else round(float(ahead)),
+                "factors": (table.factors(row) if not np.isnan(now_risk) and not now_risk < ahead
+                            else table.forecast_factors(row, now, now + hours * 60)),
+            }
+            for row, now_risk, ahead, score in zip(found.tolist(), current, forecast, combined)
+        ],
+        "airports_flagged": len(flagged[0]),
+        "stations_checked": len(table) if rows is None else len(rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stations", type=int, default=500, help="synthetic stations to write with --out")
+    parser.add_argument("--hours", type=int, default=24)
+    parser.add_argument("--out", help="write synthetic METARs here")
+    parser.add_argument("--tafs-out", help="write synthetic TAFs here")
+    parser.add_argument("--metars", help="ingest this METAR file")
+    parser.add_argument("--tafs", help="ingest this TAF file")
+    parser.add_argument("--airport", help="print check_weather for this airport")
+    args = parser.parse_args()
+
+    if args.out or args.tafs_out:
+        stations = airport_stations()
+        rng = random.Random(3)
+        while len(stations) < args.stations:
+            stations.append("Y" + "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(3)))
+        stations = sorted(set(stations))[:max(args.stations, len(airport_stations()))]
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as out:
+                out.writelines(line + "\n" for line in synthetic_metars(stations, args.hours))
+            print(f"Wrote {args.hours}h of METARs for {len(stations):,} stations to {args.out}")
+        if args.tafs_out:
+            with open(args.tafs_out, "w", encoding="utf-8") as out:
+                out.writelines(line + "\n" for line in synthetic_tafs(stations, args.hours))
+            print(f"Wrote TAFs for {len(stations):,} stations to {args.tafs_out}")
+    if args.metars or args.tafs:
+        started = time.perf_counter()
+        count, forecasts = ingest(read_lines(args.metars) if args.metars else (),
+                                  read_lines(args.tafs) if args.tafs else ())
+        print(f"Ingested {count:,} METARs and {forecasts:,} TAFs in {time.perf_counter() - started:.2f}s")
+        print(json.dumps(_table.stats(), indent=2))
+        if args.airport:
+            print(json.dumps(check_weather(args.airport), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,37 @@
+import argparse
 import asyncio
+import os
 
 # Import the main customer service agent
-from customer_service_agent.agent import customer_service_agent
+from customer_service_agent.agent import airline_assist_agent
+from customer_service_agent.metering import meter_runner
+from customer_service_agent.models.replay import configure_model
 from dotenv import load_dotenv
+from customer_service_agent.session_store import SqliteSessionService
+from customer_service_agent.tracing import instrument_runner
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from utils import add_user_query_to_history, call_agent_async
+from utils import (
+    APP_NAME,
+    add_user_query_to_history,
+    call_agent_async,
+    new_session_state,
+)
 
 load_dotenv()
 
-# ===== PART 1: Initialize In-Memory Session Service =====
-# Using in-memory storage for this example (non-persistent)
-session_service = InMemorySessionService()
+# ===== PART 1: Initialize Session Service =====
+# Sessions are persisted in SQLite so state survives restarts and can be
+# shared between worker processes. Set SESSION_DB_PATH to move the file.
+session_service = SqliteSessionService(os.getenv("SESSION_DB_PATH", "sessions.db"))
 
 
 # ===== PART 2: Define Initial State =====
-# This will be used when creating a new session
-initial_state = {
-    "user_name": "Brandon Hancock",
-    "purchased_courses": [],
-    "interaction_history": [],
-}
+# The initial state lives in utils.py so the CLI and the HTTP server
+# (server.py) start sessions from the same template.
 
 
-async def main_async():
+async def main_async(stream=False):
     # Setup constants
-    APP_NAME = "Customer Support"
     USER_ID = "aiwithbrandon"
 
     # ===== PART 3: Session Creation =====
@@ -33,18 +39,21 @@ async def main_async():
     new_session = session_service.create_session(
         app_name=APP_NAME,
         user_id=USER_ID,
-        state=initial_state,
+        state=new_session_state(),
     )
     SESSION_ID = new_session.id
     print(f"Created new session: {SESSION_ID}")
 
     # ===== PART 4: Agent Runner Setup =====
     # Create a runner with the main customer service agent
-    runner = Runner(
-        agent=customer_service_agent,
+    # (traced to TRACE_DIR when it is set; see customer_service_agent/tracing.py,
+    # and on recorded model responses with MODEL_REPLAY; see models/replay.py),
+    # with token spend metered and capped by SESSION_TOKEN_BUDGET (metering.py)
+    runner = instrument_runner(meter_runner(Runner(
+        agent=configure_model(airline_assist_agent),
         app_name=APP_NAME,
         session_service=session_service,
-    )
+    )))
 
     # ===== PART 5: Interactive Conversation Loop =====
     print("\nWelcome to Customer Service Chat!")
@@ -65,7 +74,7 @@ async def main_async():
         )
 
         # Process the user query through the agent
-        await call_agent_async(runner, USER_ID, SESSION_ID, user_input)
+        await call_agent_async(runner, USER_ID, SESSION_ID, user_input, stream=stream)
 
     # ===== PART 6: State Examination =====
     # Show final session state
@@ -79,7 +88,14 @@ async def main_async():
 
 def main():
     """Entry point for the application."""
-    asyncio.run(main_async())
+    parser = argparse.ArgumentParser(description="AirlineAssist Pro console chat")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="print agent text and tool calls as they are generated",
+    )
+    args = parser.parse_args()
+    asyncio.run(main_async(stream=args.stream))
 
 
 if __name__ == "__main__":
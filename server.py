@@ -0,0 +1,528 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from email import policy
+from email.parser import BytesParser
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from dotenv import load_dotenv
+from google.adk.runners import Runner
+
+from customer_service_agent.alerts import AlertDispatcher, SessionInbox, get_alert_index
+from customer_service_agent.fanout import fanout_stats
+from customer_service_agent.registry import loading_stats
+from customer_service_agent.tool_cache import tool_cache
+from utils import (
+    APP_NAME,
+    add_user_query_to_history,
+    new_session_state,
+    percentile,
+    run_agent_turn,
+    stream_agent_turn,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_ID = "web_user"
+MAX_BODY_BYTES = 10 * 1024 * 1024
+METRICS_WINDOW = 10_000
+SERVER_WORKERS_ENV = "SERVER_WORKERS"
+# Stores /metrics reports once something has built them: (key, module, global set when built, getter).
+# Their modules are imported where they are used, so /metrics never loads or builds one itself.
+STORES = (
+    ("baggage", "customer_service_agent.baggage", "_store", "get_scan_store"),
+    ("translation", "customer_service_agent.translation", "_pipeline", "get_translation_pipeline"),
+    ("airports", "customer_service_agent.airports.store", "_store", "get_airport_store"),
+    ("weather", "customer_service_agent.weather", "_checked_at", "get_weather_table"),
+    ("tokens", "customer_service_agent.metering", "_meter", "get_meter"),
+)
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ===== PART 1: Minimal HTTP/1.1 plumbing =====
+# Only what index.html needs: keep-alive connections, Content-Length bodies
+# and multipart/form-data, urlencoded or JSON request payloads.
+
+
+async def read_request(reader):
+    """Read one request from the stream, or return None on a clean EOF."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        raise HTTPError(HTTPStatus.LENGTH_REQUIRED, "Chunked request bodies are not supported")
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length < 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+async def write_response(writer, status, payload=None, keep_alive=True, extra_headers=None):
+    status = HTTPStatus(status)
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    headers = {
+        "Content-Length": str(len(body)),
+        "Connection": "keep-alive" if keep_alive else "close",
+        **CORS_HEADERS,
+        **(extra_headers or {}),
+    }
+    if payload is not None:
+        headers["Content-Type"] = "application/json"
+
+    head = f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    writer.write(head.encode("latin-1") + b"\r\n" + body)
+    await writer.drain()
+
+
+async def start_event_stream(writer):
+    """Send the headers for a chunked text/event-stream response."""
+    head = "HTTP/1.1 200 OK\r\n"
+    headers = {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "Transfer-Encoding": "chunked",
+        "Connection": "keep-alive",
+        **CORS_HEADERS,
+    }
+    head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    writer.write(head.encode("latin-1") + b"\r\n")
+    await writer.drain()
+
+
+async def send_event(writer, event, data):
+    """Write one Server-Sent Event as an HTTP chunk and flush it immediately."""
+    message = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+    writer.write(f"{len(message):x}\r\n".encode("latin-1") + message + b"\r\n")
+    await writer.drain()
+
+
+async def end_event_stream(writer):
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+def parse_form(headers, body):
+    """Decode a request body into a dict of text fields.
+
+    File uploads are skipped; only their field names are reported under
+    the "_files" key so the handler can acknowledge them.
+    """
+    content_type = headers.get("content-type", "")
+    if not body:
+        return {}
+    if content_type.startswith("multipart/form-data"):
+        message = BytesParser(policy=policy.HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+        )
+        fields = {"_files": []}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if part.get_filename():
+                fields["_files"].append(part.get_filename())
+            elif name:
+                fields[name] = part.get_content()
+        return fields
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        return {k: v[-1] for k, v in parse_qs(body.decode("utf-8")).items()}
+    if content_type.startswith("application/json"):
+        try:
+            fields = json.loads(body)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid JSON body")
+        if not isinstance(fields, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "JSON body must be an object")
+        return fields
+    raise HTTPError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, f"Unsupported content type: {content_type}")
+
+
+# ===== PART 2: Chat server =====
+
+
+class ChatServer:
+    """Serves the /chat endpoint used by index.html.
+
+    All sessions share one Runner and one session service. Turns for the same
+    session are serialized with a per-session lock, kept only while a turn
+    holds or waits for it (GET /health counts them as active sessions);
+    different sessions run concurrently on the event loop while they wait
+    on the model.
+
+    POST /chat returns the whole turn as JSON. POST /chat/stream returns
+    Server-Sent Events: a "session" event, then "token", "tool_call" and
+    "tool_result" events as ADK yields them, and a final "done" event.
+    GET /baggage/stream?tag=...&last_name=... pushes a bag's status changes
+    as "status" events until it is claimed or delivered.
+    POST /alerts takes an operational event for a flight (delay, gate
+    change...) and pushes it to every session following that flight;
+    GET /alerts/stream?session_id=... delivers them as "alert" events.
+    GET /airports/search?q=...&limit=... autocompletes airports by city,
+    name or code for the booking form.
+    GET /metrics reports time-to-first-token and turn latency percentiles,
+    plus the read-only tool cache and parallel_lookup counters, and the
+    stats of each store (bags, airports, weather, ...) a request has built.
+
+    A session_id the service does not know yet starts a new session under
+    that id; workers.py relies on this to route a session before it exists.
+    """
+
+    def __init__(self, runner, user_id=DEFAULT_USER_ID):
+        self.runner = runner
+        self.session_service = runner.session_service
+        self.app_name = runner.app_name
+        self.user_id = user_id
+        self.ttft_ms = deque(maxlen=METRICS_WINDOW)
+        self.turn_ms = deque(maxlen=METRICS_WINDOW)
+        self._session_locks = {}
+        self._server = None
+        self.inbox = SessionInbox(self.session_service, self.app_name)
+        self.alerts = AlertDispatcher(get_alert_index())
+        self.alerts.add_channel("session", self.inbox)
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host="127.0.0.1", port=8000, path=None):
+        """Listen on host:port, or on the Unix socket path (a worker behind workers.py)."""
+        if path:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port)
+        await self.alerts.start()
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        await self.alerts.close()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = True
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    result = await self.dispatch(method, target, headers, body, writer)
+                    if result is None:
+                        # The handler already streamed its response.
+                        continue
+                    status, payload = result
+                except HTTPError as e:
+                    status, payload, keep_alive = e.status, {"error": e.message}, False
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    raise
+                except Exception:
+                    logger.exception("Request failed")
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}
+                    keep_alive = False
+                await write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, headers, body, writer):
+        """Route a request; returns (status, payload), or None if already answered."""
+        route = urlsplit(target).path
+        if method == "OPTIONS":
+            return HTTPStatus.NO_CONTENT, None
+        if route == "/health" and method == "GET":
+            return HTTPStatus.OK, {"status": "ok", "active_sessions": len(self._session_locks)}
+        if route == "/metrics" and method == "GET":
+            return HTTPStatus.OK, self.metrics()
+        if route == "/baggage/stream" and method == "GET":
+            query = {k: v[-1] for k, v in parse_qs(urlsplit(target).query).items()}
+            await self.handle_baggage_stream(query.get("tag", ""), query.get("last_name", ""), writer)
+            return None
+        if route == "/alerts" and method == "POST":
+            return HTTPStatus.ACCEPTED, await self.handle_alert(parse_form(headers, body))
+        if route == "/alerts/stream" and method == "GET":
+            query = {k: v[-1] for k, v in parse_qs(urlsplit(target).query).items()}
+            await self.handle_alert_stream(query.get("session_id", ""), writer)
+            return None
+        if route == "/airports/search" and method == "GET":
+            query = {k: v[-1] for k, v in parse_qs(urlsplit(target).query).items()}
+            try:
+                limit = int(query.get("limit", 8))
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "limit must be an integer")
+            from customer_service_agent.airports.store import search_airports
+
+            return HTTPStatus.OK, search_airports(query.get("q", ""), limit)
+        if route in ("/chat", "/chat/stream"):
+            if method != "POST":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"Use POST for {route}")
+            fields = parse_form(headers, body)
+            if not fields.get("session_id") and headers.get("x-session-id"):
+                # Assigned by the worker supervisor, which routes on it
+                fields["session_id"] = headers["x-session-id"]
+            if route == "/chat/stream":
+                await self.handle_chat_stream(fields, writer)
+                return None
+            return HTTPStatus.OK, await self.handle_chat(fields)
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {route}")
+
+    def metrics(self):
+        built = {}
+        for key, module_name, marker, getter in STORES:
+            module = sys.modules.get(module_name)
+            if module is not None and getattr(module, marker, None) is not None:
+                built[key] = getattr(module, getter)().stats()
+        return {
+            "turns": len(self.turn_ms),
+            "ttft_ms": {f"p{p}": percentile(self.ttft_ms, p) for p in (50, 95, 99)},
+            "turn_ms": {f"p{p}": percentile(self.turn_ms, p) for p in (50, 95, 99)},
+            "tool_cache": tool_cache.stats(),
+            "fanout": fanout_stats.stats(),
+            "sub_agents_loaded_ms": loading_stats(),
+            "alerts": self.alerts.stats(),
+            **built,
+        }
+
+    def ensure_session(self, user_id, session_id=None):
+        """Return an existing session id, or create the session (under session_id if given)."""
+        if session_id:
+            session = self.session_service.get_session(
+                app_name=self.app_name, user_id=user_id, session_id=session_id
+            )
+            if session is not None:
+                return session.id
+        session = self.session_service.create_session(
+            app_name=self.app_name, user_id=user_id, state=new_session_state(),
+            session_id=session_id or None,
+        )
+        return session.id
+
+    @asynccontextmanager
+    async def session_lock(self, session_id):
+        """Hold a session's turn lock; it is dropped once no turn holds or waits for it."""
+        entry = self._session_locks.get(session_id)
+        if entry is None:
+            entry = self._session_locks[session_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._session_locks[session_id]
+
+    def prepare_turn(self, fields):
+        """Validate a chat request and return (user_id, session_id, message)."""
+        message = (fields.get("message") or "").strip()
+        links = [v for k, v in fields.items() if k.startswith("url_")]
+        if links:
+            message = "\n".join([message, *(f"Attached link: {link}" for link in links)])
+        if not message:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "message is required")
+
+        user_id = fields.get("user_id") or self.user_id
+        return user_id, self.ensure_session(user_id, fields.get("session_id")), message
+
+    async def handle_chat(self, fields):
+        user_id, session_id, message = self.prepare_turn(fields)
+
+        async with self.session_lock(session_id):
+            add_user_query_to_history(
+                self.session_service, self.app_name, user_id, session_id, message
+            )
+            started = time.perf_counter()
+            try:
+                agent_name, response = await run_agent_turn(
+                    self.runner, user_id, session_id, message
+                )
+            except Exception:
+                logger.exception("Agent turn failed for session %s", session_id)
+                raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, "The assistant is unavailable")
+            self.turn_ms.append((time.perf_counter() - started) * 1000)
+
+        return {
+            "response": response or "",
+            "agent": agent_name,
+            "session_id": session_id,
+            "attachments": [],
+        }
+
+    async def handle_chat_stream(self, fields, writer):
+        user_id, session_id, message = self.prepare_turn(fields)
+
+        await start_event_stream(writer)
+        await send_event(writer, "session", {"session_id": session_id})
+        async with self.session_lock(session_id):
+            add_user_query_to_history(
+                self.session_service, self.app_name, user_id, session_id, message
+            )
+            try:
+                async for update in stream_agent_turn(
+                    self.runner, user_id, session_id, message
+                ):
+                    kind = update.pop("type")
+                    if kind == "done":
+                        if update["ttft_ms"] is not None:
+                            self.ttft_ms.append(update["ttft_ms"])
+                        self.turn_ms.append(update["total_ms"])
+                        update["session_id"] = session_id
+                    await send_event(writer, "token" if kind == "text" else kind, update)
+            except (ConnectionError, asyncio.CancelledError):
+                raise
+            except Exception:
+                logger.exception("Streaming turn failed for session %s", session_id)
+                await send_event(writer, "error", {"error": "The assistant is unavailable"})
+        await end_event_stream(writer)
+
+    async def handle_baggage_stream(self, tag, last_name, writer):
+        from customer_service_agent.baggage import FINAL_EVENTS, describe, get_scan_store, normalize_name
+
+        store = get_scan_store()
+        latest = store.latest(tag)
+        if latest is None or latest.last_name != normalize_name(last_name):
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No bag {tag} under {last_name}")
+
+        # Subscribe before sending the snapshot so no scan falls in between
+        watch = store.watch(tag)
+        try:
+            await start_event_stream(writer)
+            await send_event(writer, "status", describe(store.latest(tag)))
+            if store.latest(tag).event not in FINAL_EVENTS:
+                async for delta in watch:
+                    await send_event(writer, "status", delta)
+                    if delta["final"]:
+                        break
+            await end_event_stream(writer)
+        finally:
+            watch.close()
+
+    async def handle_alert(self, event):
+        try:
+            alert, sessions = await self.alerts.publish(event)
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(exc))
+        return {"alert_id": alert["alert_id"], "message": alert["message"], "sessions": sessions}
+
+    async def handle_alert_stream(self, session_id, writer):
+        if not session_id:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "session_id is required")
+        stream = self.inbox.listen(session_id)
+        try:
+            await start_event_stream(writer)
+            await send_event(writer, "following", {"flights": self.alerts.index.flights_for(session_id)})
+            async for alert in stream:
+                await send_event(writer, "alert", alert)
+        finally:
+            stream.close()
+
+
+# ===== PART 3: Entry point =====
+
+
+def build_runner(session_service=None):
+    from customer_service_agent.agent import airline_assist_agent
+    from customer_service_agent.metering import meter_runner
+    from customer_service_agent.models.replay import configure_model
+    from customer_service_agent.session_store import SqliteSessionService
+    from customer_service_agent.tracing import instrument_runner
+
+    if session_service is None:
+        session_service = SqliteSessionService(os.getenv("SESSION_DB_PATH", "sessions.db"))
+    # A no-op unless TRACE_DIR is set
+    return instrument_runner(meter_runner(Runner(
+        # Replays or records model calls when MODEL_REPLAY / MODEL_RECORD is set
+        agent=configure_model(airline_assist_agent),
+        app_name=APP_NAME,
+        session_service=session_service,
+    )))
+
+
+async def main_async(host, port, workers=1):
+    from customer_service_agent.baggage import BAGGAGE_FEED_PORT_ENV, BAGGAGE_SCANS_ENV, get_scan_store, serve_feed
+
+    if workers > 1:
+        from workers import PreforkServer
+
+        server = await PreforkServer(workers).start(host, port)
+        print(f"AirlineAssist Pro chat server listening on http://{host}:{server.port}/chat "
+              f"with {workers} workers")
+        if os.getenv(BAGGAGE_FEED_PORT_ENV):
+            logger.warning("%s is ignored with --workers; workers replay %s instead",
+                           BAGGAGE_FEED_PORT_ENV, BAGGAGE_SCANS_ENV)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+        return
+
+    server = await ChatServer(build_runner()).start(host, port)
+    print(f"AirlineAssist Pro chat server listening on http://{host}:{server.port}/chat")
+    feed_port = os.getenv(BAGGAGE_FEED_PORT_ENV)
+    if feed_port:
+        await serve_feed(get_scan_store(), host, int(feed_port))
+        print(f"Accepting baggage scans on {host}:{feed_port}")
+    await server.serve_forever()
+
+
+def main():
+    """Entry point for the HTTP chat server."""
+    parser = argparse.ArgumentParser(description="Serve the AirlineAssist Pro chat API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv(SERVER_WORKERS_ENV, "1")),
+                        help="worker processes, each owning a share of the sessions (see workers.py)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main_async(args.host, args.port, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import copy
+import time
+import uuid
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from customer_service_agent.history import SUMMARY_KEY, history_manager
+
+APP_NAME = "AirlineAssist Pro"
+
+# Default state for a new customer session. Every key referenced by the
+# orchestrator instruction template must exist before the first turn.
+initial_state = {
+    "customer_name": "Guest",
+    "ff_number": "Not provided",
+    "loyalty_status": "None",
+    "active_bookings": [],
+    "booking_history": [],
+    "flight_alerts": [],
+    "interaction_history": [],
+    "history_summary": "",
+}
+
+
+def new_session_state():
+    """Return a fresh copy of the initial session state."""
+    return copy.deepcopy(initial_state)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sequence of numbers (pct in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def update_interaction_history(session_service, app_name, user_id, session_id, entry):
+    """Append an entry to state['interaction_history'] through a state delta event."""
+    session = session_service.get_session(
+        app_name=app_name, user_id=user_id, session_id=session_id
+    )
+    if "timestamp" not in entry:
+        entry["timestamp"] = time.strftime("%Y-%m-%d %H:%M:%S")
+
+    # Keeps the last few turns verbatim and folds older ones into a summary
+    interaction_history, history_summary = history_manager.append(
+        session.state.get("interaction_history"),
+        session.state.get(SUMMARY_KEY),
+        entry,
+    )
+
+    event = Event(
+        invocation_id=f"history-{uuid.uuid4().hex}",
+        author="system",
+        actions=EventActions(
+            state_delta={
+                "interaction_history": interaction_history,
+                SUMMARY_KEY: history_summary,
+            }
+        ),
+        timestamp=time.time(),
+    )
+    session_service.append_event(session, event)
+
+
+def add_user_query_to_history(session_service, app_name, user_id, session_id, query):
+    """Record the customer's query in the interaction history."""
+    update_interaction_history(
+        session_service,
+        app_name,
+        user_id,
+        session_id,
+        {"action": "user_query", "query": query},
+    )
+
+
+def add_agent_response_to_history(
+    session_service, app_name, user_id, session_id, agent_name, response
+):
+    """Record the final agent response in the interaction history."""
+    update_interaction_history(
+        session_service,
+        app_name,
+        user_id,
+        session_id,
+        {"action": "agent_response", "agent": agent_name, "response": response},
+    )
+
+
+def _event_text(event):
+    if not event.content or not event.content.parts:
+        return ""
+    return "".join(part.text or "" for part in event.content.parts if not part.thought)
+
+
+async def stream_agent_turn(runner, user_id, session_id, query, stream=True):
+    """Run one conversation turn, yielding updates as soon as ADK produces them.
+
+    Yields dicts with a "type" of:
+      - "text": a chunk of model text for the customer
+      - "tool_call" / "tool_result": a sub-agent invoked or finished a tool
+      - "done": the final response with ttft_ms (time to first text) and total_ms
+    With stream=False the model is called without SSE and text arrives as
+    one chunk per response.
+    """
+    content = types.Content(role="user", parts=[types.Part(text=query)])
+    run_config = RunConfig(
+        streaming_mode=StreamingMode.SSE if stream else StreamingMode.NONE
+    )
+
+    started = time.perf_counter()
+    ttft = None
+    streamed_partial = False
+    final_response_text = None
+    agent_name = None
+    async for event in runner.run_async(
+        user_id=user_id, session_id=session_id, new_message=content, run_config=run_config
+    ):
+        for call in event.get_function_calls():
+            yield {"type": "tool_call", "agent": event.author, "name": call.name, "args": call.args}
+        for result in event.get_function_responses():
+            yield {"type": "tool_result", "agent": event.author, "name": result.name}
+
+        text = _event_text(event)
+        if text:
+            # With SSE the partial chunks are followed by one aggregated event
+            # repeating the full text; only forward it if nothing was streamed.
+            if event.partial or not streamed_partial:
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                yield {"type": "text", "agent": event.author, "text": text}
+            streamed_partial = bool(event.partial)
+
+        if event.is_final_response() and text:
+            final_response_text = text
+            agent_name = event.author
+
+    if final_response_text:
+        add_agent_response_to_history(
+            runner.session_service,
+            runner.app_name,
+            user_id,
+            session_id,
+            agent_name,
+            final_response_text,
+        )
+    yield {
+        "type": "done",
+        "agent": agent_name,
+        "response": final_response_text,
+        "ttft_ms": None if ttft is None else ttft * 1000,
+        "total_ms": (time.perf_counter() - started) * 1000,
+    }
+
+
+async def run_agent_turn(runner, user_id, session_id, query):
+    """Run one conversation turn and return (agent_name, final_response_text)."""
+    async for update in stream_agent_turn(runner, user_id, session_id, query, stream=False):
+        if update["type"] == "done":
+            return update["agent"], update["response"]
+
+
+async def call_agent_async(runner, user_id, session_id, query, stream=False):
+    """Process a user query through the agent and print the response.
+
+    With stream=True text is printed as it arrives, along with tool calls and
+    the time to first token.
+    """
+    print(f"\nProcessing query: {query}")
+    if not stream:
+        agent_name, response = await run_agent_turn(runner, user_id, session_id, query)
+        if response:
+            print(f"\n[{agent_name}]: {response}\n")
+        else:
+            print("\nNo response received from the agent.\n")
+        return response
+
+    current_agent = None
+    async for update in stream_agent_turn(runner, user_id, session_id, query):
+        if update["type"] == "text":
+            if update["agent"] != current_agent:
+                current_agent = update["agent"]
+                print(f"\n[{current_agent}]: ", end="")
+            print(update["text"], end="", flush=True)
+        elif update["type"] == "tool_call":
+            print(f"\n  -> {update['agent']} calling {update['name']}({update['args']})", flush=True)
+            current_agent = None
+        elif update["type"] == "done":
+            if update["ttft_ms"] is None:
+                print("\nNo response received from the agent.\n")
+            else:
+                print(
+                    f"\n\n(first token {update['ttft_ms']:.0f} ms, "
+                    f"turn {update['total_ms']:.0f} ms)\n"
+                )
+            return update["response"]
@@ -0,0 +1,481 @@
+# workers.py
+"""Pre-fork worker mode for server.py: one ChatServer per core, sessions pinned to a worker.
+
+Run with: python server.py --workers 4
+
+A single ChatServer runs every session on one event loop, so CPU spent in
+one turn (JSON encoding, prompt assembly, the tool engines) stalls all the
+others. In worker mode the supervisor starts --workers processes, each with
+its own Runner and ChatServer listening on a Unix socket, and fronts them on
+the public port. Every request that names a session is relayed to the worker
+that owns it, so the session's state, its turn lock, its alert stream and
+the write-behind session cache stay in one process. A /chat request without
+a session_id is given a fresh id first (the X-Session-Id header) and routed
+by it, so the worker that creates a session is the one that serves it.
+
+Ownership comes from a consistent-hash ring with virtual nodes rather than
+hash % workers: restarting with one more worker moves about 1/N of the
+sessions instead of nearly all of them. Workers are forked from a
+forkserver that has already imported the agent, so each one starts from a
+warm copy of the module state.
+
+The supervisor restarts a worker that exits, after a back-off that doubles
+with each crash in a row (a worker that stayed up STABLE_UPTIME_S resets
+it). Requests for a worker that is restarting wait up to WORKER_WAIT_S for
+it. POST /alerts is sent to every worker, /metrics and /health are answered
+by the supervisor with every worker's figures, and requests that belong to
+no session go round-robin.
+"""
+import asyncio
+import bisect
+import hashlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import time
+import uuid
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from customer_service_agent.alerts import make_alert
+from customer_service_agent.registry import load_object
+from server import ChatServer, HTTPError, parse_form, read_request, write_response
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RUNNER_FACTORY = "server:build_runner"
+PRELOAD_MODULES = ["server", "customer_service_agent.agent"]
+VIRTUAL_NODES = 160
+READY_TIMEOUT_S = 60.0
+WORKER_WAIT_S = 10.0
+STOP_TIMEOUT_S = 10.0
+DRAIN_TIMEOUT_S = 5.0
+RESTART_BACKOFF_S = 0.5
+MAX_BACKOFF_S = 30.0
+STABLE_UPTIME_S = 30.0
+IDLE_CONNECTIONS = 64
+
+# Not forwarded to a worker: the supervisor keeps its own connections alive
+HOP_HEADERS = {"connection", "content-length", "keep-alive", "transfer-encoding"}
+
+
+def ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring over worker slots, with virtual nodes to even out the load."""
+
+    def __init__(self, slots, replicas=VIRTUAL_NODES):
+        points = sorted((ring_hash(f"worker-{slot}#{i}"), slot) for slot in range(slots) for i in range(replicas))
+        self.hashes = [point for point, _ in points]
+        self.slots = [slot for _, slot in points]
+
+    def slot(self, key):
+        index = bisect.bisect(self.hashes, ring_hash(key))
+        return self.slots[index % len(self.slots)]
+
+
+def routing_key(target, headers, body):
+    """The session a request belongs to, or None if any worker can answer it."""
+    if headers.get("x-session-id"):
+        return headers["x-session-id"]
+    query = parse_qs(urlsplit(target).query)
+    if query.get("session_id"):
+        return query["session_id"][-1]
+    if body:
+        try:
+            return parse_form(headers, body).get("session_id") or None
+        except HTTPError:
+            return None  # the worker answers the malformed body
+    return None
+
+
+# ----- worker process -----
+
+
+def run_worker(slot, path, factory, args):
+    """Process entry point: build a Runner with factory ("module:attribute") and serve it on path."""
+    logging.basicConfig(level=logging.INFO, format=f"[worker {slot}] %(levelname)s %(name)s: %(message)s")
+    # Ctrl-C reaches the whole process group; the supervisor stops workers with SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    runner = load_object(factory)(*args)
+    asyncio.run(serve_worker(runner, path))
+
+
+async def serve_worker(runner, path):
+    server = await ChatServer(runner).start(path=path)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, stop.set)
+    await stop.wait()
+    await server.close()
+    # Let open connections finish their turn; the supervisor has already hung up on the idle ones
+    handlers = asyncio.all_tasks() - {asyncio.current_task()}
+    if handlers:
+        await asyncio.wait(handlers, timeout=DRAIN_TIMEOUT_S)
+    close = getattr(runner.session_service, "close", None)
+    if close is not None:
+        close()  # flush write-behind session state before exiting
+
+
+# ----- supervisor -----
+
+
+class Worker:
+    """One supervised slot: its current process, socket and idle connections."""
+
+    def __init__(self, slot, path):
+        self.slot = slot
+        self.path = path
+        self.process = None
+        self.ready = asyncio.Event()
+        self.idle = []
+        self.started_at = 0.0
+        self.restarts = 0
+        self.crashes_in_a_row = 0
+        self.last_exit = None
+        self.requests = 0
+
+    def drop_connections(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+    def stats(self):
+        alive = self.process is not None and self.process.is_alive()
+        return {
+            "slot": self.slot,
+            "pid": self.process.pid if alive else None,
+            "ready": "yes" if self.ready.is_set() else "no",
+            "uptime_s": round(time.monotonic() - self.started_at, 1) if alive else 0.0,
+            "restarts": self.restarts,
+            "last_exit": self.last_exit,
+            "requests": self.requests,
+        }
+
+
+class PreforkServer:
+    """Serves the ChatServer routes on one port, backed by supervised worker processes."""
+
+    def __init__(self, workers, factory=DEFAULT_RUNNER_FACTORY, args=()):
+        self.factory = factory
+        self.args = tuple(args)
+        self.ring = HashRing(workers)
+        self.socket_dir = tempfile.mkdtemp(prefix="airlineassist-workers-")
+        self.workers = [Worker(slot, os.path.join(self.socket_dir, f"worker-{slot}.sock"))
+                        for slot in range(workers)]
+        self.context = multiprocessing.get_context("forkserver")
+        self.context.set_forkserver_preload(PRELOAD_MODULES)
+        self.sessions_assigned = 0
+        self.bad_gateway = 0
+        self._next = itertools.cycle(self.workers)
+        self._tasks = set()
+        self._closing = False
+        self._server = None
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host="127.0.0.1", port=8000):
+        for worker in self.workers:
+            self._spawn(worker)
+        for worker in self.workers:
+            try:
+                await asyncio.wait_for(worker.ready.wait(), READY_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                await self.close()
+                raise RuntimeError(f"Worker {worker.slot} did not start within {READY_TIMEOUT_S:.0f} s")
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._closing = True
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        loop = asyncio.get_running_loop()
+        for worker in self.workers:
+            worker.drop_connections()
+            if worker.process is not None:
+                loop.remove_reader(worker.process.sentinel)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT_S
+        for worker in self.workers:
+            if worker.process is not None:
+                await loop.run_in_executor(None, worker.process.join, max(0.0, deadline - time.monotonic()))
+                if worker.process.is_alive():
+                    worker.process.kill()
+        shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+    # ----- supervision -----
+
+    def _spawn(self, worker):
+        if self._closing:
+            return
+        if os.path.exists(worker.path):
+            os.unlink(worker.path)
+        worker.process = self.context.Process(
+            target=run_worker, args=(worker.slot, worker.path, self.factory, self.args),
+            name=f"chat-worker-{worker.slot}", daemon=True,
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        asyncio.get_running_loop().add_reader(worker.process.sentinel, self._exited, worker, worker.process)
+        self._track(self._wait_ready(worker, worker.process))
+
+    def _track(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _wait_ready(self, worker, process):
+        """Mark the worker ready once its socket accepts connections."""
+        deadline = time.monotonic() + READY_TIMEOUT_S
+        while process.is_alive() and time.monotonic() < deadline:
+            try:
+                connection = await asyncio.open_unix_connection(worker.path)
+            except (FileNotFoundError, ConnectionError):
+                await asyncio.sleep(0.05)
+                continue
+            worker.idle.append(connection)
+            worker.ready.set()
+            logger.info("Worker %d ready (pid %d)", worker.slot, process.pid)
+            return
+        if process.is_alive():
+            logger.error("Worker %d did not start within %.0f s; restarting it", worker.slot, READY_TIMEOUT_S)
+            process.kill()
+
+    def _exited(self, worker, process):
+        asyncio.get_running_loop().remove_reader(process.sentinel)
+        process.join()
+        worker.ready.clear()
+        worker.drop_connections()
+        worker.last_exit = process.exitcode
+        if self._closing:
+            return
+        if time.monotonic() - worker.started_at >= STABLE_UPTIME_S:
+            worker.crashes_in_a_row = 0
+        delay = 0.0 if worker.crashes_in_a_row == 0 else min(
+            MAX_BACKOFF_S, RESTART_BACKOFF_S * 2 ** (worker.crashes_in_a_row - 1))
+        worker.crashes_in_a_row += 1
+        worker.restarts += 1
+        logger.warning("Worker %d (pid %d) exited with %s; restarting in %.1f s",
+                       worker.slot, process.pid, process.exitcode, delay)
+        asyncio.get_running_loop().call_later(delay, self._spawn, worker)
+
+    # ----- routing -----
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = True
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    result = await self.dispatch(method, target, headers, body, writer)
+                    if result is None or result is False:
+                        # The worker's response was relayed as is.
+                        if result is None and keep_alive:
+                            continue
+                        break
+                    status, payload = result
+                except HTTPError as e:
+                    status, payload, keep_alive = e.status, {"error": e.message}, False
+                await write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, headers, body, writer):
+        """Answer or relay a request: (status, payload), None once relayed, or False to drop the connection."""
+        route = urlsplit(target).path
+        if method == "OPTIONS":
+            return HTTPStatus.NO_CONTENT, None
+        if route == "/health" and method == "GET":
+            ready = sum(worker.ready.is_set() for worker in self.workers)
+            return HTTPStatus.OK, {"status": "ok" if ready == len(self.workers) else "degraded",
+                                   "workers_ready": ready, "workers": len(self.workers)}
+        if route == "/metrics" and method == "GET":
+            return HTTPStatus.OK, await self.metrics()
+        if route == "/alerts" and method == "POST":
+            return HTTPStatus.ACCEPTED, await self.handle_alert(parse_form(headers, body))
+
+        key = routing_key(target, headers, body)
+        if key is None and route in ("/chat", "/chat/stream") and method == "POST":
+            key = headers["x-session-id"] = str(uuid.uuid4())
+            self.sessions_assigned += 1
+        worker = next(self._next) if key is None else self.worker_for(key)
+        if not await self.forward(worker, method, target, headers, body, writer):
+            return False
+        return None
+
+    def worker_for(self, session_id):
+        return self.workers[self.ring.slot(session_id)]
+
+    async def _connection(self, worker):
+        try:
+            await asyncio.wait_for(worker.ready.wait(), WORKER_WAIT_S)
+        except asyncio.TimeoutError:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, f"Worker {worker.slot} is restarting")
+        while worker.idle:
+            reader, writer = worker.idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        try:
+            reader, writer = await asyncio.open_unix_connection(worker.path)
+        except (FileNotFoundError, ConnectionError):
+            self.bad_gateway += 1
+            raise HTTPError(HTTPStatus.BAD_GATEWAY, f"Worker {worker.slot} is unavailable")
+        return reader, writer, False
+
+    def _release(self, worker, connection, reusable):
+        if reusable and worker.ready.is_set() and len(worker.idle) < IDLE_CONNECTIONS:
+            worker.idle.append(connection)
+        else:
+            connection[1].close()
+
+    async def forward(self, worker, method, target, headers, body, writer):
+        """Relay one request to worker and its response back; returns False if the client must be dropped."""
+        request = encode_request(method, target, headers, body)
+        worker.requests += 1
+        while True:
+            upstream, downstream, reused = await self._connection(worker)
+            try:
+                downstream.write(request)
+                await downstream.drain()
+                response_headers, response_head = await read_response_head(upstream)
+                break
+            except (asyncio.IncompleteReadError, ConnectionError):
+                downstream.close()
+                if not reused:
+                    self.bad_gateway += 1
+                    raise HTTPError(HTTPStatus.BAD_GATEWAY, f"Worker {worker.slot} dropped the request")
+                # A pooled connection went stale (the worker restarted); retry on a new one
+
+        reusable = False
+        try:
+            writer.write(response_head)
+            reusable = await relay_body(upstream, writer, response_headers)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # Either side went away mid-response: the client cannot get a clean answer now
+            return False
+        finally:
+            self._release(worker, (upstream, downstream), reusable)
+        return reusable
+
+    async def broadcast(self, method, target, payload=None):
+        """Send a JSON request to every ready worker; returns their decoded responses (None on failure)."""
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        headers = {} if payload is None else {"content-type": "application/json"}
+        request = encode_request(method, target, headers, body)
+
+        async def ask(worker):
+            upstream, downstream, _ = await self._connection(worker)
+            reusable = False
+            try:
+                downstream.write(request)
+                await downstream.drain()
+                response_headers, _ = await read_response_head(upstream)
+                data = await upstream.readexactly(int(response_headers.get("content-length", 0) or 0))
+                reusable = response_headers.get("connection", "").lower() != "close"
+                return json.loads(data) if data else None
+            except (asyncio.IncompleteReadError, ConnectionError, HTTPError):
+                return None
+            finally:
+                self._release(worker, (upstream, downstream), reusable)
+
+        ready = [worker for worker in self.workers if worker.ready.is_set()]
+        return await asyncio.gather(*(ask(worker) for worker in ready))
+
+    async def handle_alert(self, event):
+        # Validate and number the alert once, so every worker sends the same alert_id
+        try:
+            alert = make_alert(event)
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(exc))
+        results = await self.broadcast("POST", "/alerts", {**event, "alert_id": alert["alert_id"]})
+        sessions = sum(result.get("sessions", 0) for result in results if result)
+        return {"alert_id": alert["alert_id"], "message": alert["message"], "sessions": sessions}
+
+    def stats(self):
+        return {
+            "workers": [worker.stats() for worker in self.workers],
+            "restarts": sum(worker.restarts for worker in self.workers),
+            "sessions_assigned": self.sessions_assigned,
+            "bad_gateway": self.bad_gateway,
+        }
+
+    async def metrics(self):
+        results = await self.broadcast("GET", "/metrics")
+        return {
+            "supervisor": self.stats(),
+            "per_worker": results,
+        }
+
+
+def encode_request(method, target, headers, body):
+    head = f"{method} {target} HTTP/1.1\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in headers.items() if name not in HOP_HEADERS)
+    head += f"Content-Length: {len(body)}\r\n\r\n"
+    return head.encode("latin-1") + body
+
+
+async def read_response_head(reader):
+    """Read a response's status line and headers; returns (headers, raw head bytes)."""
+    lines = [await reader.readline()]
+    if not lines[0]:
+        raise asyncio.IncompleteReadError(b"", None)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise asyncio.IncompleteReadError(b"", None)
+        lines.append(line)
+        if line in (b"\r\n", b"\n"):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return headers, b"".join(lines)
+
+
+async def relay_body(reader, writer, headers):
+    """Copy a response body from a worker to the client, flushing each chunk of an event stream.
+
+    Returns whether the worker connection can take another request.
+    """
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size_line = await reader.readline()
+            if not size_line:
+                raise asyncio.IncompleteReadError(b"", None)
+            size = int(size_line.split(b";", 1)[0].strip(), 16)
+            writer.write(size_line + await reader.readexactly(size + 2))
+            await writer.drain()
+            if size == 0:
+                break
+    else:
+        length = int(headers.get("content-length", 0) or 0)
+        writer.write(await reader.readexactly(length) if length else b"")
+        await writer.drain()
+    return headers.get("connection", "").lower() != "close"